@@ -309,6 +309,7 @@ class AutomationDiscovery(DiscoveryAutomation):
             selected_sections=NO_SELECTION,
             simulation_mode=config.simulation_mode,
             snmp_backend_override=None,
+            source_timeout=config.fetcher_source_timeout,
             password_store_file=cmk.utils.password_store.pending_password_store_path(),
         )
         for hostname in hostnames:
@@ -453,6 +454,7 @@ class AutomationDiscoveryPreview(Automation):
             selected_sections=NO_SELECTION,
             simulation_mode=config.simulation_mode,
             snmp_backend_override=None,
+            source_timeout=config.fetcher_source_timeout,
             password_store_file=cmk.utils.password_store.pending_password_store_path(),
         )
         ip_address_of = config.ConfiguredIPLookup(
@@ -755,6 +757,7 @@ def _execute_autodiscovery() -> tuple[Mapping[HostName, DiscoveryResult], bool]:
         selected_sections=NO_SELECTION,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=None,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.core_password_store_path(LATEST_CONFIG),
     )
     section_plugins = SectionPluginMapper()
@@ -2717,6 +2720,8 @@ class AutomationUpdateDNSCache(Automation):
                 configured_ipv6_addresses=config.ipv6addresses,
                 simulation_mode=config.simulation_mode,
                 override_dns=HostAddress(config.fake_dns) if config.fake_dns is not None else None,
+                max_workers=config.dns_cache_update_max_workers,
+                lookup_timeout=config.dns_cache_update_lookup_timeout,
             )
         )
 
@@ -10,8 +10,10 @@ from __future__ import annotations
 import functools
 import itertools
 import logging
+import threading
 import time
 from collections.abc import Callable, Container, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future
 from dataclasses import dataclass
 from functools import partial
 from pathlib import Path
@@ -57,7 +59,7 @@ from cmk.checkengine.checkresults import (
     UnsubmittableServiceCheckResult,
 )
 from cmk.checkengine.discovery import AutocheckEntry, DiscoveryPlugin, HostLabelPlugin
-from cmk.checkengine.fetcher import HostKey, SourceInfo, SourceType
+from cmk.checkengine.fetcher import FetcherType, HostKey, SourceInfo, SourceType
 from cmk.checkengine.inventory import InventoryPlugin, InventoryPluginName
 from cmk.checkengine.parameters import Parameters
 from cmk.checkengine.parser import HostSections, NO_SELECTION, parse_raw_data, SectionNameCollection
@@ -103,7 +105,7 @@ from cmk.agent_based.prediction_backend import (
 from cmk.agent_based.v1 import IgnoreResults, IgnoreResultsError, Metric
 from cmk.agent_based.v1 import Result as CheckFunctionResult
 from cmk.agent_based.v1 import State
-from cmk.ccc.exceptions import MKTimeout, OnError
+from cmk.ccc.exceptions import MKFetcherError, MKTimeout, OnError
 
 __all__ = [
     "CheckPluginMapper",
@@ -120,7 +122,12 @@ __all__ = [
 
 
 def _fetch_all(
-    sources: Iterable[Source], *, simulation: bool, file_cache_options: FileCacheOptions, mode: Mode
+    sources: Iterable[Source],
+    *,
+    simulation: bool,
+    file_cache_options: FileCacheOptions,
+    mode: Mode,
+    timeout: float | None = None,
 ) -> Sequence[
     tuple[
         SourceInfo,
@@ -129,15 +136,106 @@ def _fetch_all(
     ]
 ]:
     console.verbose(f"{tty.yellow}+{tty.normal} FETCHING DATA")
-    return [
-        _do_fetch(
+    fetches = [
+        (
             source.source_info(),
             source.file_cache(simulation=simulation, file_cache_options=file_cache_options),
             source.fetcher(),
-            mode=mode,
         )
         for source in sources
     ]
+    if len(fetches) < 2 and timeout is None:
+        return [
+            _do_fetch(source_info, file_cache, fetcher, mode=mode)
+            for source_info, file_cache, fetcher in fetches
+        ]
+    return _fetch_concurrently(fetches, mode=mode, timeout=timeout)
+
+
+def _fetch_concurrently(
+    fetches: Sequence[tuple[SourceInfo, FileCache, Fetcher]],
+    *,
+    mode: Mode,
+    timeout: float | None,
+) -> Sequence[
+    tuple[
+        SourceInfo,
+        result.Result[AgentRawData | SNMPRawData, Exception],
+        Snapshot,
+    ]
+]:
+    """Fetch the sources in threads and return the results in the order of the sources
+
+    The SNMP fetchers share the single OID cache of the process, so they run one after
+    the other. A source that has not delivered after `timeout` seconds is reported as
+    failed. Its thread cannot be interrupted, but what it fetches is discarded. The
+    threads are daemon threads, so a source that hangs does not keep the process alive.
+    """
+    lanes: dict[int | None, list[int]] = {}
+    for index, (source_info, _file_cache, _fetcher) in enumerate(fetches):
+        lanes.setdefault(
+            None if source_info.fetcher_type is FetcherType.SNMP else index, []
+        ).append(index)
+
+    futures = [
+        Future[tuple[SourceInfo, result.Result[AgentRawData | SNMPRawData, Exception], Snapshot]]()
+        for _fetch in fetches
+    ]
+
+    def fetch_lane(lane: Sequence[int]) -> None:
+        for index in lane:
+            if not futures[index].set_running_or_notify_cancel():
+                continue
+            source_info, file_cache, fetcher = fetches[index]
+            try:
+                futures[index].set_result(
+                    _do_fetch(source_info, file_cache, fetcher, mode=mode, thread=True)
+                )
+            except Exception as exc:
+                futures[index].set_exception(exc)
+
+    start = time.monotonic()
+    deadlines = {
+        index: None if timeout is None else start + timeout * (position + 1)
+        for lane in lanes.values()
+        for position, index in enumerate(lane)
+    }
+    try:
+        for number, lane in enumerate(lanes.values()):
+            threading.Thread(
+                target=fetch_lane, args=(lane,), name=f"fetch_{number}", daemon=True
+            ).start()
+        return [
+            _wait_for_fetch(fetches[index][0], future, deadlines[index], timeout)
+            for index, future in enumerate(futures)
+        ]
+    finally:
+        # Don't start what nobody waits for anymore, be it after a timeout or an error.
+        for future in futures:
+            future.cancel()
+
+
+def _wait_for_fetch(
+    source_info: SourceInfo,
+    future: Future[
+        tuple[SourceInfo, result.Result[AgentRawData | SNMPRawData, Exception], Snapshot]
+    ],
+    deadline: float | None,
+    timeout: float | None,
+) -> tuple[
+    SourceInfo,
+    result.Result[AgentRawData | SNMPRawData, Exception],
+    Snapshot,
+]:
+    try:
+        return future.result(None if deadline is None else max(deadline - time.monotonic(), 0))
+    except TimeoutError:
+        console.debug(f"  Source: {source_info} timed out")
+        return (
+            source_info,
+            result.Error(MKFetcherError(f"Fetching data timed out after {timeout} seconds")),
+            Snapshot.null(),
+        )
 
 
 def _do_fetch(
@@ -146,13 +244,14 @@ def _do_fetch(
     fetcher: Fetcher,
     *,
     mode: Mode,
+    thread: bool = False,
 ) -> tuple[
     SourceInfo,
     result.Result[AgentRawData | SNMPRawData, Exception],
     Snapshot,
 ]:
     console.debug(f"  Source: {source_info}")
-    with CPUTracker(console.debug) as tracker:
+    with CPUTracker(console.debug, thread=thread) as tracker:
         raw_data = get_raw_data(file_cache, fetcher, mode)
     return source_info, raw_data, tracker.duration
 
@@ -332,6 +431,7 @@ class CMKFetcher:
         simulation_mode: bool,
         max_cachefile_age: MaxAge | None = None,
         snmp_backend_override: SNMPBackendEnum | None,
+        source_timeout: float | None = None,
     ) -> None:
         self.config_cache: Final = config_cache
         self.factory: Final = factory
@@ -345,6 +445,7 @@ class CMKFetcher:
         self.simulation_mode: Final = simulation_mode
         self.max_cachefile_age: Final = max_cachefile_age
         self.snmp_backend_override: Final = snmp_backend_override
+        self.source_timeout: Final = source_timeout
 
     def __call__(self, host_name: HostName, *, ip_address: HostAddress | None) -> Sequence[
         tuple[
@@ -457,6 +558,7 @@ class CMKFetcher:
             simulation=self.simulation_mode,
             file_cache_options=self.file_cache_options,
             mode=self.mode,
+            timeout=self.source_timeout,
         )
 
 
@@ -14,6 +14,7 @@ import ipaddress
 import itertools
 import logging
 import marshal
+import mmap
 import numbers
 import os
 import pickle
@@ -516,6 +517,7 @@ def _perform_post_config_loading_actions() -> None:
     global_dict = globals()
     _collect_parameter_rulesets_from_globals(global_dict)
     _transform_plugin_names_from_160_to_170(global_dict)
+    piggyback.set_storage(piggyback_storage)
 
     get_config_cache().initialize()
 
@@ -842,8 +844,49 @@ class PackedConfigGenerator:
         return helper_config
 
 
+class PackedRulesets(Mapping[str, Any]):
+    """Rulesets of the packed configuration which are decoded on first access
+
+    A helper only needs the parameter rulesets of the plugins it actually executes.
+    """
+
+    def __init__(self, data: memoryview, index: Mapping[str, tuple[int, int]]) -> None:
+        self._data: Final = data
+        self._index: Final = index
+        self._decoded: dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        with contextlib.suppress(KeyError):
+            return self._decoded[name]
+        offset, length = self._index[name]
+        return self._decoded.setdefault(
+            name, pickle.loads(self._data[offset : offset + length])  # nosec B301 # BNS:c3c5e9
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __reduce__(self) -> tuple[type[dict], tuple[dict[str, Any]]]:
+        return dict, (dict(self.items()),)
+
+
 class PackedConfigStore:
-    """Caring about persistence of the packed configuration"""
+    """Caring about persistence of the packed configuration
+
+    Every configuration variable is pickled on its own, and the file is memory mapped for reading.
+    This way the helpers share the undecoded data in the page cache, and the rulesets in
+    _LAZY_VARIABLES are only decoded when they are used (see PackedRulesets).
+
+    File layout: magic, length of the index, pickled index, pickled values
+    """
+
+    _MAGIC: Final = b"CMKPACK\x01"
+    _INDEX_LENGTH: Final = struct.Struct("<Q")
+    # Large variables of rulesets which are only looked up by name
+    _LAZY_VARIABLES: Final = ("checkgroup_parameters", "inv_parameters")
 
     def __init__(self, path: Path) -> None:
         self.path: Final = path
@@ -857,15 +900,54 @@ class PackedConfigStore:
         return Path(config_path) / "precompiled_check_config.mk"
 
     def write(self, helper_config: Mapping[str, Any]) -> None:
+        values: list[bytes] = []
+        offset = 0
+
+        def add(value: object) -> tuple[int, int]:
+            nonlocal offset
+            values.append(pickled := pickle.dumps(value))
+            offset += len(pickled)
+            return offset - len(pickled), len(pickled)
+
+        index: dict[str, tuple[int, int] | dict[str, tuple[int, int]]] = {
+            varname: (
+                {name: add(ruleset) for name, ruleset in value.items()}
+                if varname in self._LAZY_VARIABLES and isinstance(value, Mapping)
+                else add(value)
+            )
+            for varname, value in helper_config.items()
+        }
+        pickled_index = pickle.dumps(index)
+
         self.path.parent.mkdir(parents=True, exist_ok=True)
         tmp_path = self.path.with_suffix(f"{self.path.suffix}.compiled")
         with tmp_path.open("wb") as compiled_file:
-            pickle.dump(helper_config, compiled_file)
+            compiled_file.write(self._MAGIC)
+            compiled_file.write(self._INDEX_LENGTH.pack(len(pickled_index)))
+            compiled_file.write(pickled_index)
+            compiled_file.writelines(values)
         tmp_path.rename(self.path)
 
     def read(self) -> Mapping[str, Any]:
         with self.path.open("rb") as f:
-            return pickle.load(f)  # nosec B301 # BNS:c3c5e9
+            # The mapping stays valid after closing the file, and even after it got replaced.
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        start = len(self._MAGIC) + self._INDEX_LENGTH.size
+        if bytes(data[: len(self._MAGIC)]) != self._MAGIC:
+            raise MKGeneralException(f"Invalid packed configuration: {self.path}")
+        (index_length,) = self._INDEX_LENGTH.unpack(data[len(self._MAGIC) : start])
+        index = pickle.loads(data[start : start + index_length])  # nosec B301 # BNS:c3c5e9
+        values = data[start + index_length :]
+
+        return {
+            varname: (
+                PackedRulesets(values, entry)
+                if isinstance(entry, dict)
+                else pickle.loads(values[entry[0] : entry[0] + entry[1]])  # nosec B301 # BNS:c3c5e9
+            )
+            for varname, entry in index.items()
+        }
 
 
 @contextlib.contextmanager
@@ -1923,6 +2005,7 @@ class ConfigCache:
             all_configured_hosts=list(set(self.hosts_config)),
             debug_matching_stats=ruleset_matching_stats,
         )
+        cache_manager.register_size_source("ruleset_matcher", self.ruleset_matcher.dump_sizes)
 
         self.ruleset_matcher.ruleset_optimizer.set_all_processed_hosts(
             {
@@ -2072,6 +2155,9 @@ class ConfigCache:
                 ],
                 character_encoding=self._snmp_character_encoding(host_name),
                 snmp_backend=self.get_snmp_backend(host_name),
+                table_walk_enabled=self.ruleset_matcher.get_host_bool_value(
+                    host_name, snmp_table_walk_hosts
+                ),
             ),
         )
         if backend_override:
@@ -3099,12 +3185,16 @@ class ConfigCache:
                 return SNMPBackendEnum.INLINE
             if host_backend == "classic":
                 return SNMPBackendEnum.CLASSIC
+            if host_backend == "asyncio":
+                return SNMPBackendEnum.ASYNCIO
             raise MKGeneralException(f"Bad Host SNMP Backend configuration: {host_backend}")
 
         if with_inline_snmp and snmp_backend_default == "inline":
             return SNMPBackendEnum.INLINE
         if snmp_backend_default == "classic":
             return SNMPBackendEnum.CLASSIC
+        if snmp_backend_default == "asyncio":
+            return SNMPBackendEnum.ASYNCIO
         # Note: in the above case we raise here.
         # I am not sure if this different behavior is intentional.
         return SNMPBackendEnum.CLASSIC
@@ -4647,6 +4737,7 @@ def get_ruleset_id_mapping() -> Mapping[int, str]:
         id(host_label_rules): "host_label_rules",
         id(bulkwalk_hosts): "bulkwalk_hosts",
         id(snmpv2c_hosts): "snmpv2c_hosts",
+        id(snmp_table_walk_hosts): "snmp_table_walk_hosts",
         id(snmp_without_sys_descr): "snmp_without_sys_descr",
         id(snmpv3_contexts): "snmpv3_contexts",
         id(usewalk_hosts): "usewalk_hosts",
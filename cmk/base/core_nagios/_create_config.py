@@ -6,12 +6,17 @@
 
 import base64
 import itertools
+import multiprocessing
+import re
 import socket
 import sys
 from collections import Counter
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterator, Mapping, Sequence
 from contextlib import suppress
+from dataclasses import dataclass
 from io import StringIO
+from multiprocessing.connection import Connection
+from pathlib import Path
 from typing import Any, cast, IO, Literal
 
 import cmk.utils.config_path
@@ -40,14 +45,21 @@ from cmk.base.core_config import (
     get_tags_with_groups_from_attributes,
 )
 
+import cmk.ccc.version as cmk_version
 from cmk.ccc import store
-from cmk.ccc.exceptions import MKGeneralException
+from cmk.ccc.exceptions import MKGeneralException, MKIPAddressLookupError
 
 from ._precompile_host_checks import precompile_hostchecks
 
 _ContactgroupName = str
 ObjectSpec = dict[str, Any]
 
+# Host check commands are numbered throughout the whole configuration. The objects of the hosts
+# are created separately, so their commands are marked to be numbered when merging them.
+_HOSTCHECK_COMMAND = "check-mk-host-custom-%d"
+_UNNUMBERED_HOSTCHECK_COMMAND = "\x00check-mk-host-custom-%d\x00"
+_UNNUMBERED_HOSTCHECK_COMMAND_RE = re.compile(r"\x00check-mk-host-custom-(\d+)\x00")
+
 
 class NagiosCore(core_config.MonitoringCore):
     @classmethod
@@ -68,7 +80,9 @@ class NagiosCore(core_config.MonitoringCore):
         hosts_to_update: set[HostName] | None = None,
     ) -> None:
         self._config_cache = config_cache
-        self._create_core_config(config_path, licensing_handler, passwords, ip_address_of)
+        self._create_core_config(
+            config_path, licensing_handler, passwords, ip_address_of, hosts_to_update
+        )
         self._precompile_hostchecks(config_path)
 
     def _create_core_config(
@@ -77,6 +91,7 @@ class NagiosCore(core_config.MonitoringCore):
         licensing_handler: LicensingHandler,
         passwords: Mapping[str, str],
         ip_address_of: config.IPLookup,
+        hosts_to_update: set[HostName] | None = None,
     ) -> None:
         """Tries to create a new Checkmk object configuration file for the Nagios core
 
@@ -103,6 +118,7 @@ class NagiosCore(core_config.MonitoringCore):
             licensing_handler=licensing_handler,
             passwords=passwords,
             ip_address_of=ip_address_of,
+            hosts_to_update=hosts_to_update,
         )
 
         store.save_text_to_file(cmk.utils.paths.nagios_objects_file, config_buffer.getvalue())
@@ -140,6 +156,7 @@ class NagiosConfig:
         self.active_checks_to_define: dict[str, str] = {}
         self.custom_commands_to_define: set[CoreCommandName] = set()
         self.hostcheck_commands_to_define: list[tuple[CoreCommand, str]] = []
+        self.hostcheck_command_format = _HOSTCHECK_COMMAND
 
     def write(self, x: str) -> None:
         # TODO: Something seems to be mixed up in our call sites...
@@ -163,17 +180,44 @@ def create_config(
     licensing_handler: LicensingHandler,
     passwords: Mapping[str, str],
     ip_address_of: config.IPLookup,
+    hosts_to_update: set[HostName] | None = None,
 ) -> None:
+    """Creates the objects of the given hosts
+
+    In case only hosts_to_update have been changed since the last configuration was created,
+    the objects of all other hosts are taken from that configuration.
+    """
     cfg = NagiosConfig(outfile, hostnames)
 
     _output_conf_header(cfg)
 
+    host_objects_store = _HostObjectsStore()
+    all_host_objects = host_objects_store.load_unchanged(hosts_to_update) if hosts_to_update else {}
+    for host_objects in all_host_objects.values():
+        _record_warnings_and_failures(host_objects, ip_address_of)
+
+    hosts_to_create = [hn for hn in hostnames if hn not in all_host_objects]
+    if config.core_config_generation_workers > 1 and len(hosts_to_create) > 1:
+        all_host_objects.update(
+            _create_host_objects_forked(
+                config_cache,
+                hosts_to_create,
+                passwords,
+                ip_address_of,
+                config.core_config_generation_workers,
+            )
+        )
+    else:
+        for hostname in hosts_to_create:
+            all_host_objects[hostname] = _create_host_objects(
+                config_cache, hostname, passwords, ip_address_of
+            )
+
     licensing_counter = Counter("services")
     all_notify_host_configs: dict[HostName, NotificationHostConfig] = {}
     for hostname in hostnames:
-        all_notify_host_configs[hostname] = _create_nagios_config_host(
-            cfg, config_cache, hostname, passwords, licensing_counter, ip_address_of
-        )
+        _merge_host_objects(cfg, all_host_objects[hostname], licensing_counter)
+        all_notify_host_configs[hostname] = all_host_objects[hostname].notify_host_config
 
     _validate_licensing(config_cache.hosts_config, licensing_handler, licensing_counter)
 
@@ -190,6 +234,221 @@ def create_config(
         cfg.write("\n# extra_nagios_conf\n\n")
         cfg.write(config.extra_nagios_conf)
 
+    host_objects_store.save(
+        {
+            hostname: all_host_objects[hostname]
+            for hostname in hostnames
+            # Give the lookup another chance the next time
+            if not all_host_objects[hostname].failed_ip_lookups
+        }
+    )
+
+
+@dataclass(frozen=True)
+class _HostObjects:
+    """Everything the configuration gets from a single host
+
+    Its host check commands are not numbered yet, see _merge_host_objects().
+    """
+
+    objects: str
+    notify_host_config: NotificationHostConfig
+    licensing_counter: Counter
+    hostgroups_to_define: set[HostgroupName]
+    servicegroups_to_define: set[ServicegroupName]
+    contactgroups_to_define: set[_ContactgroupName]
+    checknames_to_define: set[CheckPluginName]
+    active_checks_to_define: Mapping[str, str]
+    custom_commands_to_define: set[CoreCommandName]
+    hostcheck_commands_to_define: Sequence[tuple[CoreCommand, str]]
+    configuration_warnings: Sequence[str]
+    failed_ip_lookups: Mapping[HostName, Exception]
+
+
+class _HostObjectsStore:
+    """Keeps the objects of the hosts for the next incremental configuration"""
+
+    def __init__(self) -> None:
+        self.path = Path(cmk.utils.paths.var_dir, "core", "nagios_host_objects.pkl")
+
+    def load_unchanged(self, changed_hosts: set[HostName]) -> dict[HostName, _HostObjects]:
+        stored: Mapping[str, object] = store.load_object_from_pickle_file(self.path, default={})
+        if stored.get("version") != cmk_version.__version__:
+            return {}
+        all_host_objects = stored.get("hosts", {})
+        assert isinstance(all_host_objects, dict)
+        return {hn: ho for hn, ho in all_host_objects.items() if hn not in changed_hosts}
+
+    def save(self, all_host_objects: Mapping[HostName, _HostObjects]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        store.save_object_to_pickle_file(
+            self.path, {"version": cmk_version.__version__, "hosts": all_host_objects}
+        )
+
+
+def _create_host_objects(
+    config_cache: ConfigCache,
+    hostname: HostName,
+    passwords: Mapping[str, str],
+    ip_address_of: config.IPLookup,
+) -> _HostObjects:
+    outfile = StringIO()
+    cfg = NagiosConfig(outfile, [hostname])
+    cfg.hostcheck_command_format = _UNNUMBERED_HOSTCHECK_COMMAND
+    licensing_counter: Counter = Counter()
+    error_handler = _collected_ip_lookup_failures(ip_address_of)
+    known_failures = len(error_handler.failed_ip_lookups) if error_handler else 0
+    known_warnings = len(config_warnings.g_configuration_warnings)
+
+    notify_host_config = _create_nagios_config_host(
+        cfg, config_cache, hostname, passwords, licensing_counter, ip_address_of
+    )
+
+    return _HostObjects(
+        objects=outfile.getvalue(),
+        notify_host_config=notify_host_config,
+        licensing_counter=licensing_counter,
+        hostgroups_to_define=cfg.hostgroups_to_define,
+        servicegroups_to_define=cfg.servicegroups_to_define,
+        contactgroups_to_define=cfg.contactgroups_to_define,
+        checknames_to_define=cfg.checknames_to_define,
+        active_checks_to_define=cfg.active_checks_to_define,
+        custom_commands_to_define=cfg.custom_commands_to_define,
+        hostcheck_commands_to_define=cfg.hostcheck_commands_to_define,
+        configuration_warnings=config_warnings.g_configuration_warnings[known_warnings:],
+        failed_ip_lookups=(
+            {
+                # Exceptions have to survive pickling, the message is all that is reported
+                failed_host: MKIPAddressLookupError(str(exc))
+                for failed_host, exc in itertools.islice(
+                    error_handler.failed_ip_lookups.items(), known_failures, None
+                )
+            }
+            if error_handler
+            else {}
+        ),
+    )
+
+
+def _partition(hostnames: Sequence[HostName], num_slices: int) -> Iterator[Sequence[HostName]]:
+    slice_size = -(-len(hostnames) // num_slices)
+    for start in range(0, len(hostnames), slice_size):
+        yield hostnames[start : start + slice_size]
+
+
+def _create_host_objects_forked(
+    config_cache: ConfigCache,
+    hostnames: Sequence[HostName],
+    passwords: Mapping[str, str],
+    ip_address_of: config.IPLookup,
+    num_workers: int,
+) -> dict[HostName, _HostObjects]:
+    """Creates the host objects in worker processes
+
+    The workers are forked after the configuration has been loaded, so they share it
+    copy-on-write. Each worker handles a slice of the hosts.
+    """
+    context = multiprocessing.get_context("fork")
+    workers = []
+    try:
+        for number, hostnames_slice in enumerate(_partition(hostnames, num_workers)):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_create_host_objects_worker,
+                args=(sender, config_cache, hostnames_slice, passwords, ip_address_of),
+                name=f"core_config_{number}",
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            workers.append((process, receiver))
+
+        all_host_objects: dict[HostName, _HostObjects] = {}
+        for process, receiver in workers:
+            try:
+                result = receiver.recv()
+            except EOFError:
+                process.join()
+                raise MKGeneralException(
+                    f"Worker {process.name} died (exit code: {process.exitcode})"
+                )
+            if isinstance(result, str):
+                raise MKGeneralException(result)
+            for host_objects in result.values():
+                # The workers have already printed their warnings
+                _record_warnings_and_failures(host_objects, ip_address_of)
+            all_host_objects.update(result)
+        return all_host_objects
+    finally:
+        for process, receiver in workers:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _create_host_objects_worker(
+    connection: Connection,
+    config_cache: ConfigCache,
+    hostnames: Sequence[HostName],
+    passwords: Mapping[str, str],
+    ip_address_of: config.IPLookup,
+) -> None:
+    try:
+        result: dict[HostName, _HostObjects] | str = {
+            hostname: _create_host_objects(config_cache, hostname, passwords, ip_address_of)
+            for hostname in hostnames
+        }
+    except Exception as e:
+        # Exceptions may not survive pickling, the message is all the caller reports anyway
+        result = str(e)
+    connection.send(result)
+    connection.close()
+
+
+def _collected_ip_lookup_failures(
+    ip_address_of: config.IPLookup,
+) -> ip_lookup.CollectFailedHosts | None:
+    if isinstance(ip_address_of, config.ConfiguredIPLookup) and isinstance(
+        ip_address_of.error_handler, ip_lookup.CollectFailedHosts
+    ):
+        return ip_address_of.error_handler
+    return None
+
+
+def _record_warnings_and_failures(
+    host_objects: _HostObjects, ip_address_of: config.IPLookup
+) -> None:
+    """Records what creating the objects of a host in another process has brought up"""
+    config_warnings.g_configuration_warnings.extend(host_objects.configuration_warnings)
+    if error_handler := _collected_ip_lookup_failures(ip_address_of):
+        for hostname, exc in host_objects.failed_ip_lookups.items():
+            error_handler(hostname, exc)
+
+
+def _merge_host_objects(
+    cfg: NagiosConfig, host_objects: _HostObjects, licensing_counter: Counter
+) -> None:
+    offset = len(cfg.hostcheck_commands_to_define)
+
+    def number(text: str) -> str:
+        return _UNNUMBERED_HOSTCHECK_COMMAND_RE.sub(
+            lambda match: cfg.hostcheck_command_format % (offset + int(match.group(1))), text
+        )
+
+    cfg.write(number(host_objects.objects))
+    licensing_counter.update(host_objects.licensing_counter)
+    cfg.hostgroups_to_define.update(host_objects.hostgroups_to_define)
+    cfg.servicegroups_to_define.update(host_objects.servicegroups_to_define)
+    cfg.contactgroups_to_define.update(host_objects.contactgroups_to_define)
+    cfg.checknames_to_define.update(host_objects.checknames_to_define)
+    cfg.active_checks_to_define.update(host_objects.active_checks_to_define)
+    cfg.custom_commands_to_define.update(host_objects.custom_commands_to_define)
+    cfg.hostcheck_commands_to_define.extend(
+        (number(command), command_line)
+        for command, command_line in host_objects.hostcheck_commands_to_define
+    )
+
 
 def _output_conf_header(cfg: NagiosConfig) -> None:
     cfg.write(
@@ -271,7 +530,7 @@ def create_nagios_host_spec(  # pylint: disable=too-many-branches
             host_spec[key] = value
 
     def host_check_via_service_status(service: ServiceName) -> CoreCommand:
-        command = "check-mk-host-custom-%d" % (len(cfg.hostcheck_commands_to_define) + 1)
+        command = cfg.hostcheck_command_format % (len(cfg.hostcheck_commands_to_define) + 1)
         service_with_hostname = replace_macros_in_str(
             service,
             {"$HOSTNAME$": hostname},
@@ -50,8 +50,12 @@ agent_exclude_sections: list[RuleSpec[dict[str, str]]] = []
 snmp_ports: list[RuleSpec[int]] = []
 tcp_connect_timeout = 5.0
 tcp_connect_timeouts: list[RuleSpec[float]] = []
+fetcher_source_timeout: float | None = None  # secs. per source of a host, None: no limit
 use_dns_cache = True  # prevent DNS by using own cache file
+dns_cache_update_max_workers = 1  # parallel lookups during --update-dns-cache
+dns_cache_update_lookup_timeout: float | None = None  # secs. per lookup, None: no limit
 delay_precompile = False  # delay Python compilation to Nagios execution
+core_config_generation_workers = 1  # forked processes creating the host objects, 1: no forking
 restart_locking: Literal["abort", "wait"] | None = "abort"
 check_submission: Literal["file", "pipe"] = "file"
 default_host_group = "check_mk"
@@ -59,6 +63,8 @@ default_host_group = "check_mk"
 check_max_cachefile_age = 0  # per default do not use cache files when checking
 cluster_max_cachefile_age = 90  # secs.
 piggyback_max_cachefile_age = 3600  # secs
+# Where the piggyback data is kept, has to be the same for all processes of the site
+piggyback_storage: Literal["files", "segments"] = "files"
 # Ruleset for translating piggyback host names
 piggyback_translation: list[RuleSpec[TranslationOptions]] = []
 # Ruleset for translating service names
@@ -83,7 +89,7 @@ http_proxies: dict[str, dict[str, str]] = {}
 # SNMP communities and encoding
 
 # Global config for SNMP Backend
-snmp_backend_default: Literal["inline", "classic"] = "inline"
+snmp_backend_default: Literal["inline", "classic", "asyncio"] = "inline"
 # Deprecated: Replaced by snmp_backend_hosts
 use_inline_snmp: bool = True
 
@@ -229,6 +235,7 @@ tcp_hosts: list = [
 cmk_agent_connection: dict[HostName, Literal["pull-agent", "push-agent"]] = {}
 bulkwalk_hosts: list[RuleSpec[bool]] = []
 snmpv2c_hosts: list[RuleSpec[bool]] = []
+snmp_table_walk_hosts: list[RuleSpec[bool]] = []
 snmp_without_sys_descr: list[RuleSpec[bool]] = []
 snmpv3_contexts: list[
     RuleSpec[tuple[str | None, Sequence[str], Literal["continue_on_timeout", "stop_on_timeout"]]]
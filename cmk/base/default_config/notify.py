@@ -29,6 +29,10 @@ notification_rules: list[EventRule] = []
 # Check every 10 seconds for ripe bulks
 notification_bulk_interval = 10
 notification_plugin_timeout = 60
+# Number of notification plug-in calls running at the same time (1 = one after the other) and
+# the limit of calls running at the same time for each plug-in
+notification_plugin_workers = 1
+notification_max_calls_per_plugin = 4
 
 # Notification Spooling.
 
@@ -176,6 +176,8 @@ def parse_snmp_backend(backend: object) -> SNMPBackendEnum | None:
             return SNMPBackendEnum.INLINE
         case "classic":
             return SNMPBackendEnum.CLASSIC
+        case "asyncio":
+            return SNMPBackendEnum.ASYNCIO
         case "stored-walk":
             return SNMPBackendEnum.STORED_WALK
         case _:
@@ -312,7 +314,7 @@ _SNMP_BACKEND_OPTION: Final = Option(
     long_option="snmp-backend",
     short_help="Override default SNMP backend",
     argument=True,
-    argument_descr="inline|classic|stored-walk",
+    argument_descr="inline|classic|asyncio|stored-walk",
 )
 
 # .
@@ -833,6 +835,8 @@ def mode_update_dns_cache() -> None:
         configured_ipv4_addresses=config.ipv6addresses,
         simulation_mode=config.simulation_mode,
         override_dns=HostAddress(config.fake_dns) if config.fake_dns is not None else None,
+        max_workers=config.dns_cache_update_max_workers,
+        lookup_timeout=config.dns_cache_update_lookup_timeout,
     )
 
 
@@ -1457,7 +1461,7 @@ modes.register(
         long_help=[
             "You may add host names as additional arguments. This enables the incremental "
             "activate mechanism, only compiling these host names and using cached data for all "
-            "other hosts. Only supported with Checkmk Micro Core."
+            "other hosts."
         ],
         handler_function=mode_restart,
         short_help="Create core config + core restart",
@@ -1508,7 +1512,7 @@ modes.register(
         long_help=[
             "You may add host names as additional arguments. This enables the incremental "
             "activate mechanism, only compiling these host names and using cached data for all "
-            "other hosts. Only supported with Checkmk Micro Core."
+            "other hosts."
         ],
         handler_function=mode_reload,
         short_help="Create core config + core reload",
@@ -1710,6 +1714,8 @@ def mode_notify(options: dict, args: list[str]) -> int | None:
         ensure_nagios=ensure_nagios,
         bulk_interval=config.notification_bulk_interval,
         plugin_timeout=config.notification_plugin_timeout,
+        plugin_workers=config.notification_plugin_workers,
+        max_calls_per_plugin=config.notification_max_calls_per_plugin,
         config_contacts=config.contacts,
         fallback_email=config.notification_fallback_email,
         fallback_format=config.notification_fallback_format,
@@ -1790,6 +1796,7 @@ def mode_check_discovery(
             inventory=1.5 * check_interval,
         ),
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.core_password_store_path(LATEST_CONFIG),
     )
     parser = CMKParser(
@@ -2116,6 +2123,7 @@ def mode_discover(options: _DiscoveryOptions, args: list[str]) -> None:
         selected_sections=selected_sections,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.pending_password_store_path(),
     )
     for hostname in sorted(
@@ -2277,6 +2285,7 @@ def mode_check(
         selected_sections=selected_sections,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=(
             cmk.utils.password_store.core_password_store_path(LATEST_CONFIG)
             if precompiled_host_check
@@ -2322,7 +2331,8 @@ def mode_check(
         ) as value_store_manager,
     ):
         console.debug(f"Checkmk version {cmk_version.__version__}")
-        fetched = fetcher(hostname, ip_address=ipaddress)
+        with CPUTracker(console.debug) as fetch_tracker:
+            fetched = fetcher(hostname, ip_address=ipaddress)
         check_plugins = CheckPluginMapper(
             config_cache,
             value_store_manager,
@@ -2364,7 +2374,7 @@ def mode_check(
         checks_result = [
             *checks_result,
             make_timing_results(
-                tracker.duration,
+                fetch_tracker.duration + tracker.duration,
                 tuple((f[0], f[2]) for f in fetched),
                 perfdata_with_times=config.check_mk_perfdata_with_times,
             ),
@@ -2518,6 +2528,7 @@ def mode_inventory(options: _InventoryOptions, args: list[str]) -> None:
         selected_sections=selected_sections,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.pending_password_store_path(),
     )
     parser = CMKParser(
@@ -2770,6 +2781,7 @@ def mode_inventory_as_check(
         selected_sections=NO_SELECTION,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.core_password_store_path(LATEST_CONFIG),
     )
     parser = CMKParser(
@@ -2934,6 +2946,7 @@ def mode_inventorize_marked_hosts(options: Mapping[str, object]) -> None:
         selected_sections=NO_SELECTION,
         simulation_mode=config.simulation_mode,
         snmp_backend_override=snmp_backend_override,
+        source_timeout=config.fetcher_source_timeout,
         password_store_file=cmk.utils.password_store.core_password_store_path(LATEST_CONFIG),
     )
 
@@ -21,16 +21,19 @@ import itertools
 import logging
 import os
 import re
+import selectors
 import subprocess
 import sys
+import threading
 import time
 import traceback
 import uuid
-from collections.abc import Iterable, Mapping, Sequence
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from contextlib import suppress
 from functools import partial
 from pathlib import Path
-from typing import Any, Callable, cast, Literal, overload
+from typing import Any, Callable, cast, IO, Literal, overload
 
 import cmk.utils.paths
 from cmk.utils import log
@@ -44,6 +47,7 @@ from cmk.utils.notify import (
     log_to_history,
     notification_message,
     notification_result_message,
+    NotificationBacklog,
     NotificationForward,
     NotificationPluginName,
     NotificationResultCode,
@@ -73,7 +77,7 @@ from cmk.utils.notify_types import (
     UUIDs,
 )
 from cmk.utils.regex import regex
-from cmk.utils.timeout import MKTimeout, Timeout
+from cmk.utils.timeout import MKTimeout
 from cmk.utils.timeperiod import is_timeperiod_active, timeperiod_active, TimeperiodSpecs
 
 from cmk.base import events
@@ -120,6 +124,7 @@ _FallbackFormat = tuple[NotificationPluginNameStr, NotifyPluginParamsDict]
 notification_logdir = cmk.utils.paths.var_dir + "/notify"
 notification_spooldir = cmk.utils.paths.var_dir + "/notify/spool"
 notification_bulkdir = cmk.utils.paths.var_dir + "/notify/bulk"
+notification_backlog_dir = cmk.utils.paths.var_dir + "/notify/backlog"
 notification_log = cmk.utils.paths.log_dir + "/notify.log"
 
 notification_log_template = (
@@ -167,6 +172,90 @@ def _initialize_logging(logging_level: int) -> None:
     log.setup_watched_file_logging_handler(notification_log)
 
 
+_PluginCallKey = tuple[NotificationPluginNameStr, str, str, str | None]
+
+
+class NotificationPluginPool:
+    """Calls the notification plug-ins in a bounded number of worker threads
+
+    Calls of a plug-in for the same contact and host or service are done one after the other in
+    the order they have been submitted. At most max_calls_per_plugin calls of one plug-in run at
+    the same time, so a slow plug-in cannot occupy all workers.
+    """
+
+    def __init__(self, *, max_workers: int, max_calls_per_plugin: int) -> None:
+        self._max_workers = max_workers
+        self._max_calls_per_plugin = max_calls_per_plugin
+        self._condition = threading.Condition()
+        # The first call of each queue is the one being executed (or about to be)
+        self._queues: dict[_PluginCallKey, deque[Callable[[], object]]] = {}
+        self._ready: deque[_PluginCallKey] = deque()
+        self._running: Counter[NotificationPluginNameStr] = Counter()
+        self._workers: list[threading.Thread] = []
+
+    def submit(
+        self,
+        plugin_name: NotificationPluginNameStr,
+        plugin_context: NotificationContext,
+        call: Callable[[], object],
+    ) -> None:
+        key = (
+            plugin_name,
+            plugin_context["CONTACTNAME"],
+            plugin_context["HOSTNAME"],
+            plugin_context.get("SERVICEDESC"),
+        )
+        with self._condition:
+            if (queue := self._queues.get(key)) is not None:
+                queue.append(call)
+                return
+
+            self._queues[key] = deque([call])
+            self._ready.append(key)
+            if len(self._workers) < self._max_workers:
+                worker = threading.Thread(
+                    target=self._work, name=f"notify-{len(self._workers)}", daemon=True
+                )
+                self._workers.append(worker)
+                worker.start()
+            self._condition.notify_all()
+
+    def join(self) -> None:
+        """Wait until all submitted calls are done"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._queues)
+
+    def _next_key(self) -> _PluginCallKey | None:
+        for key in self._ready:
+            if self._running[key[0]] < self._max_calls_per_plugin:
+                self._ready.remove(key)
+                return key
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while (key := self._next_key()) is None:
+                    self._condition.wait()
+                self._running[key[0]] += 1
+                call = self._queues[key][0]
+
+            try:
+                call()
+            except Exception:
+                logger.exception("ERROR:")
+
+            with self._condition:
+                self._running[key[0]] -= 1
+                queue = self._queues[key]
+                queue.popleft()
+                if queue:
+                    self._ready.append(key)
+                else:
+                    del self._queues[key]
+                self._condition.notify_all()
+
+
 # .
 #   .--Main----------------------------------------------------------------.
 #   |                        __  __       _                                |
@@ -218,6 +307,8 @@ def do_notify(
     fallback_format: _FallbackFormat,
     bulk_interval: int,
     plugin_timeout: int,
+    plugin_workers: int,
+    max_calls_per_plugin: int,
     spooling: Literal["local", "remote", "both", "off"],
     backlog_size: int,
     logging_level: int,
@@ -234,6 +325,16 @@ def do_notify(
         os.makedirs(notification_spooldir)
     _initialize_logging(logging_level)
 
+    # Calling the plug-ins one after the other is the default, since only the keepalive mode
+    # and notifications with many contacts benefit from the worker threads.
+    plugin_pool = (
+        NotificationPluginPool(
+            max_workers=plugin_workers, max_calls_per_plugin=max_calls_per_plugin
+        )
+        if plugin_workers > 1
+        else None
+    )
+
     try:
         notify_mode = "notify"
         if args:
@@ -285,6 +386,7 @@ def do_notify(
                 backlog_size=backlog_size,
                 logging_level=logging_level,
                 all_timeperiods=all_timeperiods,
+                plugin_pool=plugin_pool,
             )
         elif notify_mode == "replay":
             try:
@@ -306,6 +408,7 @@ def do_notify(
                 backlog_size=backlog_size,
                 logging_level=logging_level,
                 all_timeperiods=all_timeperiods,
+                plugin_pool=plugin_pool,
             )
         elif notify_mode == "test":
             assert isinstance(args[0], dict)
@@ -341,6 +444,7 @@ def do_notify(
                 backlog_size=backlog_size,
                 logging_level=logging_level,
                 all_timeperiods=all_timeperiods,
+                plugin_pool=plugin_pool,
             )
         elif notify_mode == "send-bulks":
             send_ripe_bulks(
@@ -362,6 +466,7 @@ def do_notify(
                 backlog_size=backlog_size,
                 logging_level=logging_level,
                 all_timeperiods=all_timeperiods,
+                plugin_pool=plugin_pool,
             )
 
     except Exception:
@@ -372,6 +477,9 @@ def do_notify(
             crash_file.write(
                 "CRASH ({}):\n{}\n".format(time.strftime("%Y-%m-%d %H:%M:%S"), format_exception())
             )
+    finally:
+        if plugin_pool is not None:
+            plugin_pool.join()
     return None
 
 
@@ -393,6 +501,7 @@ def notify_notify(
     all_timeperiods: TimeperiodSpecs,
     analyse: bool = False,
     dispatch: bool = False,
+    plugin_pool: NotificationPluginPool | None = None,
 ) -> NotifyAnalysisInfo | None:
     """
     This function processes one raw notification and decides wether it should be spooled or not.
@@ -457,6 +566,7 @@ def notify_notify(
             all_timeperiods=all_timeperiods,
             analyse=analyse,
             dispatch=dispatch,
+            plugin_pool=plugin_pool,
         )
     return None
 
@@ -476,6 +586,7 @@ def locally_deliver_raw_context(
     all_timeperiods: TimeperiodSpecs,
     analyse: bool = False,
     dispatch: bool = False,
+    plugin_pool: NotificationPluginPool | None = None,
 ) -> NotifyAnalysisInfo | None:
     try:
         logger.debug("Preparing rule based notifications")
@@ -493,6 +604,7 @@ def locally_deliver_raw_context(
             all_timeperiods=all_timeperiods,
             analyse=analyse,
             dispatch=dispatch,
+            plugin_pool=plugin_pool,
         )
 
     except Exception:
@@ -660,6 +772,7 @@ def notify_keepalive(
     backlog_size: int,
     logging_level: int,
     all_timeperiods: TimeperiodSpecs,
+    plugin_pool: NotificationPluginPool | None = None,
 ) -> None:
     events.event_keepalive(
         event_function=partial(
@@ -677,6 +790,7 @@ def notify_keepalive(
             backlog_size=backlog_size,
             logging_level=logging_level,
             all_timeperiods=all_timeperiods,
+            plugin_pool=plugin_pool,
         ),
         call_every_loop=partial(
             send_ripe_bulks,
@@ -685,6 +799,7 @@ def notify_keepalive(
             plugin_timeout=plugin_timeout,
         ),
         loop_interval=bulk_interval,
+        shutdown_function=None if plugin_pool is None else plugin_pool.join,
     )
 
 
@@ -716,6 +831,7 @@ def notify_rulebased(
     all_timeperiods: TimeperiodSpecs,
     analyse: bool = False,
     dispatch: bool = False,
+    plugin_pool: NotificationPluginPool | None = None,
 ) -> NotifyAnalysisInfo:
     # First step: go through all rules and construct our table of
     # notification plugins to call. This is a dict from (users, plugin) to
@@ -774,6 +890,7 @@ def notify_rulebased(
         spooling=spooling,
         analyse=analyse,
         dispatch=dispatch,
+        plugin_pool=plugin_pool,
     )
 
     return rule_info, plugin_info
@@ -879,6 +996,7 @@ def _process_notifications(
     spooling: Literal["local", "remote", "both", "off"],
     analyse: bool,
     dispatch: bool = False,
+    plugin_pool: NotificationPluginPool | None = None,
 ) -> list[NotifyPluginInfo]:
     # pylint: disable=too-many-branches
     plugin_info: list[NotifyPluginInfo] = []
@@ -909,7 +1027,9 @@ def _process_notifications(
                     else rbn_split_plugin_context(plugin_context)
                 )
                 for context in plugin_contexts:
-                    call_notification_script(plugin_name, context, plugin_timeout=plugin_timeout)
+                    _call_notification_script_in_pool(
+                        plugin_pool, plugin_name, context, plugin_timeout=plugin_timeout
+                    )
             else:
                 logger.info("No rule matched, would notify fallback contacts, but none configured")
     else:
@@ -959,28 +1079,55 @@ def _process_notifications(
                             NotificationViaPlugin({"context": context, "plugin": plugin_name}),
                         )
                     else:
-                        call_notification_script(
-                            plugin_name, context, plugin_timeout=plugin_timeout
+                        _call_notification_script_in_pool(
+                            plugin_pool, plugin_name, context, plugin_timeout=plugin_timeout
                         )
 
             except Exception as e:
                 if cmk.ccc.debug.enabled():
                     raise
                 logger.exception("    ERROR:")
-                log_to_history(
-                    notification_result_message(
-                        plugin=NotificationPluginName(plugin_name),
-                        contact=plugin_context["CONTACTNAME"],
-                        hostname=plugin_context["HOSTNAME"],
-                        service=plugin_context.get("SERVICEDESC"),
-                        exit_code=NotificationResultCode(2),
-                        output=[str(e)],
-                    )
-                )
+                _log_notification_failure(plugin_name, plugin_context, e)
 
     return plugin_info
 
 
+def _call_notification_script_in_pool(
+    plugin_pool: NotificationPluginPool | None,
+    plugin_name: NotificationPluginNameStr,
+    plugin_context: NotificationContext,
+    *,
+    plugin_timeout: int,
+) -> None:
+    if plugin_pool is None:
+        call_notification_script(plugin_name, plugin_context, plugin_timeout=plugin_timeout)
+        return
+
+    def call() -> None:
+        try:
+            call_notification_script(plugin_name, plugin_context, plugin_timeout=plugin_timeout)
+        except Exception as e:
+            logger.exception("    ERROR:")
+            _log_notification_failure(plugin_name, plugin_context, e)
+
+    plugin_pool.submit(plugin_name, plugin_context, call)
+
+
+def _log_notification_failure(
+    plugin_name: NotificationPluginNameStr, plugin_context: NotificationContext, e: Exception
+) -> None:
+    log_to_history(
+        notification_result_message(
+            plugin=NotificationPluginName(plugin_name),
+            contact=plugin_context["CONTACTNAME"],
+            hostname=plugin_context["HOSTNAME"],
+            service=plugin_context.get("SERVICEDESC"),
+            exit_code=NotificationResultCode(2),
+            output=[str(e)],
+        )
+    )
+
+
 def rbn_fallback_contacts(*, config_contacts: ConfigContacts, fallback_email: str) -> Contacts:
     fallback_contacts: Contacts = []
     if fallback_email:
@@ -1780,36 +1927,29 @@ def call_notification_script(
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         env=notification_script_env(plugin_context),
-        encoding="utf-8",
         close_fds=True,
     ) as p:
         output_lines: list[str] = []
         assert p.stdout is not None
 
-        with Timeout(
-            plugin_timeout,
-            message="Notification plug-in timed out",
-        ) as timeout_guard:
-            try:
-                while True:
-                    # read and output stdout linewise to ensure we don't force python to produce
-                    # one - potentially huge - memory buffer
-                    if not (line := p.stdout.readline()):
-                        break
-                    output = line.rstrip()
-                    plugin_log("Output: %s" % output)
-                    output_lines.append(output)
-                    if _log_to_stdout:
-                        with suppress(IOError):
-                            print(line, end="", flush=True, file=sys.stdout)
-            except MKTimeout:
-                plugin_log(
-                    "Notification plug-in did not finish within %d seconds. Terminating."
-                    % plugin_timeout
-                )
-                p.kill()
+        timed_out = False
+        try:
+            for line in _plugin_output_lines(p.stdout, time.monotonic() + plugin_timeout):
+                output = line.rstrip()
+                plugin_log("Output: %s" % output)
+                output_lines.append(output)
+                if _log_to_stdout:
+                    with suppress(IOError):
+                        print(line, end="", flush=True, file=sys.stdout)
+        except MKTimeout:
+            plugin_log(
+                "Notification plug-in did not finish within %d seconds. Terminating."
+                % plugin_timeout
+            )
+            p.kill()
+            timed_out = True
 
-    if exitcode := 1 if timeout_guard.signaled else p.returncode:
+    if exitcode := 1 if timed_out else p.returncode:
         plugin_log("Plug-in exited with code %d" % exitcode)
 
     # Result is already logged to history for spoolfiles by
@@ -1829,6 +1969,29 @@ def call_notification_script(
     return exitcode
 
 
+def _plugin_output_lines(stdout: IO[bytes], deadline: float) -> Iterator[str]:
+    """Yield the output of a plug-in linewise until it closes its stdout
+
+    Unlike Timeout(), which is based on SIGALRM, this also works in the worker threads of the
+    NotificationPluginPool. Raises MKTimeout once the deadline has passed.
+    """
+    pending = b""
+    with selectors.DefaultSelector() as selector:
+        selector.register(stdout, selectors.EVENT_READ)
+        while True:
+            if (remaining := deadline - time.monotonic()) <= 0 or not selector.select(remaining):
+                raise MKTimeout("Notification plug-in timed out")
+            # read the output in chunks to ensure we don't force python to produce
+            # one - potentially huge - memory buffer
+            if not (chunk := os.read(stdout.fileno(), 65536)):
+                break
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8") + "\n"
+    if pending:
+        yield pending.decode("utf-8")
+
+
 # Construct the environment for the notification script
 def notification_script_env(plugin_context: NotificationContext) -> PluginNotificationContext:
     # Use half of the maximum allowed string length MAX_ARG_STRLEN
@@ -2428,29 +2591,16 @@ def call_bulk_notification_script(
 
 
 def store_notification_backlog(raw_context: EventContext, *, backlog_size: int) -> None:
-    path = notification_logdir + "/backlog.mk"
-    if not backlog_size:
-        if os.path.exists(path):
-            os.remove(path)
-        return
-
-    backlog = store.load_object_from_file(
-        path,
-        default=[],
-        lock=True,
-    )[: backlog_size - 1]
-    store.save_object_to_file(path, [raw_context] + backlog, pretty=False)
+    NotificationBacklog(Path(notification_backlog_dir)).append(raw_context, size=backlog_size)
 
 
 def raw_context_from_backlog(nr: int) -> EventContext:
-    backlog = store.load_object_from_file(notification_logdir + "/backlog.mk", default=[])
-
-    if nr < 0 or nr >= len(backlog):
+    if (context := NotificationBacklog(Path(notification_backlog_dir)).get(nr)) is None:
         console.error(f"No notification number {nr} in backlog.", file=sys.stderr)
         sys.exit(2)
 
     logger.info("Replaying notification %d from backlog...\n", nr)
-    return backlog[nr]
+    return context
 
 
 def raw_context_from_env(environ: Mapping[str, str]) -> EventContext:
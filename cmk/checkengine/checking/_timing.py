@@ -22,9 +22,9 @@ def make_timing_results(
     *,
     perfdata_with_times: bool,
 ) -> ActiveCheckResult:
+    """The total times include the fetching, which may have been done concurrently"""
     summary: DefaultDict[str, Snapshot] = defaultdict(Snapshot.null)
     for source, duration in fetched:
-        total_times += duration
         with suppress(KeyError):
             summary[
                 {
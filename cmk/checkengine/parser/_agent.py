@@ -6,9 +6,10 @@
 from __future__ import annotations
 
 import abc
+import io
 import logging
 import time
-from collections.abc import Iterator, Mapping, MutableMapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
 from typing import final, Final, NamedTuple
 
 from cmk.utils.agentdatatype import AgentRawData
@@ -92,6 +93,7 @@ class ParserState(abc.ABC):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         self.hostname: Final = hostname
         self.sections = sections
@@ -99,6 +101,11 @@ class ParserState(abc.ABC):
         self.translation: Final = translation
         self.encoding_fallback: Final = encoding_fallback
         self._logger: Final = logger
+        # The lines of the other sections are dropped right away.
+        self.selection: Final = selection
+
+    def _is_selected(self, section_header: SectionMarker) -> bool:
+        return self.selection is NO_SELECTION or section_header.name in self.selection
 
     @abc.abstractmethod
     def do_action(self, line: bytes) -> ParserState:
@@ -129,6 +136,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_host_section_parser(
@@ -141,6 +149,17 @@ class ParserState(abc.ABC):
             type(self).__name__,
             HostSectionParser.__name__,
         )
+        if not self._is_selected(section_header):
+            return HostSectionSkipParser(
+                self.hostname,
+                self.sections,
+                self.piggyback_sections,
+                current_section=section_header,
+                translation=self.translation,
+                encoding_fallback=self.encoding_fallback,
+                logger=self._logger,
+                selection=self.selection,
+            )
         if not self.sections or self.sections[-1].header != section_header:
             self.sections.append(SectionWithHeader(section_header, []))
         return HostSectionParser(
@@ -151,6 +170,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_parser(
@@ -172,6 +192,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_section_parser(
@@ -186,6 +207,18 @@ class ParserState(abc.ABC):
             type(self).__name__,
             PiggybackSectionParser.__name__,
         )
+        if not self._is_selected(section_header):
+            return PiggybackSectionSkipParser(
+                self.hostname,
+                self.sections,
+                self.piggyback_sections,
+                current_host=current_host,
+                current_section=section_header,
+                translation=self.translation,
+                encoding_fallback=self.encoding_fallback,
+                logger=self._logger,
+                selection=self.selection,
+            )
         if (
             not self.piggyback_sections[current_host]
             or self.piggyback_sections[current_host][-1].header != section_header
@@ -200,6 +233,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_noop_parser(
@@ -214,6 +248,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_ignore_parser(self) -> PiggybackIgnoreParser:
@@ -224,6 +259,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_error(self, line: bytes) -> ParserState:
@@ -302,6 +338,7 @@ class PiggybackParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -310,6 +347,7 @@ class PiggybackParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
 
@@ -348,6 +386,7 @@ class PiggybackSectionParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -356,6 +395,7 @@ class PiggybackSectionParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
         self.current_section: Final = current_section
@@ -380,6 +420,13 @@ class PiggybackSectionParser(ParserState):
         return self.to_piggyback_noop_parser(self.current_host)
 
 
+class PiggybackSectionSkipParser(PiggybackSectionParser):
+    """A piggybacked section which is not selected"""
+
+    def do_action(self, line: bytes) -> ParserState:
+        return self
+
+
 class PiggybackNOOPParser(ParserState):
     def __init__(
         self,
@@ -391,6 +438,7 @@ class PiggybackNOOPParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -399,6 +447,7 @@ class PiggybackNOOPParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
 
@@ -457,6 +506,7 @@ class HostSectionParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -465,6 +515,7 @@ class HostSectionParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_section: Final = current_section
 
@@ -493,6 +544,33 @@ class HostSectionParser(ParserState):
         return self.to_noop_parser()
 
 
+class HostSectionSkipParser(HostSectionParser):
+    """A section which is not selected"""
+
+    def do_action(self, line: bytes) -> ParserState:
+        return self
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """The lines of the agent output arriving in chunks, without the line endings"""
+    partial = b""
+    for chunk in chunks:
+        # Iterating over a BytesIO does not copy the chunk, unlike splitting it.
+        lines = io.BytesIO(chunk)
+        if partial:
+            if not (line := partial + lines.readline()).endswith(b"\n"):
+                partial = line
+                continue
+            partial = b""
+            yield line.rstrip(b"\r\n")
+        for line in lines:
+            if line.endswith(b"\n"):
+                yield line.rstrip(b"\r\n")
+            else:
+                partial = line
+    yield partial.rstrip(b"\r")
+
+
 class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
     """A parser for agent data."""
 
@@ -523,9 +601,22 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         *,
         selection: SectionNameCollection,
     ) -> HostSections[AgentRawDataSection]:
+        return self.parse_chunks((raw_data,), selection=selection)
+
+    def parse_chunks(
+        self,
+        chunks: Iterable[bytes],
+        *,
+        selection: SectionNameCollection,
+    ) -> HostSections[AgentRawDataSection]:
+        """Parse the agent output as it arrives, e.g. while it is read from a socket
+
+        The chunks may end anywhere, even within a line. Only the lines of the selected
+        sections are kept.
+        """
         now = int(time.time())
 
-        raw_sections, piggyback_sections = self._parse_host_section(raw_data)
+        raw_sections, piggyback_sections = self._parse_host_section(chunks, selection)
         section_info = {
             header.name: header
             for header, _ in raw_sections
@@ -612,7 +703,8 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
 
     def _parse_host_section(
         self,
-        raw_data: AgentRawData,
+        chunks: Iterable[bytes],
+        selection: SectionNameCollection,
     ) -> tuple[ImmutableSection, Mapping[PiggybackMarker, ImmutableSection]]:
         """Split agent output in chunks, splits lines by whitespaces."""
         parser: ParserState = NOOPParser(
@@ -622,8 +714,9 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=selection,
         )
-        for line in raw_data.split(b"\n"):
-            parser = parser(line.rstrip(b"\r"))
+        for line in _iter_lines(chunks):
+            parser = parser(line)
 
         return parser.sections, parser.piggyback_sections
@@ -3,8 +3,11 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import json
 import logging
-from collections.abc import Callable
+import pickle
+import struct
+from collections.abc import Callable, Iterator
 from pathlib import Path
 from typing import Final, Generic, TypeVar
 
@@ -16,6 +19,105 @@ __all__ = ["SectionStore"]
 
 _T = TypeVar("_T")
 
+# The persisted sections are stored as
+#
+#   _MAGIC, length of the header, JSON header, pickled section contents
+#
+# The header holds the name, creation time, expiry and size of each section in the
+# order of the contents. The expiry can be checked without unpickling any content,
+# and sections which are kept unchanged are written back without pickling them again.
+_MAGIC: Final = b"CMKPS\x01"
+_HEADER_LENGTH: Final = struct.Struct("!I")
+
+
+class _PersistedSections(MutableSectionMap[tuple[int, int, _T]]):
+    """The persisted sections, their contents are only unpickled when accessed"""
+
+    def __init__(
+        self,
+        headers: dict[SectionName, tuple[int, int]],
+        raw: dict[SectionName, memoryview],
+    ) -> None:
+        self._headers: Final = headers
+        self._raw: Final = raw
+        self._decoded: Final[dict[SectionName, tuple[int, int, _T]]] = {}
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "_PersistedSections[_T]":
+        view = memoryview(data)
+        offset = len(_MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(view, offset)
+        offset += _HEADER_LENGTH.size
+        header = json.loads(bytes(view[offset : offset + header_length]))
+        offset += header_length
+        headers = {}
+        raw = {}
+        for name, created_at, valid_until, length in header:
+            section_name = SectionName(name)
+            headers[section_name] = (created_at, valid_until)
+            raw[section_name] = view[offset : offset + length]
+            offset += length
+        return cls(headers, raw)
+
+    def serialize(self) -> bytes:
+        contents = [self._pickled(section_name) for section_name in self._headers]
+        header = json.dumps(
+            [
+                [str(section_name), created_at, valid_until, len(content)]
+                for (section_name, (created_at, valid_until)), content in zip(
+                    self._headers.items(), contents
+                )
+            ]
+        ).encode()
+        return b"".join((_MAGIC, _HEADER_LENGTH.pack(len(header)), header, *contents))
+
+    def _pickled(self, section_name: SectionName) -> bytes | memoryview:
+        if (raw := self._raw.get(section_name)) is not None:
+            return raw
+        return pickle.dumps(self._decoded[section_name][2], protocol=pickle.HIGHEST_PROTOCOL)
+
+    def header(self, section_name: SectionName) -> tuple[int, int]:
+        return self._headers[section_name]
+
+    def __getitem__(self, section_name: SectionName) -> tuple[int, int, _T]:
+        if (entry := self._decoded.get(section_name)) is None:
+            created_at, valid_until = self._headers[section_name]
+            entry = (created_at, valid_until, pickle.loads(self._raw[section_name]))
+            self._decoded[section_name] = entry
+        return entry
+
+    def __setitem__(self, section_name: SectionName, entry: tuple[int, int, _T]) -> None:
+        self._headers[section_name] = entry[:2]
+        self._raw.pop(section_name, None)
+        self._decoded[section_name] = entry
+
+    def __delitem__(self, section_name: SectionName) -> None:
+        del self._headers[section_name]
+        self._raw.pop(section_name, None)
+        self._decoded.pop(section_name, None)
+
+    def __iter__(self) -> Iterator[SectionName]:
+        return iter(self._headers)
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+
+def _header(
+    sections: MutableSectionMap[tuple[int, int, _T]], section_name: SectionName
+) -> tuple[int, int]:
+    """Creation time and expiry of a persisted section, without unpickling it"""
+    if isinstance(sections, _PersistedSections):
+        return sections.header(section_name)
+    created_at, valid_until, *_rest = sections[section_name]
+    return created_at, valid_until
+
+
+def _is_old_format(
+    sections: MutableSectionMap[tuple[int, int, _T]], section_name: SectionName
+) -> bool:
+    return not isinstance(sections, _PersistedSections) and len(sections[section_name]) == 2
+
 
 class SectionStore(Generic[_T]):
     def __init__(
@@ -37,16 +139,22 @@ class SectionStore(Generic[_T]):
             self.path.unlink(missing_ok=True)
             return
 
+        if not isinstance(sections, _PersistedSections):
+            persisted = _PersistedSections[_T]({}, {})
+            persisted.update(sections)
+            sections = persisted
+
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        _store.save_object_to_pickle_file(
-            self.path,
-            {str(k): v for k, v in sections.items()},
-        )
+        _store.save_bytes_to_file(self.path, sections.serialize())
         self._logger.debug("Stored persisted sections: %s", ", ".join(str(s) for s in sections))
 
     def load(self) -> MutableSectionMap[tuple[int, int, _T]]:
-        raw_sections_data = _store.load_object_from_pickle_file(self.path, default={})
-        return {SectionName(k): v for k, v in raw_sections_data.items()}
+        data = _store.load_bytes_from_file(self.path, default=b"")
+        if not data.startswith(_MAGIC):
+            # Written by an older version, with all sections in one pickle
+            raw_sections_data = pickle.loads(data) if data else {}
+            return {SectionName(k): v for k, v in raw_sections_data.items()}
+        return _PersistedSections[_T].deserialize(data)
 
     def update(
         self,
@@ -94,7 +202,7 @@ class SectionStore(Generic[_T]):
 
         if not keep_outdated:
             for section_name in tuple(persisted_sections):
-                (_created_at, valid_until, _section_content) = persisted_sections[section_name]
+                valid_until = _header(persisted_sections, section_name)[1]
                 if section_outdated(valid_until, now):
                     store_sections = True
                     del persisted_sections[section_name]
@@ -109,16 +217,13 @@ class SectionStore(Generic[_T]):
         cache_info: MutableSectionMap[tuple[int, int]],
         persisted_sections: MutableSectionMap[tuple[int, int, _T]],
     ) -> SectionMap[_T]:
-        cache_info.update(
-            {
-                section_name: (created_at, valid_until - created_at)
-                for section_name, (created_at, valid_until, *_rest) in persisted_sections.items()
-                if section_name not in sections
-            }
-        )
         result: MutableSectionMap[_T] = dict(sections.items())
-        for section_name, entry in persisted_sections.items():
-            if len(entry) == 2:
+        for section_name in persisted_sections:
+            created_at, valid_until = _header(persisted_sections, section_name)
+            if section_name not in sections:
+                cache_info[section_name] = (created_at, valid_until - created_at)
+
+            if _is_old_format(persisted_sections, section_name):
                 continue  # Skip entries of "old" format
 
             # Don't overwrite sections that have been received from the source with this call
@@ -130,5 +235,5 @@ class SectionStore(Generic[_T]):
                 continue
 
             self._logger.debug("Using persisted section %r", section_name)
-            result[section_name] = entry[-1]
+            result[section_name] = persisted_sections[section_name][-1]
         return result
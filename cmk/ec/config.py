@@ -161,6 +161,7 @@ class Rule(TypedDict, total=False):
     contact_groups: ContactGroups
     count: Count
     customer: str  # TODO: This is a GUI-only feature, which doesn't belong here at all.
+    delay: int
     description: str
     docu_url: str
     disabled: bool
@@ -326,6 +327,7 @@ class ConfigFromWATO(TypedDict):
     debug_rules: bool
     event_limit: EventLimits
     eventsocket_queue_len: int
+    history_file_index: bool
     history_lifetime: int
     history_rotation: Literal["daily", "weekly"]
     hostname_translation: TranslationOptions  # TODO: Mutable???
@@ -14,7 +14,7 @@ from typing import Any, Literal
 
 from .config import Config
 from .event import Event
-from .query import QueryGET
+from .query import Columns, QueryGET
 
 HistoryWhat = Literal[
     "ORPHANED",
@@ -51,6 +51,23 @@ class History(ABC):
     @abstractmethod
     def close(self) -> None: ...
 
+    @classmethod
+    def status_columns(cls) -> Columns:
+        """Columns of the status table about the history backend, see get_status()"""
+        return [
+            ("status_history_queue_length", 0),
+            ("status_average_history_flush_time", 0.0),
+            ("status_history_dropped_entries", 0),
+        ]
+
+    def get_status(self) -> Sequence[object]:
+        """Number of entries not yet written, the average time for writing them and the
+        number of entries dropped because too many were not written yet
+
+        Only relevant for backends which do not write the entries in add() itself.
+        """
+        return [0, 0.0, 0]
+
 
 class TimedHistory(History):
     """Decorate History methods with timing information."""
@@ -89,6 +106,9 @@ class TimedHistory(History):
         with self._timing("close"):
             return self._history.close()
 
+    def get_status(self) -> Sequence[object]:
+        return self._history.get_status()
+
 
 def _log_event(
     config: Config, logger: Logger, event: Event, what: HistoryWhat, who: str, addinfo: str
@@ -3,15 +3,20 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import contextlib
 import itertools
+import math
+import os
 import shlex
+import struct
 import subprocess
 import threading
 import time
-from collections.abc import Callable, Iterable, Sequence
+import zlib
+from collections.abc import Callable, Container, Iterable, Sequence
 from logging import Logger
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Final
 
 from cmk.utils.log import VERBOSE
 from cmk.utils.render import date_and_time
@@ -39,6 +44,8 @@ class FileHistory(History):
         self._history_columns = history_columns
         self._lock = threading.Lock()
         self._active_history_period = ActiveHistoryPeriod()
+        # The index builds running in the background, by history file
+        self._index_builds: dict[Path, threading.Thread] = {}
 
     def flush(self) -> None:
         _expire_logfiles(self._settings, self._config, self._logger, self._lock, True)
@@ -66,12 +73,24 @@ class FileHistory(History):
                 for colname, defval in self._event_columns
             ]
 
-            with get_logfile(
+            path = get_logfile(
                 self._config,
                 self._settings.paths.history_dir.value,
                 self._active_history_period,
-            ).open(mode="ab") as f:
-                f.write(b"\t".join(columns) + b"\n")
+            )
+            line = b"\t".join(columns) + b"\n"
+            with path.open(mode="ab") as f:
+                f.write(line)
+                end = f.tell()
+
+            if self._config["history_file_index"]:
+                HistoryIndex(path).append(
+                    float(columns[0]),
+                    int(columns[4]),
+                    columns[4 + _HOST_COLUMN],
+                    end - len(line),
+                    end,
+                )
 
     def get(self, query: QueryGET) -> Iterable[Sequence[object]]:
         if not self._settings.paths.history_dir.value.exists():
@@ -114,6 +133,15 @@ class FileHistory(History):
             if not _intersects(time_range, _get_logfile_timespan(path)):
                 self._logger.debug("skipping history file %s because of time filters", path)
                 continue
+            if self._config["history_file_index"]:
+                if (records := HistoryIndex(path).load(self._lock)) is not None:
+                    new_entries = self._get_indexed(path, records, query, limit)
+                    history_entries += new_entries
+                    if limit is not None:
+                        limit -= len(new_entries)
+                    continue
+                # Until the index is built, the file is searched without it.
+                self._start_index_build(path)
             tac = f"nl -b a {shlex.quote(str(path))} | tac"  # Process younger lines first
             cmd = " | ".join([tac] + grep_pipeline)
             self._logger.debug("preprocessing history file with command [%s]", cmd)
@@ -125,11 +153,49 @@ class FileHistory(History):
                 limit -= len(new_entries)
         return history_entries
 
+    def _start_index_build(self, path: Path) -> None:
+        with self._lock:
+            if (build := self._index_builds.get(path)) is not None and build.is_alive():
+                return
+            self._index_builds = {p: t for p, t in self._index_builds.items() if t.is_alive()}
+            self._index_builds[path] = build = threading.Thread(
+                target=self._build_index, args=(path,), name="history-index", daemon=True
+            )
+            build.start()
+
+    def _build_index(self, path: Path) -> None:
+        self._logger.info("(re)building index of history file %s", path)
+        try:
+            HistoryIndex(path).rebuild(self._lock)
+        except OSError as e:  # e.g. the history file has been expired meanwhile
+            self._logger.warning("Cannot build index of history file %s: %s", path, e)
+
+    def _get_indexed(
+        self,
+        path: Path,
+        records: Sequence[tuple[float, int, int, int]],
+        query: QueryGET,
+        limit: int | None,
+    ) -> list[Any]:
+        self._logger.debug("querying history file %s via its index", path)
+        return query_history_file_index(
+            self._history_columns,
+            path,
+            records,
+            query.filter_row,
+            [f.predicate for f in query.filters if f.column_name == "history_time"],
+            _index_argument_set(query.filters, "event_id", int),
+            _index_argument_set(query.filters, "event_host", _host_key),
+            limit,
+            self._logger,
+        )
+
     def housekeeping(self) -> None:
         _expire_logfiles(self._settings, self._config, self._logger, self._lock, False)
 
     def close(self) -> None:
-        pass
+        for build in list(self._index_builds.values()):
+            build.join()
 
 
 def _expire_logfiles(
@@ -152,6 +218,7 @@ def _expire_logfiles(
                         "Deleting log file %s (age %s)", path, date_and_time(path.stat().st_mtime)
                     )
                     path.unlink()
+                    HistoryIndex(path).path.unlink(missing_ok=True)
         except Exception as e:
             if settings.options.debug:
                 raise
@@ -292,6 +359,184 @@ def parse_history_file(
     return entries
 
 
+# Index of the "event_host" column within the event columns of a history line
+_HOST_COLUMN = 7
+
+
+class HistoryIndex:
+    """Sidecar index of a history file, maintained as FileHistory.add() appends.
+
+    For each line of "<period>.log", "<period>.idx" holds one fixed size record
+    (history time, event id, CRC32 of the lowercased host name, offset of the end of the line),
+    so queries can be answered by scanning the small records and seeking to the
+    matching lines instead of grepping and parsing the whole file. The line numbers
+    (the history_line column) are implicit in the record order.
+
+    The lock is the one FileHistory.add() holds while appending to both files.
+    """
+
+    RECORD: Final = struct.Struct("<dQIQ")
+
+    def __init__(self, log_path: Path) -> None:
+        self.log_path: Final = log_path
+        self.path: Final = log_path.with_suffix(".idx")
+
+    def append(self, history_time: float, event_id: int, host: bytes, start: int, end: int) -> None:
+        """Add the record for the line from start to end, if the index is up to date
+
+        Otherwise the index is left alone, it is rebuilt by the next query.
+        """
+        with self.path.open(mode="a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size % self.RECORD.size:
+                return
+            if size:
+                f.seek(size - self.RECORD.size)
+                if self.RECORD.unpack(f.read(self.RECORD.size))[3] != start:
+                    return
+            elif start:
+                return
+            f.write(self.RECORD.pack(history_time, event_id, _host_crc(host), end))
+
+    def load(
+        self, lock: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+    ) -> list[tuple[float, int, int, int]] | None:
+        """Return the records, or None if the index does not cover exactly the history file"""
+        with lock:  # Only the sizes must match, the records are read without blocking add().
+            try:
+                size = self.log_path.stat().st_size
+                index_size = self.path.stat().st_size
+            except FileNotFoundError:
+                return None
+        if index_size % self.RECORD.size:
+            return None
+        try:
+            with self.path.open(mode="rb") as f:
+                raw = f.read(index_size)
+        except FileNotFoundError:
+            return None
+        if len(raw) != index_size:
+            return None
+        records = list(self.RECORD.iter_unpack(raw))
+        if (records[-1][3] if records else 0) != size:
+            return None
+        return records
+
+    def rebuild(
+        self, lock: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+    ) -> None:
+        """Replace the index by a new one covering the whole history file
+
+        The new index is written to a temporary file which replaces the index atomically.
+        Only the lines appended while the bulk of the file is indexed are indexed with the
+        lock held.
+        """
+        new_path = self.path.with_name(f"{self.path.name}.new.{threading.get_native_id()}")
+        try:
+            with self.log_path.open(mode="rb") as log, new_path.open(mode="wb") as new:
+                end = self._index_lines(log, 0, new, complete=False)
+                with lock:
+                    self._index_lines(log, end, new, complete=True)
+                    new.flush()
+                    new_path.replace(self.path)
+        finally:
+            new_path.unlink(missing_ok=True)
+
+    def _index_lines(self, log: BinaryIO, end: int, index: BinaryIO, *, complete: bool) -> int:
+        """Write the records of the lines from end on, return the new end
+
+        Without the lock, a line without newline may still be written, it is left for later.
+        """
+        log.seek(end)
+        for line in log:
+            if not (complete or line.endswith(b"\n")):
+                break
+            end += len(line)
+            try:
+                fields = line.split(b"\t", 5 + _HOST_COLUMN)
+                history_time, event_id = float(fields[0]), int(fields[4])
+                host = fields[4 + _HOST_COLUMN]
+            except (ValueError, IndexError):
+                # Keep the line, it is reported as invalid when it is read.
+                history_time, event_id, host = math.nan, 0, b""
+            index.write(self.RECORD.pack(history_time, event_id, _host_crc(host), end))
+        return end
+
+
+def _host_crc(host: bytes) -> int:
+    # Host names are compared case insensitively by the "in" operator.
+    return zlib.crc32(
+        host.decode("utf-8", "surrogateescape").lower().encode("utf-8", "surrogateescape")
+    )
+
+
+def _host_key(host: str) -> int:
+    return _host_crc(quote_tab(host))
+
+
+def _index_argument_set(
+    filters: Iterable[QueryFilter], column_name: str, key: Callable[[Any], int]
+) -> set[int] | None:
+    """Keys which an indexed column must have to match all "=" and "in" filters on it
+
+    None means that the filters do not restrict the column.
+    """
+    result: set[int] | None = None
+    for f in filters:
+        if f.column_name != column_name:
+            continue
+        if f.operator_name == "=":
+            keys = {key(f.argument)}
+        elif f.operator_name == "in":
+            keys = {key(a) for a in f.argument}
+        else:
+            continue
+        result = keys if result is None else result & keys
+    return result
+
+
+def query_history_file_index(
+    history_columns: Sequence[tuple[str, Any]],
+    path: Path,
+    records: Sequence[tuple[float, int, int, int]],
+    filter_row: Callable[[Sequence[Any]], bool],
+    history_time_filters: Sequence[Callable[[object], bool]],
+    event_ids: Container[int] | None,
+    hosts: Container[int] | None,
+    limit: int | None,
+    logger: Logger,
+) -> list[Any]:
+    """Read the lines selected by the index, younger lines first
+
+    The index only preselects lines, all filters are still applied to the parsed lines.
+    """
+    entries: list[Any] = []
+    with path.open(mode="rb") as f:
+        for line_number in range(len(records), 0, -1):
+            if limit is not None and len(entries) > limit:
+                break
+            history_time, event_id, host, end = records[line_number - 1]
+            if (
+                # Invalid lines (NaN) are read to report them.
+                not (math.isnan(history_time) or all(f(history_time) for f in history_time_filters))
+                or (event_ids is not None and event_id not in event_ids)
+                or (hosts is not None and host not in hosts)
+            ):
+                continue
+            start = records[line_number - 2][3] if line_number > 1 else 0
+            f.seek(start)
+            line = f.read(end - start)
+            try:
+                parts: list[Any] = line.decode("utf-8").rstrip("\n").split("\t")
+                parts.insert(0, line_number)
+                convert_history_line(history_columns, parts)
+                if filter_row(parts):
+                    entries.append(parts)
+            except Exception:
+                logger.exception("Invalid line '%s' in history file %s", line, path)
+    return entries
+
+
 def parse_history_file_python(
     history_columns: Sequence[tuple[str, Any]],
     path: Path,
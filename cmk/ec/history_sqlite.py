@@ -6,6 +6,7 @@
 import itertools
 import json
 import sqlite3
+import threading
 import time
 from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
@@ -17,6 +18,7 @@ from typing import Final, Literal
 from .config import Config
 from .event import Event
 from .history import History, HistoryWhat
+from .perfcounters import lerp
 from .query import Columns, QueryFilter, QueryGET
 from .settings import Options, Paths, Settings
 
@@ -53,12 +55,27 @@ TABLE_COLUMNS: Final = (
     "match_groups_syslog_application",
 )
 
+# The columns the GUI history views usually filter on
 INDEXED_COLUMNS: Final = (
     "time",
     "id",
     "host",
+    "what",
+    "core_host",
 )
 
+INSERT_STATEMENT: Final = f"""INSERT INTO
+    history ({', '.join(TABLE_COLUMNS[1:])})
+        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});"""
+
+# History entries are written in batches by a background thread, a batch is written
+# as soon as it has MAX_BATCH_SIZE entries or its oldest entry is MAX_BATCH_DELAY old.
+# Entries beyond MAX_PENDING_ENTRIES, e.g. while the database cannot be written, are
+# dropped and counted.
+MAX_BATCH_SIZE: Final = 1000
+MAX_BATCH_DELAY: Final = 0.5  # seconds
+MAX_PENDING_ENTRIES: Final = 100 * MAX_BATCH_SIZE
+
 SQLITE_PRAGMAS = {
     "PRAGMA journal_mode=WAL;": "WAL mode for concurrent reads and writes",
     "PRAGMA synchronous = NORMAL;": "Writes should not blocked by reads",
@@ -158,6 +175,16 @@ class SQLiteHistory(History):
         self._history_columns = history_columns
         self._last_housekeeping = 0.0
         self._page_size = 4096
+        # Guards self.conn, which is shared with the writer thread.
+        self._lock = threading.RLock()
+        # Entries not yet written, guarded by self._pending_condition, which must only be
+        # acquired after self._lock (if that is needed, too).
+        self._pending: list[Sequence[object]] = []
+        self._pending_since = 0.0
+        self._pending_condition = threading.Condition()
+        self._closing = False
+        self._average_flush_time = 0.0
+        self._dropped_entries = 0
 
         if isinstance(self._settings.database, Path):
             self._settings.database.parent.mkdir(parents=True, exist_ok=True)
@@ -219,32 +246,106 @@ class SQLiteHistory(History):
             for index_statement in SQLITE_INDEXES:
                 connection.execute(index_statement)
 
+        self._writer = self._start_writer()
+
+    def _start_writer(self) -> threading.Thread:
+        writer = threading.Thread(target=self._write_batches, name="HistoryWriter")
+        writer.daemon = True
+        writer.start()
+        return writer
+
     def flush(self) -> None:
         """Delete all entries the history table."""
-        with self.conn as connection:
-            connection.execute("DELETE FROM history;")
+        with self._lock:
+            self._write_pending()
+            with self.conn as connection:
+                connection.execute("DELETE FROM history;")
 
     def add(self, event: Event, what: HistoryWhat, who: str = "", addinfo: str = "") -> None:
         """Add a single entry to the history table.
 
         No need to include the line column, as it is autoincremented.
+
+        The entry is only queued here, it is written by the writer thread together with
+        other entries in a single transaction. This way the caller never waits for the
+        database. If the queue is full, the entry is dropped.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.execute(
-                f"""INSERT INTO
-                    history ({', '.join(TABLE_COLUMNS[1:])})
-                        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});""",
-                tuple(
-                    itertools.chain(
-                        (time.time(), what, who, addinfo),
-                        [
-                            event.get(colname.removeprefix("event_"), defval)
-                            for colname, defval in self._event_columns
-                        ],
-                    )
-                ),
+        entry = tuple(
+            itertools.chain(
+                (time.time(), what, who, addinfo),
+                [
+                    event.get(colname.removeprefix("event_"), defval)
+                    for colname, defval in self._event_columns
+                ],
             )
+        )
+        with self._pending_condition:
+            if not self._writer.is_alive() and not self._closing:
+                # The writer thread does not survive a fork, e.g. when daemonizing.
+                self._writer = self._start_writer()
+            if len(self._pending) >= MAX_PENDING_ENTRIES:
+                if not self._dropped_entries:
+                    self._logger.warning("Event history queue is full, dropping history entries")
+                self._dropped_entries += 1
+                return
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(entry)
+            if len(self._pending) == 1 or len(self._pending) >= MAX_BATCH_SIZE:
+                self._pending_condition.notify()
+
+    def _write_batches(self) -> None:
+        while True:
+            with self._pending_condition:
+                while not self._closing and len(self._pending) < MAX_BATCH_SIZE:
+                    timeout = (
+                        self._pending_since + MAX_BATCH_DELAY - time.monotonic()
+                        if self._pending
+                        else None
+                    )
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._pending_condition.wait(timeout)
+                if self._closing:
+                    return  # close() writes the rest
+            try:
+                self.write_queued_entries()
+            except Exception:
+                self._logger.exception("Cannot write event history")
+                with self._pending_condition:  # Do not retry right away.
+                    self._pending_condition.wait_for(lambda: self._closing, MAX_BATCH_DELAY)
+
+    def write_queued_entries(self) -> None:
+        """Write the entries queued by add() right now"""
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """Write all queued entries in one transaction. Must be called with self._lock held.
+
+        Everybody reading or modifying the history table does this first, so the queued
+        entries are always taken into account. If the transaction fails, the entries are
+        queued again.
+        """
+        with self._pending_condition:
+            entries, self._pending = self._pending, []
+            pending_since = self._pending_since
+        if not entries:
+            return
+        start = time.monotonic()
+        try:
+            with self.conn as connection:
+                connection.executemany(INSERT_STATEMENT, entries)
+        except Exception:
+            with self._pending_condition:
+                self._pending[:0] = entries
+                self._pending_since = pending_since
+            raise
+        self._average_flush_time = lerp(time.monotonic() - start, self._average_flush_time, 0.95)
+
+    def get_status(self) -> Sequence[object]:
+        with self._pending_condition:
+            return [len(self._pending), self._average_flush_time, self._dropped_entries]
 
     def add_entries(self, entries: Sequence[Sequence[object]]) -> None:
         """Add multiple entries to the history table.
@@ -252,14 +353,10 @@ class SQLiteHistory(History):
         Used only by the cmk-update-config during EC history migration to sqlite.
         The first column is the line number, which is autoincremented, so ignored in TABLE_COLUMNS.
         """
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.executemany(
-                f"""INSERT INTO
-                    history ({', '.join(TABLE_COLUMNS[1:])})
-                        VALUES ({', '.join(itertools.repeat('?', len(TABLE_COLUMNS[1:])))});""",
-                (entry[1:] for entry in entries),
-            )
+        with self._lock:
+            self._write_pending()
+            with self.conn as connection:
+                connection.executemany(INSERT_STATEMENT, (entry[1:] for entry in entries))
 
     def get(self, query: QueryGET) -> Iterable[Sequence[object]]:
         """Retrieve entries from the history table.
@@ -270,10 +367,12 @@ class SQLiteHistory(History):
         if query.limit:
             sqlite_query += " LIMIT ?"
             sqlite_arguments += f" {query.limit + 1}"
-        with self.conn as connection:
-            cur = connection.cursor()
-            cur.execute(sqlite_query, sqlite_arguments)
-            return cur.fetchall()
+        with self._lock:
+            self._write_pending()
+            with self.conn as connection:
+                cur = connection.cursor()
+                cur.execute(sqlite_query, sqlite_arguments)
+                return cur.fetchall()
 
     def housekeeping(self) -> None:
         """Remove old entries from the history table.
@@ -283,11 +382,13 @@ class SQLiteHistory(History):
         now = time.time()
         if now - self._last_housekeeping > self._config["sqlite_housekeeping_interval"]:
             delta = now - timedelta(days=self._config["history_lifetime"]).total_seconds()
-            with self.conn as connection:
-                cur = connection.cursor()
-                cur.execute("DELETE FROM history WHERE time <= ?;", (delta,))
-            # should be executed outside of the transaction
-            self._vacuum()
+            with self._lock:
+                self._write_pending()
+                with self.conn as connection:
+                    cur = connection.cursor()
+                    cur.execute("DELETE FROM history WHERE time <= ?;", (delta,))
+                # should be executed outside of the transaction
+                self._vacuum()
             self._last_housekeeping = now
 
     def _vacuum(self) -> None:
@@ -305,5 +406,11 @@ class SQLiteHistory(History):
         Used during a new object instantiation,
         to avoid sqlite3.OperationalError: database is locked.
         """
-        self.conn.commit()
-        self.conn.close()
+        with self._pending_condition:
+            self._closing = True
+            self._pending_condition.notify()
+        self._writer.join()
+        with self._lock:
+            self._write_pending()
+            self.conn.commit()
+            self.conn.close()
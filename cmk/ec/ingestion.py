@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Receiving and classifying syslog messages in worker processes.
+
+The event server thread receives, parses and matches all messages under the GIL, so
+it can not use more than one core. With ingestion workers, each worker process
+receives a share of the syslog messages (UDP and TCP), parses them and matches them
+against the rules. The workers hand over only the classified events which need
+further processing to the event server, which stays the only owner of the event
+status. Counting and cancelling of events is therefore still consistent.
+
+When mkeventd binds the syslog ports itself, every worker binds its own sockets with
+SO_REUSEPORT and the kernel distributes the messages. Sockets inherited from
+mkeventd_open514 can not be bound again, they are shared by the workers instead.
+"""
+
+import contextlib
+import multiprocessing
+import signal
+import socket
+from collections.abc import Callable, Collection, Iterator, Mapping, Sequence
+from logging import Logger
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Final, NamedTuple
+
+from .config import Config, ECRulePack
+from .event import Event
+from .helpers import parse_bytes_into_syslog_messages
+from .rule_matcher import MatchSuccess
+
+# Datagrams received in one go before they are classified and handed over as a batch
+MAX_DATAGRAMS: Final = 256
+
+
+class IngestedEvent(NamedTuple):
+    """An event classified by a worker, together with the IDs of the rules it hit"""
+
+    event: Event
+    hits: Sequence[tuple[str, MatchSuccess]]
+
+
+class IngestBatch(NamedTuple):
+    rules_generation: int
+    counts: Mapping[str, int]
+    hash_stats: Mapping[tuple[int, int], int]  # facility/priority
+    events: Sequence[IngestedEvent]
+
+
+class IngestRules(NamedTuple):
+    """New rules for the workers, tagged with the event server's rules generation"""
+
+    generation: int
+    rule_packs: Sequence[ECRulePack]
+
+
+def bind_reuse_port(kind: socket.SocketKind, port: int) -> socket.socket:
+    """Bind a socket which shares the port with the sockets of the other workers"""
+    try:
+        sock = socket.socket(socket.AF_INET6, kind)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            with contextlib.suppress(AttributeError, OSError):
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            sock.bind(("::", port))
+        except OSError:
+            sock.close()
+            raise
+    except OSError:
+        sock = socket.socket(socket.AF_INET, kind)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("0.0.0.0", port))
+    if kind == socket.SOCK_STREAM:
+        sock.listen(20)
+    return sock
+
+
+class SyslogReceiver:
+    """The syslog sockets of a worker and its TCP connections"""
+
+    def __init__(self, udp: socket.socket | None, tcp: socket.socket | None) -> None:
+        self._udp = udp
+        self._tcp = tcp
+        self._clients: dict[socket.socket, tuple[object, bytes]] = {}
+        if tcp is not None:
+            # A shared listening socket wakes up all workers, but only one gets the connection.
+            tcp.setblocking(False)
+
+    def sockets(self) -> list[socket.socket]:
+        return [s for s in (self._udp, self._tcp) if s is not None] + list(self._clients)
+
+    def receive(
+        self, readable: Collection[object]
+    ) -> Iterator[tuple[str, object, Sequence[bytes]]]:
+        """Yields what has been received, where it comes from and the complete messages"""
+        if self._udp is not None and self._udp in readable:
+            for _n in range(MAX_DATAGRAMS):
+                try:
+                    message, address = self._udp.recvfrom(4096, socket.MSG_DONTWAIT)
+                except BlockingIOError:
+                    break
+                yield "syslog socket (UDP)", address, [message]
+
+        if self._tcp is not None and self._tcp in readable:
+            with contextlib.suppress(BlockingIOError):  # taken by another worker
+                client_socket, address = self._tcp.accept()
+                client_socket.setblocking(True)
+                self._clients[client_socket] = (address, b"")
+
+        for client_socket, (address, previous_data) in list(self._clients.items()):
+            if client_socket in readable:
+                try:
+                    new_data = client_socket.recv(4096)
+                except OSError:
+                    new_data = b""
+                if not new_data:  # the other side is gone, the incomplete rest is discarded
+                    del self._clients[client_socket]
+                    client_socket.close()
+                    continue
+                messages, unprocessed = parse_bytes_into_syslog_messages(previous_data + new_data)
+                self._clients[client_socket] = (address, unprocessed)
+                yield "syslog socket (TCP)", address, list(messages)
+
+
+def _run_worker(
+    serve: Callable[[Connection, SyslogReceiver], None],
+    connection: Connection,
+    create_receiver: Callable[[], SyslogReceiver],
+    event_server_connections: Sequence[Connection],
+) -> None:
+    # The copies of the event server's ends would keep the workers from noticing when the
+    # event server closes their connection.
+    for event_server_connection in event_server_connections:
+        event_server_connection.close()
+    # The signal handlers of mkeventd are meant for the main process. A worker is
+    # stopped by closing its connection, or by the default action of SIGTERM.
+    for signum in (signal.SIGHUP, signal.SIGINT, signal.SIGQUIT):
+        signal.signal(signum, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    serve(connection, create_receiver())
+
+
+class IngestWorkers:
+    """The ingestion worker processes, as seen from the event server
+
+    The workers are forked, so they start with a copy of the compiled rules. Later
+    configurations and rules are sent to them through their connection.
+    """
+
+    def __init__(self, logger: Logger) -> None:
+        self._logger = logger
+        self._workers: dict[Connection, BaseProcess] = {}
+
+    @property
+    def connections(self) -> list[Connection]:
+        return list(self._workers)
+
+    def start(
+        self,
+        count: int,
+        serve: Callable[[Connection, SyslogReceiver], None],
+        create_receiver: Callable[[], SyslogReceiver],
+    ) -> None:
+        """Start the workers, serve() and create_receiver() are called in the workers"""
+        context = multiprocessing.get_context("fork")
+        for n in range(count):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_run_worker,
+                args=(serve, worker_connection, create_receiver, [*self.connections, connection]),
+                name=f"ingest-{n}",
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self._workers[connection] = process
+        self._logger.info("Started %d ingestion workers", count)
+
+    def receive(self, connection: Connection) -> IngestBatch | None:
+        """Receive the next batch of a worker, None if the worker is gone"""
+        try:
+            batch = connection.recv()
+        except (EOFError, OSError):
+            process = self._workers.pop(connection)
+            connection.close()
+            process.join(timeout=1)
+            self._logger.error(
+                "Ingestion worker %s is gone (exit code %s)", process.name, process.exitcode
+            )
+            return None
+        if not isinstance(batch, IngestBatch):
+            raise TypeError(f"Invalid data from ingestion worker: {batch!r}")
+        return batch
+
+    def reload_configuration(self, config: Config) -> None:
+        self._send(config)
+
+    def load_rules(self, generation: int, rule_packs: Sequence[ECRulePack]) -> None:
+        self._send(IngestRules(generation, rule_packs))
+
+    def _send(self, update: Config | IngestRules) -> None:
+        for connection in self.connections:
+            with contextlib.suppress(OSError):  # gone, this is noticed when receiving
+                connection.send(update)
+
+    def stop(self) -> None:
+        for connection in self.connections:
+            connection.close()
+        for process in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = {}
@@ -30,6 +30,7 @@ import time
 import traceback
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from logging import DEBUG, getLogger, Logger
+from multiprocessing.connection import Connection
 from pathlib import Path
 from types import FrameType
 from typing import Any, assert_never, IO, Literal, TypedDict
@@ -61,6 +62,14 @@ from .history_file import FileHistory
 from .history_mongo import MongoDBHistory
 from .history_sqlite import SQLiteHistory, SQLiteSettings
 from .host_config import HostConfig
+from .ingestion import (
+    bind_reuse_port,
+    IngestBatch,
+    IngestedEvent,
+    IngestRules,
+    IngestWorkers,
+    SyslogReceiver,
+)
 from .perfcounters import Perfcounters
 from .query import (
     Columns,
@@ -72,9 +81,18 @@ from .query import (
     QueryREPLICATE,
     StatusTable,
 )
-from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
+from .rule_matcher import (
+    compile_rule,
+    match,
+    MatchFailure,
+    MatchResult,
+    MatchSuccess,
+    RuleHit,
+    RuleMatcher,
+    RulePrefilter,
+)
 from .rule_packs import load_active_config
-from .settings import create_settings, FileDescriptor, PortNumber, Settings
+from .settings import create_settings, EndPoint, FileDescriptor, PortNumber, Settings
 from .snmp import SNMPTrapParser
 from .syslog import SyslogFacility, SyslogPriority
 from .timeperiod import TimePeriods
@@ -381,6 +399,8 @@ class EventServer(ECServerThread):
         self._rules: list[Rule] = []
         self._rule_by_id: dict[str | None, Rule] = {}
         self._rule_hash: dict[int, dict[int, Any]] = {}
+        self._rule_prefilter = RulePrefilter([])
+        self._rules_generation = 0  # tells the ingestion workers' results for older rules apart
         self._hash_stats: list[list[int]] = []  # facility/priority
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
@@ -398,6 +418,7 @@ class EventServer(ECServerThread):
             omd_site_id=omd_site(),
             is_active_time_period=self._time_period.active,
         )
+        self._ingest_workers = IngestWorkers(self._logger.getChild("ingest"))
 
         # HACK for testing: The real fix would involve breaking up these huge
         # class monsters.
@@ -406,8 +427,11 @@ class EventServer(ECServerThread):
 
         self.create_pipe()
         self.open_eventsocket()
-        self.open_syslog_udp()
-        self.open_syslog_tcp()
+        # Syslog ports are bound by the ingestion workers themselves
+        if not self._bound_by_ingest_workers(self.settings.options.syslog_udp):
+            self.open_syslog_udp()
+        if not self._bound_by_ingest_workers(self.settings.options.syslog_tcp):
+            self.open_syslog_tcp()
         self.open_snmptrap()
         self._snmp_trap_parser = SNMPTrapParser(
             self.settings, self._config, self._logger.getChild("snmp")
@@ -421,6 +445,7 @@ class EventServer(ECServerThread):
                 Perfcounters.status_columns(),
                 cls._replication_columns(),
                 cls._event_limit_columns(),
+                History.status_columns(),
             )
         )
 
@@ -458,6 +483,7 @@ class EventServer(ECServerThread):
                 *self._perfcounters.get_status(),
                 *self._add_replication_status(),
                 *self._add_event_limit_status(),
+                *self._history.get_status(),
             ]
         ]
 
@@ -503,6 +529,9 @@ class EventServer(ECServerThread):
 
         self._logger.info("Created FIFO '%s' for receiving events", path)
 
+    def _bound_by_ingest_workers(self, endpoint: EndPoint | None) -> bool:
+        return bool(self.settings.options.ingest_workers) and isinstance(endpoint, PortNumber)
+
     def open_syslog_udp(self) -> None:
         endpoint = self.settings.options.syslog_udp
         try:
@@ -649,24 +678,29 @@ class EventServer(ECServerThread):
 
     def serve(self) -> None:  # pylint: disable=too-many-branches
         pipe = self.open_pipe()
-        listen_list = [
-            f
-            for f in (
-                pipe,
-                self._syslog_udp,
-                self._syslog_tcp,
-                self._eventsocket,
-                self._snmp_trap_socket,
-            )
-            if f is not None
-        ]
+        listen_list: list[FileDescr | socket.socket] = [pipe, self._eventsocket]
+        if self._snmp_trap_socket is not None:
+            listen_list.append(self._snmp_trap_socket)
         client_sockets: dict[FileDescr, tuple[socket.socket, tuple[str, int] | None, bytes]] = {}
         select_timeout = 1
         unprocessed_pipe_data = b""
         while not self._terminate_event.is_set():
+            ingest_connections = self._ingest_workers.connections
+            # The ingestion workers receive the syslog messages, as long as there are some.
+            syslog_sockets = (
+                []
+                if ingest_connections
+                else [f for f in (self._syslog_udp, self._syslog_tcp) if f is not None]
+            )
+            wait_for: list[FileDescr | socket.socket | Connection] = [
+                *listen_list,
+                *syslog_sockets,
+                *client_sockets,
+                *ingest_connections,
+            ]
             try:
-                readable: list[FileDescr | socket.socket] = select.select(
-                    listen_list + list(client_sockets.keys()), [], [], select_timeout
+                readable: list[FileDescr | socket.socket | Connection] = select.select(
+                    wait_for, [], [], select_timeout
                 )[0]
             except OSError as e:
                 if e.args[0] != errno.EINTR:
@@ -674,6 +708,14 @@ class EventServer(ECServerThread):
                 continue
             address: tuple[str, int] | None  # host/port
 
+            # Receive the events classified by the ingestion workers
+            for connection in ingest_connections:
+                if connection in readable:
+                    if (batch := self._ingest_workers.receive(connection)) is not None:
+                        self.process_ingest_batch(batch)
+                    elif not self._ingest_workers.connections:
+                        self._receive_syslog_without_ingest_workers()
+
             # Accept new connection on event unix socket
             if self._eventsocket in readable:
                 client_socket, remote_address = self._eventsocket.accept()
@@ -748,6 +790,87 @@ class EventServer(ECServerThread):
             else:
                 select_timeout = 1  # restore default select timeout
 
+    def start_ingest_workers(self) -> None:
+        """Hand the syslog messages over to ingestion workers, if configured.
+
+        Needs to be called before any other threads are started, the workers are forked.
+        """
+        options = self.settings.options
+        if options.ingest_workers and (options.syslog_udp or options.syslog_tcp):
+            self._ingest_workers.start(
+                options.ingest_workers, self.serve_ingestion, self._create_syslog_receiver
+            )
+
+    def stop_ingest_workers(self) -> None:
+        self._ingest_workers.stop()
+
+    def _create_syslog_receiver(self) -> SyslogReceiver:
+        """Bind the syslog ports again or share the inherited sockets, called in a worker"""
+        options = self.settings.options
+        return SyslogReceiver(
+            udp=(
+                bind_reuse_port(socket.SOCK_DGRAM, options.syslog_udp.value)
+                if isinstance(options.syslog_udp, PortNumber)
+                else self._syslog_udp
+            ),
+            tcp=(
+                bind_reuse_port(socket.SOCK_STREAM, options.syslog_tcp.value)
+                if isinstance(options.syslog_tcp, PortNumber)
+                else self._syslog_tcp
+            ),
+        )
+
+    def _receive_syslog_without_ingest_workers(self) -> None:
+        self._logger.error("All ingestion workers are gone, receiving syslog messages directly")
+        if self._syslog_udp is None and self.settings.options.syslog_udp is not None:
+            self.open_syslog_udp()
+        if self._syslog_tcp is None and self.settings.options.syslog_tcp is not None:
+            self.open_syslog_tcp()
+
+    def serve_ingestion(self, connection: Connection, receiver: SyslogReceiver) -> None:
+        """Main loop of an ingestion worker, working on its forked copy of the event server
+
+        Only the syslog messages are handled here. New configurations come in through the
+        connection, which is closed when the event server terminates.
+        """
+        setthreadtitle(f"{self.name} ingest")
+        self._ingest_workers = IngestWorkers(self._logger)
+        self._perfcounters.take_counts()  # those are counted by the event server already
+        self.take_hash_stats()
+        try:
+            while True:
+                wait_for: list[Connection | socket.socket] = [connection, *receiver.sockets()]
+                readable: list[Connection | socket.socket] = select.select(wait_for, [], [])[0]
+                if connection in readable:
+                    try:
+                        update = connection.recv()
+                    except EOFError:
+                        return
+                    if isinstance(update, IngestRules):
+                        self.compile_rules(update.rule_packs)
+                        self._rules_generation = update.generation
+                    else:
+                        self.apply_configuration(update, self._history)
+
+                events = [
+                    ingested_event
+                    for what, address, messages in receiver.receive(readable)
+                    for event in create_events_from_syslog_messages(
+                        messages,
+                        parse_address(what, address),
+                        self._logger if self._config["debug_rules"] else None,
+                    )
+                    if (ingested_event := self.classify_ingested_event(event)) is not None
+                ]
+                counts = self._perfcounters.take_counts()
+                if events or counts:
+                    connection.send(
+                        IngestBatch(self._rules_generation, counts, self.take_hash_stats(), events)
+                    )
+        except Exception:
+            self._logger.exception("Exception in ingestion worker")
+            raise
+
     def create_events_from_trap(self, data: bytes, address: tuple[str, int]) -> Iterator[Event]:
         try:
             if varbinds_and_ipaddress := self._snmp_trap_parser(data, address):
@@ -771,6 +894,38 @@ class EventServer(ECServerThread):
             elapsed = time.time() - before
             self._perfcounters.count_time("processing", elapsed)
 
+    def classify_ingested_event(self, event: Event) -> IngestedEvent | None:
+        """The part of process_potential_event() done by an ingestion worker
+
+        Returns None if the event needs no further processing by the event server.
+        """
+        self._perfcounters.count("messages")
+        self.do_translate_hostname(event)
+        if self._config["log_messages"]:
+            self.log_message(event)
+        self.count_hash_stats(event)
+        hits = self.match_rules(event)
+        if not hits and not self._config["archive_orphans"]:
+            return None
+        return IngestedEvent(event, [(hit.rule["id"], hit.result) for hit in hits])
+
+    def process_ingest_batch(self, batch: IngestBatch) -> None:
+        """Finish the processing of the events classified by an ingestion worker"""
+        self._perfcounters.add_counts(batch.counts)
+        for (facility, priority), count in batch.hash_stats.items():
+            self._hash_stats[facility][priority] += count
+        for event, hits in batch.events:
+            before = time.time()
+            # In replication slave mode (when not took over), ignore all events
+            if is_replication_slave(self._config) and self._slave_status["mode"] == "sync":
+                continue
+            if batch.rules_generation == self._rules_generation:
+                rule_hits = [RuleHit(self._rule_by_id[rule_id], result) for rule_id, result in hits]
+            else:  # the rules have been reloaded in the meantime
+                rule_hits = self.match_rules(event)
+            self.process_rule_hits(event, rule_hits)
+            self._perfcounters.count_time("processing", time.time() - before)
+
     def process_syslog_messages(
         self, messages: Iterable[bytes], address: tuple[str, int] | None
     ) -> None:
@@ -1105,23 +1260,33 @@ class EventServer(ECServerThread):
                 self._event_status.remove_event(event, "AUTODELETE")
 
     def reload_configuration(self, config: Config, history: History) -> None:
+        self.apply_configuration(config, history)
+        self.compile_rules(self._config["rule_packs"])
+
+    def apply_configuration(self, config: Config, history: History) -> None:
+        """Everything of reload_configuration() but compiling the rules"""
         self._config = config
         self._history = history
         self._snmp_trap_parser = SNMPTrapParser(
             self.settings, self._config, self._logger.getChild("snmp")
         ).parse
-        self.compile_rules(self._config["rule_packs"])
         self.host_config = HostConfig(self._logger)
         self._rule_matcher = RuleMatcher(
             logger=self._logger if config["debug_rules"] else None,
             omd_site_id=omd_site(),
             is_active_time_period=self._time_period.active,
         )
+        self._ingest_workers.reload_configuration(config)
 
     def compile_rules(self, rule_packs: Sequence[ECRulePack]) -> None:
-        """Precompile regular expressions and similar stuff."""
+        """Precompile regular expressions and similar stuff.
+
+        This is the only place where the rules change, the ingestion workers get the
+        same rules from here.
+        """
         self._rules = []
         self._rule_by_id = {}
+        self._rules_generation += 1
         # Speedup-Hash for rule execution
         self._rule_hash = {}
         count_disabled = 0
@@ -1179,6 +1344,11 @@ class EventServer(ECServerThread):
                 len(self._rules) - count_unspecific,
                 count_unspecific,
             )
+            self._rule_prefilter = RulePrefilter(self._rules)
+            self._logger.info(
+                "Rule prefilter: %d rules with literal host, text or application conditions",
+                self._rule_prefilter.num_constrained,
+            )
             for facility in list(range(23)) + [31]:
                 if facility in self._rule_hash:
                     stats = [
@@ -1187,6 +1357,8 @@ class EventServer(ECServerThread):
                     ]
                     self._logger.info(" %-12s: %s", SyslogFacility(facility), " ".join(stats))
 
+        self._ingest_workers.load_rules(self._rules_generation, rule_packs)
+
     def hash_rule(self, rule: Rule) -> None:
         """Construct rule hash for faster execution."""
         facility = rule.get("match_facility")
@@ -1242,20 +1414,47 @@ class EventServer(ECServerThread):
                 (100.0 * count / float(total_count)),
             )
 
-    def process_potential_event(self, event: Event) -> None:  # pylint: disable=too-many-branches
+    def process_potential_event(self, event: Event) -> None:
         self.do_translate_hostname(event)
 
         # Log all incoming messages into a syslog-like text file if that is enabled
         if self._config["log_messages"]:
             self.log_message(event)
 
-        # Rule optimizer
+        self.count_hash_stats(event)
+        self.process_rule_hits(event, self.match_rules(event))
+
+    def count_hash_stats(self, event: Event) -> None:
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
+
+    def take_hash_stats(self) -> dict[tuple[int, int], int]:
+        """Return the counts of facility/priority since the last call and reset them"""
+        counts = {
+            (facility, priority): count
+            for facility, counts_by_priority in enumerate(self._hash_stats)
+            for priority, count in enumerate(counts_by_priority)
+            if count
+        }
+        for facility, priority in counts:
+            self._hash_stats[facility][priority] = 0
+        return counts
+
+    def match_rules(self, event: Event) -> list[RuleHit]:
+        """Find the rules hit by the event
+
+        These are the hit rules dropping the rest of their rule pack, followed by the
+        rule deciding what happens to the event, if any.
+        """
+        # Rule optimizer
+        if self._config["rule_optimizer"]:
             rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
+            if not self._config["debug_rules"]:  # keep the debug log of all tried rules
+                rule_candidates = self._rule_prefilter.filter(rule_candidates, event)
         else:
             rule_candidates = self._rules
 
+        hits: list[RuleHit] = []
         skip_pack = None
         for rule in rule_candidates:
             # TODO: Rewrite this skipping logic, so it's blindingly obvious, even for mypy.
@@ -1272,133 +1471,140 @@ class EventServer(ECServerThread):
                 self._logger.exception(result.reason)
 
             if isinstance(result, MatchSuccess):
-                self._perfcounters.count("rule_hits")
                 if self._config["debug_rules"]:
                     self._logger.info("  matching groups:\n%s", pprint.pformat(result.match_groups))
+                hits.append(RuleHit(rule, result))
+                if rule.get("drop") == "skip_pack":
+                    skip_pack = rule["pack"]
+                    if self._config["debug_rules"]:
+                        self._logger.info("  skipping this rule pack (%s)", skip_pack)
+                    continue
+                break
+        return hits
 
-                self._event_status.count_rule_match(rule["id"])
-                if self._config["log_rulehits"]:
-                    self._logger.info(
-                        "Rule '%s/%s' hit by message %s/%s - '%s'.",
-                        rule["pack"],
-                        rule["id"],
-                        SyslogFacility(event["facility"]),
-                        SyslogPriority(event["priority"]),
-                        event["text"],
-                    )
-
-                if rule.get("drop"):
-                    if rule["drop"] == "skip_pack":
-                        skip_pack = rule["pack"]
-                        if self._config["debug_rules"]:
-                            self._logger.info("  skipping this rule pack (%s)", skip_pack)
-                        continue
-                    self._perfcounters.count("drops")
-                    return
-
-                if result.cancelling:
-                    self._event_status.cancel_events(
-                        self, self._event_columns, event, result.match_groups, rule
-                    )
-                    return
-
-                # Remember the rule id that this event originated from
-                event["rule_id"] = rule["id"]
+    def process_rule_hits(  # pylint: disable=too-many-branches
+        self, event: Event, hits: Sequence[RuleHit]
+    ) -> None:
+        """Act on the rules hit by the event, see match_rules()"""
+        for rule, _result in hits:
+            self._perfcounters.count("rule_hits")
+            self._event_status.count_rule_match(rule["id"])
+            if self._config["log_rulehits"]:
+                self._logger.info(
+                    "Rule '%s/%s' hit by message %s/%s - '%s'.",
+                    rule["pack"],
+                    rule["id"],
+                    SyslogFacility(event["facility"]),
+                    SyslogPriority(event["priority"]),
+                    event["text"],
+                )
 
-                # Attach optional contact group information for visibility
-                # and eventually for notifications
-                self._add_rule_contact_groups_to_event(rule, event)
+        if not hits or hits[-1].rule.get("drop") == "skip_pack":
+            if self._config["archive_orphans"]:
+                self._event_status.archive_event(event)
+            return
 
-                # Store groups from matching this event. In order to make
-                # persistence easier, we do not save them as list but join
-                # them on ASCII-1.
-                match_groups_message = result.match_groups.get("match_groups_message", ())
-                assert match_groups_message is not False
-                event["match_groups"] = match_groups_message
+        rule, result = hits[-1]
+        if rule.get("drop"):
+            self._perfcounters.count("drops")
+            return
 
-                match_groups_syslog_application = result.match_groups.get(
-                    "match_groups_syslog_application", ()
-                )
-                assert match_groups_syslog_application is not False
-                event["match_groups_syslog_application"] = match_groups_syslog_application
+        if result.cancelling:
+            self._event_status.cancel_events(
+                self, self._event_columns, event, result.match_groups, rule
+            )
+            return
 
-                self.rewrite_event(rule, event, result.match_groups)
+        # Remember the rule id that this event originated from
+        event["rule_id"] = rule["id"]
 
-                # Lookup the monitoring core hosts and add the core host
-                # name to the event when one can be matched.
-                #
-                # Needs to be done AFTER event rewriting, because the rewriting
-                # may change the "host" field.
-                #
-                # For the moment we have no rule/condition matching on this
-                # field. So we only add the core host info for matched events.
-                self._add_core_host_to_new_event(event)
-
-                if "count" in rule:
-                    count = rule["count"]
-                    # Check if a matching event already exists that we need to
-                    # count up. If the count reaches the limit, the event will
-                    # be opened and its rule actions performed.
-                    existing_event = self._event_status.count_event(self, event, count)
-                    if existing_event:
-                        if "delay" in rule:
-                            if self._config["debug_rules"]:
-                                self._logger.info(
-                                    "Event opening will be delayed for %d seconds", rule["delay"]
-                                )
-                            existing_event["delay_until"] = time.time() + rule["delay"]
-                            existing_event["phase"] = "delayed"
-                        else:
-                            event_has_opened(
-                                self._history,
-                                self.settings,
-                                self._config,
-                                self._logger,
-                                self.host_config,
-                                self._event_columns,
-                                rule,
-                                existing_event,
-                            )
+        # Attach optional contact group information for visibility
+        # and eventually for notifications
+        self._add_rule_contact_groups_to_event(rule, event)
 
-                        self._history.add(existing_event, "COUNTREACHED")
+        # Store groups from matching this event. In order to make
+        # persistence easier, we do not save them as list but join
+        # them on ASCII-1.
+        match_groups_message = result.match_groups.get("match_groups_message", ())
+        assert match_groups_message is not False
+        event["match_groups"] = match_groups_message
 
-                        if "delay" not in rule and rule.get("autodelete"):
-                            existing_event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(existing_event, "AUTODELETE")
-                elif "expect" in rule:
-                    self._event_status.count_expected_event(self, event)
+        match_groups_syslog_application = result.match_groups.get(
+            "match_groups_syslog_application", ()
+        )
+        assert match_groups_syslog_application is not False
+        event["match_groups_syslog_application"] = match_groups_syslog_application
+
+        self.rewrite_event(rule, event, result.match_groups)
+
+        # Lookup the monitoring core hosts and add the core host
+        # name to the event when one can be matched.
+        #
+        # Needs to be done AFTER event rewriting, because the rewriting
+        # may change the "host" field.
+        #
+        # For the moment we have no rule/condition matching on this
+        # field. So we only add the core host info for matched events.
+        self._add_core_host_to_new_event(event)
+
+        if "count" in rule:
+            count = rule["count"]
+            # Check if a matching event already exists that we need to
+            # count up. If the count reaches the limit, the event will
+            # be opened and its rule actions performed.
+            existing_event = self._event_status.count_event(self, event, count)
+            if existing_event:
+                if "delay" in rule:
+                    if self._config["debug_rules"]:
+                        self._logger.info(
+                            "Event opening will be delayed for %d seconds", rule["delay"]
+                        )
+                    existing_event["delay_until"] = time.time() + rule["delay"]
+                    existing_event["phase"] = "delayed"
                 else:
-                    if "delay" in rule:
-                        if self._config["debug_rules"]:
-                            self._logger.info(
-                                "Event opening will be delayed for %d seconds", rule["delay"]
-                            )
-                        event["delay_until"] = time.time() + rule["delay"]
-                        event["phase"] = "delayed"
-                    else:
-                        event["phase"] = "open"
+                    event_has_opened(
+                        self._history,
+                        self.settings,
+                        self._config,
+                        self._logger,
+                        self.host_config,
+                        self._event_columns,
+                        rule,
+                        existing_event,
+                    )
 
-                    if self.new_event_respecting_limits(event) and event["phase"] == "open":
-                        event_has_opened(
-                            self._history,
-                            self.settings,
-                            self._config,
-                            self._logger,
-                            self.host_config,
-                            self._event_columns,
-                            rule,
-                            event,
-                        )
-                        if rule.get("autodelete"):
-                            event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(event, "AUTODELETE")
-                return
+                self._history.add(existing_event, "COUNTREACHED")
 
-        # End of loop over rules.
-        if self._config["archive_orphans"]:
-            self._event_status.archive_event(event)
+                if "delay" not in rule and rule.get("autodelete"):
+                    existing_event["phase"] = "closed"
+                    with self._event_status.lock:
+                        self._event_status.remove_event(existing_event, "AUTODELETE")
+        elif "expect" in rule:
+            self._event_status.count_expected_event(self, event)
+        else:
+            if "delay" in rule:
+                if self._config["debug_rules"]:
+                    self._logger.info("Event opening will be delayed for %d seconds", rule["delay"])
+                event["delay_until"] = time.time() + rule["delay"]
+                event["phase"] = "delayed"
+            else:
+                event["phase"] = "open"
+
+            if self.new_event_respecting_limits(event) and event["phase"] == "open":
+                event_has_opened(
+                    self._history,
+                    self.settings,
+                    self._config,
+                    self._logger,
+                    self.host_config,
+                    self._event_columns,
+                    rule,
+                    event,
+                )
+                if rule.get("autodelete"):
+                    event["phase"] = "closed"
+                    with self._event_status.lock:
+                        self._event_status.remove_event(event, "AUTODELETE")
 
     def _add_rule_contact_groups_to_event(self, rule: Rule, event: Event) -> None:
         if rule.get("contact_groups") is None:
@@ -3461,6 +3667,7 @@ def main() -> None:
             logger.info("Daemonized with PID %d.", os.getpid())
 
         cmk.utils.daemon.lock_with_pid_file(pid_path)
+        event_server.start_ingest_workers()
 
         def signal_handler(signum: int, stack_frame: FrameType | None) -> None:
             logger.log(VERBOSE, "Got signal %d.", signum)
@@ -3500,6 +3707,9 @@ def main() -> None:
         drain_pipe(pipe)  # Drain any data
         os.close(pipe)  # Close pipe
 
+        logger.log(VERBOSE, "Stopping ingestion workers")
+        event_server.stop_ingest_workers()
+
         logger.log(VERBOSE, "Saving final event state")
         event_status.save_status()
 
@@ -55,6 +55,21 @@ class Perfcounters:
         with self._lock:
             self._counters[counter] += 1
 
+    def take_counts(self) -> dict[str, int]:
+        """Return the counts since the last call and start again from zero.
+
+        Used by the ingestion workers to hand their counts over to the event server.
+        """
+        with self._lock:
+            counts = {name: value for name, value in self._counters.items() if value}
+            self._counters = {n: 0 for n in self._counter_names}
+            return counts
+
+    def add_counts(self, counts: Mapping[str, int]) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self._counters[name] += value
+
     def count_time(self, counter: str, ptime: float) -> None:
         with self._lock:
             if counter in self._times:
@@ -7,10 +7,10 @@ from __future__ import annotations
 
 import ipaddress
 import re
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Sequence
 from dataclasses import dataclass
 from logging import Logger
-from typing import Literal, NamedTuple
+from typing import Final, Literal, NamedTuple
 
 from livestatus import SiteId
 
@@ -40,6 +40,11 @@ class MatchSuccess:
 MatchResult = MatchFailure | MatchSuccess
 
 
+class RuleHit(NamedTuple):
+    rule: Rule
+    result: MatchSuccess
+
+
 def compile_matching_value(key: str, original_value: str) -> TextPattern | None:
     """Tries to convert a string to a compiled regex pattern.
 
@@ -163,6 +168,133 @@ def match_ip_network(pattern: str, ipaddress_text: str) -> bool:
     return ipaddress_ in network
 
 
+class _LiteralSearch:
+    """Find out which of many literals occur in a text, with a single regex search
+
+    The regex tries the literals longest first at every position. A literal which
+    occurs at the same position as the found one is a prefix of it, so it is added
+    via the prefix table.
+    """
+
+    def __init__(self, literals: Iterable[str]) -> None:
+        self.literals: Final = sorted(set(literals), key=lambda lit: (-len(lit), lit))
+        self._regex = (
+            re.compile("(?=(%s))" % "|".join(re.escape(lit) for lit in self.literals))
+            if self.literals
+            else None
+        )
+        known = frozenset(self.literals)
+        self._prefixes = {
+            lit: [lit[:n] for n in range(len(lit) + 1) if lit[:n] in known] for lit in self.literals
+        }
+
+    def found_in(self, text: str) -> set[str]:
+        if self._regex is None:
+            return set()
+        found = {m.group(1) for m in self._regex.finditer(text)}
+        return {prefix for lit in found for prefix in self._prefixes[lit]}
+
+
+class RulePrefilter:
+    """Preselect the rules which can possibly match an event
+
+    Without inverted matching, a rule can only match if
+     * a literal match_host equals the host,
+     * one of the literal match/match_ok patterns occurs in the text and
+     * one of the literal match_application/cancel_application patterns occurs in the
+       application.
+    A condition containing a regex is not used here and left to the RuleMatcher. The
+    literals of all rules are searched for in one go, so the costs of an event do not
+    grow with the number of rules which can not match it.
+
+    Dropping rules which can not match does not change the outcome of the rule
+    processing: neither the first matching rule nor skipping the rest of a rule pack
+    (which are consecutive) depend on rules which do not match.
+    """
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self._unconstrained: set[int] = set()
+        self._needed: dict[int, int] = {}
+        self._by_host: dict[str, list[int]] = {}
+        self._by_text: dict[str, list[int]] = {}
+        self._by_application: dict[str, list[int]] = {}
+        for rule in rules:
+            self._add_rule(rule)
+        self._text_search = _LiteralSearch(self._by_text)
+        self._application_search = _LiteralSearch(self._by_application)
+
+    def _add_rule(self, rule: Rule) -> None:
+        key = id(rule)
+        if rule.get("invert_matching"):
+            self._unconstrained.add(key)
+            return
+        needed = 0
+        if isinstance(host := rule.get("match_host"), str):
+            self._by_host.setdefault(host, []).append(key)
+            needed += 1
+        if (
+            texts := _literal_alternatives(rule, "match", "match_ok", required="match")
+        ) is not None:
+            for text in texts:
+                self._by_text.setdefault(text, []).append(key)
+            needed += 1
+        if (
+            applications := _literal_alternatives(rule, "match_application", "cancel_application")
+        ) is not None:
+            for application in applications:
+                self._by_application.setdefault(application, []).append(key)
+            needed += 1
+        if needed:
+            self._needed[key] = needed
+        else:
+            self._unconstrained.add(key)
+
+    @property
+    def num_constrained(self) -> int:
+        return len(self._needed)
+
+    def filter(self, rules: Iterable[Rule], event: Event) -> list[Rule]:
+        """Keep the rules (in the given order) which can possibly match the event"""
+        satisfied: dict[int, int] = {}
+        for keys in (
+            set(self._by_host.get(event["host"].lower(), ())),
+            {
+                k
+                for t in self._text_search.found_in(event["text"].lower())
+                for k in self._by_text[t]
+            },
+            {
+                k
+                for a in self._application_search.found_in(event["application"].lower())
+                for k in self._by_application[a]
+            },
+        ):
+            for key in keys:
+                satisfied[key] = satisfied.get(key, 0) + 1
+        possible = self._unconstrained | {
+            key for key, count in satisfied.items() if count == self._needed[key]
+        }
+        return [rule for rule in rules if id(rule) in possible]
+
+
+def _literal_alternatives(
+    rule: Rule,
+    *keys: Literal["match", "match_ok", "match_application", "cancel_application"],
+    required: str | None = None,
+) -> list[str] | None:
+    """The literals of which one must occur, or None if this can not be told without regexes
+
+    A missing key does not restrict the match, unless it is the "required" one: the
+    rule then falls back to matching everything for it.
+    """
+    if required is not None and required not in rule:
+        return None
+    patterns = [rule[key] for key in keys if key in rule]
+    if not patterns or not all(isinstance(p, str) for p in patterns):
+        return None
+    return [p for p in patterns if isinstance(p, str)]
+
+
 class RuleMatcher:
     def __init__(
         self,
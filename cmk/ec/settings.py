@@ -157,6 +157,13 @@ class ECArgumentParser(ArgumentParser):
                 % port_numbers.snmptrap_udp.value
             ),
         )
+        self.add_argument(
+            "--ingest-workers",
+            metavar="N",
+            type=self._number_of_workers,
+            default=0,
+            help="receive, parse and classify syslog messages in N worker processes",
+        )
         self.add_argument(
             "-g",
             "--foreground",
@@ -191,6 +198,17 @@ class ECArgumentParser(ArgumentParser):
             raise ArgumentTypeError(f"invalid file descriptor value: {repr(value)}") from e
         return FileDescriptor(file_desc)
 
+    @staticmethod
+    def _number_of_workers(value: str) -> int:
+        """A custom argument type for a number of worker processes, i.e. non-negative integers."""
+        try:
+            number = int(value)
+            if number < 0:
+                raise ValueError
+        except ValueError as e:
+            raise ArgumentTypeError(f"invalid number of workers: {repr(value)}") from e
+        return number
+
 
 # a communication endpoint, e.g. for syslog or SNMP
 EndPoint = PortNumber | FileDescriptor
@@ -216,6 +234,7 @@ class Options(NamedTuple):
     syslog_udp: EndPoint | None
     syslog_tcp: EndPoint | None
     snmptrap_udp: EndPoint | None
+    ingest_workers: int
     foreground: bool
     debug: bool
     profile_status: bool
@@ -240,6 +259,7 @@ def create_settings(version: str, omd_root: Path, argv: list[str]) -> Settings:
         syslog_udp=_endpoint(args.syslog, args.syslog_fd, port_numbers.syslog_udp),
         syslog_tcp=_endpoint(args.syslog_tcp, args.syslog_tcp_fd, port_numbers.syslog_tcp),
         snmptrap_udp=_endpoint(args.snmptrap, args.snmptrap_fd, port_numbers.snmptrap_udp),
+        ingest_workers=args.ingest_workers,
         foreground=args.foreground,
         debug=args.debug,
         profile_status=args.profile_status,
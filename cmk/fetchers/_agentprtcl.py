@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 import enum
+import functools
 import hashlib
 import hmac
 import zlib
@@ -20,6 +21,11 @@ from cmk.ccc.exceptions import MKFetcherError
 
 OPENSSL_SALTED_MARKER = "Salted__"
 
+# Deriving the key of a PBKDF2 encrypted payload is by far the most expensive part of
+# fetching the data of an agent. Agents may reuse a salt for some time (see
+# ENCRYPTION_SALT_ROTATION in the agents encryption.cfg), so we keep the derived keys.
+PBKDF2_KEY_CACHE_SIZE: Final = 8192
+
 
 class TCPEncryptionHandling(enum.Enum):
     TLS_ENCRYPTED_ONLY = enum.auto()
@@ -236,7 +242,7 @@ def _check_mac_and_decrypt(
         raise ValueError("Decryption failed: MAC mismatch")
 
     cipher = AesCbcCipher("decrypt", key, iv)
-    decrypted = cipher.update(bytes(ciphertext)) + cipher.finalize()
+    decrypted = cipher.update(memoryview(ciphertext)) + cipher.finalize()
 
     return AesCbcCipher.unpad_block(decrypted)
 
@@ -271,7 +277,7 @@ def _decrypt_aes_256_cbc_pbkdf2_mac(cipherblob: Buffer, password: str) -> bytes:
     salt, mac, ciphertext = _unpack_cipher_blob(cipherblob)
     key, iv = _derive_key_and_iv_pbkdf2(
         password.encode("utf-8"),
-        salt,
+        bytes(salt),
         cycles=600_000,
         key_length=32,
         iv_length=16,
@@ -315,14 +321,14 @@ def _decrypt_aes_256_cbc_pbkdf2(ciphertext: Buffer, password: str) -> bytes:
 
     key, iv = _derive_key_and_iv_pbkdf2(
         password.encode("utf-8"),
-        memoryview(ciphertext)[:SALT_LENGTH],
+        bytes(memoryview(ciphertext)[:SALT_LENGTH]),
         cycles=PBKDF2_CYCLES,
         key_length=KEY_LENGTH,
         iv_length=IV_LENGTH,
     )
 
     cipher = AesCbcCipher("decrypt", key, iv)
-    decrypted = cipher.update(bytes(memoryview(ciphertext)[SALT_LENGTH:])) + cipher.finalize()
+    decrypted = cipher.update(memoryview(ciphertext)[SALT_LENGTH:]) + cipher.finalize()
 
     return AesCbcCipher.unpad_block(decrypted)
 
@@ -348,14 +354,15 @@ def _decrypt_aes_256_cbc_legacy(
     )
 
     cipher = AesCbcCipher("decrypt", key, iv)
-    decrypted = cipher.update(bytes(ciphertext)) + cipher.finalize()
+    decrypted = cipher.update(memoryview(ciphertext)) + cipher.finalize()
 
     return AesCbcCipher.unpad_block(decrypted)
 
 
+@functools.lru_cache(maxsize=PBKDF2_KEY_CACHE_SIZE)
 def _derive_key_and_iv_pbkdf2(
     password: bytes,
-    salt: Buffer,
+    salt: bytes,
     *,
     cycles: int,
     key_length: int,
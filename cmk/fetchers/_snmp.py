@@ -3,8 +3,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import contextlib
 import dataclasses
 import logging
+import struct
 import time
 from collections.abc import Collection, Iterable, Iterator, Mapping, MutableMapping, Sequence
 from pathlib import Path
@@ -24,7 +26,7 @@ from cmk.snmplib import (
 from cmk.checkengine.parser import SectionStore
 
 from cmk.ccc import store
-from cmk.ccc.exceptions import MKFetcherError, MKTimeout
+from cmk.ccc.exceptions import MKFetcherError
 
 from ._abstract import Fetcher, Mode
 from ._snmpscan import gather_available_raw_section_names, SNMPScanConfig
@@ -44,82 +46,161 @@ class WalkCache(
     The fetched data is always saved to a file *if* the respective OID is marked as being cached
     by the plug-in using `OIDCached` (that is: if the save_to_cache attribute of the OID object
     is true).
+
+    All walks of a host are stored in one binary file: a header with an index of the
+    walks (fetchoid, context hash, offset and length of the rows) followed by the rows
+    as raw OID and value bytes. Loading only reads the index, the rows of a walk are
+    decoded when the walk is requested.
     """
 
-    __slots__ = ("_store", "_path", "_logger")
+    __slots__ = ("_store", "_index", "_data", "_changed", "_path", "_logger")
+
+    _MAGIC: Final = b"CMKWALK1"
+    _HEADER: Final = struct.Struct(">8sI")
+    _INDEX_ENTRY: Final = struct.Struct(">HHQI")
+    _ROW: Final = struct.Struct(">HI")
 
     def __init__(self, walk_cache: Path, logger: logging.Logger) -> None:
         self._store: dict[tuple[str, str, bool], SNMPRowInfo] = {}
+        # The walks in the file which have not been decoded yet: offset and length of the rows
+        self._index: dict[tuple[str, str], tuple[int, int]] = {}
+        self._data = b""
+        self._changed = False
         self._path = walk_cache
         self._logger = logger
 
-    def _read_row(self, path: Path) -> SNMPRowInfo:
-        return store.load_object_from_file(path, default=None)
-
-    def _write_row(self, path: Path, rowinfo: SNMPRowInfo) -> None:
-        return store.save_object_to_file(path, rowinfo, pretty=False)
-
-    @staticmethod
-    def _oid2name(fetchoid: str, context_hash: str) -> str:
-        return f"OID{fetchoid}-{context_hash}"
+    @classmethod
+    def _encode(cls, walks: Mapping[tuple[str, str], SNMPRowInfo | bytes]) -> bytes:
+        """Encode the walks, the rows may be given in their encoded form already"""
+        encoded_rows = [
+            (
+                rowinfo
+                if isinstance(rowinfo, bytes)
+                else b"".join(
+                    cls._ROW.pack(len(oid_bytes := oid.encode()), len(value)) + oid_bytes + value
+                    for oid, value in rowinfo
+                )
+            )
+            for rowinfo in walks.values()
+        ]
+        index = []
+        offset = cls._HEADER.size + sum(
+            cls._INDEX_ENTRY.size + len(fetchoid.encode()) + len(context_hash.encode())
+            for fetchoid, context_hash in walks
+        )
+        for (fetchoid, context_hash), rows in zip(walks, encoded_rows):
+            fetchoid_bytes, context_hash_bytes = fetchoid.encode(), context_hash.encode()
+            index.append(
+                cls._INDEX_ENTRY.pack(
+                    len(fetchoid_bytes), len(context_hash_bytes), offset, len(rows)
+                )
+                + fetchoid_bytes
+                + context_hash_bytes
+            )
+            offset += len(rows)
+        return b"".join([cls._HEADER.pack(cls._MAGIC, len(walks)), *index, *encoded_rows])
 
-    @staticmethod
-    def _name2oid(basename: str) -> tuple[str, str]:
-        name_parts = basename[3:].split("-", 1)
-        return name_parts[0], name_parts[1]
+    @classmethod
+    def _decode_index(cls, data: bytes) -> dict[tuple[str, str], tuple[int, int]]:
+        magic, count = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC:
+            raise ValueError(f"invalid walk cache: {magic!r}")
+        index = {}
+        offset = cls._HEADER.size
+        for _entry in range(count):
+            fetchoid_length, context_hash_length, rows_offset, rows_length = (
+                cls._INDEX_ENTRY.unpack_from(data, offset)
+            )
+            offset += cls._INDEX_ENTRY.size
+            fetchoid = data[offset : offset + fetchoid_length].decode()
+            offset += fetchoid_length
+            context_hash = data[offset : offset + context_hash_length].decode()
+            offset += context_hash_length
+            if rows_offset + rows_length > len(data):
+                raise ValueError("truncated walk cache")
+            index[(fetchoid, context_hash)] = (rows_offset, rows_length)
+        return index
 
-    def _iterfiles(self) -> Iterable[Path]:
-        return self._path.iterdir() if self._path.is_dir() else ()
+    @classmethod
+    def _decode_rows(cls, data: bytes, offset: int, length: int) -> SNMPRowInfo:
+        rowinfo = []
+        end = offset + length
+        while offset < end:
+            oid_length, value_length = cls._ROW.unpack_from(data, offset)
+            offset += cls._ROW.size
+            oid = data[offset : offset + oid_length].decode()
+            offset += oid_length
+            rowinfo.append((oid, data[offset : offset + value_length]))
+            offset += value_length
+        return rowinfo
 
     def __repr__(self) -> str:
         return f"{type(self).__name__}({self._store!r})"
 
     def __getitem__(self, key: tuple[str, str, bool]) -> SNMPRowInfo:
-        return self._store.__getitem__(key)
+        with contextlib.suppress(KeyError):
+            return self._store[key]
+        fetchoid, context_hash, save_flag = key
+        if not save_flag or (location := self._index.pop((fetchoid, context_hash), None)) is None:
+            raise KeyError(key)
+        self._logger.debug(f"  Loading {fetchoid} from walk cache {self._path}")
+        rowinfo = self._store[key] = self._decode_rows(self._data, *location)
+        return rowinfo
 
     def __setitem__(self, key: tuple[str, str, bool], value: SNMPRowInfo) -> None:
+        fetchoid, context_hash, save_flag = key
+        if save_flag:
+            self._index.pop((fetchoid, context_hash), None)
+            self._changed = True
         return self._store.__setitem__(key, value)
 
     def __delitem__(self, key: tuple[str, str, bool]) -> None:
-        return self._store.__delitem__(key)
+        fetchoid, context_hash, save_flag = key
+        if not save_flag or self._index.pop((fetchoid, context_hash), None) is None:
+            self._store.__delitem__(key)
+        self._changed |= save_flag
 
     def __iter__(self) -> Iterator[tuple[str, str, bool]]:
-        return self._store.__iter__()
+        yield from self._store
+        yield from ((fetchoid, context_hash, True) for fetchoid, context_hash in self._index)
 
     def __len__(self) -> int:
-        return self._store.__len__()
+        return len(self._store) + len(self._index)
 
     def clear(self) -> None:
-        for path in self._iterfiles():
-            path.unlink(missing_ok=True)
+        self._path.unlink(missing_ok=True)
+        self._index.clear()
+        self._data = b""
 
     def load(self) -> None:
-        """Try to read the OIDs data from cache files"""
-        for path in self._iterfiles():
-            fetchoid, context_hash = self._name2oid(path.name)
-
-            self._logger.debug(f"  Loading {fetchoid} from walk cache {path}")
-            try:
-                read_walk = self._read_row(path)
-            except MKTimeout:
-                raise
-            except Exception:
-                self._logger.debug(f"  Failed to load {fetchoid} from walk cache {path}")
-                continue
-
-            if read_walk is not None:
-                self._store[(fetchoid, context_hash, True)] = read_walk
+        """Try to read the index of the cached OIDs from the cache file"""
+        data = store.load_bytes_from_file(self._path, default=b"")
+        if not data:
+            return
+        try:
+            self._index = self._decode_index(data)
+        except (ValueError, struct.error) as e:
+            self._logger.debug(f"  Failed to load walk cache {self._path}: {e}")
+            return
+        self._data = data
 
     def save(self) -> None:
-        self._path.mkdir(parents=True, exist_ok=True)
-
-        for (fetchoid, context_hash, save_flag), rowinfo in self._store.items():
-            if not save_flag:
-                continue
-
-            path = self._path / self._oid2name(fetchoid, context_hash)
-            self._logger.debug(f"  Saving walk of {fetchoid} to walk cache {path}")
-            self._write_row(path, rowinfo)
+        if not self._changed:
+            return
+
+        walks: dict[tuple[str, str], SNMPRowInfo | bytes] = {
+            (fetchoid, context_hash): rowinfo
+            for (fetchoid, context_hash, save_flag), rowinfo in self._store.items()
+            if save_flag
+        }
+        walks.update(
+            (key, self._data[offset : offset + length])
+            for key, (offset, length) in self._index.items()
+        )
+        self._logger.debug(f"  Saving {len(walks)} walks to walk cache {self._path}")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        store.save_bytes_to_file(self._path, self._encode(walks))
+        self._changed = False
 
 
 @dataclasses.dataclass(init=False)
@@ -315,7 +396,9 @@ class SNMPFetcher(Fetcher[SNMPRawData]):
             # Nothing to discover? That can't be right.
             raise MKFetcherError("Got no data")
 
-        walk_cache = WalkCache(self.walk_cache_path / str(self._backend.hostname), self._logger)
+        walk_cache = WalkCache(
+            self.walk_cache_path / f"{self._backend.hostname}.walk", self._logger
+        )
         if mode is Mode.CHECKING:
             walk_cache_msg = "SNMP walk cache is enabled: Use any locally cached information"
             walk_cache.load()
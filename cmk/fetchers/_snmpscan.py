@@ -3,19 +3,21 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-import functools
+import contextlib
 import re
-from collections.abc import Callable, Collection, Iterable
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Iterable, Sequence
 from dataclasses import dataclass
 from logging import Logger
 from pathlib import Path
+from typing import Final
 
 from cmk.utils import tty
 from cmk.utils.regex import regex
 from cmk.utils.sectionname import SectionName
 from cmk.utils.tty import format_warning
 
-from cmk.snmplib import get_single_oid, SNMPBackend, SNMPDetectAtom, SNMPDetectBaseType
+from cmk.snmplib import get_single_oid, OID, SNMPBackend, SNMPDetectAtom, SNMPDetectBaseType
 
 import cmk.fetchers._snmpcache as snmp_cache
 
@@ -56,6 +58,13 @@ def gather_available_raw_section_names(
 
 OID_SYS_DESCR = ".1.3.6.1.2.1.1.1.0"
 OID_SYS_OBJ = ".1.3.6.1.2.1.1.2.0"
+_PREFETCHED_OIDS: Final = frozenset(oid.lstrip(".") for oid in (OID_SYS_DESCR, OID_SYS_OBJ))
+
+# The detection trees of the most recently scanned collections of sections
+_MAX_DETECTION_TREES: Final = 8
+# Start over before a tree grows too large, e.g. when scanning very different hosts
+_MAX_DETECTION_RESULTS: Final = 10000
+_detection_trees: OrderedDict[tuple[object, ...], "_DetectionTree"] = OrderedDict()
 
 
 def _snmp_scan(
@@ -116,21 +125,132 @@ def _fake_description_object(logger: Logger) -> None:
     snmp_cache.single_oid_cache()[OID_SYS_OBJ] = ""
 
 
+class _DetectionNode:
+    """Probe an OID and continue with the node or the result for its value"""
+
+    __slots__ = ("oid", "section_name", "children")
+
+    def __init__(self, oid: OID, section_name: SectionName) -> None:
+        self.oid: Final = oid
+        # The first section probing the OID, relevant for the SNMPv3 contexts
+        self.section_name: Final = section_name
+        self.children: dict[str | None, _DetectionNode | frozenset[SectionName]] = {}
+
+
+class _DetectionTree:
+    """The detection of a collection of sections, memoized for all hosts
+
+    The detection only depends on the values of the OIDs it probes, and which OID is
+    probed next only depends on the values of the OIDs probed before. So the probed
+    OIDs form a decision tree whose leaves are the found sections. Hosts with the same
+    values for these OIDs (e.g. many switches of the same model) are detected by
+    looking up the values, without evaluating any detection spec.
+    """
+
+    def __init__(self, sections: Iterable[SNMPScanSection]) -> None:
+        self.sections: Final = [(name, _prefetched_oids_first(spec)) for name, spec in sections]
+        self._root: _DetectionNode | frozenset[SectionName] | None = None
+        self._results = 0
+
+    def lookup(
+        self, get_value: Callable[[OID, SectionName], str | None]
+    ) -> frozenset[SectionName] | None:
+        node = self._root
+        while isinstance(node, _DetectionNode):
+            node = node.children.get(get_value(node.oid, node.section_name))
+        return node
+
+    def add(
+        self,
+        probes: Sequence[tuple[OID, SectionName, str | None]],
+        found_sections: frozenset[SectionName],
+    ) -> None:
+        """Add the result of a detection, probes are the OIDs in the order they were probed"""
+        if self._results >= _MAX_DETECTION_RESULTS:
+            self._root, self._results = None, 0
+        if not probes:
+            self._root = found_sections
+            return
+
+        if self._root is None:
+            self._root = _DetectionNode(probes[0][0], probes[0][1])
+        node = self._root
+        for (oid, _section_name, value), (next_oid, next_section_name, _next_value) in zip(
+            probes, probes[1:]
+        ):
+            if not isinstance(node, _DetectionNode) or node.oid != oid:
+                return
+            node = node.children.setdefault(value, _DetectionNode(next_oid, next_section_name))
+
+        oid, _section_name, value = probes[-1]
+        if isinstance(node, _DetectionNode) and node.oid == oid and value not in node.children:
+            node.children[value] = found_sections
+            self._results += 1
+
+
+def _prefetched_oids_first(detect_spec: SNMPDetectBaseType) -> SNMPDetectBaseType:
+    """Evaluate the conditions on the system description and object OID first
+
+    These are fetched anyway, so checking them first saves the GETs of the other
+    OIDs of an alternative which does not match.
+    """
+
+    def cost(atom: SNMPDetectAtom) -> int:
+        return 0 if atom[0].lstrip(".") in _PREFETCHED_OIDS else 1
+
+    return sorted(
+        (sorted(alternative, key=cost) for alternative in detect_spec),
+        key=lambda alternative: sum(map(cost, alternative)),
+    )
+
+
+def _detection_tree(sections: Iterable[SNMPScanSection]) -> _DetectionTree:
+    sections = list(sections)
+    key = tuple(
+        (name, tuple(tuple(tuple(atom) for atom in alternative) for alternative in spec))
+        for name, spec in sections
+    )
+    with contextlib.suppress(KeyError):
+        _detection_trees.move_to_end(key)
+        return _detection_trees[key]
+
+    tree = _detection_trees[key] = _DetectionTree(sections)
+    while len(_detection_trees) > _MAX_DETECTION_TREES:
+        _detection_trees.popitem(last=False)
+    return tree
+
+
 def _find_sections(
     sections: Iterable[SNMPScanSection],
     *,
     on_error: OnError,
     backend: SNMPBackend,
 ) -> frozenset[SectionName]:
-    found_sections: set[SectionName] = set()
-    for name, specs in sections:
-        oid_value_getter = functools.partial(
-            get_single_oid,
-            section_name=name,
+    def get_value(oid: OID, section_name: SectionName) -> str | None:
+        return get_single_oid(
+            oid,
+            section_name=section_name,
             single_oid_cache=snmp_cache.single_oid_cache(),
             backend=backend,
             log=backend.logger.debug,
         )
+
+    tree = _detection_tree(sections)
+    if (memoized_sections := tree.lookup(get_value)) is not None:
+        backend.logger.debug("   Detected like a host with the same values of the probed OIDs")
+        return memoized_sections
+
+    # The first probe of every OID, in the order of probing
+    probes: dict[OID, tuple[SectionName, str | None]] = {}
+    failed = False
+    found_sections: set[SectionName] = set()
+    for name, specs in tree.sections:
+
+        def oid_value_getter(oid: OID, name: SectionName = name) -> str | None:
+            value = get_value(oid, name)
+            probes.setdefault(oid, (name, value))
+            return value
+
         try:
             if _evaluate_snmp_detection(
                 detect_spec=specs,
@@ -146,10 +266,18 @@ def _find_sections(
         except Exception:
             if on_error is OnError.RAISE:
                 raise
+            failed = True
             if on_error is OnError.WARN:
                 backend.logger.warning(
                     format_warning(f"   Exception in SNMP scan function of {name}")
                 )
+
+    # Only memoize results which do not depend on errors
+    if not failed:
+        tree.add(
+            [(oid, name, value) for oid, (name, value) in probes.items()],
+            frozenset(found_sections),
+        )
     return frozenset(found_sections)
 
 
@@ -6,7 +6,6 @@
 import logging
 import socket
 import ssl
-from collections.abc import Buffer
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Final
@@ -37,18 +36,32 @@ class TLSConfig:
     site_crt: Path
 
 
-def recvall(sock: socket.socket, flags: int = 0) -> bytes:
-    buffer = bytearray()
+# Initial size of the receive buffer, it is doubled whenever it is full.
+_RECV_BUFFER_SIZE: Final = 64 * 1024
+
+
+def recvall(sock: socket.socket, flags: int = 0, *, prefix: bytes = b"") -> memoryview:
+    """Receive everything until the connection is closed
+
+    The data is received directly into a buffer that grows as needed, after `prefix`.
+    The returned view on this buffer spares another copy of the data.
+    """
+    buffer = bytearray(max(_RECV_BUFFER_SIZE, 2 * len(prefix)))
+    buffer[: len(prefix)] = prefix
+    received = len(prefix)
     try:
         while True:
-            data = sock.recv(4096, flags)
-            if not data:
+            if received == len(buffer):
+                buffer += bytes(len(buffer))
+            with memoryview(buffer)[received:] as free:
+                count = sock.recv_into(free, 0, flags)
+            if not count:
                 break
-            buffer += data
+            received += count
     except OSError as e:
         raise MKFetcherError("Communication failed: %s" % e)
 
-    return bytes(buffer)
+    return memoryview(buffer)[:received]
 
 
 def wrap_tls(sock: socket.socket, server_hostname: str, *, tls_config: TLSConfig) -> ssl.SSLSocket:
@@ -160,7 +173,8 @@ class TCPFetcher(Fetcher[AgentRawData]):
 
     def _from_tls(
         self, sock: socket.socket, server_hostname: str
-    ) -> tuple[TransportProtocol, Buffer]:
+    ) -> tuple[TransportProtocol, memoryview]:
+        """Return the protocol and the data of the agent, still starting with the protocol"""
         self._logger.debug("Reading data from agent via TLS socket")
         with wrap_tls(sock, server_hostname, tls_config=self.tls_config) as ssock:
             self._logger.debug("Reading data from agent")
@@ -182,7 +196,7 @@ class TCPFetcher(Fetcher[AgentRawData]):
             )
 
         self._logger.debug("Detected transport protocol: %s", protocol)
-        return protocol, memoryview(agent_data)[2:]
+        return protocol, memoryview(agent_data)
 
     def _get_agent_data(self, sock: socket.socket, server_hostname: str | None) -> AgentRawData:
         try:
@@ -207,16 +221,18 @@ class TCPFetcher(Fetcher[AgentRawData]):
             if server_hostname is None:
                 raise MKFetcherError("Agent controller not registered")
 
-            protocol, output = self._from_tls(sock, server_hostname)
+            protocol, agent_data = self._from_tls(sock, server_hostname)
         else:
             self._logger.debug("Reading data from agent")
-            output = recvall(sock, socket.MSG_WAITALL)
+            agent_data = recvall(sock, socket.MSG_WAITALL, prefix=raw_protocol)
 
+        output = agent_data[len(protocol.value) :]
         if not output:
             return AgentRawData(b"")  # nothing to to, validation will fail
 
         if protocol is TransportProtocol.PLAIN:
-            return AgentRawData(protocol.value + output)  # bring back stolen bytes
+            # The protocol bytes are the start of the first section header.
+            return AgentRawData(bytes(agent_data))
 
         if (secret := self.pre_shared_secret) is None:
             raise MKFetcherError("Data is encrypted but no secret is known")
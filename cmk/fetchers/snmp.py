@@ -16,9 +16,10 @@ from cmk.snmplib import (
     SNMPBackendEnum,
     SNMPDetectSpec,
     SNMPHostConfig,
+    SNMPVersion,
 )
 
-from .snmp_backend import ClassicSNMPBackend, StoredWalkSNMPBackend
+from .snmp_backend import AsyncioSNMPBackend, ClassicSNMPBackend, StoredWalkSNMPBackend
 
 try:
     from .cee.snmp_backend import inline  # type: ignore[import,unused-ignore]
@@ -59,6 +60,12 @@ def make_backend(
     if inline and snmp_config.snmp_backend is SNMPBackendEnum.INLINE:
         return inline.InlineSNMPBackend(snmp_config, logger)
 
+    if snmp_config.snmp_backend is SNMPBackendEnum.ASYNCIO:
+        if snmp_config.snmp_version is SNMPVersion.V3:
+            # SNMP v3 (USM) is not implemented by the asyncio backend
+            return ClassicSNMPBackend(snmp_config, logger)
+        return AsyncioSNMPBackend(snmp_config, logger)
+
     if snmp_config.snmp_backend is SNMPBackendEnum.CLASSIC:
         return ClassicSNMPBackend(snmp_config, logger)
 
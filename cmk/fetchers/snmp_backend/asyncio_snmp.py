@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Pure Python SNMP v1 and v2c backend based on asyncio
+
+The AsyncSNMPClient sends the requests of any number of hosts over one UDP socket per
+address family and matches the responses by their request ID, so that walks of many hosts
+and columns can run at the same time in one event loop. The AsyncioSNMPBackend wraps it for
+the synchronous fetchers.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import socket
+from collections.abc import Sequence
+from typing import Final, NamedTuple
+
+from cmk.utils.sectionname import SectionName
+
+from cmk.snmplib import (
+    OID,
+    SNMPBackend,
+    SNMPContext,
+    SNMPHostConfig,
+    SNMPRawValue,
+    SNMPRowInfo,
+    SNMPVersion,
+)
+
+from cmk.ccc.exceptions import MKSNMPError
+
+from ._utils import strip_snmp_value
+
+__all__ = ["AsyncioSNMPBackend", "AsyncSNMPClient"]
+
+# BER tags of the types and PDUs we deal with
+_INTEGER: Final = 0x02
+_OCTET_STRING: Final = 0x04
+_NULL: Final = 0x05
+_OBJECT_IDENTIFIER: Final = 0x06
+_SEQUENCE: Final = 0x30
+_IP_ADDRESS: Final = 0x40
+_COUNTER32: Final = 0x41
+_GAUGE32: Final = 0x42
+_TIME_TICKS: Final = 0x43
+_COUNTER64: Final = 0x46
+_NO_SUCH_OBJECT: Final = 0x80
+_NO_SUCH_INSTANCE: Final = 0x81
+_END_OF_MIB_VIEW: Final = 0x82
+_GET_REQUEST: Final = 0xA0
+_GET_NEXT_REQUEST: Final = 0xA1
+_RESPONSE: Final = 0xA2
+_GET_BULK_REQUEST: Final = 0xA5
+
+# The defaults of the Net-SNMP tools, which the classic backend uses
+_DEFAULT_TIMEOUT: Final = 1.0
+_DEFAULT_RETRIES: Final = 5
+
+# Bytes Net-SNMP prints as string (isprint() or isspace() in the C locale), all other
+# octet strings are printed as hex string.
+_PRINTABLE: Final = frozenset(range(0x20, 0x7F)) | frozenset(range(0x09, 0x0E))
+
+
+class _PDU(NamedTuple):
+    request_id: int
+    # non-repeaters and max-repetitions in GETBULK requests
+    error_status: int
+    error_index: int
+    # OID, tag and BER encoded value
+    varbinds: Sequence[tuple[tuple[int, ...], int, bytes]]
+
+
+def _encode_tlv(tag: int, value: bytes) -> bytes:
+    length = len(value)
+    if length < 0x80:
+        return bytes((tag, length)) + value
+    encoded_length = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes((tag, 0x80 | len(encoded_length))) + encoded_length + value
+
+
+def _encode_integer(value: int, tag: int = _INTEGER) -> bytes:
+    return _encode_tlv(tag, value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True))
+
+
+def _encode_oid(oid: tuple[int, ...]) -> bytes:
+    encoded = bytearray()
+    for sub_id in (oid[0] * 40 + oid[1], *oid[2:]):
+        chunk = [sub_id & 0x7F]
+        while sub_id := sub_id >> 7:
+            chunk.append(0x80 | (sub_id & 0x7F))
+        encoded += bytes(reversed(chunk))
+    return _encode_tlv(_OBJECT_IDENTIFIER, bytes(encoded))
+
+
+def _encode_message(
+    version: int,
+    community: bytes,
+    pdu_type: int,
+    request_id: int,
+    error_status: int,
+    error_index: int,
+    varbinds: Sequence[tuple[tuple[int, ...], bytes]],
+) -> bytes:
+    """Encode a message, the values of the varbinds are expected to be BER encoded already
+
+    For GETBULK requests, error_status and error_index are non-repeaters and max-repetitions.
+    """
+    return _encode_tlv(
+        _SEQUENCE,
+        _encode_integer(version)
+        + _encode_tlv(_OCTET_STRING, community)
+        + _encode_tlv(
+            pdu_type,
+            _encode_integer(request_id)
+            + _encode_integer(error_status)
+            + _encode_integer(error_index)
+            + _encode_tlv(
+                _SEQUENCE,
+                b"".join(
+                    _encode_tlv(_SEQUENCE, _encode_oid(oid) + value) for oid, value in varbinds
+                ),
+            ),
+        ),
+    )
+
+
+def _decode_tlv(data: bytes, offset: int) -> tuple[int, int, int]:
+    """Return the tag and the begin and end of the value at offset"""
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        offset += 2
+        if length & 0x80:
+            num_bytes = length & 0x7F
+            length = int.from_bytes(data[offset : offset + num_bytes], "big")
+            offset += num_bytes
+    except IndexError:
+        raise MKSNMPError("Truncated SNMP message")
+    if offset + length > len(data):
+        raise MKSNMPError("Truncated SNMP message")
+    return tag, offset, offset + length
+
+
+def _decode_oid(value: bytes) -> tuple[int, ...]:
+    sub_ids = []
+    sub_id = 0
+    for byte in value:
+        sub_id = (sub_id << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            sub_ids.append(sub_id)
+            sub_id = 0
+    if not sub_ids:
+        raise MKSNMPError("Invalid OID in SNMP message")
+    first = min(sub_ids[0] // 40, 2)
+    return (first, sub_ids[0] - 40 * first, *sub_ids[1:])
+
+
+def _decode_message(data: bytes) -> tuple[int, bytes, int, _PDU]:
+    """Decode a message into version, community, PDU type and the PDU"""
+    _tag, offset, end = _decode_tlv(data, 0)
+    _tag, begin, offset = _decode_tlv(data, offset)
+    version = int.from_bytes(data[begin:offset], "big", signed=True)
+    _tag, begin, offset = _decode_tlv(data, offset)
+    community = data[begin:offset]
+    pdu_type, offset, end = _decode_tlv(data, offset)
+    fields = []
+    for _field in range(3):
+        _tag, begin, offset = _decode_tlv(data, offset)
+        fields.append(int.from_bytes(data[begin:offset], "big", signed=True))
+    _tag, offset, end = _decode_tlv(data, offset)
+    varbinds = []
+    while offset < end:
+        _tag, varbind_offset, offset = _decode_tlv(data, offset)
+        _tag, begin, varbind_offset = _decode_tlv(data, varbind_offset)
+        oid = _decode_oid(data[begin:varbind_offset])
+        tag, begin, varbind_offset = _decode_tlv(data, varbind_offset)
+        varbinds.append((oid, tag, data[begin:varbind_offset]))
+    return version, community, pdu_type, _PDU(fields[0], fields[1], fields[2], varbinds)
+
+
+def _oid_tuple(oid: OID) -> tuple[int, ...]:
+    try:
+        return tuple(map(int, oid.strip(".").split(".")))
+    except ValueError:
+        raise MKSNMPError(f"Invalid OID {oid}")
+
+
+def _oid_str(oid: tuple[int, ...]) -> OID:
+    return "." + ".".join(map(str, oid))
+
+
+def _raw_value(tag: int, value: bytes) -> SNMPRawValue | None:
+    """Convert a value like the classic backend converts the output of the Net-SNMP tools"""
+    if tag == _INTEGER:
+        return str(int.from_bytes(value, "big", signed=True)).encode()
+    if tag in (_COUNTER32, _GAUGE32, _TIME_TICKS, _COUNTER64):
+        return str(int.from_bytes(value, "big")).encode()
+    if tag == _OCTET_STRING:
+        if not _PRINTABLE.issuperset(value):
+            return value
+        # Net-SNMP quotes the string, so this is subject to the same cleanups
+        text = value.decode("ascii").replace("\\", "\\\\").replace('"', '\\"')
+        return strip_snmp_value(f'"{text}"')
+    if tag == _OBJECT_IDENTIFIER:
+        return _oid_str(_decode_oid(value)).encode()
+    if tag == _IP_ADDRESS:
+        return ".".join(map(str, value)).encode()
+    if tag == _NULL:
+        return b""
+    if tag in (_NO_SUCH_OBJECT, _NO_SUCH_INSTANCE, _END_OF_MIB_VIEW):
+        return None
+    # Opaque and friends
+    return value
+
+
+class _ClientProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "AsyncSNMPClient") -> None:
+        self._client = client
+
+    def datagram_received(self, data: bytes, addr: tuple[str | int, ...]) -> None:
+        self._client._response_received(data)
+
+    def error_received(self, exc: Exception) -> None:
+        # E.g. ICMP port unreachable. The request will time out.
+        self._client._logger.debug("SNMP socket error: %s", exc)
+
+
+class AsyncSNMPClient:
+    """Sends SNMP v1 and v2c requests of many hosts over one UDP socket per address family
+
+    At most max_requests_per_host requests are outstanding for each host, all others wait.
+    Timeouts and retries are taken from the timing settings of the host, just like the
+    Net-SNMP tools would do.
+    """
+
+    def __init__(self, logger: logging.Logger, *, max_requests_per_host: int = 1) -> None:
+        self._logger = logger
+        self._max_requests_per_host = max_requests_per_host
+        self._transports: dict[socket.AddressFamily, asyncio.DatagramTransport] = {}
+        self._pending: dict[int, asyncio.Future[_PDU]] = {}
+        self._host_slots: dict[tuple[str, int], asyncio.Semaphore] = {}
+        self._request_ids = itertools.count(random.randrange(1, 2**30))
+        self.requests_sent = 0
+
+    async def __aenter__(self) -> "AsyncSNMPClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for transport in self._transports.values():
+            transport.close()
+        self._transports.clear()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    async def get(self, config: SNMPHostConfig, oid: OID) -> SNMPRawValue | None:
+        """Fetch a single OID, a trailing .* fetches the first OID below the given one"""
+        if oid.endswith(".*"):
+            prefix = _oid_tuple(oid[:-2])
+            response = await self._request(config, _GET_NEXT_REQUEST, [prefix])
+        else:
+            prefix = _oid_tuple(oid)
+            response = await self._request(config, _GET_REQUEST, [prefix])
+
+        if response.error_status or not response.varbinds:
+            return None
+        response_oid, tag, value = response.varbinds[0]
+        if oid.endswith(".*") and response_oid[: len(prefix)] != prefix:
+            return None
+        return _raw_value(tag, value)
+
+    async def walk(self, config: SNMPHostConfig, oid: OID) -> SNMPRowInfo:
+        """Walk the tree below the OID with GETBULK (or GETNEXT) requests"""
+        root = _oid_tuple(oid)
+        rowinfo: SNMPRowInfo = []
+        current = root
+        while True:
+            if config.use_bulkwalk:
+                response = await self._request(
+                    config,
+                    _GET_BULK_REQUEST,
+                    [current],
+                    error_index=config.bulk_walk_size_of,
+                )
+            else:
+                response = await self._request(config, _GET_NEXT_REQUEST, [current])
+            # SNMP v1 agents answer with noSuchName at the end of the MIB
+            if response.error_status or not response.varbinds:
+                break
+
+            varbinds = list(
+                itertools.takewhile(
+                    lambda varbind: varbind[1] != _END_OF_MIB_VIEW
+                    and varbind[0][: len(root)] == root,
+                    response.varbinds,
+                )
+            )
+            for response_oid, tag, value in varbinds:
+                if (raw_value := _raw_value(tag, value)) is not None:
+                    rowinfo.append((_oid_str(response_oid), raw_value))
+
+            # Like snmpwalk -Cc we accept OIDs which are not increasing, but not an agent
+            # answering with the same OID again and again.
+            if len(varbinds) < len(response.varbinds) or varbinds[-1][0] == current:
+                break
+            current = varbinds[-1][0]
+
+        if not rowinfo and (raw_value := await self.get(config, oid)) is not None:
+            # Like snmpwalk: the OID may point to a single instance
+            rowinfo.append((_oid_str(root), raw_value))
+        return rowinfo
+
+    async def _request(
+        self,
+        config: SNMPHostConfig,
+        pdu_type: int,
+        oids: Sequence[tuple[int, ...]],
+        *,
+        error_index: int = 0,
+    ) -> _PDU:
+        if not isinstance(config.credentials, str):
+            raise MKSNMPError(f"SNMP v3 is not supported by this backend ({config.hostname})")
+
+        family = socket.AF_INET6 if config.is_ipv6_primary else socket.AF_INET
+        if (transport := self._transports.get(family)) is None:
+            transport, _protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _ClientProtocol(self), family=family
+            )
+            self._transports[family] = transport
+
+        address = (config.ipaddress or "0.0.0.0", config.port)
+        timeout = config.timing.get("timeout", _DEFAULT_TIMEOUT)
+        retries = config.timing.get("retries", _DEFAULT_RETRIES)
+        version = 0 if config.snmp_version is SNMPVersion.V1 else 1
+
+        async with self._host_slots.setdefault(
+            address, asyncio.Semaphore(self._max_requests_per_host)
+        ):
+            for _attempt in range(retries + 1):
+                request_id = next(self._request_ids) % 2**31
+                future = asyncio.get_running_loop().create_future()
+                self._pending[request_id] = future
+                try:
+                    transport.sendto(
+                        _encode_message(
+                            version,
+                            config.credentials.encode(),
+                            pdu_type,
+                            request_id,
+                            0,
+                            error_index,
+                            [(oid, _encode_tlv(_NULL, b"")) for oid in oids],
+                        ),
+                        address,
+                    )
+                    self.requests_sent += 1
+                    return await asyncio.wait_for(future, timeout)
+                except TimeoutError:
+                    self._logger.debug("Timeout on SNMP request to %s", address[0])
+                finally:
+                    self._pending.pop(request_id, None)
+
+        raise MKSNMPError(f"SNMP Error on {address[0]}: Timeout ({retries} retries)")
+
+    def _response_received(self, data: bytes) -> None:
+        try:
+            _version, _community, pdu_type, response = _decode_message(data)
+        except MKSNMPError as e:
+            self._logger.debug("Dropping invalid SNMP response: %s", e)
+            return
+        if pdu_type != _RESPONSE:
+            return
+        if (future := self._pending.pop(response.request_id, None)) is not None:
+            if not future.done():
+                future.set_result(response)
+
+
+class AsyncioSNMPBackend(SNMPBackend):
+    """Synchronous interface to the AsyncSNMPClient for the fetchers
+
+    SNMP contexts only exist in SNMP v3, which is not supported, so they are ignored.
+    """
+
+    def get(self, /, oid: OID, *, context: SNMPContext) -> SNMPRawValue | None:
+        try:
+            return asyncio.run(self._get(oid))
+        except MKSNMPError as e:
+            self._logger.debug("SNMP error: %s", e)
+            return None
+
+    def walk(
+        self,
+        /,
+        oid: OID,
+        *,
+        context: SNMPContext,
+        section_name: SectionName | None = None,
+        table_base_oid: OID | None = None,
+    ) -> SNMPRowInfo:
+        self._logger.debug(f"  Walking {oid}")
+        return asyncio.run(self._walk(oid))
+
+    async def _get(self, oid: OID) -> SNMPRawValue | None:
+        async with AsyncSNMPClient(self._logger) as client:
+            return await client.get(self.config, oid)
+
+    async def _walk(self, oid: OID) -> SNMPRowInfo:
+        async with AsyncSNMPClient(self._logger) as client:
+            return await client.walk(self.config, oid)
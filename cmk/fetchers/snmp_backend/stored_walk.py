@@ -4,10 +4,12 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """Abstract classes and types."""
 
+import bisect
 import logging
+from collections import OrderedDict
 from collections.abc import Sequence
 from pathlib import Path
-from typing import Final
+from typing import Final, NamedTuple
 
 from cmk.utils.sectionname import SectionName
 
@@ -20,6 +22,20 @@ from ._utils import strip_snmp_value
 __all__ = ["StoredWalkSNMPBackend"]
 
 
+class _StoredWalk(NamedTuple):
+    """The lines of a walk file, sorted by OID"""
+
+    oids: Sequence[tuple[int, ...]]
+    # Position in the file, OID (without leading dot) and value for each of the oids
+    lines: Sequence[tuple[int, str, str]]
+
+
+# Parsed walk files by path and stat() of the file, to answer all walks of a fetch from
+# one parse. Only the most recently used ones are kept to limit the memory usage.
+_MAX_CACHED_WALKS: Final = 8
+_cached_walks: OrderedDict[Path, tuple[tuple[int, int, int], _StoredWalk]] = OrderedDict()
+
+
 class StoredWalkSNMPBackend(SNMPBackend):
     def __init__(self, snmp_config: SNMPHostConfig, logger: logging.Logger, path: Path) -> None:
         super().__init__(snmp_config, logger)
@@ -57,34 +73,54 @@ class StoredWalkSNMPBackend(SNMPBackend):
             dot_star = False
 
         self._logger.debug(f"  Loading {oid}")
-        lines = self.read_walk_data()
-
-        begin = 0
-        end = len(lines)
-        hit = None
-        while end - begin > 0:
-            current = (begin + end) // 2
-            parts = lines[current].split(None, 1)
-            comp = parts[0]
-            hit = StoredWalkSNMPBackend._compare_oids(oid_prefix, comp)
-            if hit == 0:
-                break
-            if hit == 1:  # we are too low
-                begin = current + 1
-            else:
-                end = current
-
-        if hit != 0:
-            return []  # not found
-
-        rowinfo = StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current, -1)
-        rowinfo.reverse()
-        rowinfo += StoredWalkSNMPBackend._collect_until(oid, oid_prefix, lines, current + 1, 1)
+        stored_walk = self._stored_walk()
+
+        prefix = StoredWalkSNMPBackend._to_bin_string(oid_prefix)
+        begin = end = bisect.bisect_left(stored_walk.oids, prefix)
+        while end < len(stored_walk.oids) and stored_walk.oids[end][: len(prefix)] == prefix:
+            end += 1
+        # Answer in the order of the file, which is not always sorted numerically
+        lines = sorted(stored_walk.lines[begin:end])
 
         if dot_star:
-            return [rowinfo[0]]
+            # The first OID below the prefix
+            lines = [line for line in lines if line[1] != oid_prefix][:1]
 
-        return rowinfo
+        return [("." + o, strip_snmp_value(value)) for _position, o, value in lines]
+
+    def _stored_walk(self) -> _StoredWalk:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            raise MKSNMPError(f"No snmpwalk file {self.path}")
+
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if (cached := _cached_walks.get(self.path)) is not None and cached[0] == key:
+            _cached_walks.move_to_end(self.path)
+            return cached[1]
+
+        entries = []
+        for position, line in enumerate(self.read_walk_data()):
+            parts = line.split(None, 1)
+            o = parts[0][1:]
+            entries.append(
+                (
+                    StoredWalkSNMPBackend._to_bin_string(o),
+                    (position, o, parts[1] if len(parts) > 1 else ""),
+                )
+            )
+        # Walk files are usually sorted already, so this is cheap. Entries with the same OID
+        # keep the order of the file.
+        entries.sort(key=lambda entry: entry[0])
+        stored_walk = _StoredWalk(
+            oids=[entry[0] for entry in entries], lines=[entry[1] for entry in entries]
+        )
+
+        _cached_walks[self.path] = (key, stored_walk)
+        _cached_walks.move_to_end(self.path)
+        while len(_cached_walks) > _MAX_CACHED_WALKS:
+            _cached_walks.popitem(last=False)
+        return stored_walk
 
     @staticmethod
     def read_walk_from_path(path: Path, logger: logging.Logger) -> Sequence[str]:
@@ -124,33 +160,3 @@ class StoredWalkSNMPBackend(SNMPBackend):
             raise
         except Exception:
             raise MKGeneralException(f"Invalid OID {oid}")
-
-    @staticmethod
-    def _collect_until(
-        oid: OID, oid_prefix: OID, lines: Sequence[str], index: int, direction: int
-    ) -> SNMPRowInfo:
-        rows = []
-        # Handle case, where we run after the end of the lines list
-        if index >= len(lines):
-            if direction > 0:
-                return []
-            index -= 1
-        while True:
-            line = lines[index]
-            parts = line.split(None, 1)
-            o = parts[0]
-            if o.startswith("."):
-                o = o[1:]
-            if o == oid or o.startswith(oid_prefix + "."):
-                if len(parts) > 1:
-                    value = parts[1]
-                else:
-                    value = ""
-                # Fix for missing starting oids
-                rows.append(("." + o, strip_snmp_value(value)))
-                index += direction
-                if index < 0 or index >= len(lines):
-                    break
-            else:
-                break
-        return rows
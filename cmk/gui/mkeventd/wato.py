@@ -226,6 +226,7 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleEventLimit)
     config_var_registry.register(ConfigVariableEventConsoleHistoryRotation)
     config_var_registry.register(ConfigVariableEventConsoleHistoryLifetime)
+    config_var_registry.register(ConfigVariableEventConsoleHistoryFileIndex)
     config_var_registry.register(ConfigVariableEventConsoleSocketQueueLength)
     config_var_registry.register(ConfigVariableEventConsoleEventSocketQueueLength)
     config_var_registry.register(ConfigVariableEventConsoleTranslateSNMPTraps)
@@ -4070,7 +4071,11 @@ class ConfigVariableEventConsoleSqliteHousekeepingInterval(ConfigVariable):
                 "From time to time the Event Console history requires maintenance. "
                 "For example, it needs to clean up old data, optimize the storage and "
                 "defragment the data. Here you can specify the regular interval "
-                "for that job."
+                "for that job. "
+                "Please note: New history entries are written in the background, in batches "
+                "of up to 1000 entries and at the latest 0.5 seconds after they were created. "
+                "If the Event Console crashes, the entries not written yet are lost. If "
+                "100000 entries are waiting to be written, further entries are dropped."
             ),
         )
 
@@ -4496,6 +4501,32 @@ class ConfigVariableEventConsoleHistoryRotation(ConfigVariable):
         )
 
 
+class ConfigVariableEventConsoleHistoryFileIndex(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainEventConsole
+
+    def ident(self) -> str:
+        return "history_file_index"
+
+    def valuespec(self) -> ValueSpec:
+        return Checkbox(
+            title=_("Index the event history files"),
+            label=_("Maintain an index for each event history file"),
+            help=_(
+                "This only affects the archive mode <i>file</i>. When enabled, the "
+                "Event Console maintains an index file next to each event history file, "
+                "containing the time, event ID and host of each history entry. History "
+                "queries filtering on these are then answered by reading the matching "
+                "entries only instead of searching the complete files. Missing or outdated "
+                "indices are built in the background after the first query, until then "
+                "the files are searched without them."
+            ),
+        )
+
+
 class ConfigVariableEventConsoleHistoryLifetime(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupEventConsoleGeneric
@@ -282,6 +282,7 @@ def register(
     rulespec_registry.register(SnmpBulkSize)
     rulespec_registry.register(SnmpWithoutSysDescr)
     rulespec_registry.register(Snmpv2CHosts)
+    rulespec_registry.register(SnmpTableWalkHosts)
     rulespec_registry.register(SnmpTiming)
     rulespec_registry.register(NonInlineSnmpHosts)
     rulespec_registry.register(SnmpBackendHosts)
@@ -3167,20 +3168,25 @@ class ConfigVariableUseDNSCache(ConfigVariable):
 
 
 def transform_snmp_backend_default_to_valuespec(
-    backend: Literal["classic", "inline"]
+    backend: Literal["classic", "inline", "asyncio"]
 ) -> SNMPBackendEnum:
     return {
         "classic": SNMPBackendEnum.CLASSIC,
         "inline": SNMPBackendEnum.INLINE,
+        "asyncio": SNMPBackendEnum.ASYNCIO,
     }[backend]
 
 
-def transform_snmp_backend_from_valuespec(backend: SNMPBackendEnum) -> Literal["classic", "inline"]:
+def transform_snmp_backend_from_valuespec(
+    backend: SNMPBackendEnum,
+) -> Literal["classic", "inline", "asyncio"]:
     match backend:
         case SNMPBackendEnum.CLASSIC:
             return "classic"
         case SNMPBackendEnum.INLINE:
             return "inline"
+        case SNMPBackendEnum.ASYNCIO:
+            return "asyncio"
         case _:
             raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
@@ -3204,6 +3210,7 @@ class ConfigVariableChooseSNMPBackend(ConfigVariable):
                 choices=[
                     (SNMPBackendEnum.CLASSIC, _("Use Classic SNMP Backend")),
                     (SNMPBackendEnum.INLINE, _("Use Inline SNMP Backend")),
+                    (SNMPBackendEnum.ASYNCIO, _("Use asyncio SNMP Backend (SNMP v1 and v2c)")),
                 ],
                 help=_(
                     "By default Checkmk uses command line calls of Net-SNMP tools like snmpget or "
@@ -5551,6 +5558,24 @@ Snmpv2CHosts = BinaryHostRulespec(
 )
 
 
+def _help_snmp_table_walk_hosts():
+    return _(
+        "By default Checkmk walks every column of an SNMP table on its own. For wide tables "
+        "like the interface tables of large switches this means one walk over all rows per "
+        "column. For the hosts selected by this rule Checkmk walks the whole table once if "
+        "more than one of its columns is needed. Be aware that this also fetches the columns "
+        "no section is interested in, so only use this rule if most columns are needed."
+    )
+
+
+SnmpTableWalkHosts = BinaryHostRulespec(
+    group=RulespecGroupAgentSNMP,
+    help_func=_help_snmp_table_walk_hosts,
+    name="snmp_table_walk_hosts",
+    title=lambda: _("Walk whole SNMP tables at once"),
+)
+
+
 def _valuespec_snmp_timing():
     return Dictionary(
         title=_("Timing settings for SNMP access"),
@@ -5642,6 +5667,8 @@ def transform_snmp_backend_hosts_to_valuespec(backend):
         # We dropped pysnmp during the 2.1 beta because it is currently slow
         # and unreliable.
         return SNMPBackendEnum.CLASSIC
+    if backend == "asyncio":
+        return SNMPBackendEnum.ASYNCIO
     raise MKConfigError("SNMPBackendEnum %r not implemented" % backend)
 
 
@@ -5652,6 +5679,7 @@ def _valuespec_snmp_backend():
             choices=[
                 (SNMPBackendEnum.INLINE, _("Use Inline SNMP backend")),
                 (SNMPBackendEnum.CLASSIC, _("Use Classic backend")),
+                (SNMPBackendEnum.ASYNCIO, _("Use asyncio backend (SNMP v1 and v2c)")),
             ],
         ),
         to_valuespec=transform_snmp_backend_hosts_to_valuespec,
@@ -10,13 +10,14 @@ import time
 from collections.abc import Collection, Iterator, Mapping
 from copy import deepcopy
 from datetime import datetime
+from pathlib import Path
 from typing import Any, cast, Literal, NamedTuple, overload
 
 from livestatus import LivestatusResponse, SiteId
 
 from cmk.utils import paths
 from cmk.utils.labels import Labels
-from cmk.utils.notify import NotificationContext
+from cmk.utils.notify import NotificationBacklog, NotificationContext
 from cmk.utils.notify_types import EventRule, is_always_bulk, NotifyAnalysisInfo
 from cmk.utils.statename import host_state_name, service_state_name
 from cmk.utils.user import UserId
@@ -107,7 +108,6 @@ from cmk.gui.watolib.timeperiods import TimeperiodSelection
 from cmk.gui.watolib.user_scripts import load_notification_scripts
 from cmk.gui.watolib.users import notification_script_choices
 
-from cmk.ccc import store
 from cmk.ccc.version import edition, Edition
 
 from .._group_selection import ContactGroupSelection
@@ -1102,9 +1102,9 @@ class ModeNotifications(ABCNotificationsMode):
         if not self._show_backlog:
             return
 
-        backlog = store.load_object_from_file(
-            cmk.utils.paths.var_dir + "/notify/backlog.mk",
-            default=[],
+        backlog = cast(
+            list[NotificationContext],
+            list(NotificationBacklog(Path(cmk.utils.paths.var_dir, "notify", "backlog"))),
         )
         if not backlog:
             return
@@ -1148,7 +1148,7 @@ class ModeNotifications(ABCNotificationsMode):
                         state = context["SERVICESTATEID"]
                         css = [f"state svcstate state{state}"]
                     else:
-                        statename = context.get("HOSTSTATE")[:4]
+                        statename = context["HOSTSTATE"][:4]
                         state = context["HOSTSTATEID"]
                         css = [f"state hstate hstate{state}"]
                     table.cell(
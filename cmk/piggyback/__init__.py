@@ -3,14 +3,16 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from ._metadata import PiggybackFileInfo, PiggybackRawDataInfo
 from ._storage import (
     cleanup_piggyback_files,
     get_piggyback_raw_data,
     get_piggybacked_host_with_sources,
+    get_source_piggyback_raw_data,
     move_for_host_rename,
-    PiggybackFileInfo,
-    PiggybackRawDataInfo,
     remove_source_status_file,
+    set_storage,
+    StorageKind,
     store_piggyback_raw_data,
 )
 
@@ -18,9 +20,12 @@ __all__ = [
     "cleanup_piggyback_files",
     "get_piggybacked_host_with_sources",
     "get_piggyback_raw_data",
+    "get_source_piggyback_raw_data",
     "PiggybackFileInfo",
     "PiggybackRawDataInfo",
     "remove_source_status_file",
+    "set_storage",
+    "StorageKind",
     "store_piggyback_raw_data",
     "move_for_host_rename",
 ]
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import NamedTuple, Self
+
+from cmk.utils.agentdatatype import AgentRawData
+from cmk.utils.hostaddress import HostName
+
+
+@dataclass(frozen=True, kw_only=True)
+class PiggybackFileInfo:
+    source: HostName
+    file_path: Path
+    last_update: int
+    last_contact: int | None
+
+    def serialize(self) -> str:
+        return json.dumps({k: str(v) for k, v in asdict(self).items()})
+
+    @classmethod
+    def deserialize(cls, serialized: str, /) -> Self:
+        raw = json.loads(serialized)
+        return cls(
+            source=HostName(raw["source"]),
+            file_path=Path(raw["file_path"]),
+            last_update=int(raw["last_update"]),
+            last_contact=None if (i := raw["last_contact"]) is None else int(i),
+        )
+
+
+class PiggybackRawDataInfo(NamedTuple):
+    info: PiggybackFileInfo
+    raw_data: AgentRawData
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Piggyback storage with one segment file per source
+
+The default storage keeps one file per source/piggybacked host pair and encodes the
+times of the last update and the last contact in file modification times. Special
+agents with many thousands of piggybacked hosts create a lot of files that way, and
+listing or cleaning up the piggyback data has to stat every single one of them.
+
+This storage writes all payloads of a source into a single segment file, which starts
+with its own index: the last contact of the source and, for each piggybacked host,
+the last update and the location of its payload within the segment:
+
+    tmp/check_mk/piggyback_segments/sources/SOURCE
+
+    <last contact or ->\t<size of the index>\n
+    <piggybacked host>\t<last update>\t<offset>\t<length>\n
+    ...
+    <payloads>
+
+A small lookup file per piggybacked host names the sources which have data for it:
+
+    tmp/check_mk/piggyback_segments/hosts/HOST
+
+Both are replaced atomically, so readers do not lock. Writers lock the segment of the
+source and the lookup files they change, and the lookup files only change when a
+source starts or stops sending data for a host. Storing the data of one source
+therefore neither rewrites nor waits for the data of the other sources.
+
+The parsed index of a segment is kept in memory until the segment is replaced, so
+looking up one piggybacked host reads its lookup file and one payload per source.
+"""
+
+import contextlib
+import logging
+import os
+import tempfile
+from collections.abc import Container, Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Final, NamedTuple
+
+from cmk.utils.agentdatatype import AgentRawData
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.ccc import store
+
+from ._metadata import PiggybackFileInfo, PiggybackRawDataInfo
+
+logger = logging.getLogger(__name__)
+
+
+class _Payload(NamedTuple):
+    last_update: int
+    offset: int
+    length: int
+
+
+class _Segment(NamedTuple):
+    last_contact: int | None
+    payloads: Mapping[HostAddress, _Payload]
+    # Where the payloads start within the segment file
+    data_offset: int
+
+
+_NO_SEGMENT: Final = _Segment(None, {}, 0)
+
+
+def _parse_segment_header(segment: BinaryIO) -> _Segment:
+    if not (first_line := segment.readline()):
+        return _NO_SEGMENT  # created by locking it, but never written
+    raw_last_contact, raw_index_size = first_line.split(b"\t")
+    index = segment.read(int(raw_index_size))
+    payloads = {}
+    for line in index.splitlines():
+        host, last_update, offset, length = line.split(b"\t")
+        payloads[HostAddress(host.decode())] = _Payload(int(last_update), int(offset), int(length))
+    return _Segment(
+        last_contact=None if raw_last_contact == b"-" else int(raw_last_contact),
+        payloads=payloads,
+        data_offset=len(first_line) + len(index),
+    )
+
+
+def _serialize_segment(
+    last_contact: int | None, payloads: Mapping[HostAddress, tuple[int, bytes]]
+) -> bytes:
+    index = []
+    offset = 0
+    for piggybacked_host, (last_update, content) in sorted(payloads.items()):
+        index.append(
+            b"%s\t%d\t%d\t%d\n" % (piggybacked_host.encode(), last_update, offset, len(content))
+        )
+        offset += len(content)
+    raw_index = b"".join(index)
+    return b"".join(
+        (
+            b"%s\t%d\n" % (b"-" if last_contact is None else b"%d" % last_contact, len(raw_index)),
+            raw_index,
+            *(content for _host, (_last_update, content) in sorted(payloads.items())),
+        )
+    )
+
+
+class SegmentStorage:
+    def __init__(self, directory: Path) -> None:
+        self._segments_dir: Final = directory / "sources"
+        self._hosts_dir: Final = directory / "hosts"
+        # The parsed indexes of the segments, by the identity of the segment file
+        self._segments: dict[HostName, tuple[tuple[int, int, int], _Segment]] = {}
+
+    def _segment_path(self, source: HostName) -> Path:
+        return self._segments_dir / str(source)
+
+    def _lookup_path(self, piggybacked_host: HostAddress) -> Path:
+        return self._hosts_dir / str(piggybacked_host)
+
+    @contextmanager
+    def _locked_segment(self, source: HostName) -> Iterator[None]:
+        """Lock the segment of a source, the lock file is the segment itself"""
+        segment_path = self._segment_path(source)
+        with store.locked(segment_path):
+            try:
+                yield
+            finally:
+                # Locking creates the file, do not leave it behind when nothing was written.
+                with contextlib.suppress(FileNotFoundError):
+                    if segment_path.stat().st_size == 0:
+                        segment_path.unlink()
+
+    @contextmanager
+    def _open_segment(self, source: HostName) -> Iterator[tuple[_Segment, BinaryIO | None]]:
+        try:
+            segment_file = self._segment_path(source).open("rb")
+        except FileNotFoundError:
+            yield _NO_SEGMENT, None
+            return
+        with segment_file:
+            stat = os.fstat(segment_file.fileno())
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if (cached := self._segments.get(source)) is not None and cached[0] == key:
+                yield cached[1], segment_file
+                return
+            segment = _parse_segment_header(segment_file)
+            self._segments[source] = (key, segment)
+            yield segment, segment_file
+
+    def _read_segment(self, source: HostName) -> _Segment:
+        with self._open_segment(source) as (segment, _segment_file):
+            return segment
+
+    @staticmethod
+    def _read_payload(segment: _Segment, segment_file: BinaryIO, payload: _Payload) -> bytes:
+        segment_file.seek(segment.data_offset + payload.offset)
+        return segment_file.read(payload.length)
+
+    def _read_payloads(
+        self, source: HostName, hosts: Container[HostAddress] | None = None
+    ) -> tuple[_Segment, Mapping[HostAddress, tuple[int, bytes]]]:
+        with self._open_segment(source) as (segment, segment_file):
+            if segment_file is None:
+                return segment, {}
+            return segment, {
+                host: (payload.last_update, self._read_payload(segment, segment_file, payload))
+                for host, payload in segment.payloads.items()
+                if hosts is None or host in hosts
+            }
+
+    def _write_segment(
+        self,
+        source: HostName,
+        last_contact: int | None,
+        payloads: Mapping[HostAddress, tuple[int, bytes]],
+    ) -> None:
+        """Replace the segment of a source, the caller holds the lock of the segment"""
+        if last_contact is None and not payloads:
+            self._segment_path(source).unlink(missing_ok=True)
+        else:
+            _write_atomically(
+                self._segment_path(source), _serialize_segment(last_contact, payloads)
+            )
+
+    def _sources_of(self, piggybacked_host: HostAddress) -> Sequence[HostName]:
+        try:
+            content = self._lookup_path(piggybacked_host).read_text()
+        except FileNotFoundError:
+            return []
+        return [HostName(source) for source in content.splitlines()]
+
+    def _update_lookups(
+        self,
+        source: HostName,
+        added: Iterable[HostAddress] = (),
+        removed: Iterable[HostAddress] = (),
+    ) -> None:
+        """Add the source to or remove it from the lookup files of the piggybacked hosts"""
+        self._hosts_dir.mkdir(mode=0o770, exist_ok=True, parents=True)
+        for piggybacked_host, add in [*((h, True) for h in added), *((h, False) for h in removed)]:
+            lookup_path = self._lookup_path(piggybacked_host)
+            if add and _create_atomically(lookup_path, f"{source}\n".encode()):
+                continue  # the first source of the host, nobody else can have changed it
+            with store.locked(lookup_path):
+                sources = set(self._sources_of(piggybacked_host))
+                if sources and add == (source in sources):
+                    continue
+                sources = sources | {source} if add else sources - {source}
+                if sources:
+                    _write_atomically(
+                        lookup_path, "".join(f"{s}\n" for s in sorted(sources)).encode()
+                    )
+                else:  # also the file created by locking it
+                    lookup_path.unlink(missing_ok=True)
+
+    def get_piggyback_raw_data(
+        self, piggybacked_hostname: HostAddress
+    ) -> Sequence[PiggybackRawDataInfo]:
+        piggyback_data = []
+        for source in self._sources_of(piggybacked_hostname):
+            with self._open_segment(source) as (segment, segment_file):
+                if (
+                    segment_file is None
+                    or (payload := segment.payloads.get(piggybacked_hostname)) is None
+                ):
+                    continue  # race condition: removed after reading the lookup file
+                content = self._read_payload(segment, segment_file, payload)
+            logger.debug("Read piggyback data of '%s' from '%s'", piggybacked_hostname, source)
+            piggyback_data.append(
+                PiggybackRawDataInfo(
+                    info=self._file_info(source, segment, payload), raw_data=AgentRawData(content)
+                )
+            )
+        return piggyback_data
+
+    def get_source_piggyback_raw_data(
+        self, source_hostname: HostName, piggybacked_hosts: Container[HostAddress]
+    ) -> Mapping[HostAddress, PiggybackRawDataInfo]:
+        segment, payloads = self._read_payloads(source_hostname, piggybacked_hosts)
+        return {
+            piggybacked_host: PiggybackRawDataInfo(
+                info=self._file_info(source_hostname, segment, segment.payloads[piggybacked_host]),
+                raw_data=AgentRawData(content),
+            )
+            for piggybacked_host, (_last_update, content) in payloads.items()
+        }
+
+    def _sources(self) -> Sequence[HostName]:
+        try:
+            return sorted(
+                HostName(p.name) for p in self._segments_dir.iterdir() if not p.name.startswith(".")
+            )
+        except FileNotFoundError:
+            return []
+
+    def get_piggybacked_host_with_sources(
+        self,
+    ) -> Mapping[HostAddress, Sequence[PiggybackFileInfo]]:
+        by_piggybacked_host: dict[HostAddress, list[PiggybackFileInfo]] = {}
+        for source in self._sources():
+            segment = self._read_segment(source)
+            for piggybacked_host, payload in segment.payloads.items():
+                by_piggybacked_host.setdefault(piggybacked_host, []).append(
+                    self._file_info(source, segment, payload)
+                )
+        return dict(sorted(by_piggybacked_host.items()))
+
+    def _file_info(
+        self, source: HostName, segment: _Segment, payload: _Payload
+    ) -> PiggybackFileInfo:
+        return PiggybackFileInfo(
+            source=source,
+            file_path=self._segment_path(source),
+            last_update=payload.last_update,
+            last_contact=segment.last_contact,
+        )
+
+    def remove_source_status_file(self, source_hostname: HostName) -> bool:
+        with self._locked_segment(source_hostname):
+            segment, payloads = self._read_payloads(source_hostname)
+            if segment.last_contact is None:
+                return False
+            self._write_segment(source_hostname, None, payloads)
+            return True
+
+    def store_piggyback_raw_data(
+        self,
+        source_hostname: HostName,
+        piggybacked_raw_data: Mapping[HostName, Sequence[bytes]],
+        timestamp: float,
+    ) -> None:
+        if not piggybacked_raw_data:
+            logger.debug("Received no piggyback data")
+            self.remove_source_status_file(source_hostname)
+            return
+
+        new_payloads = {
+            HostAddress(piggybacked_hostname): (int(timestamp), b"%s\n" % b"\n".join(lines))
+            for piggybacked_hostname, lines in piggybacked_raw_data.items()
+        }
+        logger.debug("Received piggyback data for %d hosts", len(piggybacked_raw_data))
+        with self._locked_segment(source_hostname):
+            segment, old_payloads = self._read_payloads(
+                source_hostname,
+                {h for h in self._read_segment(source_hostname).payloads if h not in new_payloads},
+            )
+            self._write_segment(source_hostname, int(timestamp), {**old_payloads, **new_payloads})
+            self._update_lookups(
+                source_hostname, added=[h for h in new_payloads if h not in segment.payloads]
+            )
+
+    def cleanup(self, cut_off_timestamp: float) -> None:
+        for source in self._sources():
+            with self._locked_segment(source):
+                segment, payloads = self._read_payloads(source)
+                last_contact = segment.last_contact
+                if last_contact is not None and last_contact < cut_off_timestamp:
+                    logger.debug("Piggyback source '%s' too old. Remove its status.", source)
+                    last_contact = None
+                outdated = {
+                    h
+                    for h, (last_update, _c) in payloads.items()
+                    if last_update < cut_off_timestamp
+                }
+                if outdated:
+                    logger.debug(
+                        "Piggyback data of %d hosts from '%s' too old. Remove it.",
+                        len(outdated),
+                        source,
+                    )
+                if outdated or last_contact != segment.last_contact:
+                    self._write_segment(
+                        source,
+                        last_contact,
+                        {h: p for h, p in payloads.items() if h not in outdated},
+                    )
+                self._update_lookups(source, removed=outdated)
+
+    def move_for_host_rename(self, old_host: HostName, new_host: HostName) -> tuple[str, ...]:
+        actions = []
+        if sources := self._sources_of(old_host):
+            for source in sources:
+                with self._locked_segment(source):
+                    segment, payloads = self._read_payloads(source)
+                    if old_host not in payloads:
+                        continue
+                    renamed = dict(payloads)
+                    renamed[new_host] = renamed.pop(old_host)
+                    self._write_segment(source, segment.last_contact, renamed)
+                    self._update_lookups(source, added=[new_host], removed=[old_host])
+            actions.append("piggyback-load")
+
+        with self._locked_segment(old_host), self._locked_segment(new_host):
+            segment = self._read_segment(old_host)
+            if segment.last_contact is not None or segment.payloads:
+                replaced = self._read_segment(new_host)
+                self._segment_path(old_host).rename(self._segment_path(new_host))
+                self._update_lookups(
+                    new_host,
+                    added=[h for h in segment.payloads if h not in replaced.payloads],
+                    removed=[h for h in replaced.payloads if h not in segment.payloads],
+                )
+                self._update_lookups(old_host, removed=segment.payloads)
+                actions.append("piggyback-pig")
+        return tuple(actions)
+
+
+def _write_atomically(file_path: Path, content: bytes) -> None:
+    file_path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=str(file_path.parent), prefix=f".{file_path.name}.new", delete=False
+    ) as tmp:
+        tmp.write(content)
+    os.rename(tmp.name, str(file_path))
+
+
+def _create_atomically(file_path: Path, content: bytes) -> bool:
+    """Create the file with its content, False if it exists already"""
+    tmp_path = file_path.parent / f".{file_path.name}.{os.getpid()}.new"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o660)
+    try:
+        os.write(fd, content)
+    finally:
+        os.close(fd)
+    try:
+        os.link(tmp_path, file_path)
+    except FileExistsError:
+        return False
+    finally:
+        tmp_path.unlink()
+    return True
@@ -5,47 +5,46 @@
 
 import datetime
 import errno
-import json
 import logging
 import os
 import shutil
+import socket
 import tempfile
-from collections.abc import Iterable, Mapping, Sequence
-from dataclasses import asdict, dataclass
+from collections.abc import Container, Iterable, Mapping, Sequence
 from pathlib import Path
-from typing import NamedTuple, Self
+from typing import Literal
 
 from cmk.utils.agentdatatype import AgentRawData
 from cmk.utils.hostaddress import HostAddress, HostName
-from cmk.utils.paths import piggyback_dir, piggyback_source_dir
+from cmk.utils.paths import (
+    piggyback_dir,
+    piggyback_hub_socket,
+    piggyback_segments_dir,
+    piggyback_source_dir,
+)
+
+from ._metadata import PiggybackFileInfo, PiggybackRawDataInfo
+from ._segments import SegmentStorage
 
 logger = logging.getLogger(__name__)
 
+StorageKind = Literal["files", "segments"]
 
-@dataclass(frozen=True, kw_only=True)
-class PiggybackFileInfo:
-    source: HostName
-    file_path: Path
-    last_update: int
-    last_contact: int | None
-
-    def serialize(self) -> str:
-        return json.dumps({k: str(v) for k, v in asdict(self).items()})
-
-    @classmethod
-    def deserialize(cls, serialized: str, /) -> Self:
-        raw = json.loads(serialized)
-        return cls(
-            source=HostName(raw["source"]),
-            file_path=Path(raw["file_path"]),
-            last_update=int(raw["last_update"]),
-            last_contact=None if (i := raw["last_contact"]) is None else int(i),
-        )
+# Sites with many piggybacked hosts can keep the piggyback data in one segment file per
+# source (see _segments.py), see set_storage().
+_segment_storage: SegmentStorage | None = None
 
 
-class PiggybackRawDataInfo(NamedTuple):
-    info: PiggybackFileInfo
-    raw_data: AgentRawData
+def set_storage(kind: StorageKind) -> None:
+    """Choose where the piggyback data is kept (setting "piggyback_storage")
+
+    The storage has to be the same for all processes of a site.
+    """
+    global _segment_storage
+    if kind == "files":
+        _segment_storage = None
+    elif _segment_storage is None:
+        _segment_storage = SegmentStorage(piggyback_segments_dir)
 
 
 # ***** Terminology *****
@@ -73,6 +72,9 @@ def get_piggyback_raw_data(piggybacked_hostname: HostAddress) -> Sequence[Piggyb
     the source host name and the second element is the raw
     piggyback data (byte string)
     """
+    if _segment_storage is not None:
+        return _segment_storage.get_piggyback_raw_data(piggybacked_hostname)
+
     piggyback_file_infos = _get_payload_meta_data(piggybacked_hostname)
     logger.debug("%s piggyback files for '%s'.", len(piggyback_file_infos), piggybacked_hostname)
 
@@ -93,8 +95,50 @@ def get_piggyback_raw_data(piggybacked_hostname: HostAddress) -> Sequence[Piggyb
     return piggyback_data
 
 
+def get_source_piggyback_raw_data(
+    source_hostname: HostName, piggybacked_hosts: Container[HostAddress]
+) -> Mapping[HostAddress, PiggybackRawDataInfo]:
+    """Returns the piggyback data of the source for the given piggybacked hosts
+
+    This covers at least the piggybacked hosts of the last data stored for the source.
+    """
+    if _segment_storage is not None:
+        return _segment_storage.get_source_piggyback_raw_data(source_hostname, piggybacked_hosts)
+
+    try:
+        stored_hosts = _get_source_status_file_path(source_hostname).read_text().splitlines()
+    except FileNotFoundError:
+        return {}
+    last_contact = _get_mtime(_get_source_status_file_path(source_hostname))
+
+    piggyback_data = {}
+    for piggybacked_host in (HostAddress(h) for h in stored_hosts):
+        if piggybacked_host not in piggybacked_hosts:
+            continue
+        file_path = _get_piggybacked_file_path(source_hostname, piggybacked_host)
+        try:
+            content = file_path.read_bytes()
+        except FileNotFoundError:
+            continue
+        if (mtime := _get_mtime(file_path)) is None:
+            continue
+        piggyback_data[piggybacked_host] = PiggybackRawDataInfo(
+            info=PiggybackFileInfo(
+                source=source_hostname,
+                file_path=file_path,
+                last_update=mtime,
+                last_contact=last_contact,
+            ),
+            raw_data=AgentRawData(content),
+        )
+    return piggyback_data
+
+
 def get_piggybacked_host_with_sources() -> Mapping[HostAddress, Sequence[PiggybackFileInfo]]:
     """Generates all piggyback pig/piggybacked host pairs"""
+    if _segment_storage is not None:
+        return _segment_storage.get_piggybacked_host_with_sources()
+
     return {
         piggybacked_host: _get_payload_meta_data(piggybacked_host)
         for piggybacked_host_folder in _get_piggybacked_host_folders()
@@ -113,6 +157,9 @@ def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
 def remove_source_status_file(source_hostname: HostName) -> bool:
     """Remove the source_status_file of this piggyback host which will
     mark the piggyback data from this source as outdated."""
+    if _segment_storage is not None:
+        return _segment_storage.remove_source_status_file(source_hostname)
+
     source_status_path = _get_source_status_file_path(source_hostname)
     return _remove_piggyback_file(source_status_path)
 
@@ -121,6 +168,33 @@ def store_piggyback_raw_data(
     source_hostname: HostName,
     piggybacked_raw_data: Mapping[HostName, Sequence[bytes]],
     timestamp: float,
+) -> None:
+    if _segment_storage is not None:
+        _segment_storage.store_piggyback_raw_data(source_hostname, piggybacked_raw_data, timestamp)
+    else:
+        _store_piggyback_files(source_hostname, piggybacked_raw_data, timestamp)
+
+    if piggybacked_raw_data:
+        _notify_piggyback_hub(source_hostname)
+
+
+def _notify_piggyback_hub(source_hostname: HostName) -> None:
+    """Tell the piggyback hub about new data of this source, if the hub is running
+
+    The notification must never block or fail the caller. If it gets lost, the hub
+    picks up the data with its next periodic synchronization."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(str(source_hostname).encode(), str(piggyback_hub_socket))
+    except OSError:
+        pass
+
+
+def _store_piggyback_files(
+    source_hostname: HostName,
+    piggybacked_raw_data: Mapping[HostName, Sequence[bytes]],
+    timestamp: float,
 ) -> None:
     if not piggybacked_raw_data:
         # Cleanup the status file when no piggyback data was sent this turn.
@@ -143,9 +217,14 @@ def store_piggyback_raw_data(
     # Store the last contact with this piggyback source to be able to filter outdated data later
     # We use the mtime of this file later for comparison.
     # Only do this for hosts that sent piggyback data this turn.
+    # The file lists the piggybacked hosts of this turn, see get_source_piggyback_raw_data().
     logger.debug("Received piggyback data for %d hosts", len(piggybacked_raw_data))
     status_file_path = _get_source_status_file_path(source_hostname)
-    _write_file_with_mtime(file_path=status_file_path, content=b"", mtime=timestamp)
+    _write_file_with_mtime(
+        file_path=status_file_path,
+        content=b"".join(b"%s\n" % h.encode() for h in piggybacked_raw_data),
+        mtime=timestamp,
+    )
 
 
 def _write_file_with_mtime(
@@ -258,6 +337,9 @@ def cleanup_piggyback_files(cut_off_timestamp: float) -> None:
         _render_datetime(cut_off_timestamp),
         cut_off_timestamp,
     )
+    if _segment_storage is not None:
+        _segment_storage.cleanup(cut_off_timestamp)
+        return
 
     piggybacked_hosts_settings = [
         (piggybacked_host_folder, _files_in(piggybacked_host_folder))
@@ -337,6 +419,8 @@ def move_for_host_rename(old_host: str, new_host: str) -> tuple[str, ...]:
 
     Return a tuple of strings representing the actions taken.
     """
+    if _segment_storage is not None:
+        return _segment_storage.move_for_host_rename(HostName(old_host), HostName(new_host))
 
     def _rename_piggybacked_dir(old_name: str, new_name: str) -> Iterable[str]:
         if not (old_path := piggyback_dir / old_name).exists():
@@ -358,7 +442,7 @@ def move_for_host_rename(old_host: str, new_host: str) -> tuple[str, ...]:
         old_path.rename(new_path)
         yield "piggyback-pig"
 
-    return tuple(
+    return (
         *_rename_piggybacked_dir(old_host, new_host),
         *_rename_payload_file(piggyback_dir, old_host, new_host),
     )
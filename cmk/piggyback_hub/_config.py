@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cmk.utils.hostaddress import HostAddress
+
+from cmk.piggyback import StorageKind
+
+SiteId = str
+
+# Batches are sent as one frame, see _transport.py
+MAX_FRAME_SIZE = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class PeerAddress:
+    host: str
+    port: int
+
+
+@dataclass(frozen=True)
+class HubConfig:
+    """What the piggyback hub of this site distributes, and to whom
+
+    The hub receives on listen_address:listen_port, if a port is configured.
+    targets maps the piggybacked hosts which are monitored on other sites to their site.
+    piggyback_storage is the "piggyback_storage" setting of the site.
+    """
+
+    listen_address: str | None = None
+    listen_port: int | None = None
+    max_frame_size: int = MAX_FRAME_SIZE
+    peers: Mapping[SiteId, PeerAddress] = field(default_factory=dict)
+    targets: Mapping[HostAddress, SiteId] = field(default_factory=dict)
+    piggyback_storage: StorageKind = "files"
+
+
+def load_config(path: Path) -> HubConfig:
+    """Load the hub configuration, a missing file means there is nothing to distribute
+
+    Example:
+    {
+        "listen_address": "10.0.0.1",
+        "listen_port": 6560,
+        "max_frame_size": 8388608,
+        "peers": {"remote1": {"host": "remote1.example.com", "port": 6560}},
+        "targets": {"vm-1": "remote1"},
+        "piggyback_storage": "segments"
+    }
+    """
+    try:
+        raw = json.loads(path.read_text())
+    except FileNotFoundError:
+        return HubConfig()
+
+    peers = {site_id: PeerAddress(**address) for site_id, address in raw["peers"].items()}
+    if unknown := {site_id for site_id in raw["targets"].values() if site_id not in peers}:
+        raise ValueError(f"Targets on unknown sites: {', '.join(sorted(unknown))}")
+
+    piggyback_storage = raw.get("piggyback_storage", "files")
+    if piggyback_storage not in ("files", "segments"):
+        raise ValueError(f"Unknown piggyback storage: {piggyback_storage}")
+
+    if (listen_port := raw.get("listen_port")) is not None and not raw.get("listen_address"):
+        raise ValueError("The address to receive piggyback data on is missing")
+
+    return HubConfig(
+        listen_address=raw.get("listen_address"),
+        listen_port=listen_port,
+        max_frame_size=raw.get("max_frame_size", MAX_FRAME_SIZE),
+        peers=peers,
+        targets={HostAddress(host): site_id for host, site_id in raw["targets"].items()},
+        piggyback_storage=piggyback_storage,
+    )
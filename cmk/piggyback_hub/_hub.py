@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Distribution of piggyback data to the sites monitoring the piggybacked hosts
+
+store_piggyback_raw_data() notifies the hub with a datagram holding the name of the
+source. The hub collects the notifications for a short time, looks up the payloads of
+these sources for the piggybacked hosts monitored on other sites and pushes the new
+ones in batches to the hubs of these sites. A full synchronization in regular
+intervals makes up for lost notifications and failed deliveries.
+"""
+
+import json
+import logging
+import select
+import socket
+import threading
+import time
+import zlib
+from collections.abc import Callable, Collection, Container, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Final, Protocol
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.ccc import store
+from cmk.piggyback import (
+    get_piggyback_raw_data,
+    get_source_piggyback_raw_data,
+    PiggybackRawDataInfo,
+    store_piggyback_raw_data,
+)
+
+from ._config import HubConfig, SiteId
+from ._metrics import HubMetrics
+from ._transport import frame_size, Payload
+
+# Notifications arriving within this time are handled together
+BATCH_WINDOW: Final = 0.2
+MAX_BATCH_PAYLOADS: Final = 1000
+MAX_BATCH_BYTES: Final = 4 * 1024 * 1024
+SYNCHRONIZATION_INTERVAL: Final = 60.0
+METRICS_INTERVAL: Final = 60.0
+
+
+class Peer(Protocol):
+    def send(self, payloads: Sequence[Payload]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+def open_notification_socket(path: Path) -> socket.socket:
+    path.unlink(missing_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(path))
+    return sock
+
+
+def store_received_payloads(payloads: Sequence[Payload]) -> None:
+    """Store the payloads another hub has sent, as if the sources were monitored here"""
+    by_source: dict[tuple[HostName, int], dict[HostName, Sequence[bytes]]] = {}
+    for payload in payloads:
+        # The stored payload already ends with the newline store_piggyback_raw_data() adds.
+        by_source.setdefault((payload.source, payload.last_update), {})[
+            payload.piggybacked_host
+        ] = (payload.raw_data.removesuffix(b"\n"),)
+    for (source, last_update), piggybacked_raw_data in by_source.items():
+        store_piggyback_raw_data(source, piggybacked_raw_data, last_update)
+
+
+def _batches(payloads: Sequence[Payload], max_frame_size: int) -> Iterator[Sequence[Payload]]:
+    max_size = min(MAX_BATCH_BYTES, max_frame_size)
+    batch: list[Payload] = []
+    size = 0
+    for payload in payloads:
+        # The frame of a batch is not larger than the frames of its payloads together.
+        payload_size = frame_size([payload])
+        if batch and (len(batch) >= MAX_BATCH_PAYLOADS or size + payload_size > max_size):
+            yield batch
+            batch, size = [], 0
+        batch.append(payload)
+        size += payload_size
+    if batch:
+        yield batch
+
+
+class PiggybackHub:
+    def __init__(
+        self,
+        logger: logging.Logger,
+        config: HubConfig,
+        peers: Mapping[SiteId, Peer],
+        metrics: HubMetrics,
+        get_raw_data: Callable[
+            [HostAddress], Sequence[PiggybackRawDataInfo]
+        ] = get_piggyback_raw_data,
+        get_source_raw_data: Callable[
+            [HostName, Container[HostAddress]], Mapping[HostAddress, PiggybackRawDataInfo]
+        ] = get_source_piggyback_raw_data,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._logger = logger
+        self._config = config
+        self._peers = peers
+        self._metrics = metrics
+        self._get_raw_data = get_raw_data
+        self._get_source_raw_data = get_source_raw_data
+        self._clock = clock
+        # What has been delivered: last update and checksum of each host/source pair
+        self._delivered: dict[tuple[HostAddress, HostName], tuple[int, int]] = {}
+
+    def _raw_data(
+        self, sources: Collection[HostName] | None
+    ) -> Iterator[tuple[HostAddress, PiggybackRawDataInfo]]:
+        """The data of the sources (all if None) for the target hosts"""
+        if sources is None:
+            for piggybacked_host in self._config.targets:
+                for data in self._get_raw_data(piggybacked_host):
+                    yield piggybacked_host, data
+            return
+        for source in sources:
+            yield from self._get_source_raw_data(source, self._config.targets).items()
+
+    def _new_payloads(
+        self, sources: Collection[HostName] | None
+    ) -> Mapping[SiteId, Sequence[tuple[Payload, int]]]:
+        new: dict[SiteId, list[tuple[Payload, int]]] = {}
+        for piggybacked_host, data in self._raw_data(sources):
+            site_id = self._config.targets[piggybacked_host]
+            checksum = zlib.crc32(data.raw_data)
+            key = (piggybacked_host, data.info.source)
+            if self._delivered.get(key) == (data.info.last_update, checksum):
+                continue
+            payload = Payload(
+                data.info.source, piggybacked_host, data.info.last_update, data.raw_data
+            )
+            if frame_size([payload]) > self._config.max_frame_size:
+                self._logger.warning(
+                    "Piggyback data of %s from %s is too large to distribute (%d bytes)",
+                    piggybacked_host,
+                    data.info.source,
+                    len(data.raw_data),
+                )
+                self._delivered[key] = (data.info.last_update, checksum)  # until it changes
+                continue
+            new.setdefault(site_id, []).append((payload, checksum))
+        return new
+
+    def distribute(self, sources: Collection[HostName] | None, noticed: float) -> int:
+        """Push the new payloads of the sources (all if None) and return how many were sent
+
+        Payloads which could not be delivered are sent again with the next distribution.
+        """
+        delivered = 0
+        for site_id, payloads in self._new_payloads(sources).items():
+            checksums = {(p.piggybacked_host, p.source): c for p, c in payloads}
+            for batch in _batches([p for p, _c in payloads], self._config.max_frame_size):
+                try:
+                    self._peers[site_id].send(batch)
+                except ConnectionError as e:
+                    self._metrics.record_error(site_id)
+                    self._logger.warning("Cannot distribute piggyback data to %s: %s", site_id, e)
+                    break
+                for payload in batch:
+                    key = (payload.piggybacked_host, payload.source)
+                    self._delivered[key] = (payload.last_update, checksums[key])
+                self._metrics.record_delivery(
+                    site_id, (len(p.raw_data) for p in batch), (noticed for _p in batch)
+                )
+                delivered += len(batch)
+                self._logger.debug("Sent %d payloads to %s", len(batch), site_id)
+        return delivered
+
+    def _wait_for_notifications(
+        self, notifications: socket.socket, timeout: float
+    ) -> tuple[set[HostName], float]:
+        """Return the sources with new data, collected for BATCH_WINDOW after the first"""
+        sources: set[HostName] = set()
+        noticed = deadline = 0.0
+        while True:
+            remaining = (deadline - self._clock()) if sources else timeout
+            if not select.select([notifications], [], [], max(remaining, 0))[0]:
+                return sources, noticed
+            data = notifications.recv(4096)
+            try:
+                source = HostName(data.decode())
+            except (UnicodeDecodeError, ValueError):
+                self._logger.warning("Invalid notification: %r", data)
+                continue
+            if not sources:
+                noticed = self._clock()
+                deadline = noticed + BATCH_WINDOW
+            sources.add(source)
+
+    def run(
+        self,
+        notifications: socket.socket,
+        stop: threading.Event,
+        metrics_file: Path | None = None,
+    ) -> None:
+        next_synchronization = next_metrics = self._clock()
+        while not stop.is_set():
+            timeout = min(next_synchronization, next_metrics, self._clock() + 1) - self._clock()
+            sources, noticed = self._wait_for_notifications(notifications, timeout)
+            if sources:
+                self.distribute(sources, noticed)
+
+            if (now := self._clock()) >= next_synchronization:
+                if delivered := self.distribute(None, now):
+                    self._logger.info("Synchronization sent %d payloads", delivered)
+                next_synchronization = now + SYNCHRONIZATION_INTERVAL
+
+            if (now := self._clock()) >= next_metrics:
+                self._report_metrics(metrics_file)
+                next_metrics = now + METRICS_INTERVAL
+
+        for peer in self._peers.values():
+            peer.close()
+
+    def _report_metrics(self, metrics_file: Path | None) -> None:
+        snapshot = self._metrics.snapshot()
+        for site_id, metrics in snapshot.items():
+            self._logger.info(
+                "%s: %d payloads (%.1f/s), %d errors, latency median %.3fs, max %.3fs",
+                site_id,
+                metrics["payloads"],
+                metrics["payloads_per_second"],
+                metrics["errors"],
+                metrics.get("latency_median", 0.0),
+                metrics.get("latency_max", 0.0),
+            )
+        if metrics_file is not None:
+            store.save_text_to_file(metrics_file, json.dumps(snapshot))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Final
+
+from ._config import SiteId
+
+# Number of recent deliveries the latencies are computed from
+LATENCY_SAMPLES: Final = 1000
+
+
+@dataclass
+class _SiteMetrics:
+    batches: int = 0
+    payloads: int = 0
+    bytes: int = 0
+    errors: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+
+class HubMetrics:
+    """Throughput and latency of the distribution to the other sites
+
+    The latency of a payload is the time from the hub noticing it until the peer has
+    acknowledged that it is stored.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._started = clock()
+        self._sites: dict[SiteId, _SiteMetrics] = {}
+
+    def _site(self, site_id: SiteId) -> _SiteMetrics:
+        return self._sites.setdefault(site_id, _SiteMetrics())
+
+    def record_delivery(
+        self, site_id: SiteId, payload_sizes: Iterable[int], noticed: Iterable[float]
+    ) -> None:
+        site = self._site(site_id)
+        now = self._clock()
+        sizes = list(payload_sizes)
+        site.batches += 1
+        site.payloads += len(sizes)
+        site.bytes += sum(sizes)
+        site.latencies.extend(now - n for n in noticed)
+
+    def record_error(self, site_id: SiteId) -> None:
+        self._site(site_id).errors += 1
+
+    def snapshot(self) -> Mapping[SiteId, Mapping[str, float]]:
+        uptime = max(self._clock() - self._started, 1e-6)
+        return {
+            site_id: {
+                "batches": site.batches,
+                "payloads": site.payloads,
+                "bytes": site.bytes,
+                "errors": site.errors,
+                "payloads_per_second": site.payloads / uptime,
+                "bytes_per_second": site.bytes / uptime,
+                **_latency_summary(site.latencies),
+            }
+            for site_id, site in sorted(self._sites.items())
+        }
+
+
+def _latency_summary(latencies: Iterable[float]) -> Mapping[str, float]:
+    if not (ordered := sorted(latencies)):
+        return {}
+    return {
+        "latency_median": ordered[len(ordered) // 2],
+        "latency_p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "latency_max": ordered[-1],
+    }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Exchange of piggyback payloads between the hubs of the sites
+
+A batch of payloads is sent as one frame: the length of the frame, the length of a
+JSON header describing the payloads, the header and then the raw payloads one after
+the other. The receiving hub stores the payloads and acknowledges the batch with a
+frame holding the number of stored payloads.
+
+The hubs talk TLS and authenticate each other with their site certificates: the
+common name of a certificate is the ID of the site. A receiver only accepts the sites
+it has been configured with, and closes connections sending frames larger than its
+maximum frame size before receiving them.
+"""
+
+import json
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+from collections.abc import Callable, Container, Sequence
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from ._config import PeerAddress, SiteId
+
+_LENGTH: Final = struct.Struct("!I")
+
+# Seconds a connecting hub has for the TLS handshake
+HANDSHAKE_TIMEOUT: Final = 10.0
+
+
+class FrameTooLarge(ConnectionError):
+    pass
+
+
+def server_context(certificate: Path, trusted_cas: Path) -> ssl.SSLContext:
+    """TLS of the receiving hub, requiring a certificate of the sending site"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certificate)
+    context.load_verify_locations(trusted_cas)
+    context.verify_mode = ssl.CERT_REQUIRED
+    return context
+
+
+def client_context(certificate: Path, trusted_cas: Path) -> ssl.SSLContext:
+    """TLS of the sending hub, the site of the receiving hub is checked by PeerConnection"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certificate)
+    context.load_verify_locations(trusted_cas)
+    # Site certificates name the site, not the host name the hub is reached by.
+    context.check_hostname = False
+    return context
+
+
+def peer_site_id(sock: ssl.SSLSocket) -> SiteId | None:
+    """The site of the verified certificate of the other side"""
+    if (certificate := sock.getpeercert()) is None:
+        return None
+    for rdn in certificate.get("subject", ()):
+        for attribute in rdn:
+            if isinstance(attribute, tuple) and attribute[0] == "commonName":
+                return SiteId(attribute[1])
+    return None
+
+
+class Payload(NamedTuple):
+    source: HostName
+    piggybacked_host: HostAddress
+    last_update: int
+    raw_data: bytes
+
+
+def _encode_header(payloads: Sequence[Payload]) -> bytes:
+    return json.dumps(
+        [[p.source, p.piggybacked_host, p.last_update, len(p.raw_data)] for p in payloads]
+    ).encode()
+
+
+def encode_batch(payloads: Sequence[Payload]) -> bytes:
+    header = _encode_header(payloads)
+    return b"".join((_LENGTH.pack(len(header)), header, *(p.raw_data for p in payloads)))
+
+
+def frame_size(payloads: Sequence[Payload]) -> int:
+    """The size of the frame of the batch, as checked by the receiver"""
+    return _LENGTH.size + len(_encode_header(payloads)) + sum(len(p.raw_data) for p in payloads)
+
+
+def decode_batch(data: bytes) -> Sequence[Payload]:
+    (header_length,) = _LENGTH.unpack_from(data)
+    offset = _LENGTH.size + header_length
+    payloads = []
+    for source, piggybacked_host, last_update, length in json.loads(data[_LENGTH.size : offset]):
+        payloads.append(
+            Payload(
+                HostName(source),
+                HostAddress(piggybacked_host),
+                int(last_update),
+                data[offset : offset + length],
+            )
+        )
+        offset += length
+    if offset != len(data):
+        raise ValueError("Invalid batch: size does not match header")
+    return payloads
+
+
+def send_frame(sock: socket.socket, data: bytes) -> None:
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def receive_frame(sock: socket.socket, max_size: int) -> bytes | None:
+    """Receive the next frame, None if the other side has closed the connection"""
+    if (length := _receive_exactly(sock, _LENGTH.size)) is None:
+        return None
+    (size,) = _LENGTH.unpack(length)
+    if size > max_size:
+        raise FrameTooLarge(f"Frame of {size} bytes exceeds the maximum of {max_size} bytes")
+    if (data := _receive_exactly(sock, size)) is None:
+        raise ConnectionError("Connection closed within a frame")
+    return data
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes | None:
+    buffer = bytearray()
+    while len(buffer) < size:
+        if not (chunk := sock.recv(min(size - len(buffer), 1 << 20))):
+            if buffer:
+                raise ConnectionError("Connection closed within a frame")
+            return None
+        buffer += chunk
+    return bytes(buffer)
+
+
+class PeerConnection:
+    """The connection to the hub of another site, opened on demand"""
+
+    def __init__(
+        self, site_id: SiteId, address: PeerAddress, context: ssl.SSLContext, timeout: float
+    ) -> None:
+        self.site_id: Final = site_id
+        self.address: Final = address
+        self._context = context
+        self._timeout = timeout
+        self._socket: ssl.SSLSocket | None = None
+
+    def _connect(self) -> ssl.SSLSocket:
+        sock = self._context.wrap_socket(
+            socket.create_connection((self.address.host, self.address.port), timeout=self._timeout)
+        )
+        if (site_id := peer_site_id(sock)) != self.site_id:
+            sock.close()
+            raise ConnectionError(f"Certificate of site {site_id}, expected {self.site_id}")
+        return sock
+
+    def send(self, payloads: Sequence[Payload]) -> None:
+        """Send a batch and wait until it has been stored. Raises OSError on failure."""
+        try:
+            if self._socket is None:
+                self._socket = self._connect()
+            send_frame(self._socket, encode_batch(payloads))
+            # The answer is the number of stored payloads.
+            if (answer := receive_frame(self._socket, 32)) is None:
+                raise ConnectionError("Connection closed by peer")
+            if int(answer) != len(payloads):
+                raise ConnectionError(f"Peer stored {int(answer)} of {len(payloads)} payloads")
+        except (OSError, ValueError) as e:
+            self.close()
+            raise ConnectionError(f"Sending to {self.address.host}:{self.address.port}: {e}") from e
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class PayloadReceiver(socketserver.ThreadingTCPServer):
+    """Receives the batches of the other hubs and stores them one after the other"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        address: tuple[str, int],
+        context: ssl.SSLContext,
+        peers: Container[SiteId],
+        max_frame_size: int,
+        store: Callable[[Sequence[Payload]], None],
+    ) -> None:
+        super().__init__(address, _PayloadRequestHandler)
+        self.context: Final = context
+        self.peers: Final = peers
+        self.max_frame_size: Final = max_frame_size
+        self.store_lock: Final = threading.Lock()
+        self.store: Final = store
+
+    def get_request(self) -> tuple[ssl.SSLSocket, tuple[str, int]]:
+        sock, address = self.socket.accept()
+        # The handshake is done by the handler thread, a slow peer must not block accepting.
+        return (
+            self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False),
+            address,
+        )
+
+
+class _PayloadRequestHandler(socketserver.BaseRequestHandler):
+    server: PayloadReceiver
+    request: ssl.SSLSocket
+
+    def handle(self) -> None:
+        try:
+            self.request.settimeout(HANDSHAKE_TIMEOUT)
+            self.request.do_handshake()
+            self.request.settimeout(None)
+        except OSError:
+            return  # no valid certificate, or no TLS at all
+        if peer_site_id(self.request) not in self.server.peers:
+            return
+        try:
+            self._receive_batches()
+        except (ConnectionError, ValueError, TypeError, struct.error):
+            return  # the connection is closed
+
+    def _receive_batches(self) -> None:
+        while (data := receive_frame(self.request, self.server.max_frame_size)) is not None:
+            payloads = decode_batch(data)
+            # The piggyback storage uses process wide locks, they do not protect threads
+            # against each other.
+            with self.server.store_lock:
+                self.server.store(payloads)
+            send_frame(self.request, b"%d" % len(payloads))
@@ -8,15 +8,26 @@ import logging
 import os
 import signal
 import sys
-import time
+import threading
 from dataclasses import dataclass
 from logging import getLogger
 from logging.handlers import WatchedFileHandler
 from pathlib import Path
 from types import FrameType
 
+from cmk.utils import paths
 from cmk.utils.daemon import daemonize, pid_file_lock
 
+from cmk import piggyback
+
+from ._config import load_config
+from ._hub import open_notification_socket, PiggybackHub, store_received_payloads
+from ._metrics import HubMetrics
+from ._transport import client_context, PayloadReceiver, PeerConnection, server_context
+
+# Seconds to wait for another hub to connect and to store a batch
+PEER_TIMEOUT = 30.0
+
 VERBOSITY_MAP = {
     0: logging.INFO,
     1: 15,
@@ -89,10 +100,47 @@ def _register_signal_handler() -> None:
     signal.signal(signal.SIGTERM, signal_handler)
 
 
-# a dummy daemon for now
-def run_piggyback_hub():
-    while True:
-        time.sleep(5)
+def run_piggyback_hub(logger: logging.Logger) -> None:
+    config = load_config(paths.piggyback_hub_config_file)
+    piggyback.set_storage(config.piggyback_storage)
+    logger.info(
+        "Distributing piggyback data of %d hosts to %d sites",
+        len(config.targets),
+        len(config.peers),
+    )
+    # The hubs authenticate each other with the certificates of their sites.
+    context = client_context(paths.site_cert_file, paths.trusted_ca_file)
+    hub = PiggybackHub(
+        logger,
+        config,
+        {
+            site_id: PeerConnection(site_id, address, context, timeout=PEER_TIMEOUT)
+            for site_id, address in config.peers.items()
+        },
+        HubMetrics(),
+    )
+
+    receiver = None
+    if config.listen_address is not None and config.listen_port is not None:
+        receiver = PayloadReceiver(
+            (config.listen_address, config.listen_port),
+            server_context(paths.site_cert_file, paths.trusted_ca_file),
+            config.peers,
+            config.max_frame_size,
+            store_received_payloads,
+        )
+        threading.Thread(target=receiver.serve_forever, name="receiver", daemon=True).start()
+        logger.info(
+            "Receiving piggyback data on %s port %d", config.listen_address, config.listen_port
+        )
+
+    try:
+        with open_notification_socket(paths.piggyback_hub_socket) as notifications:
+            hub.run(notifications, threading.Event(), paths.piggyback_hub_metrics_file)
+    finally:
+        if receiver is not None:
+            receiver.shutdown()
+            receiver.server_close()
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -118,7 +166,7 @@ def main(argv: list[str] | None = None) -> int:
 
     try:
         with pid_file_lock(Path(args.pid_file)):
-            run_piggyback_hub()
+            run_piggyback_hub(logger)
     except SignalException:
         logger.info("Stopping Piggyback Hub daemon.")
     except Exception as e:
@@ -59,6 +59,9 @@ def get_snmp_table(
     max_len = 0
     max_len_col = -1
 
+    if backend.config.table_walk_enabled:
+        _walk_table(section_name, tree, walk_cache=walk_cache, backend=backend, log=log)
+
     for oid in tree.oids:
         fetchoid: OID = f"{tree.base}.{oid.column}"
         # column may be integer or string like "1.5.4.2.3"
@@ -177,6 +180,59 @@ def _key_oid_pairs(pair1: tuple[OID, SNMPRawValue]) -> list[int]:
     return _oid_to_intlist(pair1[0].lstrip("."))
 
 
+def _walk_table(
+    section_name: SectionName | None,
+    tree: BackendSNMPTree,
+    *,
+    walk_cache: MutableMapping[tuple[str, str, bool], SNMPRowInfo],
+    backend: SNMPBackend,
+    log: Callable[[str], None],
+) -> None:
+    """Walk the base OID once and put the rows of the columns into the walk cache
+
+    The cache keys are the same as the ones of the walks of the single columns, so
+    get_snmp_table finds the columns in the walk cache afterwards.
+    """
+    context_hash = _context_hash(section_name, backend)
+    cache_keys: dict[str, list[tuple[str, str, bool]]] = {}
+    for oid in tree.oids:
+        if isinstance(oid.column, SpecialColumn):
+            continue
+        cache_key = (f"{tree.base}.{oid.column}", context_hash, oid.save_to_cache)
+        if cache_key not in walk_cache:
+            cache_keys.setdefault(str(oid.column), []).append(cache_key)
+
+    # A single column is walked just as well on its own
+    if len(cache_keys) < 2:
+        return
+
+    log(f"Walking table {tree.base} for {len(cache_keys)} columns")
+    columns: dict[str, SNMPRowInfo] = {column: [] for column in cache_keys}
+    max_depth = max(column.count(".") for column in columns) + 1
+    prefix = f"{tree.base}."
+    for row_oid, value in _walk_contexts(section_name, tree.base, tree.base, backend, log):
+        if not row_oid.startswith(prefix):
+            continue
+        # Columns may be given as "2" or as "2.1.3", so try all depths
+        parts = row_oid[len(prefix) :].split(".", max_depth)
+        for depth in range(1, min(max_depth, len(parts)) + 1):
+            if (rowinfo := columns.get(".".join(parts[:depth]))) is not None:
+                rowinfo.append((row_oid, value))
+
+    for column, keys in cache_keys.items():
+        for cache_key in keys:
+            # Every column gets its own list, _sanitize_snmp_table_columns sorts them in place
+            walk_cache[cache_key] = list(columns[column])
+
+
+def _context_hash(section_name: SectionName | None, backend: SNMPBackend) -> str:
+    contexts = backend.config.snmpv3_contexts_of(section_name).contexts
+    context_string = "-".join(["no_context" if not c else c for c in contexts])
+
+    # contexts are hashed in order not to exceed max pathname length
+    return hashlib.shake_256(context_string.encode("utf-8")).hexdigest(15)
+
+
 def get_snmpwalk(
     section_name: SectionName | None,
     base_oid: str,
@@ -187,17 +243,25 @@ def get_snmpwalk(
     backend: SNMPBackend,
     log: Callable[[str], None],
 ) -> SNMPRowInfo:
-    contexts = backend.config.snmpv3_contexts_of(section_name).contexts
-    context_string = "-".join(["no_context" if not c else c for c in contexts])
-
-    # contexts are hashed in order not to exceed max pathname length
-    context_hash = hashlib.shake_256(context_string.encode("utf-8")).hexdigest(15)
+    context_hash = _context_hash(section_name, backend)
 
     with contextlib.suppress(KeyError):
         cache_info = walk_cache[(fetchoid, context_hash, save_walk_cache)]
         log(f"Already fetched OID: {fetchoid}")
         return cache_info
 
+    rowinfo = _walk_contexts(section_name, base_oid, fetchoid, backend, log)
+    walk_cache[(fetchoid, context_hash, save_walk_cache)] = rowinfo
+    return rowinfo
+
+
+def _walk_contexts(
+    section_name: SectionName | None,
+    base_oid: str,
+    fetchoid: OID,
+    backend: SNMPBackend,
+    log: Callable[[str], None],
+) -> SNMPRowInfo:
     added_oids: set[OID] = set()
     rowinfo: SNMPRowInfo = []
 
@@ -240,7 +304,6 @@ def get_snmpwalk(
     if skip and not rowinfo:
         raise MKSNMPError("SNMP Error on %s: SNMP query timed out" % backend.config.hostname)
 
-    walk_cache[(fetchoid, context_hash, save_walk_cache)] = rowinfo
     return rowinfo
 
 
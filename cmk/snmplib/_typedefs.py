@@ -57,6 +57,7 @@ class SNMPBackendEnum(enum.Enum):
     INLINE = "Inline"
     CLASSIC = "Classic"
     STORED_WALK = "StoredWalk"
+    ASYNCIO = "Asyncio"
 
     def serialize(self) -> str:
         return self.name
@@ -135,6 +136,8 @@ class SNMPHostConfig:
     snmpv3_contexts: Sequence[SNMPContextConfig]
     character_encoding: str | None
     snmp_backend: SNMPBackendEnum
+    # Walk the base OID of a table once instead of every single column
+    table_walk_enabled: bool = False
 
     @property
     def use_bulkwalk(self) -> bool:
@@ -25,7 +25,12 @@ class VersionSpecificCachesCleaner(UpdateAction):
 
         walk_cache_dir = Path(paths_utils.var_dir, "snmp_cache")
         if walk_cache_dir.exists():
-            paths.extend(walk_cache_dir.iterdir())
+            for path in walk_cache_dir.iterdir():
+                # One file per host, older versions used one directory per host
+                if path.is_dir():
+                    paths.append(path)
+                else:
+                    path.unlink(missing_ok=True)
 
         for base_dir in paths:
             try:
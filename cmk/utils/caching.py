@@ -7,7 +7,7 @@
 from __future__ import annotations
 
 import collections
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from functools import lru_cache, wraps
 from typing import ParamSpec, TypeVar
 
@@ -41,6 +41,7 @@ def instance_method_lru_cache(
 class CacheManager:
     def __init__(self) -> None:
         self._caches: dict[str, DictCache] = collections.defaultdict(DictCache)
+        self._size_sources: dict[str, Callable[[], Mapping[str, int]]] = {}
 
     def __contains__(self, name: str) -> bool:
         return name in self._caches
@@ -49,15 +50,23 @@ class CacheManager:
         """get or create cache with provided name"""
         return self._caches[name]
 
+    def register_size_source(self, name: str, source: Callable[[], Mapping[str, int]]) -> None:
+        """Add the sizes of caches which are not managed here to dump_sizes()"""
+        self._size_sources[name] = source
+
     def clear(self) -> None:
         self._caches.clear()
+        self._size_sources.clear()
 
     def clear_all(self) -> None:
         for cache in self._caches.values():
             cache.clear()
 
     def dump_sizes(self) -> dict[str, int]:
-        return {name: cmk.utils.misc.total_size(cache) for name, cache in self._caches.items()}
+        sizes = {name: cmk.utils.misc.total_size(cache) for name, cache in self._caches.items()}
+        for source_name, source in self._size_sources.items():
+            sizes.update({f"{source_name}.{name}": size for name, size in source().items()})
+        return sizes
 
 
 class DictCache(dict):
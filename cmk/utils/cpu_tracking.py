@@ -7,6 +7,7 @@ from __future__ import annotations
 
 import os
 import posix
+import resource
 from collections.abc import Callable
 from dataclasses import dataclass
 
@@ -27,6 +28,18 @@ class Snapshot:
     def take(cls) -> Snapshot:
         return cls(os.times())
 
+    @classmethod
+    def take_for_thread(cls) -> Snapshot:
+        """Like take(), but with the user and system time of the calling thread only
+
+        The children cannot be attributed to a thread, so their times are left out.
+        Count them once for the whole process, with take().
+        """
+        thread = resource.getrusage(resource.RUSAGE_THREAD)
+        return cls(
+            posix.times_result((thread.ru_utime, thread.ru_stime, 0.0, 0.0, os.times().elapsed))
+        )
+
     @classmethod
     def deserialize(cls, serialized: object) -> Snapshot:
         try:
@@ -53,9 +66,10 @@ class Snapshot:
 
 
 class CPUTracker:
-    def __init__(self, log: Callable[[str], None]) -> None:
+    def __init__(self, log: Callable[[str], None], *, thread: bool = False) -> None:
         super().__init__()
         self._log = log
+        self._take = Snapshot.take_for_thread if thread else Snapshot.take
         self._start: Snapshot = Snapshot.null()
         self._end: Snapshot = Snapshot.null()
 
@@ -63,12 +77,12 @@ class CPUTracker:
         return "%s()" % type(self).__name__
 
     def __enter__(self) -> CPUTracker:
-        self._start = Snapshot.take()
+        self._start = self._take()
         self._log(f"[cpu_tracking] Start [{id(self):x}]")
         return self
 
     def __exit__(self, *exc_info: object) -> None:
-        self._end = Snapshot.take()
+        self._end = self._take()
         self._log(f"[cpu_tracking] Stop [{id(self):x} - {self.duration}]")
 
     @property
@@ -26,7 +26,7 @@ class AesCbcCipher:
             else Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
         )
 
-    def update(self, data: bytes) -> bytes:
+    def update(self, data: bytes | bytearray | memoryview) -> bytes:
         return self._cipher.update(data)
 
     def finalize(self) -> bytes:
@@ -5,12 +5,18 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import enum
+import fcntl
+import functools
+import os
 import socket
-from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping, Sequence
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, assert_never, Literal, NamedTuple
+from typing import Any, assert_never, Final, Literal, NamedTuple
 
 import cmk.utils.paths
 from cmk.utils.caching import cache_manager
@@ -228,10 +234,7 @@ class IPLookupCacheSerializer:
 
     def serialize(self, data: Mapping[IPLookupCacheId, HostAddress]) -> bytes:
         return self._dim_serializer.serialize(
-            {
-                (str(hn), {socket.AF_INET: 4, socket.AF_INET6: 6}[f]): v
-                for (hn, f), v in data.items()
-            }
+            {(str(hn), _FAMILY_TO_INT[f]): v for (hn, f), v in data.items()}
         )
 
     def deserialize(self, raw: bytes) -> Mapping[IPLookupCacheId, HostAddress]:
@@ -242,19 +245,89 @@ class IPLookupCacheSerializer:
             (
                 (HostName(k), socket.AF_INET)  # old pre IPv6 style
                 if isinstance(k, str)
-                else (HostName(k[0]), {4: socket.AF_INET, 6: socket.AF_INET6}[k[1]])
+                else (HostName(k[0]), _INT_TO_FAMILY[k[1]])
             ): HostAddress(v)
             for k, v in loaded_object.items()
         }
 
 
+class _IPLookupJournal:
+    """Append-only log of cache updates on top of the persisted cache
+
+    Every line is one update: "<4|6> <host name> <address>". Appending does not
+    need the store lock and never re-reads anything, which keeps the price of a
+    single update constant. Appenders hold a shared lock on the journal while
+    writing, folding the journal into the persisted cache (compaction) holds it
+    exclusively, so no update can get lost in between.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Final = path
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, cache_id: IPLookupCacheId, ipa: HostAddress) -> int:
+        """Append an update and return the new size of the journal"""
+        hostname, family = cache_id
+        line = f"{_FAMILY_TO_INT[family]} {hostname} {ipa}\n".encode()
+        self.path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # O_APPEND: a single write() is never interleaved with other appenders
+            os.write(fd, line)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    def read(self) -> Iterator[tuple[IPLookupCacheId, HostAddress]]:
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        # Ignore a trailing partial line, its writer has not finished yet.
+        for line in raw[: raw.rfind(b"\n") + 1].splitlines():
+            try:
+                family, hostname, ipa = line.decode().split(" ")
+                yield (HostName(hostname), _INT_TO_FAMILY[int(family)]), HostAddress(ipa)
+            except ValueError:
+                if cmk.ccc.debug.enabled():
+                    raise
+
+    @contextmanager
+    def locked_exclusively(self) -> Iterator[None]:
+        self.path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o660)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def truncate(self) -> None:
+        """Empty the journal. Must only be called while locked_exclusively()"""
+        with self.path.open("r+b") as f:
+            f.truncate()
+
+
+_FAMILY_TO_INT: Final = {socket.AF_INET: 4, socket.AF_INET6: 6}
+_INT_TO_FAMILY: Final = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+
 class IPLookupCache:
     PATH = Path(cmk.utils.paths.var_dir, "ipaddresses.cache")
+    # Fold the journal into the persisted cache once it has grown beyond this size
+    JOURNAL_COMPACTION_SIZE = 64 * 1024
 
     def __init__(self, cache: MutableMapping[IPLookupCacheId, HostAddress]) -> None:
         self._cache = cache
         self._persist_on_update = True
         self._store = store.ObjectStore(self.PATH, serializer=IPLookupCacheSerializer())
+        self._journal = _IPLookupJournal(self.PATH.with_name(f"{self.PATH.name}.journal"))
 
     @contextmanager
     def persisting_disabled(self) -> Iterator[None]:
@@ -283,6 +356,7 @@ class IPLookupCache:
     def load_persisted(self) -> None:
         try:
             self._cache.update(self._store.read_obj(default={}))
+            self._cache.update(self._journal.read())
         except (MKTerminate, MKTimeout):
             # We should be more specific with the exception handler below, then we
             # could drop this special handling here
@@ -299,30 +373,37 @@ class IPLookupCache:
         When self.persist_on_update update is disabled, this simply updates the in-memory
         cache without any persistence interaction. Otherwise:
 
-        The cache that was previously loaded into this IPLookupCache with load_persisted()
-        might be outdated compared to the current persisted lookup cache. Another process
-        might have updated the cache in the meantime.
-
-        The approach here is to load the currently persisted cache with a lock, then update
-        the current IPLookupCache with it, add the given new / changed entry and then write
-        out the resulting data structure.
-
-        This could really be solved in a better way, but may be sufficient for the moment.
+        The new / changed entry is appended to the journal of the persisted cache. This
+        neither needs the store lock nor re-reading the persisted cache, so concurrent
+        helpers do not serialize on it. Once the journal has grown large enough, it is
+        compacted: the persisted cache and the journal are loaded under the lock, merged
+        into this IPLookupCache and written out as the new persisted cache.
 
         The cache can only be cleaned up with the "Update DNS cache" option in WATO
         or the "cmk --update-dns-cache" call that both call update_dns_cache().
         """
+        self._cache[cache_id] = ipa
         if not self._persist_on_update:
-            self._cache[cache_id] = ipa
             return
 
-        with self._store.locked():
+        if self._journal.append(cache_id, ipa) >= self.JOURNAL_COMPACTION_SIZE:
+            self.compact_persisted()
+
+    def compact_persisted(self) -> None:
+        """Fold the journal (and other processes' updates) into the persisted cache"""
+        with self._store.locked(), self._journal.locked_exclusively():
             self._cache.update(self._store.read_obj(default={}))
-            self._cache[cache_id] = ipa
-            self.save_persisted()
+            self._cache.update(self._journal.read())
+            self._write_persisted()
 
     def save_persisted(self) -> None:
-        self._store.write_obj(self._cache)
+        with self._store.locked(), self._journal.locked_exclusively():
+            self._write_persisted()
+
+    def _write_persisted(self) -> None:
+        # Write a snapshot: abandoned lookups of update_dns_cache() may still add entries.
+        self._store.write_obj(dict(self._cache))
+        self._journal.truncate()
 
     def clear(self) -> None:
         """Clear the persisted AND in memory cache"""
@@ -350,58 +431,183 @@ def update_dns_cache(
     # will just clear the cache.
     simulation_mode: bool,
     override_dns: HostAddress | None,
+    max_workers: int = 1,
+    lookup_timeout: float | None = None,
 ) -> tuple[int, Sequence[HostName]]:
+    """Re-resolve all hosts and persist the resulting cache once
+
+    With max_workers > 1 the lookups are done by a bounded thread pool, so that
+    a slow or dead resolver does not serialize the whole run. A lookup that did
+    not finish within lookup_timeout seconds (counted from its start) is reported
+    as failed, just like a lookup that raised.
+    """
     failed = []
 
     ip_lookup_cache = _get_ip_lookup_cache()
 
+    def lookup(
+        host_name: HostName,
+        host_config: IPLookupConfig,
+        family: Literal[socket.AddressFamily.AF_INET, socket.AddressFamily.AF_INET6],
+    ) -> HostAddress:
+        return lookup_ip_address(
+            host_name=host_name,
+            family=family,
+            configured_ip_address=(
+                configured_ipv4_addresses if family is socket.AF_INET else configured_ipv6_addresses
+            ).get(host_name),
+            simulation_mode=simulation_mode,
+            is_snmp_usewalk_host=(host_config.is_use_walk_host and host_config.is_snmp_host),
+            override_dns=override_dns,
+            is_dyndns_host=host_config.is_dyndns_host,
+            force_file_cache_renewal=True,  # it's cleared anyway
+        )
+
     with ip_lookup_cache.persisting_disabled():
         console.verbose("Cleaning up existing DNS cache...")
         ip_lookup_cache.clear()
 
         console.verbose("Updating DNS cache...")
         # `_annotate_family()` handles DUAL_STACK and NO_IP
-        for host_name, host_config, family in _annotate_family(ip_lookup_configs):
+        results = (
+            _lookup_serial(lookup, _annotate_family(ip_lookup_configs))
+            if max_workers <= 1 and lookup_timeout is None
+            else _lookup_concurrent(
+                lookup,
+                _annotate_family(ip_lookup_configs),
+                max_workers=max(1, max_workers),
+                lookup_timeout=lookup_timeout,
+            )
+        )
+        for host_name, family, result in results:
             console.verbose_no_lf(f"{host_name} ({family})...")
-            try:
-                ip = lookup_ip_address(
-                    host_name=host_name,
-                    family=family,
-                    configured_ip_address=(
-                        configured_ipv4_addresses
-                        if family is socket.AF_INET
-                        else configured_ipv6_addresses
-                    ).get(host_name),
-                    simulation_mode=simulation_mode,
-                    is_snmp_usewalk_host=(
-                        host_config.is_use_walk_host and host_config.is_snmp_host
-                    ),
-                    override_dns=override_dns,
-                    is_dyndns_host=host_config.is_dyndns_host,
-                    force_file_cache_renewal=True,  # it's cleared anyway
-                )
-                console.verbose(f"{ip}")
-
-            except (MKTerminate, MKTimeout):
-                # We should be more specific with the exception handler below, then we
-                # could drop this special handling here
-                raise
-            except MKIPAddressLookupError as e:
-                failed.append(host_name)
-                console.verbose(f"lookup failed: {e}")
-                continue
-            except Exception as e:
-                failed.append(host_name)
-                console.verbose(f"lookup failed: {e}")
-                if cmk.ccc.debug.enabled():
-                    raise
+            if isinstance(result, HostAddress):
+                console.verbose(f"{result}")
                 continue
 
+            failed.append(host_name)
+            console.verbose(f"lookup failed: {result}")
+            if not isinstance(result, MKIPAddressLookupError) and cmk.ccc.debug.enabled():
+                raise result
+
     ip_lookup_cache.save_persisted()
 
     return len(ip_lookup_cache), failed
 
 
+_LookupFunction = Callable[
+    [
+        HostName,
+        IPLookupConfig,
+        Literal[socket.AddressFamily.AF_INET, socket.AddressFamily.AF_INET6],
+    ],
+    HostAddress,
+]
+_LookupResult = tuple[HostName, socket.AddressFamily, HostAddress | Exception]
+
+
+def _lookup_serial(
+    lookup: _LookupFunction,
+    jobs: Iterable[
+        tuple[
+            HostName,
+            IPLookupConfig,
+            Literal[socket.AddressFamily.AF_INET, socket.AddressFamily.AF_INET6],
+        ]
+    ],
+) -> Iterator[_LookupResult]:
+    for host_name, host_config, family in jobs:
+        try:
+            yield host_name, family, lookup(host_name, host_config, family)
+        except (MKTerminate, MKTimeout):
+            # We should be more specific with the exception handler below, then we
+            # could drop this special handling here
+            raise
+        except Exception as e:
+            yield host_name, family, e
+
+
+def _lookup_concurrent(
+    lookup: _LookupFunction,
+    jobs: Iterable[
+        tuple[
+            HostName,
+            IPLookupConfig,
+            Literal[socket.AddressFamily.AF_INET, socket.AddressFamily.AF_INET6],
+        ]
+    ],
+    *,
+    max_workers: int,
+    lookup_timeout: float | None,
+) -> Iterator[_LookupResult]:
+    """Run the lookups in worker threads and yield the results in submission order
+
+    getaddrinfo() can not be interrupted, so a timed out lookup is only abandoned:
+    its worker thread keeps running until the resolver gives up on its own. The workers
+    are daemon threads, so an abandoned lookup does not delay the exit of the process.
+    """
+    jobs = list(jobs)
+    futures = [concurrent.futures.Future[HostAddress]() for _job in jobs]
+    started: dict[int, float] = {}
+    next_index = iter(range(len(jobs)))
+    next_index_lock = threading.Lock()
+
+    def work() -> None:
+        while True:
+            with next_index_lock:
+                if (index := next(next_index, None)) is None:
+                    return
+            if not futures[index].set_running_or_notify_cancel():
+                continue
+            host_name, host_config, family = jobs[index]
+            started[index] = time.monotonic()
+            try:
+                futures[index].set_result(lookup(host_name, host_config, family))
+            except Exception as e:
+                futures[index].set_exception(e)
+
+    for number in range(min(max_workers, len(jobs))):
+        threading.Thread(target=work, name=f"dns-lookup-{number}", daemon=True).start()
+    try:
+        for index, (host_name, _host_config, family) in enumerate(jobs):
+            yield host_name, family, _wait_for_lookup(
+                futures[index], functools.partial(started.get, index), lookup_timeout
+            )
+    finally:
+        # Don't start the lookups nobody waits for anymore.
+        for future in futures:
+            future.cancel()
+
+
+def _wait_for_lookup(
+    future: concurrent.futures.Future[HostAddress],
+    started: Callable[[], float | None],
+    lookup_timeout: float | None,
+) -> HostAddress | Exception:
+    while True:
+        # The timeout only starts to run once a worker has picked up the lookup.
+        timeout = (
+            None
+            if lookup_timeout is None
+            else (
+                lookup_timeout
+                if (start := started()) is None
+                else max(0.0, start + lookup_timeout - time.monotonic())
+            )
+        )
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            assert lookup_timeout is not None
+            if (start := started()) is None or time.monotonic() < start + lookup_timeout:
+                continue
+            return MKIPAddressLookupError(f"DNS lookup timed out after {lookup_timeout} seconds")
+        except (MKTerminate, MKTimeout):
+            raise
+        except Exception as e:
+            return e
+
+
 def _annotate_family(
     ip_lookup_configs: Iterable[IPLookupConfig],
 ) -> Iterable[
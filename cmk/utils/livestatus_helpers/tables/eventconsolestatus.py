@@ -31,6 +31,13 @@ class Eventconsolestatus(Table):
     )
     """The average event rate"""
 
+    status_average_history_flush_time = Column(
+        'status_average_history_flush_time',
+        col_type='float',
+        description='The average time for writing queued event history entries',
+    )
+    """The average time for writing queued event history entries"""
+
     status_average_message_rate = Column(
         'status_average_message_rate',
         col_type='float',
@@ -171,6 +178,20 @@ class Eventconsolestatus(Table):
     )
     """The number of events received since startup of the Event Console"""
 
+    status_history_dropped_entries = Column(
+        'status_history_dropped_entries',
+        col_type='int',
+        description='The number of event history entries dropped since startup of the Event Console, because too many were not written yet',
+    )
+    """The number of event history entries dropped since startup of the Event Console, because too many were not written yet"""
+
+    status_history_queue_length = Column(
+        'status_history_queue_length',
+        col_type='int',
+        description='The number of event history entries not yet written',
+    )
+    """The number of event history entries not yet written"""
+
     status_message_rate = Column(
         'status_message_rate',
         col_type='float',
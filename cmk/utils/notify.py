@@ -9,7 +9,7 @@ import os
 import subprocess
 import time
 import uuid
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 from logging import Logger
 from pathlib import Path
 from typing import Final, Literal, NewType, TypedDict
@@ -20,7 +20,7 @@ from cmk.utils import statename
 from cmk.utils.config_path import VersionedConfigPath
 from cmk.utils.hostaddress import HostName
 from cmk.utils.labels import Labels
-from cmk.utils.notify_types import EnrichedEventContext
+from cmk.utils.notify_types import EnrichedEventContext, EventContext
 from cmk.utils.notify_types import NotificationContext as NotificationContext
 from cmk.utils.paths import core_helper_config_dir
 from cmk.utils.servicename import ServiceName
@@ -228,6 +228,69 @@ def create_spoolfile(
     store.save_object_to_file(file_path, data, pretty=True)
 
 
+class NotificationBacklog:
+    """The most recent raw notification contexts, numbered from the newest (0) on
+
+    The contexts are kept in a ring of slot files, so adding a context only writes that context
+    and the position of the ring, regardless of the size of the backlog. Each slot also holds
+    the sequence number of its context, so that slots left over from a different backlog size
+    are not mistaken for current ones.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        # Holds (sequence number of the next context, size of the ring)
+        self._head_file = directory / "head"
+        # Formerly, the whole backlog was rewritten to this file for each notification
+        self._legacy_file = directory.with_suffix(".mk")
+
+    def append(self, context: EventContext, *, size: int) -> None:
+        if not size:
+            self.clear()
+            return
+
+        next_seq, old_size = load_object_from_file(self._head_file, default=(0, size), lock=True)
+        if next_seq == 0 and self._legacy_file.exists():
+            for legacy_context in reversed(load_object_from_file(self._legacy_file, default=[])):
+                save_object_to_file(self._slot_file(next_seq, size), (next_seq, legacy_context))
+                next_seq += 1
+            self._legacy_file.unlink()
+
+        if size < old_size:
+            for index in range(size, old_size):
+                (self._directory / str(index)).unlink(missing_ok=True)
+
+        save_object_to_file(self._slot_file(next_seq, size), (next_seq, context))
+        save_object_to_file(self._head_file, (next_seq + 1, size))
+
+    def get(self, nr: int) -> EventContext | None:
+        if not self._head_file.exists():
+            legacy_backlog = load_object_from_file(self._legacy_file, default=[])
+            return legacy_backlog[nr] if 0 <= nr < len(legacy_backlog) else None
+
+        next_seq, size = load_object_from_file(self._head_file, default=(0, 0))
+        if not 0 <= nr < min(next_seq, size):
+            return None
+        seq = next_seq - 1 - nr
+        slot_seq, context = load_object_from_file(self._slot_file(seq, size), default=(-1, None))
+        return context if slot_seq == seq else None
+
+    def __iter__(self) -> Iterator[EventContext]:
+        nr = 0
+        while (context := self.get(nr)) is not None:
+            yield context
+            nr += 1
+
+    def clear(self) -> None:
+        if self._directory.exists():
+            for path in self._directory.iterdir():
+                path.unlink()
+        self._legacy_file.unlink(missing_ok=True)
+
+    def _slot_file(self, seq: int, size: int) -> Path:
+        return self._directory / str(seq % size)
+
+
 def log_to_history(message: SanitizedLivestatusLogStr) -> None:
     _livestatus_cmd(f"LOG;{message}")
 
@@ -162,7 +162,16 @@ def compute_prediction(
         if (response := get_recorded_data(f"{info.metric}.max", start, end))
     ]
 
-    return _calculate_data_for_prediction(raw_slices[0][0], raw_slices) if raw_slices else None
+    if not raw_slices:
+        return None
+
+    # NumPy is only imported when a prediction is actually computed: this module is
+    # loaded by every checking process.
+    from ._vectorized import (  # pylint: disable=import-outside-toplevel
+        calculate_data_for_prediction,
+    )
+
+    return calculate_data_for_prediction(raw_slices[0][0], raw_slices)
 
 
 def _calculate_data_for_prediction(
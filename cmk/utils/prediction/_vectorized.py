@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""NumPy implementation of the prediction computation
+
+This computes the same as _calculate_data_for_prediction(), on arrays instead of lists.
+The results only differ by rounding: Python sums floats with compensation, NumPy does not.
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from ._prediction import DataStat, PredictionData
+
+
+def calculate_data_for_prediction(
+    youngest_range: range,
+    raw_slices: Sequence[tuple[range, Sequence[float | None], int]],
+) -> PredictionData:
+    slices = [
+        _forward_fill_resample(
+            current_range,
+            values,
+            range(youngest_range.start - shift, youngest_range.stop - shift, youngest_range.step),
+        )
+        for current_range, values, shift in raw_slices
+    ]
+    # Like zip(), only use the time columns present in all the slices
+    columns = min(len(s) for s in slices)
+    return PredictionData(
+        points=_data_stats(np.stack([s[:columns] for s in slices])),
+        start=youngest_range.start,
+        step=youngest_range.step,
+    )
+
+
+def _forward_fill_resample(
+    current_range: range, values: Sequence[float | None], new_range: range
+) -> npt.NDArray[np.float64]:
+    array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if current_range == new_range:
+        return array
+
+    # int() in the plain implementation truncates, which only differs from flooring for
+    # negative indices, and these are clipped to 0 anyway.
+    indices = np.trunc(
+        (
+            np.arange(new_range.start, new_range.stop, new_range.step, dtype=np.float64)
+            - current_range.start
+        )
+        / current_range.step
+    )
+    return array[np.clip(indices, 0, len(values) - 1).astype(np.intp)]
+
+
+def _data_stats(slices: npt.NDArray[np.float64]) -> list[DataStat | None]:
+    """Statistically summarize the time columns of the upsampled slices, ignoring gaps"""
+    present = ~np.isnan(slices)
+    samples = present.sum(axis=0)
+    values = np.where(present, slices, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = values.sum(axis=0) / samples
+        stdev = np.sqrt(
+            np.abs((values * values).sum(axis=0) - average**2 * samples) / (samples - 1)
+        )
+    minimum = np.where(present, slices, np.inf).min(axis=0)
+    maximum = np.where(present, slices, -np.inf).max(axis=0)
+
+    return [
+        (
+            None
+            if not count
+            else DataStat(
+                average=avg,
+                min_=min_,
+                max_=max_,
+                # In the case of a single data-point an unbiased standard deviation is undefined.
+                stdev=None if count == 1 else dev,
+            )
+        )
+        for count, avg, min_, max_, dev in zip(
+            samples.tolist(),
+            average.tolist(),
+            minimum.tolist(),
+            maximum.tolist(),
+            stdev.tolist(),
+        )
+    ]
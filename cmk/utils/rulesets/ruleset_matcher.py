@@ -6,6 +6,7 @@
 
 import contextlib
 import dataclasses
+import sys
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from re import Pattern
 from typing import (
@@ -31,6 +32,7 @@ from cmk.utils.labels import (
     Labels,
     LabelSources,
 )
+from cmk.utils.misc import total_size
 from cmk.utils.parameters import merge_parameters
 from cmk.utils.regex import combine_patterns, regex
 from cmk.utils.rulesets.ruleset_matching_stats import (
@@ -95,11 +97,13 @@ LabelGroupsCacheId = tuple[tuple[AndOrNotLiteral, tuple[tuple[AndOrNotLiteral, s
 
 PreprocessedPattern: TypeAlias = tuple[bool, Pattern[str]]
 RuleID: TypeAlias = str
+# Bitmap of the matching host IDs, see HostIndex.bitmap()
+HostBitmap: TypeAlias = bytes
 PreprocessedServiceRuleset: TypeAlias = list[
     tuple[
         RuleID,
         TRuleValue,
-        set[HostName],
+        HostBitmap,
         LabelGroups,
         LabelGroupsCacheId,
         PreprocessedPattern,
@@ -169,6 +173,64 @@ def merge_cluster_labels(all_node_labels: Iterable[Iterable[HostLabel]]) -> Sequ
     return list({l.name: l for node_labels in all_node_labels for l in node_labels}.values())
 
 
+class HostIndex:
+    """Assigns consecutive IDs to the hosts to represent sets of hosts as bitmasks
+
+    A set of hosts is an int with bit N set if the host with ID N is a member.
+    Combining them is done by the bitwise operators and is much cheaper than
+    working on sets of host names, both in time and in memory.
+    """
+
+    def __init__(self, hosts: Iterable[HostName]) -> None:
+        self._hosts = list(dict.fromkeys(hosts))
+        self._ids = {hostname: host_id for host_id, hostname in enumerate(self._hosts)}
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def id_of(self, hostname: HostName) -> int | None:
+        return self._ids.get(hostname)
+
+    def host_of(self, host_id: int) -> HostName:
+        return self._hosts[host_id]
+
+    @staticmethod
+    def mask_of_ids(host_ids: Iterable[int]) -> int:
+        bits = bytearray()
+        for host_id in host_ids:
+            if (byte := host_id >> 3) >= len(bits):
+                bits.extend(bytes(byte + 1 - len(bits)))
+            bits[byte] |= 1 << (host_id & 7)
+        return int.from_bytes(bits, "little")
+
+    def mask_of(self, hostnames: Iterable[HostName]) -> int:
+        """Hosts which are not part of the index are ignored"""
+        return self.mask_of_ids(
+            host_id for hostname in hostnames if (host_id := self._ids.get(hostname)) is not None
+        )
+
+    def ids_of(self, mask: int) -> Iterator[int]:
+        bits = bin(mask)[:1:-1]  # least significant bit first, without the "0b" prefix
+        host_id = bits.find("1")
+        while host_id != -1:
+            yield host_id
+            host_id = bits.find("1", host_id + 1)
+
+    def hosts_of(self, mask: int) -> set[HostName]:
+        return {self._hosts[host_id] for host_id in self.ids_of(mask)}
+
+    @staticmethod
+    def bitmap(mask: int) -> HostBitmap:
+        """Membership in a bitmap can be tested in constant time, see is_in_bitmap()"""
+        return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+    def bitmap_position(self, hostname: HostName) -> tuple[int, int]:
+        """Returns the byte offset and the bit within that byte for the host"""
+        if (host_id := self._ids.get(hostname)) is None:
+            return sys.maxsize, 0  # never within a bitmap
+        return host_id >> 3, 1 << (host_id & 7)
+
+
 class RulesetMatcher:
     """Performing matching on host / service rulesets
 
@@ -204,6 +266,7 @@ class RulesetMatcher:
         self.label_sources_of_host = self.ruleset_optimizer.label_sources_of_host
         self.label_sources_of_service = self.ruleset_optimizer.label_sources_of_service
         self.clear_caches = self.ruleset_optimizer.clear_caches
+        self.dump_sizes = self.ruleset_optimizer.dump_sizes
 
         self._service_match_cache: dict[
             tuple[
@@ -387,6 +450,9 @@ class RulesetMatcher:
             match_object.host_name not in self.ruleset_optimizer.all_processed_hosts()
         )
         optimized_ruleset = self.ruleset_optimizer.get_service_ruleset(ruleset, with_foreign_hosts)
+        host_byte, host_bit = self.ruleset_optimizer.host_index.bitmap_position(
+            match_object.host_name
+        )
 
         ruleset_id = id(ruleset)
         if self._debug_matching_stats:
@@ -406,7 +472,7 @@ class RulesetMatcher:
             if match_object.service_description is None:
                 continue
 
-            if match_object.host_name not in hosts:
+            if host_byte >= len(hosts) or not hosts[host_byte] & host_bit:
                 continue
 
             service_cache_id = (
@@ -516,6 +582,7 @@ class RulesetOptimizer:
         self._nodes_of = nodes_of
 
         self._all_configured_hosts = all_configured_hosts
+        self.host_index = HostIndex(all_configured_hosts)
 
         # Contains all hostnames which are currently relevant for this cache.
         # Every active host or a subset of the active hosts when multiprocessing
@@ -529,15 +596,16 @@ class RulesetOptimizer:
 
         self.__service_ruleset_cache: dict[tuple[int, bool], PreprocessedServiceRuleset] = {}
         self.__host_ruleset_cache: dict[tuple[int, bool], Mapping[HostAddress, Sequence[Any]]] = {}
-        self._all_matching_hosts_match_cache: dict[tuple[ConditionCacheID, bool], set[HostName]] = (
-            {}
-        )
+        # The sets of hosts are kept as bitmasks of the IDs in the host index
+        self._all_matching_hosts_match_cache: dict[tuple[ConditionCacheID, bool], int] = {}
+        # Shared by all preprocessed service rules with the same host conditions
+        self._all_matching_hosts_bitmap_cache: dict[tuple[ConditionCacheID, bool], HostBitmap] = {}
 
         # Reference dirname -> hosts in this dir including subfolders
-        self._folder_host_lookup: dict[tuple[bool, str], set[HostName]] = {}
+        self._folder_host_lookup: dict[tuple[bool, str], int] = {}
 
-        # Provides a list of hosts with the same hosttags, excluding the folder
-        self._hosts_grouped_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], set[HostName]] = {}
+        # Provides a list of host IDs with the same hosttags, excluding the folder
+        self._hosts_grouped_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], list[int]] = {}
         # Reference hostname -> tag group reference
         self._host_grouped_ref: dict[HostName, tuple[tuple[TagGroupID, TagID], ...]] = {}
 
@@ -554,6 +622,14 @@ class RulesetOptimizer:
     def clear_caches(self) -> None:
         self.__host_ruleset_cache.clear()
         self._all_matching_hosts_match_cache.clear()
+        self._all_matching_hosts_bitmap_cache.clear()
+
+    def dump_sizes(self) -> dict[str, int]:
+        return {
+            "ruleset_optimizer_matching_hosts": total_size(self._all_matching_hosts_match_cache),
+            "ruleset_optimizer_folder_hosts": total_size(self._folder_host_lookup),
+            "ruleset_optimizer_service_rulesets": total_size(self.__service_ruleset_cache),
+        }
 
     def all_processed_hosts(self) -> Sequence[HostName]:
         """Returns a set of all processed hosts"""
@@ -675,7 +751,7 @@ class RulesetOptimizer:
 
                 # Directly compute set of all matching hosts here, this will avoid
                 # recomputation later
-                hosts = self._all_matching_hosts(rule["condition"], with_foreign_hosts)
+                hosts = self._all_matching_hosts_bitmap(rule["condition"], with_foreign_hosts)
 
                 # Prepare cache id
                 service_label_groups: LabelGroups = rule["condition"].get(
@@ -745,11 +821,31 @@ class RulesetOptimizer:
             with_foreign_hosts,
         )
 
-    def _all_matching_hosts(  # pylint: disable=too-many-branches
+    def _all_matching_hosts(
         self, condition: RuleConditionsSpec, with_foreign_hosts: bool
     ) -> set[HostName]:
         """Returns a set containing the names of hosts that match the given
         tags and hostlist conditions."""
+        return self.host_index.hosts_of(
+            self._all_matching_hosts_mask(condition, with_foreign_hosts)
+        )
+
+    def _all_matching_hosts_bitmap(
+        self, condition: RuleConditionsSpec, with_foreign_hosts: bool
+    ) -> HostBitmap:
+        cache_id = self._get_cache_id(condition, with_foreign_hosts)
+        with contextlib.suppress(KeyError):
+            return self._all_matching_hosts_bitmap_cache[cache_id]
+
+        return self._all_matching_hosts_bitmap_cache.setdefault(
+            cache_id,
+            HostIndex.bitmap(self._all_matching_hosts_mask(condition, with_foreign_hosts)),
+        )
+
+    def _all_matching_hosts_mask(  # pylint: disable=too-many-branches
+        self, condition: RuleConditionsSpec, with_foreign_hosts: bool
+    ) -> int:
+        """Same as _all_matching_hosts(), but returns the bitmask of the host IDs"""
         hostlist = condition.get("host_name")
         tag_conditions: Mapping[TagGroupID, TagCondition] = condition.get("host_tags", {})
         label_groups: LabelGroups = condition.get("host_label_groups", [])
@@ -771,7 +867,7 @@ class RulesetOptimizer:
             if matched_by_tags is not None:
                 return matched_by_tags
 
-        matching: set[HostName] = set()
+        matching = 0
         only_specific_hosts = (
             hostlist is not None
             and not isinstance(hostlist, dict)
@@ -789,16 +885,20 @@ class RulesetOptimizer:
             not tag_conditions and not label_groups and only_specific_hosts and hostlist is not None
         ):
             # If no tags are specified and there are only specific hosts we already have the matches
-            matching = valid_hosts.intersection(hostlist)
+            matching = valid_hosts & self.host_index.mask_of(cast(Sequence[HostName], hostlist))
 
         else:
             # If the rule has only exact host restrictions, we can thin out the list of hosts to check
             if only_specific_hosts and hostlist is not None:
-                hosts_to_check = valid_hosts.intersection(hostlist)
+                hosts_to_check = valid_hosts & self.host_index.mask_of(
+                    cast(Sequence[HostName], hostlist)
+                )
             else:
                 hosts_to_check = valid_hosts
 
-            for hostname in hosts_to_check:
+            matching_ids = []
+            for host_id in self.host_index.ids_of(hosts_to_check):
+                hostname = self.host_index.host_of(host_id)
                 # When no tag matching is requested, do not filter by tags. Accept all hosts
                 # and filter only by hostlist
                 if tag_conditions and not matches_host_tags(
@@ -815,7 +915,8 @@ class RulesetOptimizer:
                 if not matches_host_name(hostlist, hostname):
                     continue
 
-                matching.add(hostname)
+                matching_ids.append(host_id)
+            matching = HostIndex.mask_of_ids(matching_ids)
 
         self._all_matching_hosts_match_cache[cache_id] = matching
         return matching
@@ -859,10 +960,9 @@ class RulesetOptimizer:
     def _match_hosts_by_tags(
         self,
         cache_id: tuple[ConditionCacheID, bool],
-        valid_hosts: set[HostName],
+        valid_hosts: int,
         tag_conditions: Mapping[TagGroupID, TagCondition],
-    ) -> set[HostName] | None:
-        matching = set()
+    ) -> int | None:
         negative_match_tags = set()
         positive_match_tags = set()
         for taggroup_id, tag_condition in tag_conditions.items():
@@ -890,51 +990,38 @@ class RulesetOptimizer:
         # if has_specific_folder_tag or self._all_processed_hosts_similarity < 3.0:
         if self._all_processed_hosts_similarity < 3.0:
             # Without shared folders
-            for hostname in valid_hosts:
-                if positive_match_tags <= self._host_tags[
-                    hostname
-                ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                    matching.add(hostname)
-
-            self._all_matching_hosts_match_cache[cache_id] = matching
-            return matching
-
-        # With shared folders
-        checked_hosts: set[str] = set()
-        for hostname in valid_hosts:
-            if hostname in checked_hosts:
-                continue
-
-            hosts_with_same_tag = self._filter_hosts_with_same_tags_as_host(hostname, valid_hosts)
-            checked_hosts.update(hosts_with_same_tag)
+            matching_ids = []
+            for host_id in self.host_index.ids_of(valid_hosts):
+                host_tags = self._host_tags[self.host_index.host_of(host_id)]
+                if positive_match_tags <= host_tags and not negative_match_tags.intersection(
+                    host_tags
+                ):
+                    matching_ids.append(host_id)
 
-            if positive_match_tags <= self._host_tags[
-                hostname
-            ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                matching.update(hosts_with_same_tag)
+        else:
+            # With shared folders: Evaluate the tags once per group of hosts sharing them
+            matching_ids = []
+            for group_ref, host_ids in self._hosts_grouped_by_tags.items():
+                if positive_match_tags.issubset(group_ref) and not negative_match_tags.intersection(
+                    group_ref
+                ):
+                    matching_ids.extend(host_ids)
 
+        matching = valid_hosts & HostIndex.mask_of_ids(matching_ids)
         self._all_matching_hosts_match_cache[cache_id] = matching
         return matching
 
-    def _filter_hosts_with_same_tags_as_host(
-        self,
-        hostname: HostName,
-        hosts: set[HostName],
-    ) -> set[HostName]:
-        return self._hosts_grouped_by_tags[self._host_grouped_ref[hostname]].intersection(hosts)
-
-    def _get_hosts_within_folder(self, folder_path: str, with_foreign_hosts: bool) -> set[HostName]:
+    def _get_hosts_within_folder(self, folder_path: str, with_foreign_hosts: bool) -> int:
         cache_id = with_foreign_hosts, folder_path
         if cache_id not in self._folder_host_lookup:
-            hosts_in_folder = set()
             relevant_hosts = (
                 self._all_configured_hosts if with_foreign_hosts else self._all_processed_hosts
             )
-
-            for hostname in relevant_hosts:
-                host_path = self._host_paths.get(hostname, "/")
-                if host_path.startswith(folder_path):
-                    hosts_in_folder.add(hostname)
+            hosts_in_folder = self.host_index.mask_of(
+                hostname
+                for hostname in relevant_hosts
+                if self._host_paths.get(hostname, "/").startswith(folder_path)
+            )
 
             self._folder_host_lookup[cache_id] = hosts_in_folder
             return hosts_in_folder
@@ -944,7 +1031,8 @@ class RulesetOptimizer:
     def _initialize_host_lookup(self) -> None:
         for hostname in self._all_configured_hosts:
             group_ref = tuple(sorted(self._host_tags[hostname]))
-            self._hosts_grouped_by_tags.setdefault(group_ref, set()).add(hostname)
+            if (host_id := self.host_index.id_of(hostname)) is not None:
+                self._hosts_grouped_by_tags.setdefault(group_ref, []).append(host_id)
             self._host_grouped_ref[hostname] = group_ref
 
     def labels_of_host(self, hostname: HostName) -> Labels:
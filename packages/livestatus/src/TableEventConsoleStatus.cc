@@ -117,6 +117,17 @@ TableEventConsoleStatus::TableEventConsoleStatus() {
     addColumn(ECRow::makeIntColumn(
         "status_event_limit_active_overall",
         "Whether or not the overall event limit is in effect (0/1)", offsets));
+
+    addColumn(ECRow::makeIntColumn(
+        "status_history_queue_length",
+        "The number of event history entries not yet written", offsets));
+    addColumn(ECRow::makeDoubleColumn(
+        "status_average_history_flush_time",
+        "The average time for writing queued event history entries", offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_history_dropped_entries",
+        "The number of event history entries dropped since startup of the Event Console, because too many were not written yet",
+        offsets));
 }
 
 std::string TableEventConsoleStatus::name() const {
@@ -648,6 +648,7 @@ ColumnDefinitions event_console_status_columns() {
         {"status_average_connect_rate", ColumnType::double_},
         {"status_average_drop_rate", ColumnType::double_},
         {"status_average_event_rate", ColumnType::double_},
+        {"status_average_history_flush_time", ColumnType::double_},
         {"status_average_message_rate", ColumnType::double_},
         {"status_average_overflow_rate", ColumnType::double_},
         {"status_average_processing_time", ColumnType::double_},
@@ -668,6 +669,8 @@ ColumnDefinitions event_console_status_columns() {
         {"status_event_limit_rule", ColumnType::int_},
         {"status_event_rate", ColumnType::double_},
         {"status_events", ColumnType::int_},
+        {"status_history_dropped_entries", ColumnType::int_},
+        {"status_history_queue_length", ColumnType::int_},
         {"status_message_rate", ColumnType::double_},
         {"status_messages", ColumnType::int_},
         {"status_num_open_events", ColumnType::int_},
@@ -66,5 +66,50 @@ test_encryption_does_not_strip_newlines() {
     assertEquals "61" "${actual}"
 }
 
+test_salt_is_reused_within_rotation() {
+    MK_VARDIR="${SHUNIT_TMPDIR}"
+    ENCRYPTION_SALT_ROTATION=60
+    get_epoch() { echo "1000"; }
+
+    printf "HMACHMACHMACHMACHMACHMACHMACHMAC 950 0011 2233 4455\n" >"${MK_VARDIR}/encryption_key_cache"
+
+    actual="$(derive_pbkdf2_key "secret")"
+
+    assertEquals "0011 2233 4455" "${actual}"
+}
+
+test_salt_is_not_reused_for_other_passphrase() {
+    MK_VARDIR="${SHUNIT_TMPDIR}"
+    ENCRYPTION_SALT_ROTATION=60
+    get_epoch() { echo "1000"; }
+    printf "0123456789ABCDEF 950 0011 2233 4455\n" >"${MK_VARDIR}/encryption_key_cache"
+
+    actual="$(derive_pbkdf2_key "secret")"
+
+    assertEquals "53414C5453414C54 CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00 11001100110011001100110011001100" "${actual}"
+}
+
+test_salt_is_rotated() {
+    MK_VARDIR="${SHUNIT_TMPDIR}"
+    ENCRYPTION_SALT_ROTATION=60
+    printf "HMACHMACHMACHMACHMACHMACHMACHMAC 900 0011 2233 4455\n" >"${MK_VARDIR}/encryption_key_cache"
+    get_epoch() { echo "1000"; }
+
+    actual="$(derive_pbkdf2_key "secret")"
+
+    assertEquals "53414C5453414C54 CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00CC00 11001100110011001100110011001100" "${actual}"
+    assertEquals "HMACHMACHMACHMACHMACHMACHMACHMAC 1000 ${actual}" "$(cat "${MK_VARDIR}/encryption_key_cache")"
+}
+
+test_salt_is_not_reused_by_default() {
+    MK_VARDIR="${SHUNIT_TMPDIR}"
+    unset ENCRYPTION_SALT_ROTATION
+    rm -f "${MK_VARDIR}/encryption_key_cache"
+
+    derive_pbkdf2_key "secret" >/dev/null
+
+    assertFalse "[ -e '${MK_VARDIR}/encryption_key_cache' ]"
+}
+
 # shellcheck disable=SC1090
 . "$UNIT_SH_SHUNIT2"
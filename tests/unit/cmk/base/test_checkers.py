@@ -5,6 +5,7 @@
 
 # pylint: disable=protected-access
 
+import threading
 import time
 from collections.abc import Iterable, Mapping
 from typing import Literal
@@ -14,14 +15,19 @@ from pytest import MonkeyPatch
 
 from tests.testlib.base import Scenario
 
+from cmk.utils.agentdatatype import AgentRawData
 from cmk.utils.hostaddress import HostName
 
+from cmk.fetchers import Fetcher, Mode
+from cmk.fetchers.filecache import FileCache, FileCacheOptions, NoCache
+
 from cmk.checkengine.checkresults import ServiceCheckResult, SubmittableServiceCheckResult
-from cmk.checkengine.fetcher import HostKey, SourceType
+from cmk.checkengine.fetcher import FetcherType, HostKey, SourceInfo, SourceType
 from cmk.checkengine.parameters import TimespecificParameters, TimespecificParameterSet
 
 from cmk.base import checkers, config
 from cmk.base.plugins.agent_based.agent_based_api.v1.type_defs import CheckResult
+from cmk.base.sources import Source
 
 from cmk.agent_based.prediction_backend import (
     InjectedParameters,
@@ -29,6 +35,7 @@ from cmk.agent_based.prediction_backend import (
     PredictionParameters,
 )
 from cmk.agent_based.v1 import Metric, Result, State
+from cmk.ccc.exceptions import MKFetcherError
 
 
 def make_timespecific_params_list(
@@ -279,3 +286,107 @@ def test_prediction_injection() -> None:
             ("my_reference_metric", *prediction),
         )
     }
+
+
+class _SlowFetcher(Fetcher[AgentRawData]):
+    def __init__(
+        self,
+        ident: str,
+        delay: float,
+        fetches: dict[str, tuple[float, float]],
+        barrier: threading.Barrier | None,
+    ) -> None:
+        super().__init__()
+        self.ident = ident
+        self.delay = delay
+        self.fetches = fetches
+        self.barrier = barrier
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _fetch_from_io(self, mode: Mode) -> AgentRawData:
+        # A fetch that hangs must not keep the process alive.
+        assert threading.current_thread().daemon
+        start = time.monotonic()
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        time.sleep(self.delay)
+        self.fetches[self.ident] = (start, time.monotonic())
+        return AgentRawData(self.ident.encode())
+
+
+class _SlowSource(Source[AgentRawData]):
+    def __init__(
+        self,
+        ident: str,
+        fetcher_type: FetcherType,
+        delay: float,
+        fetches: dict[str, tuple[float, float]],
+        barrier: threading.Barrier | None = None,
+    ) -> None:
+        self.ident = ident
+        self.fetcher_type = fetcher_type
+        self.delay = delay
+        self.fetches = fetches
+        self.barrier = barrier
+
+    def source_info(self) -> SourceInfo:
+        return SourceInfo(HostName("host"), None, self.ident, self.fetcher_type, SourceType.HOST)
+
+    def fetcher(self) -> Fetcher[AgentRawData]:
+        return _SlowFetcher(self.ident, self.delay, self.fetches, self.barrier)
+
+    def file_cache(
+        self, *, simulation: bool, file_cache_options: FileCacheOptions
+    ) -> FileCache[AgentRawData]:
+        return NoCache()
+
+
+def test_fetch_all_concurrently() -> None:
+    fetches: dict[str, tuple[float, float]] = {}
+    # The sources other than SNMP only get past the barrier if they are fetched at once.
+    barrier = threading.Barrier(3)
+    sources = [
+        _SlowSource("agent", FetcherType.TCP, 0.0, fetches, barrier),
+        _SlowSource("snmp", FetcherType.SNMP, 0.1, fetches),
+        _SlowSource("special", FetcherType.SPECIAL_AGENT, 0.0, fetches, barrier),
+        _SlowSource("mgmt_snmp", FetcherType.SNMP, 0.1, fetches),
+        _SlowSource("piggyback", FetcherType.PIGGYBACK, 0.0, fetches, barrier),
+    ]
+
+    fetched = checkers._fetch_all(
+        sources, simulation=False, file_cache_options=FileCacheOptions(), mode=Mode.CHECKING
+    )
+
+    assert [(source_info.ident, raw_data.ok) for source_info, raw_data, _duration in fetched] == [
+        ("agent", b"agent"),
+        ("snmp", b"snmp"),
+        ("special", b"special"),
+        ("mgmt_snmp", b"mgmt_snmp"),
+        ("piggyback", b"piggyback"),
+    ]
+    # The SNMP sources run one after the other.
+    assert fetches["snmp"][1] <= fetches["mgmt_snmp"][0]
+    assert all(duration.process.elapsed >= 0.0 for _info, _raw, duration in fetched)
+
+
+def test_fetch_all_source_timeout() -> None:
+    fetches: dict[str, tuple[float, float]] = {}
+    fetched = checkers._fetch_all(
+        [
+            _SlowSource("agent", FetcherType.TCP, 0.0, fetches),
+            _SlowSource("special", FetcherType.SPECIAL_AGENT, 1.0, fetches),
+        ],
+        simulation=False,
+        file_cache_options=FileCacheOptions(),
+        mode=Mode.CHECKING,
+        timeout=0.2,
+    )
+
+    assert fetched[0][1].ok == b"agent"
+    assert isinstance(fetched[1][1].error, MKFetcherError)
+    assert not fetched[1][2]
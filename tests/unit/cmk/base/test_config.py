@@ -6,6 +6,7 @@
 # pylint: disable=protected-access
 
 import itertools
+import pickle
 import re
 import shutil
 import socket
@@ -2954,6 +2955,32 @@ class TestPackedConfigStore:
         assert precompiled_check_config.exists()
         assert store.read() == {"abc": 1}
 
+    def test_rulesets_are_decoded_on_access(self, store: config.PackedConfigStore) -> None:
+        rulesets = {
+            "cpu_load": [{"id": "1", "value": {"levels": (1.0, 2.0)}, "condition": {}}],
+            "memory": [{"id": "2", "value": {}, "condition": {}}],
+        }
+        store.write({"abc": 1, "checkgroup_parameters": rulesets})
+
+        packed_config = store.read()
+        packed_rulesets = packed_config["checkgroup_parameters"]
+        assert isinstance(packed_rulesets, config.PackedRulesets)
+        assert not packed_rulesets._decoded
+        assert packed_rulesets.get("cpu_load") == rulesets["cpu_load"]
+        assert packed_rulesets.get("unknown") is None
+        assert list(packed_rulesets._decoded) == ["cpu_load"]
+        # The rulesets are identified by their id by the ruleset matcher
+        assert packed_rulesets["cpu_load"] is packed_rulesets["cpu_load"]
+
+        assert packed_config == {"abc": 1, "checkgroup_parameters": rulesets}
+        assert pickle.loads(pickle.dumps(packed_rulesets)) == rulesets
+
+    def test_read_invalid_file(self, store: config.PackedConfigStore) -> None:
+        store.path.parent.mkdir(parents=True, exist_ok=True)
+        store.path.write_bytes(pickle.dumps({"abc": 1}))
+        with pytest.raises(MKGeneralException):
+            store.read()
+
 
 def test__extract_check_plugins(monkeypatch: MonkeyPatch) -> None:
     duplicate_plugin = {
@@ -20,17 +20,21 @@ from pytest import MonkeyPatch
 
 from tests.testlib.base import Scenario
 
-from cmk.utils import paths
+from cmk.utils import ip_lookup, paths
 from cmk.utils.config_path import VersionedConfigPath
 from cmk.utils.hostaddress import HostAddress, HostName
+from cmk.utils.licensing.cre_handler import CRELicensingHandler
+from cmk.utils.notify import NotificationHostConfig
 
 from cmk.checkengine.checking import CheckPluginName
 from cmk.checkengine.discovery import AutocheckEntry
 
 from cmk.base import config, core_nagios, server_side_calls
+from cmk.base.core_nagios import _create_config
 
 import cmk.ccc.debug
 import cmk.ccc.version as cmk_version
+from cmk.ccc.exceptions import MKIPAddressLookupError
 from cmk.discover_plugins import PluginLocation
 from cmk.server_side_calls.v1 import ActiveCheckCommand, ActiveCheckConfig
 
@@ -854,3 +858,136 @@ def test_create_nagios_config_commands(
 
     assert license_counter["services"] == 1
     assert outfile.getvalue() == expected_result
+
+
+def test_create_config_with_forked_workers(monkeypatch: MonkeyPatch) -> None:
+    hostnames = [HostName(f"host{n}") for n in range(7)]
+    ts = Scenario()
+    for hostname in hostnames:
+        ts.add_host(hostname)
+    ts.set_ruleset(
+        "host_check_commands",
+        [
+            {
+                "id": "01",
+                "condition": {"host_name": ["host1", "host2", "host5"]},
+                "value": ("service", "Check_MK"),
+            },
+        ],
+    )
+    config_cache = ts.apply(monkeypatch)
+
+    def lookup_ip_address(
+        _config_cache: config.ConfigCache, host_name: HostName, **_kwargs: object
+    ) -> HostAddress:
+        if host_name == "host3":
+            raise MKIPAddressLookupError("no such host")
+        return HostAddress("127.0.0.1")
+
+    monkeypatch.setattr(config, "lookup_ip_address", lookup_ip_address)
+    monkeypatch.setattr(config, "get_resource_macros", lambda *_: {})
+
+    def create_config(workers: int) -> tuple[str, Mapping[HostName, Exception]]:
+        monkeypatch.setattr(config, "core_config_generation_workers", workers)
+        error_handler = ip_lookup.CollectFailedHosts()
+        outfile = io.StringIO()
+        core_nagios.create_config(
+            outfile,
+            VersionedConfigPath(42),
+            config_cache,
+            hostnames=hostnames,
+            licensing_handler=CRELicensingHandler(),
+            passwords={},
+            ip_address_of=config.ConfiguredIPLookup(config_cache, error_handler=error_handler),
+        )
+        return outfile.getvalue(), error_handler.failed_ip_lookups
+
+    serial_config, serial_failures = create_config(1)
+    forked_config, forked_failures = create_config(3)
+
+    assert "check-mk-host-custom-3" in serial_config
+    assert "\0" not in forked_config
+    assert forked_config == serial_config
+    assert list(forked_failures) == list(serial_failures) == [HostName("host3")]
+
+
+def test_create_config_for_changed_hosts(monkeypatch: MonkeyPatch) -> None:
+    hostnames = [HostName(f"host{n}") for n in range(5)]
+
+    def apply_scenario(alias: str) -> config.ConfigCache:
+        ts = Scenario()
+        for hostname in hostnames:
+            ts.add_host(hostname)
+        ts.set_option(
+            "extra_host_conf",
+            {"alias": [{"id": "01", "condition": {"host_name": ["host2"]}, "value": alias}]},
+        )
+        ts.set_ruleset(
+            "host_check_commands",
+            [
+                {
+                    "id": "02",
+                    "condition": {"host_name": ["host1", "host2", "host4"]},
+                    "value": ("service", "Check_MK"),
+                },
+            ],
+        )
+        return ts.apply(monkeypatch)
+
+    def lookup_ip_address(
+        _config_cache: config.ConfigCache, host_name: HostName, **_kwargs: object
+    ) -> HostAddress:
+        if host_name == "host3":
+            raise MKIPAddressLookupError("no such host")
+        return HostAddress("127.0.0.1")
+
+    monkeypatch.setattr(config, "lookup_ip_address", lookup_ip_address)
+    monkeypatch.setattr(config, "get_resource_macros", lambda *_: {})
+
+    created_hosts: list[HostName] = []
+    create_nagios_config_host = _create_config._create_nagios_config_host
+
+    def create_nagios_config_host_tracked(
+        cfg: core_nagios.NagiosConfig,
+        config_cache: config.ConfigCache,
+        hostname: HostName,
+        *args: Any,
+    ) -> NotificationHostConfig:
+        created_hosts.append(hostname)
+        return create_nagios_config_host(cfg, config_cache, hostname, *args)
+
+    monkeypatch.setattr(
+        _create_config, "_create_nagios_config_host", create_nagios_config_host_tracked
+    )
+
+    def create_config(
+        config_cache: config.ConfigCache, hosts_to_update: set[HostName] | None
+    ) -> str:
+        created_hosts.clear()
+        outfile = io.StringIO()
+        core_nagios.create_config(
+            outfile,
+            VersionedConfigPath(42),
+            config_cache,
+            hostnames=hostnames,
+            licensing_handler=CRELicensingHandler(),
+            passwords={},
+            ip_address_of=config.ConfiguredIPLookup(
+                config_cache, error_handler=ip_lookup.CollectFailedHosts()
+            ),
+            hosts_to_update=hosts_to_update,
+        )
+        return outfile.getvalue()
+
+    create_config(apply_scenario("old alias"), None)
+    assert created_hosts == hostnames
+
+    config_cache = apply_scenario("new alias")
+    incremental_config = create_config(config_cache, {HostName("host2")})
+    # The objects of host3 are not kept, as its IP address lookup failed
+    assert created_hosts == [HostName("host2"), HostName("host3")]
+
+    full_config = create_config(config_cache, None)
+    assert created_hosts == hostnames
+    assert "new alias" in full_config
+    assert incremental_config == full_config
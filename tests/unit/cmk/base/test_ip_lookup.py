@@ -4,7 +4,9 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import socket
-from collections.abc import Mapping
+import threading
+import time
+from collections.abc import Callable, Mapping
 from pathlib import Path
 from typing import TypeAlias
 
@@ -315,6 +317,55 @@ class TestIPLookupCache:
         new_cache_instance.load_persisted()
         assert new_cache_instance[cache_id1] == HostAddress("0.0.0.0")
 
+    def test_update_appends_to_journal(self, tmp_path: Path) -> None:
+        cache_id1 = HostName("host1"), socket.AF_INET
+        cache_id2 = HostName("host2"), socket.AF_INET6
+        ip_lookup.IPLookupCache({cache_id1: HostAddress("1")}).save_persisted()
+        persisted = ip_lookup.IPLookupCache.PATH.read_bytes()
+
+        ip_lookup.IPLookupCache({})[cache_id1] = HostAddress("127.0.0.1")
+        ip_lookup.IPLookupCache({})[cache_id2] = HostAddress("::1")
+
+        assert ip_lookup.IPLookupCache.PATH.read_bytes() == persisted
+        new_cache_instance = ip_lookup.IPLookupCache({})
+        new_cache_instance.load_persisted()
+        assert new_cache_instance == {
+            cache_id1: HostAddress("127.0.0.1"),
+            cache_id2: HostAddress("::1"),
+        }
+
+    def test_update_compacts_journal(self, tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(ip_lookup.IPLookupCache, "JOURNAL_COMPACTION_SIZE", 64)
+        journal = ip_lookup.IPLookupCache.PATH.with_name(
+            f"{ip_lookup.IPLookupCache.PATH.name}.journal"
+        )
+        other_process = ip_lookup.IPLookupCache({})
+        other_process[(HostName("other"), socket.AF_INET)] = HostAddress("127.0.0.2")
+
+        ip_lookup_cache = ip_lookup.IPLookupCache({})
+        for n in range(5):
+            ip_lookup_cache[(HostName(f"host{n}"), socket.AF_INET)] = HostAddress(f"10.0.0.{n}")
+
+        assert journal.stat().st_size < 64
+        persisted = ip_lookup.IPLookupCacheSerializer().deserialize(
+            ip_lookup.IPLookupCache.PATH.read_bytes()
+        )
+        assert persisted[(HostName("other"), socket.AF_INET)] == HostAddress("127.0.0.2")
+        assert ip_lookup_cache[(HostName("other"), socket.AF_INET)] == HostAddress("127.0.0.2")
+
+        new_cache_instance = ip_lookup.IPLookupCache({})
+        new_cache_instance.load_persisted()
+        assert len(new_cache_instance) == 6
+
+    def test_load_ignores_partial_journal_line(self, tmp_path: Path) -> None:
+        ip_lookup.IPLookupCache.PATH.with_name(
+            f"{ip_lookup.IPLookupCache.PATH.name}.journal"
+        ).write_text("4 host1 127.0.0.1\n6 host1 ::")
+
+        cache = ip_lookup.IPLookupCache({})
+        cache.load_persisted()
+        assert cache == {(HostName("host1"), socket.AF_INET): HostAddress("127.0.0.1")}
+
     def test_load_legacy(self, tmp_path: Path) -> None:
         cache_id1 = HostName("host1"), socket.AF_INET
         cache_id2 = HostName("host2"), socket.AF_INET
@@ -407,6 +458,109 @@ def test_update_dns_cache(monkeypatch: MonkeyPatch) -> None:
     assert cache.get((HostName("dual"), socket.AF_INET6)) is None
 
 
+def _slow_getaddrinfo(
+    latency: float, hung: frozenset[str] = frozenset()
+) -> Callable[..., list[tuple[object, ...]]]:
+    """Stub resolver simulating a per-lookup latency (and hanging for some hosts)"""
+
+    def getaddrinfo(
+        host: str, port: object, family: socket.AddressFamily = socket.AF_INET, *args: object
+    ) -> list[tuple[object, ...]]:
+        time.sleep(10 * latency if host in hung else latency)
+        if family is not socket.AF_INET:
+            raise socket.gaierror("no IPv6")
+        return [(family, None, None, None, (f"10.0.0.{host.removeprefix('host')}", 0))]
+
+    return getaddrinfo
+
+
+def _ip_lookup_configs(count: int) -> list[ip_lookup.IPLookupConfig]:
+    return [
+        ip_lookup.IPLookupConfig(
+            hostname=HostName(f"host{n}"),
+            ip_stack_config=ip_lookup.IPStackConfig.IPv4,
+            is_snmp_host=False,
+            is_use_walk_host=False,
+            default_address_family=socket.AF_INET,
+            management_address=None,
+            is_dyndns_host=False,
+        )
+        for n in range(count)
+    ]
+
+
+def test_update_dns_cache_concurrent(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(socket, "getaddrinfo", _slow_getaddrinfo(0.0))
+    configs = _ip_lookup_configs(20)
+    configs.append(configs[3]._replace(ip_stack_config=ip_lookup.IPStackConfig.DUAL_STACK))
+
+    result = ip_lookup.update_dns_cache(
+        ip_lookup_configs=configs,
+        configured_ipv4_addresses={},
+        configured_ipv6_addresses={},
+        simulation_mode=False,
+        override_dns=None,
+        max_workers=8,
+    )
+
+    assert result == (20, [HostName("host3")])
+    cache = ip_lookup.IPLookupCache({})
+    cache.load_persisted()
+    assert cache == {
+        (HostName(f"host{n}"), socket.AF_INET): HostAddress(f"10.0.0.{n}") for n in range(20)
+    }
+
+
+def test_update_dns_cache_lookup_timeout(monkeypatch: MonkeyPatch) -> None:
+    resolving_threads: list[threading.Thread] = []
+
+    def getaddrinfo(host: str, *args: object) -> list[tuple[object, ...]]:
+        resolving_threads.append(threading.current_thread())
+        return _slow_getaddrinfo(0.05, hung=frozenset({"host1"}))(host, *args)
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+
+    result = ip_lookup.update_dns_cache(
+        ip_lookup_configs=_ip_lookup_configs(3),
+        configured_ipv4_addresses={},
+        configured_ipv6_addresses={},
+        simulation_mode=False,
+        override_dns=None,
+        max_workers=3,
+        lookup_timeout=0.2,
+    )
+
+    assert result[1] == [HostName("host1")]
+    # The abandoned lookup of host1 must not keep the process alive.
+    assert resolving_threads and all(thread.daemon for thread in resolving_threads)
+
+
+def test_update_dns_cache_resolves_concurrently(monkeypatch: MonkeyPatch) -> None:
+    hosts, max_workers = 50, 10
+    # Every lookup waits for max_workers - 1 others, so this only works if they run at once.
+    barrier = threading.Barrier(max_workers)
+    calls: list[str] = []
+
+    def getaddrinfo(
+        host: str, port: object, family: socket.AddressFamily = socket.AF_INET, *args: object
+    ) -> list[tuple[object, ...]]:
+        calls.append(host)
+        barrier.wait(timeout=5)
+        return [(family, None, None, None, (f"10.0.0.{host.removeprefix('host')}", 0))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+
+    assert ip_lookup.update_dns_cache(
+        ip_lookup_configs=_ip_lookup_configs(hosts),
+        configured_ipv4_addresses={},
+        configured_ipv6_addresses={},
+        simulation_mode=False,
+        override_dns=None,
+        max_workers=max_workers,
+    ) == (hosts, [])
+    assert sorted(calls) == sorted(f"host{n}" for n in range(hosts))
+
+
 @pytest.mark.parametrize(
     "hostname_str, tags, result_address",
     [
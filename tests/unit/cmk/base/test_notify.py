@@ -4,15 +4,23 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import os
+import sys
+import threading
+import time
+from collections import Counter
 from collections.abc import Mapping
+from functools import partial
+from pathlib import Path
 from typing import Final
 
 import pytest
 from pytest import MonkeyPatch
 
+import cmk.utils.paths
 from cmk.utils.notify_types import (
     Contact,
     ContactName,
+    CustomPluginName,
     EnrichedEventContext,
     EventContext,
     NotificationContext,
@@ -129,3 +137,123 @@ def test_rbn_groups_contacts(user_groups: Mapping[ContactName, list[str]]) -> No
         "dong",
         "harry",
     }
+
+
+def _write_notification_plugin(
+    monkeypatch: MonkeyPatch, tmp_path: Path, name: str, source: str
+) -> None:
+    plugin_dir = tmp_path / "notifications"
+    plugin_dir.mkdir(exist_ok=True)
+    plugin = plugin_dir / name
+    plugin.write_text(f"#!{sys.executable}\n{source}")
+    plugin.chmod(0o755)
+    monkeypatch.setattr(cmk.utils.paths, "local_notifications_dir", plugin_dir)
+    monkeypatch.setattr(notify, "log_to_history", lambda message: None)
+
+
+def test_notification_plugin_pool_calls_plugins_concurrently(
+    monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    # Each call sleeps until all calls have been started. Called one after the other, the
+    # first one would give up and no call would be done.
+    _write_notification_plugin(
+        monkeypatch,
+        tmp_path,
+        "wait_for_peers",
+        """import os, pathlib, time
+spool = pathlib.Path(os.environ["NOTIFY_SPOOL"])
+(spool / ("started-" + os.environ["NOTIFY_CONTACTNAME"])).touch()
+for _ in range(200):
+    if len(list(spool.glob("started-*"))) == 3:
+        (spool / ("done-" + os.environ["NOTIFY_CONTACTNAME"])).touch()
+        break
+    time.sleep(0.05)
+""",
+    )
+    spool = tmp_path / "spool"
+    spool.mkdir()
+
+    pool = notify.NotificationPluginPool(max_workers=3, max_calls_per_plugin=3)
+    for contact in ("alice", "bob", "carol"):
+        notify._call_notification_script_in_pool(
+            pool,
+            CustomPluginName("wait_for_peers"),
+            NotificationContext(
+                {
+                    "CONTACTNAME": contact,
+                    "HOSTNAME": "heute",
+                    "HOSTSTATE": "DOWN",
+                    "HOSTOUTPUT": "",
+                    "SPOOL": str(spool),
+                }
+            ),
+            plugin_timeout=60,
+        )
+    pool.join()
+
+    assert sorted(p.name for p in spool.glob("done-*")) == ["done-alice", "done-bob", "done-carol"]
+
+
+def test_notification_plugin_pool_limits_calls_and_keeps_order() -> None:
+    lock = threading.Lock()
+    running: Counter[str] = Counter()
+    max_running: Counter[str] = Counter()
+    done: list[tuple[str, str, int]] = []
+
+    def call(plugin_name: str, contact: str, nr: int) -> None:
+        with lock:
+            running[plugin_name] += 1
+            max_running[plugin_name] = max(max_running[plugin_name], running[plugin_name])
+        time.sleep(0.001)
+        with lock:
+            running[plugin_name] -= 1
+            done.append((plugin_name, contact, nr))
+
+    pool = notify.NotificationPluginPool(max_workers=4, max_calls_per_plugin=2)
+    for nr in range(5):
+        for plugin_name in (CustomPluginName("mail"), CustomPluginName("slack")):
+            for contact in ("alice", "bob", "carol"):
+                pool.submit(
+                    plugin_name,
+                    NotificationContext({"CONTACTNAME": contact, "HOSTNAME": "heute"}),
+                    partial(call, plugin_name, contact, nr),
+                )
+    pool.join()
+
+    assert len(done) == 30
+    assert max(max_running.values()) <= 2
+    for name in ("mail", "slack"):
+        for contact in ("alice", "bob", "carol"):
+            assert [n for p, c, n in done if (p, c) == (name, contact)] == list(range(5))
+
+
+def test_call_notification_script_timeout_in_thread(
+    monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    _write_notification_plugin(
+        monkeypatch,
+        tmp_path,
+        "sleep",
+        "import time\nprint('sleeping', flush=True)\ntime.sleep(60)\n",
+    )
+    exitcodes: list[int] = []
+    thread = threading.Thread(
+        target=lambda: exitcodes.append(
+            notify.call_notification_script(
+                CustomPluginName("sleep"),
+                NotificationContext(
+                    {
+                        "CONTACTNAME": "alice",
+                        "HOSTNAME": "heute",
+                        "HOSTSTATE": "DOWN",
+                        "HOSTOUTPUT": "",
+                    }
+                ),
+                plugin_timeout=0,
+            )
+        )
+    )
+    thread.start()
+    thread.join()
+
+    assert exitcodes == [1]
@@ -9,6 +9,7 @@ import copy
 import itertools
 import logging
 import time
+import tracemalloc
 from collections import defaultdict
 from collections.abc import Sequence
 from pathlib import Path
@@ -731,6 +732,63 @@ class TestAgentParser:
         }
         assert store.load() == {}
 
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+    def test_parse_chunks(
+        self, parser: AgentParser, monkeypatch: pytest.MonkeyPatch, chunk_size: int
+    ) -> None:
+        monkeypatch.setattr(time, "time", lambda: 1000)
+        raw_data = AgentRawData(
+            b"<<<section>>>\r\n"
+            b"first line\r\n"
+            b"\n"
+            b"<<<other:sep(44)>>>\n"
+            b"a,b\r\r\n"
+            b"<<<<piggybacked>>>>\n"
+            b"<<<section>>>\n"
+            b"piggybacked line\n"
+            b"<<<<>>>>\n"
+            b"<<<section>>>\n"
+            b"last line without newline"
+        )
+        chunks = [raw_data[n : n + chunk_size] for n in range(0, len(raw_data), chunk_size)]
+
+        expected = parser.parse(raw_data, selection=NO_SELECTION)
+        parsed = parser.parse_chunks(iter(chunks), selection=NO_SELECTION)
+
+        assert (
+            parsed.sections
+            == expected.sections
+            == {
+                SectionName("section"): [["first", "line"], ["last", "line", "without", "newline"]],
+                SectionName("other"): [["a", "b"]],
+            }
+        )
+        assert parsed.piggybacked_raw_data == expected.piggybacked_raw_data
+        assert parsed.cache_info == expected.cache_info
+
+    def test_deselected_sections_are_not_kept(self, parser: AgentParser) -> None:
+        lines = b"".join(b"line %d of a large section\n" % n for n in range(100000))
+        raw_data = AgentRawData(
+            b"<<<deselected>>>\n"
+            + lines
+            + b"<<<<piggybacked>>>>\n<<<deselected>>>\n"
+            + lines
+            + b"<<<<>>>>\n<<<selected>>>\nsmall section\n"
+        )
+
+        size = len(raw_data)
+        tracemalloc.start()
+        try:
+            ahs = parser.parse(raw_data, selection=frozenset({SectionName("selected")}))
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert ahs.sections == {SectionName("selected"): [["small", "section"]]}
+        assert ahs.piggybacked_raw_data == {"piggybacked": []}
+        # Neither the lines of the deselected sections nor a split copy of the data are kept.
+        assert peak < size // 10
+
 
 class ParserStateAdapter(ParserState):
     def __init__(self, *, translation: TranslationOptions | None = None):
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import pickle
+import time
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.sectionname import SectionName
+
+from cmk.checkengine.parser import SectionStore
+
+StringTable = list[list[str]]
+
+_SECTION_A = SectionName("section_a")
+_SECTION_B = SectionName("section_b")
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path: Path) -> SectionStore[StringTable]:
+    return SectionStore[StringTable](tmp_path / "persisted", logger=logging.getLogger("test"))
+
+
+def _corrupt_contents(store: SectionStore[StringTable]) -> None:
+    """Make every pickled content unreadable, keeping its size"""
+    data = store.path.read_bytes()
+    store.path.write_bytes(data.replace(b"first line", b"XXXXXXXXXX"))
+
+
+def test_store_and_load(store: SectionStore[StringTable]) -> None:
+    sections = {
+        _SECTION_A: (1000, 1050, [["first line"]]),
+        _SECTION_B: (1000, 1100, [["second", "line"]]),
+    }
+    store.store(sections)
+    assert store.load() == sections
+
+    store.store({})
+    assert not store.path.exists()
+    assert not store.load()
+
+
+def test_load_older_format(store: SectionStore[StringTable]) -> None:
+    store.path.write_bytes(pickle.dumps({"section_a": (1000, 1050, [["first line"]])}))
+    assert store.load() == {_SECTION_A: (1000, 1050, [["first line"]])}
+
+
+def test_update_does_not_unpickle_sections_with_live_data(
+    store: SectionStore[StringTable],
+) -> None:
+    store.store(
+        {
+            _SECTION_A: (1000, 1050, [["first line"]]),
+            _SECTION_B: (1000, 1050, [["first line"]]),
+        }
+    )
+    _corrupt_contents(store)
+
+    cache_info: dict[SectionName, tuple[int, int]] = {}
+    sections = store.update(
+        {_SECTION_A: [["new"]], _SECTION_B: [["new"]]},
+        cache_info,
+        lambda section_name: (1010, 1060),
+        lambda valid_until, now: valid_until < now,
+        now=1010,
+        keep_outdated=False,
+    )
+
+    assert sections == {_SECTION_A: [["new"]], _SECTION_B: [["new"]]}
+    assert not cache_info
+    assert store.load() == {
+        _SECTION_A: (1010, 1060, [["new"]]),
+        _SECTION_B: (1010, 1060, [["new"]]),
+    }
+
+
+def test_unchanged_sections_are_stored_as_they_are(store: SectionStore[StringTable]) -> None:
+    store.store(
+        {
+            _SECTION_A: (1000, 1050, [["first line"]]),
+            _SECTION_B: (1000, 1100, [["first line"]]),
+        }
+    )
+    _corrupt_contents(store)
+
+    persisted = store.load()
+    del persisted[_SECTION_A]
+    persisted[SectionName("section_c")] = (1060, 1100, [["new"]])
+    store.store(persisted)
+
+    persisted = store.load()
+    assert list(persisted) == [_SECTION_B, SectionName("section_c")]
+    assert persisted[SectionName("section_c")] == (1060, 1100, [["new"]])
+    assert b"XXXXXXXXXX" in store.path.read_bytes()
+
+
+def test_update_with_large_persisted_sections(store: SectionStore[StringTable]) -> None:
+    store.store(
+        {
+            SectionName(f"section_{n}"): (1000, 2000, [[f"line {i}", "value"] for i in range(2000)])
+            for n in range(50)
+        }
+    )
+
+    start = time.perf_counter()
+    for now in range(1000, 1020):
+        persist_info = (now, 2000)
+        sections = store.update(
+            {SectionName(f"section_{n}"): [["live"]] for n in range(1, 50)},
+            {},
+            lambda section_name: persist_info,
+            lambda valid_until, now: valid_until < now,
+            now=now,
+            keep_outdated=False,
+        )
+    elapsed = time.perf_counter() - start
+
+    assert len(sections[SectionName("section_0")]) == 2000
+    assert elapsed < 5
@@ -10,6 +10,7 @@ import shlex
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+import pytest
 import time_machine
 
 from cmk.utils.hostaddress import HostName
@@ -21,10 +22,12 @@ from cmk.ec.history_file import (
     _grep_pipeline,
     convert_history_line,
     FileHistory,
+    HistoryIndex,
     parse_history_file,
 )
-from cmk.ec.main import StatusTableHistory
+from cmk.ec.main import create_history, StatusTableEvents, StatusTableHistory
 from cmk.ec.query import QueryFilter, QueryGET, StatusTable
+from cmk.ec.settings import Settings
 
 
 def test_file_add_get(history: FileHistory) -> None:
@@ -56,6 +59,118 @@ def test_file_add_get(history: FileHistory) -> None:
     assert row[column_index("event_host")] == "ABC1"
 
 
+def _file_history(settings: Settings, config: Config, *, indexed: bool) -> FileHistory:
+    history = create_history(
+        settings,
+        config | {"archive_mode": "file", "history_file_index": indexed},
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+    )
+    assert isinstance(history, FileHistory)
+    return history
+
+
+def _query(history: FileHistory, *lines: str) -> QueryGET:
+    logger = logging.getLogger("cmk.mkeventd")
+
+    def get_table(name: str) -> StatusTable:
+        assert name == "history"
+        return StatusTableHistory(logger, history)
+
+    return QueryGET(get_table, ["GET history", *lines], logger)
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        pytest.param([], id="unfiltered"),
+        pytest.param(["Filter: event_host = ABC1"], id="host"),
+        pytest.param(["Filter: event_host in ABC1 ABC3"], id="host in"),
+        pytest.param(["Filter: event_id = 2", "Filter: history_what = NEW"], id="id and what"),
+        pytest.param(["Filter: event_text ~ text 2"], id="not indexed"),
+        pytest.param(["Filter: event_host = ABC1", "Limit: 2"], id="limit"),
+        pytest.param(["Filter: history_time < 0"], id="time"),
+        pytest.param(["Filter: event_host in abc1 Abc2"], id="host in ignores case"),
+    ],
+)
+def test_file_get_indexed(settings: Settings, config: Config, filters: list[str]) -> None:
+    history = _file_history(settings, config, indexed=True)
+    for n in range(6):
+        event = ec.Event(id=n % 3, host=HostName(f"ABC{n % 3}"), text=f"Event text {n}")
+        history.add(event=event, what="NEW" if n < 3 else "DELETE")
+
+    index = HistoryIndex(next(settings.paths.history_dir.value.glob("*.log")))
+    assert len(index.load() or ()) == 6
+
+    query = _query(history, *filters)
+    assert history.get(query) == list(_file_history(settings, config, indexed=False).get(query))
+
+
+@pytest.mark.parametrize("operator", [">", "<", ">=", "<="])
+def test_file_get_indexed_by_time_fraction(
+    settings: Settings, config: Config, operator: str
+) -> None:
+    history = _file_history(settings, config, indexed=True)
+    for n, timestamp in enumerate([1699999999.75, 1700000000.5, 1700000001.5, 1700000002.25]):
+        with time_machine.travel(timestamp, tick=False):
+            history.add(event=ec.Event(id=n, host=HostName("ABC"), text="Event text"), what="NEW")
+
+    # Lines within one second of the filter value must not be dropped.
+    query = _query(history, f"Filter: history_time {operator} 1700000001")
+    expected = list(_file_history(settings, config, indexed=False).get(query))
+    assert len(expected) == 2
+    assert history.get(query) == expected
+
+
+def test_file_index_is_rebuilt(settings: Settings, config: Config) -> None:
+    unindexed = _file_history(settings, config, indexed=False)
+    unindexed.add(event=ec.Event(id=1, host=HostName("ABC1"), text="Event1 text"), what="NEW")
+    unindexed.add(event=ec.Event(id=2, host=HostName("ABC2"), text="Event2 text"), what="NEW")
+    (path,) = settings.paths.history_dir.value.glob("*.log")
+    assert HistoryIndex(path).load() is None
+
+    history = _file_history(settings, config, indexed=True)
+    history.add(event=ec.Event(id=3, host=HostName("ABC1"), text="Event3 text"), what="NEW")
+    assert HistoryIndex(path).load() is None  # does not cover the first two lines
+
+    # Searched without the index while it is built in the background
+    (row,) = history.get(_query(history, "Filter: event_host = ABC2"))
+    assert row[0] == 2  # history_line
+    history.close()
+    assert len(HistoryIndex(path).load() or ()) == 3
+
+    history.add(event=ec.Event(id=4, host=HostName("ABC2"), text="Event4 text"), what="NEW")
+    assert len(HistoryIndex(path).load() or ()) == 4
+
+
+def test_file_index_rebuild_covers_lines_added_meanwhile(
+    settings: Settings, config: Config
+) -> None:
+    history = _file_history(settings, config, indexed=False)
+    history.add(event=ec.Event(id=1, host=HostName("ABC1"), text="Event1 text"), what="NEW")
+    (path,) = settings.paths.history_dir.value.glob("*.log")
+    line = path.read_bytes()
+
+    class AppendingLock:
+        """Appends a line the moment the rebuild takes the lock, like add() before it"""
+
+        def __enter__(self) -> None:
+            with path.open(mode="ab") as f:
+                f.write(line)
+
+        def __exit__(self, *exc_info: object) -> None:
+            pass
+
+    HistoryIndex(path).rebuild(AppendingLock())
+
+    records = HistoryIndex(path).load()
+    assert records is not None
+    assert [end for _time, _id, _host, end in records] == [len(line), 2 * len(line)]
+    # No temporary file is left behind
+    assert {p.name for p in path.parent.iterdir()} == {path.name, f"{path.stem}.idx"}
+
+
 def test_current_history_period(config: Config) -> None:
     """timestamp of the beginning of the current history period correctly returned."""
     with time_machine.travel(datetime.datetime.fromtimestamp(1550000000.0, tz=ZoneInfo("CET"))):
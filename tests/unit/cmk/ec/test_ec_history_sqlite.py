@@ -5,16 +5,27 @@
 """EC History sqlite backend"""
 
 import logging
+import os
 import sqlite3
+import threading
+import time
 from collections.abc import Iterator
+from pathlib import Path
 
 import pytest
 
 from cmk.utils.hostaddress import HostName
 
 import cmk.ec.export as ec
-from cmk.ec.history_sqlite import filters_to_sqlite_query, SQLiteHistory
-from cmk.ec.main import StatusTableHistory
+from cmk.ec.config import Config
+from cmk.ec.event import create_event_from_syslog_message
+from cmk.ec.history_sqlite import (
+    filters_to_sqlite_query,
+    MAX_BATCH_SIZE,
+    SQLiteHistory,
+    SQLiteSettings,
+)
+from cmk.ec.main import StatusTableEvents, StatusTableHistory
 from cmk.ec.query import QueryFilter, QueryGET, StatusTable
 
 
@@ -208,6 +219,7 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
     event2 = ec.Event(host=HostName("ABC2"), text="Event2 text", core_host=HostName("ABC"))
     history_sqlite.add(event=event1, what="NEW")
     history_sqlite.add(event=event2, what="NEW")
+    history_sqlite.write_queued_entries()
 
     with history_sqlite.conn as connection:
         cur = connection.cursor()
@@ -218,3 +230,106 @@ def test_housekeeping(history_sqlite: SQLiteHistory) -> None:
         history_sqlite.housekeeping()
         cur.execute("SELECT count(*) FROM history;")
         assert cur.fetchone()["count(*)"] == 1
+
+
+def _count_rows(history: SQLiteHistory) -> int:
+    with history.conn as connection:
+        return int(connection.execute("SELECT count(*) FROM history;").fetchone()[0])
+
+
+def test_add_is_written_in_background(history_sqlite: SQLiteHistory) -> None:
+    history_sqlite.add(event=ec.Event(host=HostName("ABC1"), text="Event1 text"), what="NEW")
+    assert history_sqlite.get_status()[0] == 1
+
+    for _retry in range(100):
+        if history_sqlite.get_status()[0] == 0:
+            break
+        time.sleep(0.05)
+
+    assert history_sqlite.get_status()[0] == 0
+    history_sqlite.write_queued_entries()
+    assert _count_rows(history_sqlite) == 1
+
+
+def test_add_restarts_writer_after_fork(history_sqlite: SQLiteHistory) -> None:
+    if (pid := os.fork()) == 0:
+        history_sqlite.add(event=ec.Event(host=HostName("ABC1"), text="Event1 text"), what="NEW")
+        for _retry in range(100):
+            if history_sqlite.get_status()[0] == 0:
+                os._exit(0)
+            time.sleep(0.05)
+        os._exit(1)
+    assert os.waitpid(pid, 0)[1] == 0
+
+
+def _syslog_stream(count: int) -> Iterator[bytes]:
+    for n in range(count):
+        yield (
+            f"<{n % 192}>Oct 17 04:53:{n % 60:02} host{n % 500} sshd[{n}]: "
+            f"Failed password for invalid user user{n % 17} from 10.0.{n % 256}.1 port 22"
+        ).encode()
+
+
+def test_add_drops_entries_beyond_queue_limit(
+    history_sqlite: SQLiteHistory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("cmk.ec.history_sqlite.MAX_PENDING_ENTRIES", 5)
+    with history_sqlite._lock:  # The writer thread cannot write meanwhile.
+        for n in range(8):
+            history_sqlite.add(event=ec.Event(host=HostName("ABC1"), text=f"{n}"), what="NEW")
+        queue_length, _flush_time, dropped = history_sqlite.get_status()
+    assert (queue_length, dropped) == (5, 3)
+
+    history_sqlite.write_queued_entries()
+    assert _count_rows(history_sqlite) == 5
+
+
+def test_failed_write_keeps_entries(history_sqlite: SQLiteHistory) -> None:
+    with history_sqlite._lock:
+        with history_sqlite.conn as connection:
+            connection.execute(
+                "CREATE TEMP TRIGGER fail BEFORE INSERT ON history"
+                " BEGIN SELECT RAISE(ABORT, 'disk full'); END;"
+            )
+        history_sqlite.add(event=ec.Event(host=HostName("ABC1"), text="Event1 text"), what="NEW")
+        with pytest.raises(sqlite3.IntegrityError):
+            history_sqlite.write_queued_entries()
+        assert history_sqlite.get_status()[0] == 1
+
+        with history_sqlite.conn as connection:
+            connection.execute("DROP TRIGGER fail;")
+        history_sqlite.write_queued_entries()
+    assert history_sqlite.get_status()[0] == 0
+    assert _count_rows(history_sqlite) == 1
+
+
+def test_load_replay_syslog_stream(tmp_path: Path, settings: ec.Settings, config: Config) -> None:
+    """Replay a syslog flood: add() must not wait for the database"""
+    events = [
+        create_event_from_syslog_message(message, ("10.0.0.1", 514), None)
+        for message in _syslog_stream(5 * MAX_BATCH_SIZE)
+    ]
+    history = SQLiteHistory(
+        SQLiteSettings.from_settings(settings, database=tmp_path / "history.sqlite"),
+        config | {"archive_mode": "sqlite"},
+        logging.getLogger("cmk.mkeventd"),
+        StatusTableEvents.columns,
+        StatusTableHistory.columns,
+    )
+    statements: list[tuple[threading.Thread, str]] = []
+    history.conn.set_trace_callback(
+        lambda statement: statements.append((threading.current_thread(), statement))
+    )
+    try:
+        for event in events:
+            history.add(event=event, what="NEW")
+        assert not [s for thread, s in statements if thread is threading.current_thread()]
+
+        history.write_queued_entries()
+        assert _count_rows(history) == len(events)
+    finally:
+        history.close()
+
+    # The entries are written in a few transactions, not in one per entry.
+    transactions = [s for _thread, s in statements if s.startswith("BEGIN")]
+    assert 0 < len(transactions) < len(events) / 100
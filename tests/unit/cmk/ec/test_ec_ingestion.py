@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import logging
+import select
+import socket
+import time
+from collections.abc import Iterator
+
+import pytest
+
+import cmk.ec.export as ec
+from cmk.ec.config import Config, ServiceLevel
+from cmk.ec.event import create_event_from_syslog_message
+from cmk.ec.helpers import ECLock
+from cmk.ec.history_file import FileHistory
+from cmk.ec.ingestion import bind_reuse_port, IngestBatch, SyslogReceiver
+from cmk.ec.main import (
+    EventServer,
+    EventStatus,
+    replication_update_state,
+    SlaveStatus,
+    StatusTableEvents,
+)
+from cmk.ec.perfcounters import Perfcounters
+from cmk.ec.settings import PortNumber
+
+
+def _rule(rule: ec.Rule) -> ec.Rule:
+    return (
+        ec.Rule(
+            actions=[],
+            autodelete=False,
+            cancel_actions=[],
+            description="",
+            disabled=False,
+            docu_url="",
+            sl=ServiceLevel(precedence="message", value=0),
+            state=0,
+        )
+        | rule
+    )
+
+
+RULES = [
+    _rule(ec.Rule(id="skip_debug", drop="skip_pack", match="debug")),
+    _rule(ec.Rule(id="disk_full", match="disk full", state=2)),
+    _rule(ec.Rule(id="disk_ok", match="disk ok", drop=True)),
+]
+
+
+@pytest.fixture(name="rules_event_server")
+def fixture_rules_event_server(event_server: EventServer, config: Config) -> EventServer:
+    event_server.reload_configuration(
+        config | {"rule_packs": [ec.default_rule_pack(RULES)]}, event_server._history
+    )
+    return event_server
+
+
+def _event(text: str) -> ec.Event:
+    return create_event_from_syslog_message(
+        f"<11>Oct 17 04:53:02 srv01 app[42]: {text}".encode(), ("10.0.0.1", 514), None
+    )
+
+
+def test_bind_reuse_port() -> None:
+    first = bind_reuse_port(socket.SOCK_DGRAM, 0)
+    second = bind_reuse_port(socket.SOCK_DGRAM, first.getsockname()[1])
+    assert first.getsockname()[1] == second.getsockname()[1]
+    first.close()
+    second.close()
+
+
+def test_syslog_receiver_udp() -> None:
+    with (
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp,
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender,
+    ):
+        udp.bind(("127.0.0.1", 0))
+        receiver = SyslogReceiver(udp=udp, tcp=None)
+        for n in range(3):
+            sender.sendto(b"message %d" % n, udp.getsockname())
+
+        readable = select.select(receiver.sockets(), [], [], 5)[0]
+        received = list(receiver.receive(readable))
+
+    assert [(what, messages) for what, _address, messages in received] == [
+        ("syslog socket (UDP)", [b"message 0"]),
+        ("syslog socket (UDP)", [b"message 1"]),
+        ("syslog socket (UDP)", [b"message 2"]),
+    ]
+
+
+def test_syslog_receiver_tcp() -> None:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as tcp:
+        tcp.bind(("127.0.0.1", 0))
+        tcp.listen(1)
+        receiver = SyslogReceiver(udp=None, tcp=tcp)
+        with socket.create_connection(tcp.getsockname()) as sender:
+            assert not list(receiver.receive(select.select(receiver.sockets(), [], [], 5)[0]))
+            sender.sendall(b"first\nsec")
+            received = list(receiver.receive(select.select(receiver.sockets(), [], [], 5)[0]))
+            sender.sendall(b"ond\n")
+            received += list(receiver.receive(select.select(receiver.sockets(), [], [], 5)[0]))
+
+        assert [messages for _what, _address, messages in received] == [[b"first"], [b"second"]]
+        assert not list(receiver.receive(select.select(receiver.sockets(), [], [], 5)[0]))
+        assert receiver.sockets() == [tcp]
+
+
+def test_ingested_events_are_processed_like_direct_ones(
+    rules_event_server: EventServer, event_status: EventStatus, perfcounters: Perfcounters
+) -> None:
+    ingested = [
+        rules_event_server.classify_ingested_event(_event(text))
+        for text in ("disk full on /var", "disk ok", "debug: disk full", "nothing to see")
+    ]
+    assert [i and [rule_id for rule_id, _result in i.hits] for i in ingested] == [
+        ["disk_full"],
+        ["disk_ok"],
+        ["skip_debug"],
+        None,
+    ]
+
+    rules_event_server.process_ingest_batch(
+        IngestBatch(
+            rules_event_server._rules_generation,
+            perfcounters.take_counts(),
+            rules_event_server.take_hash_stats(),
+            [i for i in ingested if i is not None],
+        )
+    )
+
+    assert [(e["rule_id"], e["text"], e["state"]) for e in event_status.events()] == [
+        ("disk_full", "disk full on /var", 2)
+    ]
+    assert event_status._rule_stats == {"disk_full": 1, "disk_ok": 1, "skip_debug": 1}
+    assert perfcounters._counters["messages"] == 4
+    assert perfcounters._counters["drops"] == 1
+    assert rules_event_server._hash_stats[1][3] == 4
+
+
+def test_ingested_events_of_older_rules_are_matched_again(
+    rules_event_server: EventServer, event_status: EventStatus, config: Config
+) -> None:
+    ingested = rules_event_server.classify_ingested_event(_event("disk full on /var"))
+    assert ingested is not None
+    batch = IngestBatch(rules_event_server._rules_generation, {}, {}, [ingested])
+
+    rules_event_server.reload_configuration(
+        config | {"rule_packs": [ec.default_rule_pack([_rule(ec.Rule(id="any", state=1))])]},
+        rules_event_server._history,
+    )
+    rules_event_server.process_ingest_batch(batch)
+
+    assert [(e["rule_id"], e["state"]) for e in event_status.events()] == [("any", 1)]
+
+
+def _ingesting_event_server(
+    settings: ec.Settings,
+    config: Config,
+    slave_status: SlaveStatus,
+    perfcounters: Perfcounters,
+    lock_configuration: ECLock,
+    history: FileHistory,
+    event_status: EventStatus,
+    workers: int,
+) -> EventServer:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    event_server = EventServer(
+        logging.getLogger("cmk.mkeventd.EventServer"),
+        settings._replace(
+            options=settings.options._replace(
+                syslog_udp=PortNumber(port), syslog_tcp=PortNumber(port), ingest_workers=workers
+            )
+        ),
+        config,
+        slave_status,
+        perfcounters,
+        lock_configuration,
+        history,
+        event_status,
+        StatusTableEvents.columns,
+        False,
+    )
+    event_server.compile_rules(event_server._config["rule_packs"])
+    event_server.start_ingest_workers()
+    return event_server
+
+
+@pytest.fixture(name="ingesting_event_server")
+def fixture_ingesting_event_server(
+    settings: ec.Settings,
+    config: Config,
+    slave_status: SlaveStatus,
+    perfcounters: Perfcounters,
+    lock_configuration: ECLock,
+    history: FileHistory,
+    event_status: EventStatus,
+) -> Iterator[EventServer]:
+    event_server = _ingesting_event_server(
+        settings,
+        config | {"rule_packs": [ec.default_rule_pack(RULES)]},
+        slave_status,
+        perfcounters,
+        lock_configuration,
+        history,
+        event_status,
+        workers=2,
+    )
+    yield event_server
+    event_server.stop_ingest_workers()
+
+
+def _port(event_server: EventServer) -> int:
+    port = event_server.settings.options.syslog_udp
+    assert isinstance(port, PortNumber)
+    return port.value
+
+
+def _receive_ingested(event_server: EventServer, message: bytes) -> IngestBatch:
+    """Send the message until a worker hands over an event for it"""
+    connections = event_server._ingest_workers.connections
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            sender.sendto(message, ("127.0.0.1", _port(event_server)))
+            for connection in select.select(connections, [], [], 0.5)[0]:
+                if (batch := event_server._ingest_workers.receive(connection)) and batch.events:
+                    return batch
+    raise AssertionError("no event from the ingestion workers")
+
+
+def test_ingest_workers(ingesting_event_server: EventServer, event_status: EventStatus) -> None:
+    assert len(ingesting_event_server._ingest_workers.connections) == 2
+
+    batch = _receive_ingested(
+        ingesting_event_server, b"<11>Oct 17 04:53:02 srv01 app[42]: disk full"
+    )
+    ingesting_event_server.process_ingest_batch(batch)
+
+    assert event_status.events()
+    assert {e["rule_id"] for e in event_status.events()} == {"disk_full"}
+    assert ingesting_event_server._hash_stats[1][3] >= 1
+
+    ingesting_event_server.stop_ingest_workers()
+    assert not ingesting_event_server._ingest_workers.connections
+
+
+def test_ingest_workers_get_replicated_rules(
+    ingesting_event_server: EventServer, settings: ec.Settings, event_status: EventStatus
+) -> None:
+    settings.paths.master_config_file.value.parent.mkdir(parents=True, exist_ok=True)
+    rule_packs = [ec.default_rule_pack([_rule(ec.Rule(id="any", state=1))])]
+    replication_update_state(
+        settings,
+        ingesting_event_server._config,
+        event_status,
+        ingesting_event_server,
+        {
+            "rules": [],
+            "rule_packs": rule_packs,
+            "actions": [],
+            "status": event_status.pack_status(),
+        },
+    )
+
+    # Each worker's batches for the old rules are matched again by the event server.
+    for _n in range(100):
+        batch = _receive_ingested(
+            ingesting_event_server, b"<11>Oct 17 04:53:02 srv01 app[42]: nothing to see"
+        )
+        if batch.rules_generation == ingesting_event_server._rules_generation:
+            break
+    assert [rule_id for rule_id, _result in batch.events[0].hits] == ["any"]
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_ingestion_is_shared_by_workers(  # pylint: disable=too-many-arguments
+    settings: ec.Settings,
+    config: Config,
+    slave_status: SlaveStatus,
+    perfcounters: Perfcounters,
+    lock_configuration: ECLock,
+    history: FileHistory,
+    event_status: EventStatus,
+    workers: int,
+) -> None:
+    """The kernel distributes the syslog connections over the workers' sockets"""
+    event_server = _ingesting_event_server(
+        settings,
+        config | {"rule_packs": [ec.default_rule_pack(RULES)]},
+        slave_status,
+        perfcounters,
+        lock_configuration,
+        history,
+        event_status,
+        workers=workers,
+    )
+    senders, count = 64, 20
+    messages = b"".join(
+        b"<11>Oct 17 04:53:02 srv01 app[42]: disk %d ok\n" % n for n in range(count)
+    )
+    received = dict.fromkeys(event_server._ingest_workers.connections, 0)
+    try:
+        for _n in range(senders):
+            with socket.create_connection(("127.0.0.1", _port(event_server))) as sender:
+                sender.sendall(messages)
+        while sum(received.values()) < senders * count:
+            readable = select.select(list(received), [], [], 10)[0]
+            assert readable, f"only {sum(received.values())} messages arrived"
+            for connection in readable:
+                batch = event_server._ingest_workers.receive(connection)
+                assert batch is not None
+                received[connection] += batch.counts.get("messages", 0)
+    finally:
+        event_server.stop_ingest_workers()
+
+    assert sum(received.values()) == senders * count
+    assert all(received.values()), received
@@ -23,6 +23,22 @@ def test_perfcounters_count() -> None:
     assert not [(k, v) for k, v in c._counters.items() if k != "messages" and v > 0]
 
 
+def test_perfcounters_take_and_add_counts() -> None:
+    worker = Perfcounters(logger)
+    worker.count("messages")
+    worker.count("messages")
+    worker.count("rule_tries")
+    counts = worker.take_counts()
+    assert counts == {"messages": 2, "rule_tries": 1}
+    assert worker.take_counts() == {}
+
+    c = Perfcounters(logger)
+    c.count("messages")
+    c.add_counts(counts)
+    assert c._counters["messages"] == 3
+    assert c._counters["rule_tries"] == 1
+
+
 def test_perfcounters_count_time() -> None:
     c = Perfcounters(logger)
     assert "processing" not in c._times
@@ -9,11 +9,15 @@ import re
 
 import pytest
 
+from tests.unit.cmk.ec.helpers import new_event
+
 from livestatus import SiteId
 
+from cmk.utils.hostaddress import HostName
+
 import cmk.ec.export as ec
 from cmk.ec.config import MatchGroups, TextMatchResult
-from cmk.ec.rule_matcher import compile_matching_value, MatchPriority
+from cmk.ec.rule_matcher import compile_matching_value, MatchPriority, RulePrefilter
 
 
 @pytest.mark.parametrize(
@@ -465,3 +469,104 @@ def test_compile_matching_value_different_key(key: str) -> None:
     assert isinstance(compiled_pattern, re.Pattern)
     # Expect the original pattern since the key is not in {"match", "match_ok"}
     assert compiled_pattern.pattern == original_value
+
+
+def _prefilter_rules() -> list[ec.Rule]:
+    rules = [
+        ec.Rule(id="no_conditions", pack="pack"),
+        ec.Rule(id="text", pack="pack", match="disk full"),
+        ec.Rule(id="text_prefix", pack="pack", match="disk"),
+        ec.Rule(id="text_empty", pack="pack", match=""),
+        ec.Rule(id="text_regex", pack="pack", match="^disk (full|empty)$"),
+        ec.Rule(id="text_or_ok", pack="pack", match="link down", match_ok="link up"),
+        ec.Rule(id="text_ok_regex", pack="pack", match="link down", match_ok="link (up|restored)"),
+        ec.Rule(id="host", pack="pack", match_host="srv01"),
+        ec.Rule(id="host_regex", pack="pack", match_host="srv0[12]"),
+        ec.Rule(id="host_and_text", pack="pack", match_host="srv01", match="disk full"),
+        ec.Rule(id="application", pack="pack", match_application="sshd"),
+        ec.Rule(id="cancel_application", pack="pack", cancel_application="cron"),
+        ec.Rule(id="application_and_text", pack="pack", match_application="sshd", match="failed"),
+        ec.Rule(id="inverted", pack="pack", match="disk full", invert_matching=True),
+    ]
+    for rule in rules:
+        ec.compile_rule(rule)
+    return rules
+
+
+@pytest.mark.parametrize(
+    "host, application, text",
+    [
+        ("srv01", "sshd", "Disk full on /var"),
+        ("SRV02", "cron", "disk empty"),
+        ("srv03", "kernel", "link down on eth0"),
+        ("srv01", "Kernel", "link restored on eth0"),
+        ("srv01", "sshd", "Authentication failed"),
+        ("", "", ""),
+    ],
+)
+def test_rule_prefilter_keeps_matching_rules(host: str, application: str, text: str) -> None:
+    m = ec.RuleMatcher(None, SiteId("test_site"), lambda time_period_name: True)
+    rules = _prefilter_rules()
+    event = new_event(ec.Event(host=HostName(host), application=application, text=text))
+    prefiltered = RulePrefilter(rules).filter(rules, event)
+
+    assert [rule["id"] for rule in prefiltered] == [
+        rule["id"] for rule in rules if rule in prefiltered
+    ]
+    assert {
+        rule["id"]
+        for rule in rules
+        if isinstance(m.event_rule_matches(rule, event), ec.MatchSuccess)
+    } <= {rule["id"] for rule in prefiltered}
+
+
+def test_rule_prefilter_drops_rules_with_unmet_literals() -> None:
+    rules = _prefilter_rules()
+    event = new_event(ec.Event(host=HostName("srv02"), application="sshd", text="disk full"))
+
+    assert [rule["id"] for rule in RulePrefilter(rules).filter(rules, event)] == [
+        "no_conditions",
+        "text",
+        "text_prefix",
+        "text_empty",
+        "text_regex",
+        "text_ok_regex",
+        "host_regex",
+        "application",
+        "inverted",
+    ]
+
+
+def test_rule_prefilter_evaluates_fewer_rules() -> None:
+    m = ec.RuleMatcher(None, SiteId("test_site"), lambda time_period_name: True)
+    rules = [
+        ec.Rule(id=f"rule{n}", pack="pack", match=f"error code {n:04} in module")
+        for n in range(2000)
+    ]
+    for rule in rules:
+        ec.compile_rule(rule)
+    prefilter = RulePrefilter(rules)
+    events = [
+        new_event(
+            ec.Event(host=HostName("srv01"), application="app", text=f"Error code {n:04} in module")
+        )
+        for n in range(0, 2000, 40)
+    ]
+
+    def first_match(candidates: list[ec.Rule], event: ec.Event) -> tuple[str | None, int]:
+        """The first matching rule and the number of rules evaluated to find it"""
+        for evaluated, rule in enumerate(candidates, start=1):
+            if isinstance(m.event_rule_matches(rule, event), ec.MatchSuccess):
+                return rule["id"], evaluated
+        return None, len(candidates)
+
+    unfiltered = [first_match(rules, event) for event in events]
+    prefiltered = [first_match(prefilter.filter(rules, event), event) for event in events]
+
+    assert (
+        [rule_id for rule_id, _evaluated in prefiltered]
+        == [rule_id for rule_id, _evaluated in unfiltered]
+        == [f"rule{n}" for n in range(0, 2000, 40)]
+    )
+    assert sum(evaluated for _rule_id, evaluated in unfiltered) == sum(range(1, 2000, 40))
+    assert [evaluated for _rule_id, evaluated in prefiltered] == [1] * len(events)
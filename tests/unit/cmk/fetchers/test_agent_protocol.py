@@ -3,12 +3,14 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import hashlib
 from binascii import unhexlify
 from itertools import product as cartesian_product
 from zlib import compress
 
 import pytest
 
+from cmk.fetchers import _agentprtcl
 from cmk.fetchers._agentprtcl import (
     AgentCtlMessage,
     CompressionType,
@@ -266,6 +268,36 @@ def test_legacy_encryption_mac_mismatch(protocol: TransportProtocol, encrypted:
         decrypt_by_agent_protocol("cmk", protocol, unhexlify(encrypted))
 
 
+def test_pbkdf2_mac_key_is_derived_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    _agentprtcl._derive_key_and_iv_pbkdf2.cache_clear()
+    derivations = []
+    pbkdf2_hmac = hashlib.pbkdf2_hmac
+
+    def _pbkdf2_hmac(*args: object) -> bytes:
+        derivations.append(args)
+        return pbkdf2_hmac(*args)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(hashlib, "pbkdf2_hmac", _pbkdf2_hmac)
+    salt = b"ea0e2c10f91aef7e"
+    ciphertext = b"5f1aacfa62eef34dd84fb737009b3892"
+    encrypted = unhexlify(
+        salt + b"64ad79f9ae130ac80ad544b891738aa8f5b6317167e78a706864a819656f75db" + ciphertext
+    )
+
+    for _i in range(3):
+        assert (
+            decrypt_by_agent_protocol("cmk", TransportProtocol.PBKDF2_MAC, encrypted)
+            == b"<<<cmk_test>>>"
+        )
+    assert len(derivations) == 1
+
+    with pytest.raises(ValueError):
+        decrypt_by_agent_protocol("cmk", TransportProtocol.PBKDF2_MAC, encrypted[:-1] + b"\0")
+    with pytest.raises(ValueError):
+        decrypt_by_agent_protocol("other", TransportProtocol.PBKDF2_MAC, encrypted)
+    assert len(derivations) == 2
+
+
 class TestValidateAgentProtocol:
     def test_validate_protocol_plaintext_with_enforce_raises(self) -> None:
         with pytest.raises(MKFetcherError):
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import asyncio
+import bisect
+import logging
+import socketserver
+import threading
+from collections.abc import Iterator, Sequence
+
+import pytest
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPTiming, SNMPVersion
+
+from cmk.fetchers.snmp_backend import asyncio_snmp as snmp
+from cmk.fetchers.snmp_backend import AsyncioSNMPBackend
+
+from cmk.ccc.exceptions import MKSNMPError
+
+_WALK: Sequence[tuple[tuple[int, ...], int, bytes]] = [
+    ((1, 3, 6, 1, 2, 1, 1, 1, 0), snmp._OCTET_STRING, b'Linux "box" 6.1'),
+    (
+        (1, 3, 6, 1, 2, 1, 1, 2, 0),
+        snmp._OBJECT_IDENTIFIER,
+        snmp._encode_oid((1, 3, 6, 1, 4, 1, 8072))[2:],
+    ),
+    ((1, 3, 6, 1, 2, 1, 1, 3, 0), snmp._TIME_TICKS, (3000000000).to_bytes(5, "big")),
+    ((1, 3, 6, 1, 2, 1, 2, 2, 1, 1, 1), snmp._INTEGER, b"\x01"),
+    ((1, 3, 6, 1, 2, 1, 2, 2, 1, 1, 2), snmp._INTEGER, b"\x02"),
+    ((1, 3, 6, 1, 2, 1, 2, 2, 1, 1, 3), snmp._INTEGER, b"\xff"),
+    ((1, 3, 6, 1, 2, 1, 2, 2, 1, 6, 1), snmp._OCTET_STRING, b"\x00\x0c\x29\xaa\xbb\xcc"),
+    ((1, 3, 6, 1, 2, 1, 4, 20, 1, 1, 10, 0, 0, 1), snmp._IP_ADDRESS, b"\x0a\x00\x00\x01"),
+]
+
+
+class _Agent(socketserver.BaseRequestHandler):
+    """Answers GET, GETNEXT and GETBULK requests from _WALK"""
+
+    server: "_AgentServer"
+
+    def handle(self) -> None:
+        data, sock = self.request
+        self.server.requests += 1
+        if self.server.drop:
+            self.server.drop -= 1
+            return
+        version, community, pdu_type, request = snmp._decode_message(data)
+        oids = [oid for oid, _tag, _value in _WALK]
+        varbinds: list[tuple[tuple[int, ...], bytes]] = []
+        for oid, _tag, _value in request.varbinds:
+            if pdu_type == snmp._GET_REQUEST:
+                index = bisect.bisect_left(oids, oid)
+                found = index < len(oids) and oids[index] == oid
+                varbinds.append(
+                    (oid, snmp._encode_tlv(*_WALK[index][1:]))
+                    if found
+                    else (oid, snmp._encode_tlv(snmp._NO_SUCH_OBJECT, b""))
+                )
+                continue
+            index = bisect.bisect_right(oids, oid)
+            repetitions = request.error_index if pdu_type == snmp._GET_BULK_REQUEST else 1
+            for next_oid, tag, value in _WALK[index : index + repetitions]:
+                varbinds.append((next_oid, snmp._encode_tlv(tag, value)))
+            if index + repetitions > len(_WALK):
+                varbinds.append((oid, snmp._encode_tlv(snmp._END_OF_MIB_VIEW, b"")))
+        sock.sendto(
+            snmp._encode_message(
+                version, community, snmp._RESPONSE, request.request_id, 0, 0, varbinds
+            ),
+            self.client_address,
+        )
+
+
+class _AgentServer(socketserver.UDPServer):
+    requests = 0
+    drop = 0
+
+
+@pytest.fixture(name="agent")
+def fixture_agent() -> Iterator[_AgentServer]:
+    with _AgentServer(("127.0.0.1", 0), _Agent) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def _config(
+    port: int,
+    *,
+    bulkwalk_enabled: bool = True,
+    timing: SNMPTiming | None = None,
+) -> SNMPHostConfig:
+    return SNMPHostConfig(
+        is_ipv6_primary=False,
+        hostname=HostName(f"host-{port}"),
+        ipaddress=HostAddress("127.0.0.1"),
+        credentials="public",
+        port=port,
+        bulkwalk_enabled=bulkwalk_enabled,
+        snmp_version=SNMPVersion.V2C,
+        bulk_walk_size_of=2,
+        timing={"timeout": 5} if timing is None else timing,
+        oid_range_limits={},
+        snmpv3_contexts=[],
+        character_encoding=None,
+        snmp_backend=SNMPBackendEnum.ASYNCIO,
+    )
+
+
+@pytest.mark.parametrize(
+    "oid",
+    [(1, 3, 6, 1), (1, 3, 6, 1, 2, 1, 2, 2, 1, 1, 1), (0, 39), (2, 999, 1), (1, 3, 6, 128, 2**32)],
+)
+def test_oid_roundtrip(oid: tuple[int, ...]) -> None:
+    assert snmp._decode_oid(snmp._encode_oid(oid)[2:]) == oid
+
+
+def test_message_roundtrip() -> None:
+    value = snmp._encode_tlv(snmp._OCTET_STRING, b"x" * 300)
+    message = snmp._encode_message(
+        1, b"public", snmp._RESPONSE, 2**31 - 1, 0, 0, [((1, 3, 6, 1, 2), value)]
+    )
+    assert snmp._decode_message(message) == (
+        1,
+        b"public",
+        snmp._RESPONSE,
+        snmp._PDU(2**31 - 1, 0, 0, [((1, 3, 6, 1, 2), snmp._OCTET_STRING, b"x" * 300)]),
+    )
+    with pytest.raises(MKSNMPError):
+        snmp._decode_message(message[:-1])
+
+
+@pytest.mark.parametrize("bulkwalk_enabled", [True, False])
+def test_walk(agent: _AgentServer, bulkwalk_enabled: bool) -> None:
+    backend = AsyncioSNMPBackend(
+        _config(agent.server_address[1], bulkwalk_enabled=bulkwalk_enabled),
+        logging.getLogger("test"),
+    )
+    assert backend.walk(".1.3.6.1.2.1.1", context="") == [
+        # Quotes stay escaped, just like in the output of the classic backend
+        (".1.3.6.1.2.1.1.1.0", b'Linux \\"box\\" 6.1'),
+        (".1.3.6.1.2.1.1.2.0", b".1.3.6.1.4.1.8072"),
+        (".1.3.6.1.2.1.1.3.0", b"3000000000"),
+    ]
+    assert backend.walk(".1.3.6.1.2.1.2.2.1.1", context="") == [
+        (".1.3.6.1.2.1.2.2.1.1.1", b"1"),
+        (".1.3.6.1.2.1.2.2.1.1.2", b"2"),
+        (".1.3.6.1.2.1.2.2.1.1.3", b"-1"),
+    ]
+    assert backend.walk(".1.3.6.1.2.1.2.2.1.6", context="") == [
+        (".1.3.6.1.2.1.2.2.1.6.1", b"\x00\x0c\x29\xaa\xbb\xcc"),
+    ]
+    # The end of the MIB view
+    assert backend.walk(".1.3.6.1.2.1.4", context="") == [
+        (".1.3.6.1.2.1.4.20.1.1.10.0.0.1", b"10.0.0.1"),
+    ]
+    assert not backend.walk(".1.3.6.1.2.1.5", context="")
+    # A single instance is fetched like snmpwalk does
+    assert backend.walk(".1.3.6.1.2.1.1.3.0", context="") == [(".1.3.6.1.2.1.1.3.0", b"3000000000")]
+
+
+def test_get(agent: _AgentServer) -> None:
+    backend = AsyncioSNMPBackend(_config(agent.server_address[1]), logging.getLogger("test"))
+    assert backend.get(".1.3.6.1.2.1.1.1.0", context="") == b'Linux \\"box\\" 6.1'
+    assert backend.get(".1.3.6.1.2.1.1.1", context="") is None
+    assert backend.get(".1.3.6.1.2.1.1.2.*", context="") == b".1.3.6.1.4.1.8072"
+    assert backend.get(".1.3.6.1.2.1.3.*", context="") is None
+
+
+def test_walks_of_many_hosts_share_a_client(agent: _AgentServer) -> None:
+    with _AgentServer(("127.0.0.1", 0), _Agent) as other_agent:
+        thread = threading.Thread(target=other_agent.serve_forever, daemon=True)
+        thread.start()
+
+        async def walk_all() -> tuple[int, Sequence[object]]:
+            async with snmp.AsyncSNMPClient(logging.getLogger("test")) as client:
+                results = await asyncio.gather(
+                    *(
+                        client.walk(_config(port), oid)
+                        for port in (agent.server_address[1], other_agent.server_address[1])
+                        for oid in (".1.3.6.1.2.1.1", ".1.3.6.1.2.1.2.2.1.1")
+                    )
+                )
+                return client.requests_sent, results
+
+        requests_sent, results = asyncio.run(walk_all())
+        other_agent.shutdown()
+        thread.join()
+
+    assert [len(r) for r in results] == [3, 3, 3, 3]  # type: ignore[arg-type]
+    assert results[:2] == results[2:]
+    # Two GETBULK requests with two repetitions for each walk
+    assert requests_sent == 8
+    assert agent.requests == other_agent.requests == 4
+
+
+def test_retry(agent: _AgentServer) -> None:
+    agent.drop = 1
+    backend = AsyncioSNMPBackend(
+        _config(agent.server_address[1], timing={"timeout": 0.1, "retries": 1}),
+        logging.getLogger("test"),
+    )
+    assert backend.get(".1.3.6.1.2.1.1.1.0", context="") == b'Linux \\"box\\" 6.1'
+    assert agent.requests == 2
+
+
+def test_timeout(agent: _AgentServer) -> None:
+    agent.drop = 3
+    backend = AsyncioSNMPBackend(
+        _config(agent.server_address[1], timing={"timeout": 0.1, "retries": 2}),
+        logging.getLogger("test"),
+    )
+    with pytest.raises(MKSNMPError, match="Timeout"):
+        backend.walk(".1.3.6.1.2.1.1", context="")
+    assert agent.requests == 3
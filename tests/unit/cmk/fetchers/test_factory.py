@@ -16,7 +16,7 @@ from cmk.utils.hostaddress import HostAddress, HostName
 from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
 
 from cmk.fetchers.snmp import make_backend
-from cmk.fetchers.snmp_backend import ClassicSNMPBackend
+from cmk.fetchers.snmp_backend import AsyncioSNMPBackend, ClassicSNMPBackend
 
 if is_enterprise_repo():
     from cmk.fetchers.cee.snmp_backend.inline import (  # type: ignore[import,unused-ignore] # pylint: disable=import-error,no-name-in-module
@@ -61,6 +61,22 @@ def test_factory_snmp_backend_inline(snmp_config: SNMPHostConfig, tmp_path: Path
         )
 
 
+def test_factory_snmp_backend_asyncio(snmp_config: SNMPHostConfig, tmp_path: Path) -> None:
+    snmp_config = dataclasses.replace(snmp_config, snmp_backend=SNMPBackendEnum.ASYNCIO)
+    assert isinstance(
+        make_backend(snmp_config, logging.getLogger(), stored_walk_path=tmp_path),
+        AsyncioSNMPBackend,
+    )
+    # SNMP v3 is handled by the classic backend
+    snmp_config = dataclasses.replace(
+        snmp_config, snmp_version=SNMPVersion.V3, credentials=("noAuthNoPriv", "user")
+    )
+    assert isinstance(
+        make_backend(snmp_config, logging.getLogger(), stored_walk_path=tmp_path),
+        ClassicSNMPBackend,
+    )
+
+
 def test_factory_snmp_backend_unknown_backend(snmp_config: SNMPHostConfig, tmp_path: Path) -> None:
     with pytest.raises(NotImplementedError, match="Unknown SNMP backend"):
         snmp_config = dataclasses.replace(snmp_config, snmp_backend="bla")  # type: ignore[arg-type]
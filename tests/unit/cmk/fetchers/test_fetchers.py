@@ -6,8 +6,11 @@
 # pylint: disable=protected-access
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
 import socket
+import threading
 from collections.abc import Sequence, Sized
 from pathlib import Path
 from typing import Generic, NamedTuple, NoReturn, TypeAlias, TypeVar
@@ -18,6 +21,7 @@ from pytest import MonkeyPatch
 
 import cmk.utils.resulttype as result
 from cmk.utils.agentdatatype import AgentRawData
+from cmk.utils.crypto.deprecated import AesCbcCipher
 from cmk.utils.hostaddress import HostAddress, HostName
 from cmk.utils.sectionname import SectionMap, SectionName
 
@@ -32,6 +36,7 @@ from cmk.snmplib import (
     SNMPVersion,
 )
 
+import cmk.fetchers._agentprtcl as agentprtcl
 import cmk.fetchers._snmp as snmp
 from cmk.fetchers import (
     Fetcher,
@@ -48,6 +53,7 @@ from cmk.fetchers import (
     TLSConfig,
 )
 from cmk.fetchers._ipmi import IPMISensor
+from cmk.fetchers._tcp import recvall
 from cmk.fetchers.filecache import (
     AgentFileCache,
     FileCache,
@@ -838,6 +844,83 @@ class TestTCPFetcher:
 
         assert isinstance(raw_data.error, MKFetcherError)
 
+    @staticmethod
+    def _agent(output: bytes) -> tuple[socket.socket, threading.Thread]:
+        """Return the site side of a connection to an agent sending `output`"""
+        agent, site = socket.socketpair()
+
+        def send() -> None:
+            with agent:
+                agent.sendall(output)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        return site, sender
+
+    def test_recvall_large_output(self) -> None:
+        output = b"".join(b"<<<logwatch>>>\nline %d\n" % n for n in range(1_000_000))
+        site, sender = self._agent(output)
+        with site:
+            received = recvall(site, socket.MSG_WAITALL, prefix=b"<<")
+        sender.join()
+
+        assert received.tobytes() == b"<<" + output
+
+    def test_plain_agent_output(self, fetcher: TCPFetcher) -> None:
+        output = b"<<<check_mk>>>\nVersion: 2.4.0\n" + b"<<<local>>>\n0 Service - OK\n" * 10_000
+        site, sender = self._agent(output)
+        with site:
+            agent_data = fetcher._get_agent_data(site, None)
+        sender.join()
+
+        assert agent_data == output
+
+    def test_fetch_and_decrypt_throughput(self, tmp_path: Path) -> None:
+        """1000 hosts with a version 05 encrypted agent, all using the same salt
+
+        This is what the agents send when reusing a salt (ENCRYPTION_SALT_ROTATION),
+        after the first fetch of each host.
+        """
+        salt = b"SALTSALT"
+        key_iv = hashlib.pbkdf2_hmac("sha256", b"secret", salt, 600_000, 48)
+        key, iv = key_iv[:32], key_iv[32:]
+
+        def _agent_output(host_name: HostName) -> bytes:
+            cipher = AesCbcCipher("encrypt", key, iv)
+            ciphertext = (
+                cipher.update(
+                    AesCbcCipher.pad_block(b"<<<check_mk>>>\nHostname: %s\n" % host_name.encode())
+                )
+                + cipher.finalize()
+            )
+            mac = hmac.digest(key, iv + ciphertext, hashlib.sha256)
+            return b"05" + salt + mac + ciphertext
+
+        def _fetch(host_name: HostName, output: bytes) -> AgentRawData:
+            fetcher = TCPFetcher(
+                family=socket.AF_INET,
+                address=(HostAddress("1.2.3.4"), 6556),
+                host_name=host_name,
+                timeout=0.1,
+                encryption_handling=TCPEncryptionHandling.ANY_ENCRYPTED,
+                pre_shared_secret="secret",
+                tls_config=TLSConfig(cas_dir=tmp_path, ca_store=tmp_path, site_crt=tmp_path),
+            )
+            agent, site = socket.socketpair()
+            with agent, site:
+                agent.sendall(output)
+                agent.shutdown(socket.SHUT_WR)
+                return fetcher._get_agent_data(site, None)
+
+        outputs = {HostName(f"host{n}"): _agent_output(HostName(f"host{n}")) for n in range(1000)}
+        agentprtcl._derive_key_and_iv_pbkdf2.cache_clear()
+
+        for host_name, output in outputs.items():
+            assert _fetch(host_name, output).endswith(b"Hostname: %s\n" % host_name.encode())
+
+        # The key is derived for the first host only.
+        assert agentprtcl._derive_key_and_iv_pbkdf2.cache_info().misses == 1
+
 
 class TestFetcherCaching:
     @pytest.fixture
@@ -6,10 +6,15 @@
 # pylint: disable=protected-access
 
 import logging
+from collections.abc import Sequence
 from pathlib import Path
 
 import pytest
 
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
+
 import cmk.fetchers.snmp_backend._utils as utils
 from cmk.fetchers.snmp_backend import StoredWalkSNMPBackend
 
@@ -58,6 +63,61 @@ class TestStoredWalkSNMPBackend:
             ".1.2.5 test\n",
         ]
 
+    def test_walk_in_file_order(self, tmpdir: Path) -> None:
+        backend = _stored_walk_backend(tmpdir / "walkdata" / "3.txt")
+        assert backend.walk(".1.2.3", context="") == [
+            (".1.2.3.10", b"ten"),
+            (".1.2.3.9", b"nine"),
+            (".1.2.3.11", b"eleven"),
+        ]
+        assert backend.walk(".1.2.3.9", context="") == [(".1.2.3.9", b"nine")]
+        assert backend.walk(".1.2.3.*", context="") == [(".1.2.3.10", b"ten")]
+        assert backend.walk(".1.2.4.*", context="") == []
+        assert backend.walk(".1.2.5", context="") == []
+        assert backend.get(".1.2.4", context="") == b"four"
+
+    def test_walk_file_is_read_once(self, tmpdir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        path = Path(tmpdir / "walkdata" / "3.txt")
+        backend = _stored_walk_backend(path)
+        reads = []
+        read_walk_data = backend.read_walk_data
+
+        def counting_read_walk_data() -> Sequence[str]:
+            reads.append(path)
+            return read_walk_data()
+
+        monkeypatch.setattr(backend, "read_walk_data", counting_read_walk_data)
+
+        for oid in (".1.2.3", ".1.2.4", ".1.2.3.11"):
+            backend.walk(oid, context="")
+        assert len(reads) == 1
+
+        path.write_text(".1.2.3.9 nine\n")
+        assert backend.walk(".1.2.3", context="") == [(".1.2.3.9", b"nine")]
+        assert len(reads) == 2
+
+
+def _stored_walk_backend(path: Path) -> StoredWalkSNMPBackend:
+    return StoredWalkSNMPBackend(
+        SNMPHostConfig(
+            is_ipv6_primary=False,
+            hostname=HostName("testhost"),
+            ipaddress=HostAddress("1.2.3.4"),
+            credentials="public",
+            port=161,
+            bulkwalk_enabled=True,
+            snmp_version=SNMPVersion.V2C,
+            bulk_walk_size_of=10,
+            timing={},
+            oid_range_limits={},
+            snmpv3_contexts=[],
+            character_encoding=None,
+            snmp_backend=SNMPBackendEnum.STORED_WALK,
+        ),
+        logging.getLogger("test"),
+        Path(path),
+    )
+
 
 @pytest.fixture
 def create_files(tmpdir):
@@ -66,3 +126,5 @@ def create_files(tmpdir):
     p1.write(".1.2.3 foo\n.1.2.4 bar\nfoobar\n")
     p2 = (tmpdir / "walkdata").join("2.txt")
     p2.write(".1.2.3 foo\n\n\n.1.2.5 test\n")
+    p3 = (tmpdir / "walkdata").join("3.txt")
+    p3.write(".1.2.3.10 ten\n.1.2.3.9 nine\n.1.2.3.11 eleven\n.1.2.4 four\n")
@@ -6,45 +6,107 @@
 # pylint: disable=protected-access
 
 import logging
-from collections.abc import Iterable, MutableMapping
 from pathlib import Path
 
+import pytest
+
 from cmk.snmplib import SNMPRowInfo
 
 from cmk.fetchers._snmp import WalkCache
 
 
-class MockWalkCache(WalkCache):
-    def __init__(self, mockdata: MutableMapping[str, SNMPRowInfo], path: Path) -> None:
-        super().__init__(path, logging.getLogger("test"))
-        self.mock_stored_on_fs = mockdata
+class TestWalkCache:
+    def test_encode_decode_roundtrip(self) -> None:
+        walks: dict[tuple[str, str], SNMPRowInfo] = {
+            (".1.2.3", "12c3d4a"): [(".1.2.3.1", b"43"), (".1.2.3.2", b"\x00\xff\n")],
+            (".3.1.4.1", "12c3d4a"): [],
+            (".3.1.4.1", "0f0f0f0"): [(".3.1.4.1.0", b"")],
+        }
+        data = WalkCache._encode(walks)
+        index = WalkCache._decode_index(data)
+        assert list(index) == list(walks)
+        assert {key: WalkCache._decode_rows(data, *index[key]) for key in index} == walks
 
-    def _read_row(self, path: Path) -> SNMPRowInfo:
-        return self.mock_stored_on_fs[str(path.name)]
+    def test_cache_keeps_stored_data(self, tmp_path: Path) -> None:
+        path = tmp_path / "host.walk"
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache[(".1.2.3", "12c3d4a", True)] = [(".1.2.3.4", b"43")]
+        cache[(".1.2.4", "12c3d4a", False)] = [(".1.2.4.1", b"not cached")]
+        cache.save()
 
-    def _write_row(self, path: Path, rowinfo: SNMPRowInfo) -> None:
-        self.mock_stored_on_fs[str(path.name)] = rowinfo
+        cache = WalkCache(path, logging.getLogger("test"))
+        assert not cache
+        cache.load()
+        assert list(cache) == [(".1.2.3", "12c3d4a", True)]
+        assert (".1.2.3", "12c3d4a", False) not in cache
+        assert cache[(".1.2.3", "12c3d4a", True)] == [(".1.2.3.4", b"43")]
 
-    def _iterfiles(self) -> Iterable[Path]:
-        return (Path(k) for k in self.mock_stored_on_fs)
+        # Walks which have not been decoded are kept as well
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache.load()
+        cache[(".1.2.5", "12c3d4a", True)] = [(".1.2.5.1", b"new")]
+        cache.save()
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache.load()
+        assert dict(cache) == {
+            (".1.2.3", "12c3d4a", True): [(".1.2.3.4", b"43")],
+            (".1.2.5", "12c3d4a", True): [(".1.2.5.1", b"new")],
+        }
 
+    def test_walks_are_decoded_on_access(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = tmp_path / "host.walk"
+        cache = WalkCache(path, logging.getLogger("test"))
+        for nr in range(100):
+            cache[(f".1.2.{nr}", "12c3d4a", True)] = [(f".1.2.{nr}.1", b"%d" % nr)]
+        cache.save()
 
-class TestWalkCache:
-    def test_oid2name_roundtrip(self) -> None:
-        fetchoid, context_hash = ".3.1.4.1.5.9.2.6.5.3.5", "12c3d4a"
-        assert (fetchoid, context_hash) == WalkCache._name2oid(
-            WalkCache._oid2name(fetchoid, context_hash)
-        )
+        decoded = []
+        decode_rows = WalkCache._decode_rows
 
-    def test_cache_keeps_stored_data(self, tmp_path: Path) -> None:
-        fetchoid, context_hash = ".1.2.3", "12c3d4a"
-        path = f"OID{fetchoid}-{context_hash}"
-        cache = MockWalkCache({path: [("23", b"43")]}, tmp_path)
+        def _decode_rows(data: bytes, offset: int, length: int) -> SNMPRowInfo:
+            decoded.append(offset)
+            return decode_rows(data, offset, length)
 
-        assert not cache
+        monkeypatch.setattr(WalkCache, "_decode_rows", staticmethod(_decode_rows))
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache.load()
+        assert len(cache) == 100
+        assert cache[(".1.2.42", "12c3d4a", True)] == [(".1.2.42.1", b"42")]
+        assert cache[(".1.2.42", "12c3d4a", True)] == [(".1.2.42.1", b"42")]
+        assert len(decoded) == 1
+
+    def test_unchanged_cache_is_not_written(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        path = tmp_path / "host.walk"
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache[(".1.2.3", "12c3d4a", True)] = [(".1.2.3.4", b"43")]
+        cache.save()
 
+        cache = WalkCache(path, logging.getLogger("test"))
         cache.load()
+        assert cache[(".1.2.3", "12c3d4a", True)]
+        path.unlink()
+        cache.save()
+        assert not path.exists()
 
-        assert (fetchoid, "12c3d4a", True) in cache
+    def test_clear(self, tmp_path: Path) -> None:
+        path = tmp_path / "host.walk"
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache[(".1.2.3", "12c3d4a", True)] = [(".1.2.3.4", b"43")]
         cache.save()
-        assert path in cache.mock_stored_on_fs
+
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache.clear()
+        assert not path.exists()
+        cache.load()
+        assert not cache
+
+    def test_invalid_file_is_ignored(self, tmp_path: Path) -> None:
+        path = tmp_path / "host.walk"
+        path.write_bytes(b"[('.1.2.3', b'43')]")
+        cache = WalkCache(path, logging.getLogger("test"))
+        cache.load()
+        assert not cache
@@ -109,6 +109,7 @@ def test_registered_configvars() -> None:
         "eventsocket_queue_len",
         "failed_notification_horizon",
         "hard_query_limit",
+        "history_file_index",
         "history_lifetime",
         "history_rotation",
         "hostname_translation",
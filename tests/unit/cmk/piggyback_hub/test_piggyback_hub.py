@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import json
+import logging
+import socket
+import ssl
+import struct
+import threading
+import time
+from collections.abc import Container, Iterator, Mapping, Sequence
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.certs import RootCA
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk import piggyback
+from cmk.piggyback import _storage
+from cmk.piggyback_hub._config import HubConfig, load_config, PeerAddress
+from cmk.piggyback_hub._hub import open_notification_socket, PiggybackHub, store_received_payloads
+from cmk.piggyback_hub._metrics import HubMetrics
+from cmk.piggyback_hub._transport import (
+    client_context,
+    decode_batch,
+    encode_batch,
+    FrameTooLarge,
+    Payload,
+    PayloadReceiver,
+    PeerConnection,
+    receive_frame,
+    send_frame,
+    server_context,
+)
+
+_REF_TIME = 1640000000
+
+
+class _Certificates:
+    """Site certificates issued by one CA, the common name is the site ID"""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._ca = RootCA.load_or_create(directory / "ca.pem", "Test CA", key_size=2048)
+        self.trusted_cas = directory / "ca-certificates.crt"
+        self.trusted_cas.write_bytes(self._ca.certificate.dump_pem().bytes)
+
+    def site(self, site_id: str) -> Path:
+        if not (path := self._directory / f"{site_id}.pem").exists():
+            self._ca.issue_and_store_certificate(path, site_id, key_size=2048)
+        return path
+
+    def client_context(self, site_id: str) -> ssl.SSLContext:
+        return client_context(self.site(site_id), self.trusted_cas)
+
+
+@pytest.fixture(name="certificates", scope="module")
+def fixture_certificates(tmp_path_factory: pytest.TempPathFactory) -> _Certificates:
+    return _Certificates(tmp_path_factory.mktemp("certificates"))
+
+
+class _LocalSite:
+    """Stand-in for the hub of another site, keeping what it receives in memory"""
+
+    def __init__(self, site_id: str, certificates: _Certificates) -> None:
+        self.received: dict[tuple[HostAddress, HostName], Payload] = {}
+        self.batches = 0
+        self._receiver = PayloadReceiver(
+            ("127.0.0.1", 0),
+            server_context(certificates.site(site_id), certificates.trusted_cas),
+            {"central"},
+            1024 * 1024,
+            self._store,
+        )
+        self.address = PeerAddress("127.0.0.1", self._receiver.server_address[1])
+        self._thread = threading.Thread(target=self._receiver.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _store(self, payloads: Sequence[Payload]) -> None:
+        self.batches += 1
+        self.received.update({(p.piggybacked_host, p.source): p for p in payloads})
+
+    def shutdown(self) -> None:
+        self._receiver.shutdown()
+        self._receiver.server_close()
+
+
+@pytest.fixture(name="sites")
+def fixture_sites(certificates: _Certificates) -> Iterator[Mapping[str, _LocalSite]]:
+    sites = {
+        site_id: _LocalSite(site_id, certificates) for site_id in ("remote1", "remote2", "remote3")
+    }
+    yield sites
+    for site in sites.values():
+        site.shutdown()
+
+
+def _hub(
+    sites: Mapping[str, _LocalSite],
+    targets: Mapping[HostAddress, str],
+    certificates: _Certificates,
+) -> PiggybackHub:
+    context = certificates.client_context("central")
+    return PiggybackHub(
+        logging.getLogger("cmk.piggyback_hub"),
+        HubConfig(
+            max_frame_size=1024 * 1024,
+            peers={site_id: site.address for site_id, site in sites.items()},
+            targets=targets,
+        ),
+        {
+            site_id: PeerConnection(site_id, site.address, context, timeout=5)
+            for site_id, site in sites.items()
+        },
+        HubMetrics(),
+    )
+
+
+def test_batch_encoding() -> None:
+    payloads = [
+        Payload(HostName("source"), HostAddress("vm-1"), _REF_TIME, b"<<<a>>>\n1\n"),
+        Payload(HostName("source"), HostAddress("vm-2"), _REF_TIME + 1, b""),
+    ]
+    assert decode_batch(encode_batch(payloads)) == payloads
+
+
+def test_load_config(tmp_path: Path) -> None:
+    assert load_config(tmp_path / "missing") == HubConfig()
+
+    (config_file := tmp_path / "piggyback_hub.json").write_text(
+        json.dumps(
+            {
+                "listen_address": "10.0.0.1",
+                "listen_port": 6560,
+                "peers": {"remote1": {"host": "remote1.example.com", "port": 6561}},
+                "targets": {"vm-1": "remote1"},
+            }
+        )
+    )
+    assert load_config(config_file) == HubConfig(
+        listen_address="10.0.0.1",
+        listen_port=6560,
+        peers={"remote1": PeerAddress("remote1.example.com", 6561)},
+        targets={HostAddress("vm-1"): "remote1"},
+    )
+
+
+def test_distribute_to_sites(sites: Mapping[str, _LocalSite], certificates: _Certificates) -> None:
+    hosts = [HostAddress(f"vm-{n}") for n in range(3000)]
+    targets = {host: f"remote{n % 3 + 1}" for n, host in enumerate(hosts[:-1])}
+    for source in (HostName("vcenter"), HostName("aws")):
+        piggyback.store_piggyback_raw_data(
+            source, {host: (b"<<<section>>>", b"%s" % source.encode()) for host in hosts}, _REF_TIME
+        )
+    hub = _hub(sites, targets, certificates)
+
+    assert hub.distribute(None, time.monotonic()) == 2 * len(targets)
+
+    for site_id, site in sites.items():
+        assert set(site.received) == {
+            (host, source)
+            for host, target in targets.items()
+            if target == site_id
+            for source in ("vcenter", "aws")
+        }
+    assert sites["remote1"].received[(hosts[0], HostName("aws"))].raw_data == (
+        b"<<<section>>>\naws\n"
+    )
+    assert sum(site.batches for site in sites.values()) == 6
+
+    # Nothing new, nothing to send
+    assert hub.distribute(None, time.monotonic()) == 0
+
+    piggyback.store_piggyback_raw_data(
+        HostName("aws"), {hosts[0]: (b"<<<section>>>", b"new")}, _REF_TIME
+    )
+    assert hub.distribute({HostName("vcenter")}, time.monotonic()) == 0
+    assert hub.distribute({HostName("aws")}, time.monotonic()) == 1
+    assert sites["remote1"].received[(hosts[0], HostName("aws"))].raw_data == (
+        b"<<<section>>>\nnew\n"
+    )
+
+
+def test_distribute_retries_failed_deliveries(
+    sites: Mapping[str, _LocalSite], certificates: _Certificates
+) -> None:
+    piggyback.store_piggyback_raw_data(
+        HostName("source"), {HostAddress("vm-1"): (b"data",)}, _REF_TIME
+    )
+    hub = _hub(sites, {HostAddress("vm-1"): "remote1"}, certificates)
+    site = sites["remote1"]
+    site.shutdown()
+
+    assert hub.distribute(None, time.monotonic()) == 0
+    assert hub._metrics.snapshot()["remote1"]["errors"] == 1
+
+    sites = {"remote1": _LocalSite("remote1", certificates)}
+    hub = _hub(sites, {HostAddress("vm-1"): "remote1"}, certificates)
+    assert hub.distribute(None, time.monotonic()) == 1
+    sites["remote1"].shutdown()
+
+
+def test_distribute_reads_only_notified_sources(
+    sites: Mapping[str, _LocalSite], certificates: _Certificates
+) -> None:
+    for source in (HostName("vcenter"), HostName("aws")):
+        piggyback.store_piggyback_raw_data(
+            source, {HostAddress("vm-1"): (b"%s" % source.encode(),)}, _REF_TIME
+        )
+    read_hosts: list[HostAddress] = []
+    read_sources: list[HostName] = []
+
+    def get_raw_data(host: HostAddress) -> Sequence[piggyback.PiggybackRawDataInfo]:
+        read_hosts.append(host)
+        return piggyback.get_piggyback_raw_data(host)
+
+    def get_source_raw_data(
+        source: HostName, piggybacked_hosts: Container[HostAddress]
+    ) -> Mapping[HostAddress, piggyback.PiggybackRawDataInfo]:
+        read_sources.append(source)
+        return piggyback.get_source_piggyback_raw_data(source, piggybacked_hosts)
+
+    hub = PiggybackHub(
+        logging.getLogger("cmk.piggyback_hub"),
+        HubConfig(targets={HostAddress("vm-1"): "remote1", HostAddress("vm-2"): "remote2"}),
+        {
+            "remote1": PeerConnection(
+                "remote1", sites["remote1"].address, certificates.client_context("central"), 5
+            )
+        },
+        HubMetrics(),
+        get_raw_data=get_raw_data,
+        get_source_raw_data=get_source_raw_data,
+    )
+
+    assert hub.distribute({HostName("aws")}, time.monotonic()) == 1
+    assert not read_hosts
+    assert read_sources == ["aws"]
+    assert set(sites["remote1"].received) == {(HostAddress("vm-1"), HostName("aws"))}
+
+
+def test_distribute_skips_oversized_payloads(
+    sites: Mapping[str, _LocalSite], certificates: _Certificates
+) -> None:
+    piggyback.store_piggyback_raw_data(
+        HostName("source"),
+        {HostAddress("vm-1"): (b"x" * 2048,), HostAddress("vm-2"): (b"small",)},
+        _REF_TIME,
+    )
+    hub = PiggybackHub(
+        logging.getLogger("cmk.piggyback_hub"),
+        HubConfig(
+            max_frame_size=1024,
+            targets={HostAddress("vm-1"): "remote1", HostAddress("vm-2"): "remote1"},
+        ),
+        {
+            "remote1": PeerConnection(
+                "remote1", sites["remote1"].address, certificates.client_context("central"), 5
+            )
+        },
+        HubMetrics(),
+    )
+
+    assert hub.distribute(None, time.monotonic()) == 1
+    assert set(sites["remote1"].received) == {(HostAddress("vm-2"), HostName("source"))}
+    # Not tried again until it changes
+    assert hub.distribute(None, time.monotonic()) == 0
+
+
+def test_peer_connection_checks_site_certificate(
+    sites: Mapping[str, _LocalSite], certificates: _Certificates
+) -> None:
+    connection = PeerConnection(
+        "remote2", sites["remote1"].address, certificates.client_context("central"), 5
+    )
+    with pytest.raises(ConnectionError, match="Certificate of site remote1"):
+        connection.send([Payload(HostName("source"), HostAddress("vm-1"), _REF_TIME, b"")])
+    assert not sites["remote1"].received
+
+
+def test_receiver_rejects_unknown_sites(
+    sites: Mapping[str, _LocalSite], certificates: _Certificates
+) -> None:
+    connection = PeerConnection(
+        "remote1", sites["remote1"].address, certificates.client_context("intruder"), 5
+    )
+    with pytest.raises(ConnectionError):
+        connection.send([Payload(HostName("source"), HostAddress("vm-1"), _REF_TIME, b"")])
+    assert not sites["remote1"].received
+
+
+def test_receiver_rejects_plain_connections(sites: Mapping[str, _LocalSite]) -> None:
+    address = sites["remote1"].address
+    with socket.create_connection((address.host, address.port), timeout=5) as sock:
+        send_frame(
+            sock,
+            encode_batch([Payload(HostName("source"), HostAddress("vm-1"), _REF_TIME, b"")]),
+        )
+        # The handshake fails and the receiver closes the connection.
+        assert sock.recv(1024) == b""
+    assert not sites["remote1"].received
+
+
+def test_receive_frame_rejects_oversized_frames() -> None:
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        sender.sendall(struct.pack("!I", 1 << 31))
+        with pytest.raises(FrameTooLarge):
+            receive_frame(receiver, 1024)
+
+
+def test_load_config_requires_listen_address(tmp_path: Path) -> None:
+    (config_file := tmp_path / "piggyback_hub.json").write_text(
+        json.dumps({"listen_port": 6560, "peers": {}, "targets": {}})
+    )
+    with pytest.raises(ValueError, match="address"):
+        load_config(config_file)
+
+
+def test_store_received_payloads() -> None:
+    store_received_payloads(
+        [
+            Payload(HostName("source"), HostAddress("vm-1"), _REF_TIME, b"<<<a>>>\n1\n"),
+            Payload(HostName("source"), HostAddress("vm-2"), _REF_TIME - 10, b"<<<b>>>\n"),
+        ]
+    )
+
+    (stored,) = piggyback.get_piggyback_raw_data(HostAddress("vm-1"))
+    assert stored.raw_data == b"<<<a>>>\n1\n"
+    assert stored.info.last_update == _REF_TIME
+    (stored,) = piggyback.get_piggyback_raw_data(HostAddress("vm-2"))
+    assert stored.raw_data == b"<<<b>>>\n"
+    assert stored.info.last_update == _REF_TIME - 10
+
+
+def test_hub_distributes_notified_data(
+    sites: Mapping[str, _LocalSite],
+    certificates: _Certificates,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(_storage, "piggyback_hub_socket", tmp_path / "piggyback-hub")
+    hub = _hub(
+        sites, {HostAddress("vm-1"): "remote2", HostAddress("vm-2"): "remote3"}, certificates
+    )
+    stop = threading.Event()
+
+    with open_notification_socket(tmp_path / "piggyback-hub") as notifications:
+        thread = threading.Thread(
+            target=hub.run, args=(notifications, stop, tmp_path / "metrics.json")
+        )
+        thread.start()
+        try:
+            for n in range(5):
+                piggyback.store_piggyback_raw_data(
+                    HostName("source"),
+                    {HostAddress("vm-1"): (b"%d" % n,), HostAddress("vm-2"): (b"%d" % n,)},
+                    _REF_TIME + n,
+                )
+                deadline = time.monotonic() + 10
+                while (
+                    payload := sites["remote3"].received.get(
+                        (HostAddress("vm-2"), HostName("source"))
+                    )
+                ) is None or payload.raw_data != b"%d\n" % n:
+                    assert time.monotonic() < deadline
+                    time.sleep(0.01)
+        finally:
+            stop.set()
+            thread.join()
+
+    metrics = hub._metrics.snapshot()
+    assert metrics["remote3"]["payloads"] == 5
+    assert 0 <= metrics["remote3"]["latency_max"] < 10
+    # The metrics are written when the hub starts and then in regular intervals.
+    assert set(json.loads((tmp_path / "metrics.json").read_text())) <= {"remote2", "remote3"}
+
+
+def test_metrics() -> None:
+    now = 100.0
+    metrics = HubMetrics(clock=lambda: now)
+    now = 110.0
+    metrics.record_delivery("remote1", [10, 20], [109.0, 109.5])
+    metrics.record_error("remote2")
+    assert metrics.snapshot() == {
+        "remote1": {
+            "batches": 1,
+            "payloads": 2,
+            "bytes": 30,
+            "errors": 0,
+            "payloads_per_second": 0.2,
+            "bytes_per_second": 3.0,
+            "latency_median": 1.0,
+            "latency_p95": 1.0,
+            "latency_max": 1.0,
+        },
+        "remote2": {
+            "batches": 0,
+            "payloads": 0,
+            "bytes": 0,
+            "errors": 1,
+            "payloads_per_second": 0.0,
+            "bytes_per_second": 0.0,
+        },
+    }
@@ -5,8 +5,10 @@
 
 # pylint: disable=protected-access, redefined-outer-name
 
+import dataclasses
 import logging
-from collections.abc import Iterator
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
 from pathlib import Path
 
 import pytest
@@ -258,3 +260,129 @@ def test_gather_available_raw_section_names_defaults(backend: SNMPBackend, tmp_p
         SectionName("snmp_info"),
         SectionName("snmp_uptime"),
     }
+
+
+class _ValuesBackend(SNMPBackend):
+    def __init__(self, hostname: HostName, values: Mapping[OID, bytes]) -> None:
+        super().__init__(dataclasses.replace(SNMPConfig, hostname=hostname), logger)
+        self.values = values
+        self.gets: list[OID] = []
+
+    def get(self, /, oid, *, context):
+        self.gets.append(oid)
+        return self.values.get(oid)
+
+    def walk(self, /, oid, *, context, **kw):
+        raise NotImplementedError("walk")
+
+
+_SCAN_SECTIONS = [
+    (
+        SectionName("cisco_thing"),
+        [
+            [
+                (".1.3.6.1.4.1.9.9.1.0", ".*", True),
+                (snmp_scan.OID_SYS_OBJ, ".1.3.6.1.4.1.9.*", True),
+            ],
+        ],
+    ),
+    (
+        SectionName("net_snmp_thing"),
+        [
+            [(".1.3.6.1.4.1.2021.1.0", ".*", True), (snmp_scan.OID_SYS_DESCR, "linux.*", True)],
+            [(snmp_scan.OID_SYS_OBJ, ".1.3.6.1.4.1.8072.*", True)],
+        ],
+    ),
+]
+
+
+def _scan(backend: _ValuesBackend, tmp_path: Path) -> frozenset[SectionName]:
+    try:
+        return snmp_scan.gather_available_raw_section_names(
+            _SCAN_SECTIONS,
+            scan_config=snmp_scan.SNMPScanConfig(
+                on_error=OnError.IGNORE,
+                missing_sys_description=False,
+                oid_cache_dir=tmp_path,
+            ),
+            backend=backend,
+        )
+    finally:
+        snmp_cache.cleanup_host_caches()
+
+
+def test_snmp_scan_memoizes_detection_across_hosts(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(snmp_scan, "_detection_trees", OrderedDict())
+    values = {
+        snmp_scan.OID_SYS_DESCR: b"Linux switch 6.1",
+        snmp_scan.OID_SYS_OBJ: b".1.3.6.1.4.1.8072.3.2.10",
+        ".1.3.6.1.4.1.2021.1.0": b"1",
+    }
+    first_host = _ValuesBackend(HostName("first"), values)
+    assert _scan(first_host, tmp_path) == {SectionName("net_snmp_thing")}
+    # The conditions on the system object OID are decisive, no other OID is needed
+    assert first_host.gets == [snmp_scan.OID_SYS_DESCR, snmp_scan.OID_SYS_OBJ]
+
+    evaluations = []
+    evaluate = snmp_scan._evaluate_snmp_detection
+
+    def _evaluate_snmp_detection(**kwargs: object) -> bool:
+        evaluations.append(kwargs)
+        return evaluate(**kwargs)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(snmp_scan, "_evaluate_snmp_detection", _evaluate_snmp_detection)
+    # The system description is not probed, so it does not matter
+    same_host = _ValuesBackend(
+        HostName("same"), {**values, snmp_scan.OID_SYS_DESCR: b"Linux router 5.4"}
+    )
+    assert _scan(same_host, tmp_path) == {SectionName("net_snmp_thing")}
+    assert same_host.gets == first_host.gets
+    assert not evaluations
+
+    other_host = _ValuesBackend(
+        HostName("other"),
+        {
+            **values,
+            snmp_scan.OID_SYS_OBJ: b".1.3.6.1.4.1.9.1.525",
+            ".1.3.6.1.4.1.9.9.1.0": b"1",
+        },
+    )
+    assert _scan(other_host, tmp_path) == {
+        SectionName("cisco_thing"),
+        SectionName("net_snmp_thing"),
+    }
+    assert len(evaluations) == 2
+    assert other_host.gets == [
+        snmp_scan.OID_SYS_DESCR,
+        snmp_scan.OID_SYS_OBJ,
+        ".1.3.6.1.4.1.9.9.1.0",
+        ".1.3.6.1.4.1.2021.1.0",
+    ]
+
+
+def test_snmp_scan_does_not_memoize_errors(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(snmp_scan, "_detection_trees", OrderedDict())
+    values = {snmp_scan.OID_SYS_DESCR: b"Linux", snmp_scan.OID_SYS_OBJ: b".1.3.6.1.4.1.8072"}
+    evaluate = snmp_scan._evaluate_snmp_detection
+    evaluations = []
+
+    def _failing_evaluate_snmp_detection(**kwargs: object) -> bool:
+        evaluations.append(kwargs)
+        if len(evaluations) == 1:
+            raise ValueError("scan function failed")
+        return evaluate(**kwargs)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(snmp_scan, "_evaluate_snmp_detection", _failing_evaluate_snmp_detection)
+    assert _scan(_ValuesBackend(HostName("first"), values), tmp_path) == {
+        SectionName("net_snmp_thing")
+    }
+    assert _scan(_ValuesBackend(HostName("second"), values), tmp_path) == {
+        SectionName("net_snmp_thing")
+    }
+    assert len(evaluations) == 4
+    assert _scan(_ValuesBackend(HostName("third"), values), tmp_path) == {
+        SectionName("net_snmp_thing")
+    }
+    assert len(evaluations) == 4
@@ -9,6 +9,7 @@ import dataclasses
 import logging
 from collections.abc import Sequence
 from functools import partial
+from pathlib import Path
 from typing import NoReturn
 
 import pytest
@@ -31,11 +32,14 @@ from cmk.snmplib import (
     SNMPContextConfig,
     SNMPContextTimeout,
     SNMPHostConfig,
+    SNMPRowInfo,
     SNMPTable,
     SNMPVersion,
     SpecialColumn,
 )
 
+from cmk.fetchers.snmp_backend import StoredWalkSNMPBackend
+
 from cmk.checkengine.fetcher import SourceType
 
 from cmk.base.config import ConfigCache
@@ -164,6 +168,23 @@ def test_use_advanced_snmp_version(monkeypatch: MonkeyPatch) -> None:
     )
 
 
+def test_table_walk_enabled(monkeypatch: MonkeyPatch) -> None:
+    ts = Scenario()
+    ts.set_ruleset(
+        "snmp_table_walk_hosts",
+        [{"condition": {"host_name": ["localhost"]}, "id": "01", "value": True}],
+    )
+    ts.add_host(HostName("abc"))
+    ts.add_host(HostName("localhost"))
+    config_cache = ts.apply(monkeypatch)
+    assert not config_cache.make_snmp_config(
+        HostName("abc"), HostAddress("1.2.3.4"), SourceType.HOST, backend_override=None
+    ).table_walk_enabled
+    assert config_cache.make_snmp_config(
+        HostName("localhost"), HostAddress("1.2.3.4"), SourceType.HOST, backend_override=None
+    ).table_walk_enabled
+
+
 def test_is_classic_at_snmp_v1_host(monkeypatch: MonkeyPatch) -> None:
     ts = Scenario()
     ts.set_ruleset(
@@ -262,3 +283,93 @@ def test_walk_raises_on_timeout_without_snmpv3_context_stop_on_timeout() -> None
         )
 
     assert type(excinfo.value) is SNMPContextTimeout  # pylint: disable=unidiomatic-typecheck
+
+
+def _write_if_x_table(path: Path, *, ports: int) -> None:
+    # 18 columns like the ifXTable, ifHCInMulticastPkts (8) is missing for odd ports
+    with path.open("w") as walk:
+        for column in range(1, 19):
+            for port in range(1, ports + 1):
+                if column != 8 or port % 2 == 0:
+                    walk.write(f".1.3.6.1.2.1.31.1.1.1.{column}.{port} {column * 1000 + port}\n")
+        walk.write(".1.3.6.1.2.1.31.1.2.0 42\n")
+
+
+class _CountingStoredWalkBackend(StoredWalkSNMPBackend):
+    walks: list[str] = []
+
+    def walk(self, /, oid, *, context, **kw):
+        self.walks.append(oid)
+        return super().walk(oid, context=context, **kw)
+
+
+@pytest.mark.parametrize("save_to_cache", [False, True])
+def test_get_snmp_table_by_table_walk(tmp_path: Path, save_to_cache: bool) -> None:
+    _write_if_x_table(tmp_path / "walk", ports=20)
+    tree = BackendSNMPTree(
+        base=".1.3.6.1.2.1.31.1.1.1",
+        oids=[
+            BackendOIDSpec(SpecialColumn.END, "string", False),
+            *(BackendOIDSpec(str(c), "string", save_to_cache) for c in range(1, 19)),
+        ],
+    )
+
+    def get_table(
+        table_walk_enabled: bool,
+    ) -> tuple[Sequence[SNMPTable], Sequence[object], Sequence[str]]:
+        backend = _CountingStoredWalkBackend(
+            dataclasses.replace(SNMPConfig, table_walk_enabled=table_walk_enabled),
+            logger,
+            tmp_path / "walk",
+        )
+        backend.walks = []
+        walk_cache: dict[tuple[str, str, bool], SNMPRowInfo] = {}
+        table = get_snmp_table(
+            section_name=SectionName("unit_test"),
+            tree=tree,
+            walk_cache=walk_cache,
+            backend=backend,
+            log=logger.debug,
+        )
+        return table, sorted(walk_cache.items()), backend.walks
+
+    column_table, column_cache, column_walks = get_table(False)
+    table, cache, walks = get_table(True)
+
+    assert table == column_table
+    # The gaps are filled like before
+    assert table[0][8] == ""
+    assert table[1][8] == "8002"
+    assert cache == column_cache
+    assert len(column_walks) == 18
+    assert walks == [".1.3.6.1.2.1.31.1.1.1"]
+
+
+def test_table_walk_uses_walk_cache() -> None:
+    class Backend(SNMPBackend):
+        walks: list[str] = []
+
+        def get(self, /, *args: object, **kw: object) -> NoReturn:
+            assert False
+
+        def walk(self, /, oid, *, context, **kw):
+            self.walks.append(oid)
+            return [(f"{oid}.{c}.{r}", b"%d" % r) for c in ("1", "2.1", "3") for r in (1, 2)]
+
+    backend = Backend(dataclasses.replace(SNMPConfig, table_walk_enabled=True), logger)
+    walk_cache: dict[tuple[str, str, bool], SNMPRowInfo] = {}
+    tree = BackendSNMPTree(
+        base=".1.2",
+        oids=[BackendOIDSpec("1", "string", False), BackendOIDSpec("2.1", "string", False)],
+    )
+    for _run in range(2):
+        assert get_snmp_table(
+            section_name=None,
+            tree=tree,
+            walk_cache=walk_cache,
+            backend=backend,
+            log=logger.debug,
+        ) == [["1", "1"], ["2", "2"]]
+
+    assert backend.walks == [".1.2"]
+    assert sorted(key[0] for key in walk_cache) == [".1.2.1", ".1.2.2.1"]
@@ -6,12 +6,19 @@
 # pylint: disable=protected-access
 
 import pprint
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+import pytest
 
 import cmk.utils.log
 import cmk.utils.paths
-from cmk.utils.hostaddress import HostAddress
+from cmk.utils.hostaddress import HostAddress, HostName
 
 from cmk import piggyback
+from cmk.piggyback import _segments, _storage
+from cmk.piggyback._segments import SegmentStorage
 
 _TEST_HOST_NAME = HostAddress("test-host")
 
@@ -23,6 +30,21 @@ _PAYLOAD = (
 _REF_TIME = 1640000000.0
 
 
+@pytest.fixture(name="storage", autouse=True, params=["files", "segments"])
+def fixture_storage(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "segments":
+        monkeypatch.setattr(
+            _storage, "_segment_storage", SegmentStorage(cmk.utils.paths.piggyback_segments_dir)
+        )
+    return request.param
+
+
+def _expected_file_path(storage: str, piggybacked_host: str, source: str) -> Path:
+    if storage == "segments":
+        return cmk.utils.paths.piggyback_segments_dir / "sources" / source
+    return cmk.utils.paths.piggyback_dir / piggybacked_host / source
+
+
 def _get_only_raw_data_element(host_name: HostAddress) -> piggyback.PiggybackRawDataInfo:
     first, *other = piggyback.get_piggyback_raw_data(host_name)
     assert not other
@@ -102,7 +124,7 @@ def test_store_piggyback_raw_data_second_source() -> None:
     assert raw2.last_contact == _REF_TIME + 10.0
 
 
-def test_get_source_and_piggyback_hosts() -> None:
+def test_get_source_and_piggyback_hosts(storage: str) -> None:
     piggyback.store_piggyback_raw_data(
         HostAddress("source1"), {HostAddress("test-host"): _PAYLOAD}, _REF_TIME - 10.0
     )
@@ -127,13 +149,13 @@ def test_get_source_and_piggyback_hosts() -> None:
         HostAddress("test-host"): [
             piggyback.PiggybackFileInfo(
                 source=HostAddress("source1"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host" / "source1",
+                file_path=_expected_file_path(storage, "test-host", "source1"),
                 last_update=int(_REF_TIME - 10),
                 last_contact=int(_REF_TIME),
             ),
             piggyback.PiggybackFileInfo(
                 source=HostAddress("source2"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host" / "source2",
+                file_path=_expected_file_path(storage, "test-host", "source2"),
                 last_update=int(_REF_TIME),
                 last_contact=int(_REF_TIME),
             ),
@@ -141,15 +163,192 @@ def test_get_source_and_piggyback_hosts() -> None:
         HostAddress("test-host2"): [
             piggyback.PiggybackFileInfo(
                 source=HostAddress("source1"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host2" / "source1",
+                file_path=_expected_file_path(storage, "test-host2", "source1"),
                 last_update=int(_REF_TIME),
                 last_contact=int(_REF_TIME),
             ),
             piggyback.PiggybackFileInfo(
                 source=HostAddress("source2"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host2" / "source2",
+                file_path=_expected_file_path(storage, "test-host2", "source2"),
                 last_update=int(_REF_TIME),
                 last_contact=int(_REF_TIME),
             ),
         ],
     }
+
+
+def test_cleanup_piggyback_files() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {HostAddress("old-host"): _PAYLOAD}, _REF_TIME - 100
+    )
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME
+    )
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source2"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME - 100
+    )
+
+    piggyback.cleanup_piggyback_files(_REF_TIME - 50)
+
+    assert not piggyback.get_piggyback_raw_data(HostAddress("old-host"))
+    stored = _get_only_raw_data_element(_TEST_HOST_NAME)
+    assert stored.info.source == HostAddress("source1")
+    assert stored.raw_data == b"pay\nload\n"
+    assert piggyback.remove_source_status_file(HostAddress("source2")) is False
+
+
+def test_move_for_host_rename_piggybacked_host() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME
+    )
+
+    assert piggyback.move_for_host_rename(str(_TEST_HOST_NAME), "renamed-host") == (
+        "piggyback-load",
+    )
+
+    assert not piggyback.get_piggyback_raw_data(_TEST_HOST_NAME)
+    assert _get_only_raw_data_element(HostAddress("renamed-host")).raw_data == b"pay\nload\n"
+
+
+@pytest.fixture(name="segment_storage")
+def fixture_segment_storage(tmp_path: Path) -> Iterator[SegmentStorage]:
+    yield SegmentStorage(tmp_path)
+
+
+def test_segment_storage_rename_source(segment_storage: SegmentStorage) -> None:
+    segment_storage.store_piggyback_raw_data(
+        HostName("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME
+    )
+
+    assert segment_storage.move_for_host_rename(HostName("source1"), HostName("source2")) == (
+        "piggyback-pig",
+    )
+
+    (stored,) = segment_storage.get_piggyback_raw_data(_TEST_HOST_NAME)
+    assert stored.info.source == HostName("source2")
+    assert stored.info.last_contact == _REF_TIME
+    assert stored.raw_data == b"pay\nload\n"
+
+
+def test_segment_storage_notices_replaced_segments(tmp_path: Path) -> None:
+    writer, reader = SegmentStorage(tmp_path), SegmentStorage(tmp_path)
+    writer.store_piggyback_raw_data(HostName("source1"), {_TEST_HOST_NAME: (b"old",)}, _REF_TIME)
+    assert [d.raw_data for d in reader.get_piggyback_raw_data(_TEST_HOST_NAME)] == [b"old\n"]
+
+    writer.store_piggyback_raw_data(
+        HostName("source1"),
+        {HostAddress("other-host"): (b"other",), _TEST_HOST_NAME: (b"new",)},
+        _REF_TIME + 10,
+    )
+
+    (stored,) = reader.get_piggyback_raw_data(_TEST_HOST_NAME)
+    assert stored.raw_data == b"new\n"
+    assert stored.info.last_update == _REF_TIME + 10
+
+
+def test_get_source_piggyback_raw_data() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostName("source1"),
+        {HostAddress("vm-1"): (b"old",), HostAddress("vm-2"): (b"old",)},
+        _REF_TIME,
+    )
+    piggyback.store_piggyback_raw_data(
+        HostName("source1"), {HostAddress("vm-1"): (b"new",)}, _REF_TIME + 10
+    )
+    piggyback.store_piggyback_raw_data(
+        HostName("source2"), {HostAddress("vm-1"): (b"other",)}, _REF_TIME
+    )
+
+    data = piggyback.get_source_piggyback_raw_data(
+        HostName("source1"), {HostAddress("vm-1"), HostAddress("vm-3")}
+    )
+
+    assert list(data) == [HostAddress("vm-1")]
+    assert data[HostAddress("vm-1")].raw_data == b"new\n"
+    assert data[HostAddress("vm-1")].info.last_update == _REF_TIME + 10
+    assert data[HostAddress("vm-1")].info.last_contact == _REF_TIME + 10
+    assert not piggyback.get_source_piggyback_raw_data(HostName("unknown"), {HostAddress("vm-1")})
+
+
+def test_set_storage(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(_storage, "_segment_storage", None)
+    piggyback.set_storage("segments")
+    segment_storage = _storage._segment_storage
+    assert segment_storage is not None
+    piggyback.set_storage("segments")
+    assert _storage._segment_storage is segment_storage
+    piggyback.set_storage("files")
+    assert _storage._segment_storage is None
+
+
+def test_segment_storage_is_sharded_by_source(tmp_path: Path) -> None:
+    """Storing the data of a source touches neither the data of the other sources nor
+    the lookup files of hosts it already had data for"""
+    segment_storage = SegmentStorage(tmp_path)
+    segment_storage.store_piggyback_raw_data(
+        HostName("source1"), {HostAddress("vm-1"): (b"1",)}, _REF_TIME
+    )
+    segment_storage.store_piggyback_raw_data(
+        HostName("source2"), {HostAddress("vm-1"): (b"2",)}, _REF_TIME
+    )
+    other_segment = (tmp_path / "sources" / "source2").stat()
+    lookup = (tmp_path / "hosts" / "vm-1").stat()
+
+    segment_storage.store_piggyback_raw_data(
+        HostName("source1"), {HostAddress("vm-1"): (b"new",)}, _REF_TIME + 10
+    )
+
+    assert (tmp_path / "sources" / "source2").stat() == other_segment
+    assert (tmp_path / "hosts" / "vm-1").stat() == lookup
+    assert (tmp_path / "hosts" / "vm-1").read_text() == "source1\nsource2\n"
+    assert sorted(p.name for p in (tmp_path / "sources").iterdir()) == ["source1", "source2"]
+    assert sorted(
+        d.raw_data for d in SegmentStorage(tmp_path).get_piggyback_raw_data(HostAddress("vm-1"))
+    ) == [b"2\n", b"new\n"]
+
+
+def test_segment_storage_lookup_reads_only_the_sources_of_the_host(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    writer = SegmentStorage(tmp_path)
+    for n in range(10):
+        writer.store_piggyback_raw_data(
+            HostName(f"source{n}"), {HostAddress(f"vm-{n}"): (b"data",)}, _REF_TIME
+        )
+    reader = SegmentStorage(tmp_path)
+    parsed = []
+    parse = _segments._parse_segment_header
+
+    def _parse_segment_header(segment: BinaryIO) -> _segments._Segment:
+        parsed.append(segment.name)
+        return parse(segment)
+
+    monkeypatch.setattr(_segments, "_parse_segment_header", _parse_segment_header)
+
+    (stored,) = reader.get_piggyback_raw_data(HostAddress("vm-3"))
+    (stored,) = reader.get_piggyback_raw_data(HostAddress("vm-3"))
+
+    assert stored.info.source == HostName("source3")
+    assert parsed == [str(tmp_path / "sources" / "source3")]
+
+
+def test_segment_storage_many_piggybacked_hosts(segment_storage: SegmentStorage) -> None:
+    """A source with many piggybacked hosts is one file, looking up a host does not
+    depend on the number of hosts"""
+    hosts = [HostAddress(f"vm-{n}") for n in range(5000)]
+    segment_storage.store_piggyback_raw_data(
+        HostName("vcenter"), {host: (b"<<<section>>>", b"data") for host in hosts}, _REF_TIME
+    )
+    segment_storage.store_piggyback_raw_data(
+        HostName("vcenter"), {host: (b"<<<section>>>", b"new") for host in hosts[:10]}, _REF_TIME
+    )
+
+    (stored,) = segment_storage.get_piggyback_raw_data(hosts[-1])
+    assert stored.raw_data == b"<<<section>>>\ndata\n"
+    (stored,) = segment_storage.get_piggyback_raw_data(hosts[0])
+    assert stored.raw_data == b"<<<section>>>\nnew\n"
+
+    assert len(segment_storage.get_piggybacked_host_with_sources()) == len(hosts)
+    segment_storage.cleanup(_REF_TIME + 1)
+    assert not segment_storage.get_piggybacked_host_with_sources()
+    assert not segment_storage.get_piggyback_raw_data(hosts[0])
@@ -41,3 +41,15 @@ def test_cleanup(plugin: VersionSpecificCachesCleaner) -> None:
         plugin(logging.getLogger())
         assert not cached_file.exists()
         assert base_dir.exists()
+
+
+def test_cleanup_walk_cache(plugin: VersionSpecificCachesCleaner) -> None:
+    walk_cache_dir = Path(paths_utils.var_dir, "snmp_cache")
+    (walk_cache_dir / "legacy-host").mkdir(parents=True, exist_ok=True)
+    legacy_file = walk_cache_dir / "legacy-host" / "OID.1.2.3-12c3d4a"
+    legacy_file.write_text("[]\n")
+    walk_cache_file = walk_cache_dir / "host.walk"
+    walk_cache_file.write_bytes(b"CMKWALK1\x00\x00\x00\x00")
+    plugin(logging.getLogger())
+    assert not legacy_file.exists()
+    assert not walk_cache_file.exists()
@@ -6,6 +6,9 @@
 # pylint: disable=protected-access
 
 import json
+import random
+import time
+from collections.abc import Callable, Sequence
 
 import pytest
 
@@ -13,7 +16,11 @@ from tests.testlib.repo import repo_path
 
 from livestatus import RRDResponse
 
-from cmk.utils.prediction import _prediction
+from cmk.utils.prediction import _prediction, _vectorized
+
+_CalculateData = Callable[
+    [range, Sequence[tuple[range, Sequence[float | None], int]]], _prediction.PredictionData
+]
 
 
 def _load_fake_rrd_response(start: int, end: int) -> RRDResponse:
@@ -176,10 +183,18 @@ def _load_fake_rrd_response(start: int, end: int) -> RRDResponse:
         ),
     ],
 )
+@pytest.mark.parametrize(
+    "calculate_data_for_prediction",
+    [
+        pytest.param(_prediction._calculate_data_for_prediction, id="python"),
+        pytest.param(_vectorized.calculate_data_for_prediction, id="numpy"),
+    ],
+)
 def test_calculate_data_for_prediction(
     timezone: str,
     timegroup: str,
     time_windows: list[tuple[int, int]],
+    calculate_data_for_prediction: _CalculateData,
 ) -> None:
     from_time = time_windows[0][0]
 
@@ -193,7 +208,7 @@ def test_calculate_data_for_prediction(
         if (response := _load_fake_rrd_response(start, end))
     ]
 
-    data_for_pred = _prediction._calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+    data_for_pred = calculate_data_for_prediction(raw_slices[0][0], raw_slices)
 
     expected_reference = _prediction.PredictionData.model_validate_json(
         (
@@ -210,3 +225,68 @@ def test_calculate_data_for_prediction(
     assert len(expected_reference.points) == len(data_for_pred.points)
     for cal, ref in zip(data_for_pred.points, expected_reference.points):
         assert cal == pytest.approx(ref, rel=1e-12, abs=1e-12)
+
+
+def _random_slices(
+    count: int, points: int, step: int
+) -> list[tuple[range, Sequence[float | None], int]]:
+    rng = random.Random(4711)
+    start = 1700000000
+    slices: list[tuple[range, Sequence[float | None], int]] = []
+    for n in range(count):
+        # Older slices are stored with a coarser resolution
+        slice_step = step if n < count // 2 else 5 * step
+        slice_start = start - n * 86400
+        slices.append(
+            (
+                range(slice_start, slice_start + points * step, slice_step),
+                [
+                    None if rng.random() < 0.05 else rng.uniform(0, 1e6)
+                    for _i in range(points * step // slice_step)
+                ],
+                n * 86400,
+            )
+        )
+    # A time column without any data, and one with a single value
+    slices[0][1][0:1] = [None]  # type: ignore[index]
+    for _range, values, _shift in slices[1:]:
+        values[0:2] = [None, None]  # type: ignore[index]
+    return slices
+
+
+def _assert_same_points(
+    result: _prediction.PredictionData, expected: _prediction.PredictionData
+) -> None:
+    # Python sums floats with compensation, so the last digits may differ
+    assert len(result.points) == len(expected.points)
+    assert all(
+        cal == pytest.approx(ref, rel=1e-9) for cal, ref in zip(result.points, expected.points)
+    )
+
+
+def test_vectorized_prediction_matches() -> None:
+    raw_slices = _random_slices(count=20, points=1440, step=60)
+    expected = _prediction._calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+
+    result = _vectorized.calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+    assert result.model_dump(exclude={"points"}) == expected.model_dump(exclude={"points"})
+    _assert_same_points(result, expected)
+    assert expected.points[0] is None
+    assert expected.points[1] is not None and expected.points[1].stdev is None
+
+
+def test_vectorized_prediction_benchmark() -> None:
+    """90 days of one minute steps"""
+    raw_slices = _random_slices(count=90, points=1440, step=60)
+
+    start = time.perf_counter()
+    expected = _prediction._calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+    python_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = _vectorized.calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+    numpy_time = time.perf_counter() - start
+
+    print(f"python: {python_time:.3f}s, numpy: {numpy_time:.3f}s")
+    _assert_same_points(result, expected)
+    assert numpy_time < python_time
@@ -15,6 +15,7 @@ from tests.testlib.base import Scenario
 
 from cmk.utils.hostaddress import HostName
 from cmk.utils.rulesets.ruleset_matcher import (
+    HostIndex,
     LabelManager,
     matches_tag_condition,
     RuleConditionsSpec,
@@ -572,6 +573,81 @@ def test_ruleset_matcher_get_host_values_tags(
     assert list(matcher.get_host_values(hostname, ruleset=tag_ruleset)) == expected_result
 
 
+def test_host_index() -> None:
+    hosts = [HostName(f"host{n}") for n in range(20)]
+    index = HostIndex(hosts)
+
+    mask = index.mask_of([HostName("host0"), HostName("host9"), HostName("unknown")])
+    assert mask == 0b1000000001
+    assert index.hosts_of(mask) == {HostName("host0"), HostName("host9")}
+    assert list(index.ids_of(mask)) == [0, 9]
+    assert index.hosts_of(0) == set()
+
+    bitmap = HostIndex.bitmap(mask)
+    assert len(bitmap) == 2
+    for hostname in hosts:
+        byte, bit = index.bitmap_position(hostname)
+        assert (byte < len(bitmap) and bool(bitmap[byte] & bit)) is (
+            hostname in (HostName("host0"), HostName("host9"))
+        )
+    assert index.bitmap_position(HostName("unknown"))[0] >= len(bitmap)
+
+
+def test_ruleset_matcher_tags_of_hosts_sharing_tags() -> None:
+    # Many hosts with the same tags make the optimizer evaluate each tag combination once
+    hosts = [HostName(f"host{n}") for n in range(12)]
+    matcher = RulesetMatcher(
+        host_tags={
+            hostname: {TagGroupID("criticality"): TagID("prod" if n % 3 else "test")}
+            for n, hostname in enumerate(hosts)
+        },
+        host_paths={
+            hostname: "/wato/sub/" if n < 6 else "/wato/" for n, hostname in enumerate(hosts)
+        },
+        label_manager=LabelManager(
+            explicit_host_labels={},
+            host_label_rules=(),
+            service_label_rules=(),
+            discovered_labels_of_service=lambda *args, **kw: {},
+        ),
+        all_configured_hosts=hosts,
+        clusters_of={},
+        nodes_of={},
+    )
+    matcher.ruleset_optimizer.set_all_processed_hosts(hosts)
+    ruleset: Sequence[RuleSpec[str]] = [
+        {
+            "id": "01",
+            "value": "test in sub",
+            "condition": {
+                "host_tags": {TagGroupID("criticality"): TagID("test")},
+                "host_folder": "/wato/sub/",
+            },
+        },
+        {
+            "id": "02",
+            "value": "not test",
+            "condition": {"host_tags": {TagGroupID("criticality"): {"$ne": TagID("test")}}},
+        },
+    ]
+
+    assert {
+        hostname: list(
+            matcher.get_service_ruleset_values(RulesetMatchObject(hostname, "Service"), ruleset)
+        )
+        for hostname in hosts
+    } == {
+        hostname: (["test in sub"] if n < 6 else []) if n % 3 == 0 else ["not test"]
+        for n, hostname in enumerate(hosts)
+    }
+    assert not list(
+        matcher.get_service_ruleset_values(
+            RulesetMatchObject(HostName("unknown"), "Service"), ruleset
+        )
+    )
+    assert matcher.dump_sizes()["ruleset_optimizer_matching_hosts"] > 0
+
+
 @pytest.mark.parametrize(
     "rule_spec, expected_result",
     [
@@ -45,3 +45,16 @@ def test_populated() -> None:
     assert cache.is_populated()
     cache.clear()
     assert not cache.is_populated()
+
+
+def test_dump_sizes() -> None:
+    mgr = cmk.utils.caching.CacheManager()
+    mgr.obtain_cache("test_dict")["a"] = 1
+    mgr.register_size_source("matcher", lambda: {"hosts": 42})
+
+    sizes = mgr.dump_sizes()
+    assert sizes["test_dict"] > 0
+    assert sizes["matcher.hosts"] == 42
+
+    mgr.clear()
+    assert mgr.dump_sizes() == {}
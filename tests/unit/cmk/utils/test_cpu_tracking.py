@@ -4,10 +4,13 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import json
+import subprocess
+import sys
+import threading
 
 import pytest
 
-from cmk.utils.cpu_tracking import Snapshot
+from cmk.utils.cpu_tracking import CPUTracker, Snapshot
 
 
 def json_identity(serializable: object) -> object:
@@ -50,3 +53,29 @@ class TestCpuTracking:
 
     def test_json_serialization_now(self, now: Snapshot) -> None:
         assert Snapshot.deserialize(json_identity(now.serialize())) == now
+
+    def test_thread_snapshot_excludes_other_threads(self) -> None:
+        stop = threading.Event()
+
+        def busy() -> None:
+            while not stop.is_set():
+                pass
+
+        other = threading.Thread(target=busy)
+        other.start()
+        try:
+            with CPUTracker(lambda msg: None, thread=True) as thread_tracker:
+                with CPUTracker(lambda msg: None) as process_tracker:
+                    stop.wait(0.2)
+        finally:
+            stop.set()
+            other.join()
+
+        assert process_tracker.duration.process.user > 0.05
+        assert thread_tracker.duration.process.user < 0.05
+        assert thread_tracker.duration.process.elapsed > 0.15
+
+    def test_thread_snapshot_excludes_children(self) -> None:
+        subprocess.run([sys.executable, "-c", "sum(range(1000000))"], check=True)
+        snapshot = Snapshot.take_for_thread()
+        assert snapshot.process.children_user == snapshot.process.children_system == 0.0
@@ -11,9 +11,17 @@ from pytest import MonkeyPatch
 import cmk.utils.notify
 from cmk.utils.config_path import VersionedConfigPath
 from cmk.utils.hostaddress import HostName
-from cmk.utils.notify import NotificationHostConfig, read_notify_host_file, write_notify_host_file
+from cmk.utils.notify import (
+    NotificationBacklog,
+    NotificationHostConfig,
+    read_notify_host_file,
+    write_notify_host_file,
+)
+from cmk.utils.notify_types import EventContext
 from cmk.utils.tags import TagGroupID, TagID
 
+from cmk.ccc import store
+
 
 @pytest.mark.parametrize(
     "versioned_config_path, host_name, config, expected",
@@ -68,3 +76,65 @@ def test_write_and_read_notify_host_file(
         lambda *args, **kw: notify_labels_path / host_name,
     )
     assert read_notify_host_file(host_name) == expected
+
+
+def _context(nr: int) -> EventContext:
+    return EventContext({"HOSTNAME": HostName(f"host{nr}")})
+
+
+def test_notification_backlog_keeps_newest_contexts(tmp_path: Path) -> None:
+    backlog = NotificationBacklog(tmp_path / "backlog")
+    assert backlog.get(0) is None
+
+    for nr in range(7):
+        backlog.append(_context(nr), size=3)
+
+    assert list(backlog) == [_context(6), _context(5), _context(4)]
+    assert backlog.get(1) == _context(5)
+    assert backlog.get(3) is None
+    assert backlog.get(-1) is None
+    assert len(list((tmp_path / "backlog").iterdir())) == 4  # the slots and the head
+
+
+def test_notification_backlog_append_writes_one_context(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    backlog = NotificationBacklog(tmp_path / "backlog")
+    for nr in range(50):
+        backlog.append(_context(nr), size=100)
+
+    written: list[Path] = []
+
+    def save_object_to_file(path: Path, data: object, pretty: bool = False) -> None:
+        written.append(path)
+        store.save_object_to_file(path, data, pretty)
+
+    monkeypatch.setattr(cmk.utils.notify, "save_object_to_file", save_object_to_file)
+    backlog.append(_context(50), size=100)
+
+    assert written == [tmp_path / "backlog" / "50", tmp_path / "backlog" / "head"]
+    assert backlog.get(0) == _context(50)
+
+
+def test_notification_backlog_resize(tmp_path: Path) -> None:
+    backlog = NotificationBacklog(tmp_path / "backlog")
+    for nr in range(5):
+        backlog.append(_context(nr), size=5)
+
+    backlog.append(_context(5), size=2)
+    assert list(backlog) == [_context(5)]
+    assert len(list((tmp_path / "backlog").iterdir())) == 3
+
+    backlog.append(_context(6), size=0)
+    assert list(backlog) == []
+
+
+def test_notification_backlog_migrates_legacy_file(tmp_path: Path) -> None:
+    (tmp_path / "backlog.mk").write_text(repr([_context(1), _context(0)]))
+    backlog = NotificationBacklog(tmp_path / "backlog")
+    assert list(backlog) == [_context(1), _context(0)]
+
+    backlog.append(_context(2), size=10)
+
+    assert not (tmp_path / "backlog.mk").exists()
+    assert list(backlog) == [_context(2), _context(1), _context(0)]